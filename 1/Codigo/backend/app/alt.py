@@ -0,0 +1,245 @@
+"""
+Heurística ALT (A*, Landmarks y desigualdad Triangular)
+
+La heurística haversine / velocidad máxima es muy optimista cuando existe una
+sola avenida rápida. ALT elige unos pocos nodos "landmark" L y precalcula, para
+cada nodo v, las distancias d(L, v) y d(v, L). Por la desigualdad triangular:
+
+    d(v, t) >= d(v, L) - d(t, L)
+    d(v, t) >= d(L, t) - d(L, v)
+
+El máximo de estas cotas sobre los landmarks es una heurística admisible y
+consistente, mucho más ajustada que la distancia en línea recta.
+
+Las tablas (landmarks x nodos) se guardan como arreglos NumPy en un .npz junto a
+la caché del grafo.
+
+Las cotas solo requieren que cada fila sea un potencial factible (d(L, v) <=
+d(L, u) + w(u, v) para toda arista): ante parches de pesos (ver patches.py) los
+aumentos y cortes no invalidan nada (las cotas quedan más holgadas) y las
+disminuciones se reparan propagándolas desde las aristas afectadas (update).
+"""
+import heapq
+import logging
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+
+from .csr import CSRGraph, dijkstra_all
+
+logger = logging.getLogger(__name__)
+
+ALT_VERSION = 2  # 2: huella SHA-1 del grafo (CSRGraph.fingerprint)
+DEFAULT_LANDMARKS = 8
+ACTIVE_LANDMARKS = 4  # Landmarks usados por consulta (los de mejor cota en el origen)
+# Distancia usada para nodos inalcanzables: inf - inf daría NaN en las cotas
+UNREACHABLE = 1e15
+
+
+class LandmarkTables:
+    """
+    Tablas de distancias a/desde landmarks.
+
+    from_lm[i, v] = d(L_i, v)    to_lm[i, v] = d(v, L_i)
+    """
+
+    def __init__(
+        self,
+        landmarks: np.ndarray,
+        from_lm: np.ndarray,
+        to_lm: np.ndarray,
+        checksum: str,
+        rows: Optional[Tuple[List[List[float]], List[List[float]]]] = None,
+    ):
+        self.landmarks = landmarks
+        self.from_lm = from_lm
+        self.to_lm = to_lm
+        self.checksum = checksum
+        # Filas por nodo (tuplas de L distancias) para evaluar la heurística desde
+        # Python; rows permite reutilizar las de otras tablas con los mismos valores
+        self._from_rows, self._to_rows = rows if rows is not None else (from_lm.T.tolist(), to_lm.T.tolist())
+
+    @property
+    def n_landmarks(self) -> int:
+        return len(self.landmarks)
+
+    @classmethod
+    def build(cls, csr: CSRGraph, n_landmarks: int = DEFAULT_LANDMARKS, seed: int = 0) -> 'LandmarkTables':
+        """
+        Selecciona landmarks por el método "farthest": cada nuevo landmark es el nodo
+        más lejano (en costo) de los ya elegidos, lo que los reparte en la periferia.
+        """
+        t0 = time.time()
+        n = csr.n_nodes
+        n_landmarks = min(n_landmarks, n)
+        rng = np.random.default_rng(seed)
+        landmarks: List[int] = []
+        from_rows: List[np.ndarray] = []
+        to_rows: List[np.ndarray] = []
+        # Primer landmark: el más lejano a un nodo al azar
+        closest = _finite(np.asarray(dijkstra_all(csr, [int(rng.integers(n))])))
+        for _ in range(n_landmarks):
+            candidate = int(np.argmax(np.where(closest < UNREACHABLE, closest, -1.0)))
+            if candidate in landmarks:
+                break
+            landmarks.append(candidate)
+            d_from = _finite(np.asarray(dijkstra_all(csr, [candidate])))
+            d_to = _finite(np.asarray(dijkstra_all(csr, [candidate], reverse=True)))
+            from_rows.append(d_from)
+            to_rows.append(d_to)
+            closest = d_from if len(landmarks) == 1 else np.minimum(closest, d_from)
+
+        tables = cls(
+            landmarks=np.asarray(landmarks, dtype=np.int64),
+            from_lm=np.vstack(from_rows) if from_rows else np.zeros((0, n)),
+            to_lm=np.vstack(to_rows) if to_rows else np.zeros((0, n)),
+            checksum=csr.fingerprint(),
+        )
+        logger.info(f"Landmarks ALT construidos en {time.time() - t0:.1f}s ({len(landmarks)} landmarks)")
+        return tables
+
+    def update(self, csr: CSRGraph, edges: Sequence[int]) -> 'LandmarkTables':
+        """
+        Tablas para csr, cuyos pesos cambiaron en las aristas edges, sin recalcularlas:
+        solo se corrigen las distancias que una disminución de peso hace bajar.
+        """
+        edges = np.asarray(edges, dtype=np.int64)
+        tails = csr.edge_table().source[edges]
+        heads = csr.neighbors[edges].astype(np.int64)
+        w = csr.weights[edges]
+        from_lm, to_lm = self.from_lm, self.to_lm
+        from_changed: Set[int] = set()
+        to_changed: Set[int] = set()
+        for i in range(self.n_landmarks):
+            # d(L, v): la arista u->v puede acortar el camino hasta v
+            bad = from_lm[i, tails] + w < from_lm[i, heads]
+            if bad.any():
+                if from_lm is self.from_lm:
+                    from_lm = from_lm.copy()
+                seeds = zip((from_lm[i, tails] + w)[bad].tolist(), heads[bad].tolist())
+                from_changed.update(_propagate(from_lm[i], seeds, csr.off_l, csr.nbr_l, None, csr.w_l))
+            # d(v, L): la arista u->v puede acortar el camino desde u
+            bad = to_lm[i, heads] + w < to_lm[i, tails]
+            if bad.any():
+                if to_lm is self.to_lm:
+                    to_lm = to_lm.copy()
+                seeds = zip((to_lm[i, heads] + w)[bad].tolist(), tails[bad].tolist())
+                to_changed.update(_propagate(to_lm[i], seeds, *csr.reverse(), csr.w_l))
+        # Solo se rehacen las filas de los nodos cuya distancia bajó
+        return LandmarkTables(self.landmarks, from_lm, to_lm, csr.fingerprint(), rows=(
+            _replace_rows(self._from_rows, from_lm, from_changed),
+            _replace_rows(self._to_rows, to_lm, to_changed)))
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Guarda las tablas en un .npz."""
+        np.savez(path, version=ALT_VERSION, checksum=self.checksum,
+                 landmarks=self.landmarks, from_lm=self.from_lm, to_lm=self.to_lm)
+
+    @classmethod
+    def load(cls, path: Union[str, Path], csr: CSRGraph) -> Optional['LandmarkTables']:
+        """Carga las tablas; devuelve None si fueron calculadas para otro grafo o pesos."""
+        with np.load(path) as data:
+            if int(data['version']) != ALT_VERSION or str(data['checksum']) != csr.fingerprint():
+                return None
+            return cls(data['landmarks'], data['from_lm'], data['to_lm'], str(data['checksum']))
+
+    def heuristic(self, t: int, s: Optional[int] = None, active: int = ACTIVE_LANDMARKS) -> Callable[[int], float]:
+        """
+        Devuelve h(v), cota inferior del costo de v al destino t (ids densos).
+        Si se da el origen s se usan solo los `active` landmarks con mejor cota en s.
+        """
+        lms = range(self.n_landmarks)
+        if s is not None and active < self.n_landmarks:
+            bounds = np.maximum(self.to_lm[:, s] - self.to_lm[:, t], self.from_lm[:, t] - self.from_lm[:, s])
+            lms = np.argsort(-bounds, kind='stable')[:active].tolist()
+        from_rows, to_rows = self._from_rows, self._to_rows
+        to_t = [to_rows[t][i] for i in lms]
+        from_t = [from_rows[t][i] for i in lms]
+        pairs = list(zip(lms, to_t, from_t))
+
+        def h(v: int) -> float:
+            to_v, from_v = to_rows[v], from_rows[v]
+            best = 0.0
+            for i, tt, ft in pairs:
+                b = to_v[i] - tt
+                if b > best:
+                    best = b
+                b = ft - from_v[i]
+                if b > best:
+                    best = b
+            return best
+
+        return h
+
+
+def _propagate(
+    dist: np.ndarray,
+    seeds: Sequence[Tuple[float, int]],
+    off: List[int],
+    nbr: List[int],
+    edge_of: Optional[List[int]],
+    wts: List[float],
+) -> Set[int]:
+    """
+    Dijkstra desde los nodos semilla (distancia nueva, nodo) que solo avanza mientras
+    mejora dist; deja dist (en el lugar) como potencial factible para los pesos wts.
+    Devuelve los nodos cuya distancia cambió.
+    """
+    pq = []
+    changed: Set[int] = set()
+    dist_l = dist.tolist()  # Indexar una lista es mucho más rápido que un arreglo NumPy
+    for d, v in seeds:
+        if d < dist_l[v]:
+            dist_l[v] = d
+            pq.append((d, v))
+            changed.add(v)
+    heapq.heapify(pq)
+    while pq:
+        d, u = heapq.heappop(pq)
+        if d > dist_l[u]:
+            continue
+        for i in range(off[u], off[u + 1]):
+            v = nbr[i]
+            nd = d + wts[edge_of[i] if edge_of is not None else i]
+            if nd < dist_l[v]:
+                dist_l[v] = nd
+                heapq.heappush(pq, (nd, v))
+                changed.add(v)
+    if changed:
+        idx = np.fromiter(changed, dtype=np.int64, count=len(changed))
+        dist[idx] = [dist_l[v] for v in idx.tolist()]
+    return changed
+
+
+def _replace_rows(rows: List[List[float]], table: np.ndarray, nodes: Set[int]) -> List[List[float]]:
+    """Copia de rows con las filas de nodes tomadas de table (el resto se comparte)."""
+    if not nodes:
+        return rows
+    rows = list(rows)
+    for v in nodes:
+        rows[v] = table[:, v].tolist()
+    return rows
+
+
+def _finite(dist: np.ndarray) -> np.ndarray:
+    return np.where(np.isfinite(dist), dist, UNREACHABLE)
+
+
+def load_or_build_landmarks(csr: CSRGraph, path: Union[str, Path]) -> LandmarkTables:
+    """Carga las tablas ALT guardadas junto a la caché del grafo, o las construye y las guarda."""
+    if Path(path).exists():
+        try:
+            tables = LandmarkTables.load(path, csr)
+            if tables is not None:
+                return tables
+            logger.info(f"Tablas ALT desactualizadas: {path}")
+        except Exception as e:
+            logger.warning(f"No se pudieron leer las tablas ALT {path}: {e}")
+    tables = LandmarkTables.build(csr)
+    try:
+        tables.save(path)
+    except OSError as e:
+        logger.warning(f"No se pudieron guardar las tablas ALT {path}: {e}")
+    return tables
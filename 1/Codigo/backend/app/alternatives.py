@@ -0,0 +1,178 @@
+"""
+Rutas alternativas con el método de plateaus
+
+Se calculan dos árboles de caminos mínimos: uno hacia el destino (grafo inverso) y
+otro desde el origen, ambos acotados a MAX_STRETCH veces el costo óptimo. Un
+"plateau" es una cadena de aristas que pertenece a los dos árboles: para cualquier
+nodo del plateau, ir por el árbol directo hasta él y seguir por el árbol inverso da
+el mismo costo. Cada plateau define entonces una ruta candidata
+
+    origen -> (árbol directo) -> inicio del plateau -> fin -> (árbol inverso) -> destino
+
+que es localmente óptima en todo el tramo del plateau (no tiene desvíos absurdos).
+Las K rutas se eligen de esos candidatos, en orden de costo, descartando las que
+comparten demasiado con las ya elegidas. Los dos árboles se calculan una sola vez y
+sirven para todas las alternativas: pedir más rutas no repite búsquedas (a
+diferencia de Yen, que hace una búsqueda por cada desvío probado).
+"""
+import heapq
+import math
+from typing import Dict, List, Optional, Set, Tuple
+
+from .csr import CSRGraph
+
+MAX_ALTERNATIVES = 5
+MAX_STRETCH = 1.25  # Costo máximo de una alternativa, relativo a la ruta óptima
+MAX_OVERLAP = 0.6  # Fracción máxima de su costo que una alternativa comparte con una ruta ya elegida
+MIN_PLATEAU = 0.2  # Largo mínimo (en costo) del plateau, relativo a la ruta óptima
+
+
+class Route:
+    """Ruta encontrada: costo, aristas CSR desde el origen y costo del plateau que la define."""
+
+    def __init__(self, cost: float, edges: List[int], plateau: float):
+        self.cost = cost
+        self.edges = edges
+        self.plateau = plateau
+
+
+def shortest_path_tree(
+    csr: CSRGraph,
+    root: int,
+    reverse: bool = False,
+    limit: float = math.inf,
+    target: Optional[int] = None,
+    stretch: float = 1.0,
+    bound: Optional[Dict[int, float]] = None,
+    relaxed: Optional[List[int]] = None,
+) -> Tuple[Dict[int, float], Dict[int, int], int]:
+    """
+    Dijkstra desde root (hacia root con reverse=True) hasta la distancia limit.
+
+    Devuelve (dist, parent, nodos asentados): parent[v] es la arista CSR por la que
+    se llega a v (con reverse, la primera arista del camino de v hacia root). Solo
+    las distancias <= limit son definitivas.
+
+    - target: al asentarlo el límite pasa a ser stretch * su distancia
+    - bound: distancias de la otra dirección; se descartan los nodos v con
+      dist[v] + bound[v] > limit (no pueden estar en una ruta aceptable)
+    - relaxed: si se da, se agregan las aristas que mejoraron una distancia
+    """
+    if reverse:
+        off, nbr, edge_of = csr.reverse()
+    else:
+        off, nbr, edge_of = csr.off_l, csr.nbr_l, None
+    wts = csr.w_l
+    dist = {root: 0.0}
+    parent: Dict[int, int] = {}
+    done: Set[int] = set()
+    pq = [(0.0, root)]
+    while pq:
+        d, u = heapq.heappop(pq)
+        if u in done:
+            continue
+        if d > limit:
+            break
+        done.add(u)
+        if u == target:
+            limit = min(limit, d * stretch)
+        for i in range(off[u], off[u + 1]):
+            v = nbr[i]
+            e = i if edge_of is None else edge_of[i]
+            nd = d + wts[e]
+            if nd < dist.get(v, math.inf):
+                if bound is not None and nd + bound.get(v, math.inf) > limit:
+                    continue
+                dist[v] = nd
+                parent[v] = e
+                heapq.heappush(pq, (nd, v))
+                if relaxed is not None:
+                    relaxed.append(e)
+    return dist, parent, len(done)
+
+
+def alternative_routes(
+    csr: CSRGraph,
+    s: int,
+    t: int,
+    k: int = 3,
+    collect: bool = True,
+) -> Tuple[List[Route], int, List[Tuple[str, int]]]:
+    """
+    Hasta k rutas de s a t (ids densos), la primera la óptima.
+
+    Devuelve (rutas, nodos asentados, relajaciones) donde relajaciones es la lista
+    de (dirección, arista CSR) de ambas búsquedas (solo si collect=True).
+    """
+    backward_relaxed: Optional[List[int]] = [] if collect else None
+    forward_relaxed: Optional[List[int]] = [] if collect else None
+    # Árbol hacia t: al asentar s se conoce el óptimo y se acota la búsqueda
+    db, pb, settled_b = shortest_path_tree(csr, t, reverse=True, target=s, stretch=MAX_STRETCH,
+                                           relaxed=backward_relaxed)
+    relaxations = [('backward', e) for e in backward_relaxed] if collect else []
+    if s not in db:
+        return [], settled_b, relaxations
+    opt = db[s]
+    limit = opt * MAX_STRETCH
+    df, pf, settled_f = shortest_path_tree(csr, s, limit=limit, bound=db, relaxed=forward_relaxed)
+    if collect:
+        relaxations += [('forward', e) for e in forward_relaxed]
+
+    source, head, wts = csr.edge_table().source, csr.nbr_l, csr.w_l
+
+    def forward_path(v: int) -> List[int]:
+        edges = []
+        while v != s:
+            e = pf[v]
+            edges.append(e)
+            v = int(source[e])
+        edges.reverse()
+        return edges
+
+    def backward_path(v: int) -> List[int]:
+        edges = []
+        while v != t:
+            e = pb[v]
+            edges.append(e)
+            v = head[e]
+        return edges
+
+    routes = [Route(opt, forward_path(t), opt)]
+    if k <= 1 or s == t:
+        return routes, settled_b + settled_f, relaxations
+
+    # Plateaus: aristas u -> v que están en ambos árboles, encadenadas
+    plateau_next: Dict[int, int] = {}
+    for v, e in pf.items():
+        u = int(source[e])
+        if pb.get(u) == e and df[u] + db[u] <= limit:
+            plateau_next[u] = v
+    starts = set(plateau_next) - set(plateau_next.values())
+    candidates = []
+    for a in starts:
+        b = a
+        while b in plateau_next:
+            b = plateau_next[b]
+        plateau = df[b] - df[a]
+        if plateau >= MIN_PLATEAU * opt:
+            candidates.append((df[a] + db[a], -plateau, a, b))
+    candidates.sort()
+
+    chosen: List[Set[int]] = [set(routes[0].edges)]
+    for cost, neg_plateau, a, b in candidates:
+        if len(routes) >= k:
+            break
+        chain = []
+        x = a
+        while x != b:
+            x = plateau_next[x]
+            chain.append(pf[x])
+        edges = forward_path(a) + chain + backward_path(b)
+        nodes = [s] + [head[e] for e in edges]
+        if len(set(nodes)) != len(nodes):
+            continue  # Ida y vuelta por el mismo nodo: no es una alternativa razonable
+        if any(sum(wts[e] for e in edges if e in other) > MAX_OVERLAP * cost for other in chosen):
+            continue
+        routes.append(Route(cost, edges, -neg_plateau))
+        chosen.append(set(edges))
+    return routes, settled_b + settled_f, relaxations
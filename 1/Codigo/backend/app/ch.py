@@ -0,0 +1,770 @@
+"""
+Contraction Hierarchies (CH) para consultas punto a punto sobre un grafo estático
+
+Preprocesamiento (una sola vez, sobre el atributo 'weight'):
+- Se "contraen" los nodos de a uno, en orden de importancia creciente.
+- Al contraer v, por cada par u -> v -> w de vecinos aún no contraídos se agrega un
+  atajo (shortcut) u -> w si no existe un camino testigo más corto que evite v.
+- El orden (rank) y los atajos se guardan en un .npz junto a la caché del grafo.
+
+Consulta: búsqueda bidireccional que solo sube en la jerarquía (aristas hacia nodos
+de mayor rank) desde el origen y desde el destino; el mejor nodo de encuentro da la
+distancia óptima. Los atajos se "desempaquetan" recursivamente en aristas reales.
+
+Actualización ante parches de pesos (update, ver patches.py): se conservan el
+orden y los atajos. El peso de un atajo es la suma de sus dos mitades, así que
+basta recalcular los que dependen de aristas modificadas. La decisión de no
+agregar un atajo al contraer v dependía de los caminos testigo, por eso se guardan
+las aristas de cada camino testigo. Solo se vuelven a verificar los nodos cuyos
+testigos usan una arista que se encareció y el extremo inferior de las aristas que
+se abarataron, agregando los atajos que ahora falten. Las aristas que un atajo más
+barato reemplazó al construir vuelven a la jerarquía si pasan a ser las más baratas.
+"""
+import heapq
+import logging
+import math
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+import numpy as np
+
+from .csr import CSRGraph
+
+logger = logging.getLogger(__name__)
+
+CH_VERSION = 3  # 2: aristas de los caminos testigo (ws_off / ws_edges); 3: huella SHA-1 del grafo
+WITNESS_SETTLE_LIMIT = 60  # Nodos asentados como máximo en cada búsqueda testigo
+# Fracción de nodos a volver a verificar a partir de la cual update desiste: cada
+# verificación recorre la parte alta de la jerarquía (más densa que el grafo
+# remanente al contraer) y cuesta ~10 veces lo que contraer un nodo
+UPDATE_MAX_CHECKS = 0.1
+
+
+class ContractionHierarchy:
+    """
+    Jerarquía de contracción sobre un CSRGraph.
+
+    Cada arista de la jerarquía e tiene peso ch_w[e] y es, o bien una arista real
+    (ch_orig[e] = índice de arista CSR), o bien un atajo formado por las aristas
+    de la jerarquía ch_a[e] y ch_b[e].
+
+    up_*: aristas u -> w con rank[w] > rank[u], indexadas por u (búsqueda hacia adelante)
+    dn_*: aristas u -> w con rank[u] > rank[w], indexadas por w (búsqueda hacia atrás)
+    ws_edges[ws_off[v]:ws_off[v+1]]: aristas de la jerarquía en los caminos testigo que
+        evitaron atajos al contraer v
+    """
+
+    def __init__(
+        self,
+        rank: np.ndarray,
+        ch_w: np.ndarray,
+        ch_orig: np.ndarray,
+        ch_a: np.ndarray,
+        ch_b: np.ndarray,
+        up_off: np.ndarray,
+        up_nbr: np.ndarray,
+        up_edge: np.ndarray,
+        dn_off: np.ndarray,
+        dn_nbr: np.ndarray,
+        dn_edge: np.ndarray,
+        ws_off: np.ndarray,
+        ws_edges: np.ndarray,
+        checksum: str,
+    ):
+        self.rank = rank
+        self.ch_w, self.ch_orig, self.ch_a, self.ch_b = ch_w, ch_orig, ch_a, ch_b
+        self.up_off, self.up_nbr, self.up_edge = up_off, up_nbr, up_edge
+        self.dn_off, self.dn_nbr, self.dn_edge = dn_off, dn_nbr, dn_edge
+        self.ws_off, self.ws_edges = ws_off, ws_edges
+        self.checksum = checksum
+
+        # Listas de Python para los bucles de consulta
+        self.w_l = ch_w.tolist()
+        self.orig_l = ch_orig.tolist()
+        self.a_l = ch_a.tolist()
+        self.b_l = ch_b.tolist()
+        self.up_off_l, self.up_nbr_l, self.up_edge_l = up_off.tolist(), up_nbr.tolist(), up_edge.tolist()
+        self.dn_off_l, self.dn_nbr_l, self.dn_edge_l = dn_off.tolist(), dn_nbr.tolist(), dn_edge.tolist()
+        # Índices auxiliares para update, construidos recién cuando se necesitan
+        self._aux: Optional[Dict[str, Any]] = None
+
+    @property
+    def n_shortcuts(self) -> int:
+        return int((self.ch_orig < 0).sum())
+
+    # -------------------------------------------------------------------------
+    # Preprocesamiento
+    # -------------------------------------------------------------------------
+    @classmethod
+    def build(cls, csr: CSRGraph, settle_limit: int = WITNESS_SETTLE_LIMIT) -> 'ContractionHierarchy':
+        """Contrae todos los nodos del grafo y construye los grafos de búsqueda hacia arriba."""
+        t0 = time.time()
+        n = csr.n_nodes
+        ch_w: List[float] = []
+        ch_orig: List[int] = []
+        ch_a: List[int] = []
+        ch_b: List[int] = []
+
+        # Grafo remanente: out_adj[u][w] = (peso, arista CH); se colapsan aristas paralelas
+        out_adj: List[Dict[int, Tuple[float, int]]] = [{} for _ in range(n)]
+        in_adj: List[Dict[int, Tuple[float, int]]] = [{} for _ in range(n)]
+        off, nbr, wts = csr.off_l, csr.nbr_l, csr.w_l
+        for u in range(n):
+            for e in range(off[u], off[u + 1]):
+                w = nbr[e]
+                if w == u:
+                    continue
+                cur = out_adj[u].get(w)
+                if cur is None or wts[e] < ch_w[cur[1]]:
+                    if cur is None:
+                        eid = len(ch_w)
+                        ch_w.append(wts[e]); ch_orig.append(e); ch_a.append(-1); ch_b.append(-1)
+                    else:
+                        eid = cur[1]
+                        ch_w[eid], ch_orig[eid] = wts[e], e
+                    out_adj[u][w] = (wts[e], eid)
+                    in_adj[w][u] = (wts[e], eid)
+
+        contracted = bytearray(n)
+        deleted_nbrs = [0] * n
+        rank = np.full(n, -1, dtype=np.int64)
+        up: List[List[Tuple[int, int]]] = [[] for _ in range(n)]  # up[u] = [(w, arista CH)]
+        dn: List[List[Tuple[int, int]]] = [[] for _ in range(n)]  # dn[w] = [(u, arista CH)]
+
+        witness: List[List[int]] = [[] for _ in range(n)]
+
+        def shortcuts_for(v: int, witnesses: Optional[set] = None) -> List[Tuple[int, int, float, int, int]]:
+            """
+            Atajos (u, w, peso, arista u->v, arista v->w) necesarios si se contrae v;
+            en witnesses se acumulan las aristas de los caminos testigo.
+            """
+            result = []
+            outs = out_adj[v]
+            if not outs:
+                return result
+            max_out = max(w for w, _ in outs.values())
+            for u, (w_uv, e_uv) in in_adj[v].items():
+                limit = w_uv + max_out
+                parent: Optional[Dict[int, Tuple[int, int]]] = {} if witnesses is not None else None
+                dist = _witness_search(out_adj, u, v, outs, limit, settle_limit, parent)
+                for w, (w_vw, e_vw) in outs.items():
+                    if w == u:
+                        continue
+                    via = w_uv + w_vw
+                    if dist.get(w, math.inf) > via:
+                        result.append((u, w, via, e_uv, e_vw))
+                    elif parent is not None:
+                        _add_path(parent, w, witnesses)
+            return result
+
+        def priority(v: int, n_shortcuts: int) -> int:
+            # Diferencia de aristas (penalizando atajos) + vecinos ya contraídos
+            # (uniformidad de la contracción)
+            return 2 * n_shortcuts - len(in_adj[v]) - len(out_adj[v]) + deleted_nbrs[v]
+
+        pq = [(priority(v, len(shortcuts_for(v))), v) for v in range(n)]
+        heapq.heapify(pq)
+        order = 0
+        while pq:
+            _, v = heapq.heappop(pq)
+            if contracted[v]:
+                continue
+            # Actualización perezosa: recalcular la prioridad antes de contraer
+            witnesses: set = set()
+            shortcuts = shortcuts_for(v, witnesses)
+            prio = priority(v, len(shortcuts))
+            if pq and prio > pq[0][0]:
+                heapq.heappush(pq, (prio, v))
+                continue
+            witness[v] = sorted(witnesses)
+
+            for u, w, via, e_uv, e_vw in shortcuts:
+                cur = out_adj[u].get(w)
+                if cur is not None and cur[0] <= via:
+                    continue
+                eid = len(ch_w)
+                ch_w.append(via); ch_orig.append(-1); ch_a.append(e_uv); ch_b.append(e_vw)
+                out_adj[u][w] = (via, eid)
+                in_adj[w][u] = (via, eid)
+
+            # Las aristas remanentes de v van hacia nodos de mayor rank
+            for w, (_, eid) in out_adj[v].items():
+                up[v].append((w, eid))
+                del in_adj[w][v]
+                deleted_nbrs[w] += 1
+            for u, (_, eid) in in_adj[v].items():
+                dn[v].append((u, eid))
+                del out_adj[u][v]
+                deleted_nbrs[u] += 1
+            out_adj[v].clear()
+            in_adj[v].clear()
+
+            contracted[v] = 1
+            rank[v] = order
+            order += 1
+
+        up_off, up_nbr, up_edge = _to_csr(up)
+        dn_off, dn_nbr, dn_edge = _to_csr(dn)
+        ws_off = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum([len(w) for w in witness], out=ws_off[1:])
+        ws_edges = np.fromiter((x for w in witness for x in w), dtype=np.int64, count=int(ws_off[-1]))
+        ch = cls(
+            rank=rank,
+            ch_w=np.asarray(ch_w, dtype=np.float64),
+            ch_orig=np.asarray(ch_orig, dtype=np.int64),
+            ch_a=np.asarray(ch_a, dtype=np.int64),
+            ch_b=np.asarray(ch_b, dtype=np.int64),
+            up_off=up_off, up_nbr=up_nbr, up_edge=up_edge,
+            dn_off=dn_off, dn_nbr=dn_nbr, dn_edge=dn_edge,
+            ws_off=ws_off, ws_edges=ws_edges,
+            checksum=csr.fingerprint(),
+        )
+        logger.info(f"CH construida en {time.time() - t0:.1f}s: {ch.n_shortcuts} atajos")
+        return ch
+
+    # -------------------------------------------------------------------------
+    # Persistencia
+    # -------------------------------------------------------------------------
+    def save(self, path: Union[str, Path]) -> None:
+        """Guarda la jerarquía en un .npz."""
+        np.savez(
+            path, version=CH_VERSION, checksum=self.checksum, rank=self.rank,
+            ch_w=self.ch_w, ch_orig=self.ch_orig, ch_a=self.ch_a, ch_b=self.ch_b,
+            up_off=self.up_off, up_nbr=self.up_nbr, up_edge=self.up_edge,
+            dn_off=self.dn_off, dn_nbr=self.dn_nbr, dn_edge=self.dn_edge,
+            ws_off=self.ws_off, ws_edges=self.ws_edges,
+        )
+
+    @classmethod
+    def load(cls, path: Union[str, Path], csr: CSRGraph) -> Optional['ContractionHierarchy']:
+        """Carga la jerarquía; devuelve None si fue construida para otro grafo o pesos."""
+        with np.load(path) as data:
+            if int(data['version']) != CH_VERSION or str(data['checksum']) != csr.fingerprint():
+                return None
+            fields = {k: data[k] for k in (
+                'rank', 'ch_w', 'ch_orig', 'ch_a', 'ch_b',
+                'up_off', 'up_nbr', 'up_edge', 'dn_off', 'dn_nbr', 'dn_edge', 'ws_off', 'ws_edges')}
+        return cls(checksum=csr.fingerprint(), **fields)
+
+    # -------------------------------------------------------------------------
+    # Actualización ante parches de pesos
+    # -------------------------------------------------------------------------
+    def update(
+        self,
+        csr: CSRGraph,
+        edges: Iterable[int],
+        settle_limit: int = WITNESS_SETTLE_LIMIT,
+        max_checks: Optional[int] = None,
+    ) -> Optional['ContractionHierarchy']:
+        """
+        Jerarquía para csr, cuyos pesos cambiaron en las aristas CSR edges, sin volver
+        a contraer (ver docstring del módulo). Devuelve una jerarquía nueva; esta no
+        se modifica y puede seguir respondiendo consultas mientras tanto.
+
+        Devuelve None si habría que volver a verificar más de max_checks nodos (por
+        defecto UPDATE_MAX_CHECKS del total): a partir de ahí reconstruir es más rápido.
+        """
+        t0 = time.time()
+        aux = self._auxiliary(csr)
+        n, n_old = len(self.rank), len(self.w_l)
+        if max_checks is None:
+            max_checks = int(n * UPDATE_MAX_CHECKS)
+        rank = aux['rank']
+        w, orig, a, b = list(self.w_l), list(self.orig_l), list(self.a_l), list(self.b_l)
+        tail, head, in_ch, dropped = aux['tail'], aux['head'], aux['in_ch'], aux['dropped']
+        up_off, up_nbr, up_edge = self.up_off_l, self.up_nbr_l, self.up_edge_l
+        dn_off, dn_nbr, dn_edge = self.dn_off_l, self.dn_nbr_l, self.dn_edge_l
+        dt_off, dt_nbr, dt_edge = aux['dt_off'], aux['dt_nbr'], aux['dt_edge']
+        par_off, par = aux['par_off'], aux['par']
+
+        # Aristas nuevas de esta actualización, (vecino, arista CH) por nodo como en up/dn;
+        # extra_dt indexa las de extra_dn por el origen
+        extra_up: Dict[int, List[Tuple[int, int]]] = {}
+        extra_dn: Dict[int, List[Tuple[int, int]]] = {}
+        extra_dt: Dict[int, List[Tuple[int, int]]] = {}
+        out_cache: Dict[int, List[Tuple[int, int]]] = {}
+        check: List[Tuple[int, int]] = []
+
+        def lower(u: int, v: int) -> int:
+            return u if rank[u] < rank[v] else v
+
+        def add_edge(u: int, v: int, weight: float, e_orig: int, e_a: int, e_b: int) -> None:
+            eid = len(w)
+            w.append(weight); orig.append(e_orig); a.append(e_a); b.append(e_b)
+            if rank[u] < rank[v]:
+                extra_up.setdefault(u, []).append((v, eid))
+            else:
+                extra_dn.setdefault(v, []).append((u, eid))
+                extra_dt.setdefault(u, []).append((v, eid))
+            out_cache.pop(u, None)
+            # El costo a través del extremo inferior bajó: hay que verificarlo
+            x = lower(u, v)
+            heapq.heappush(check, (rank[x], x))
+
+        def pair_edges(u: int, v: int) -> List[int]:
+            """Aristas u -> v de la jerarquía (las paralelas incluidas)."""
+            if rank[u] < rank[v]:
+                cand = zip(up_nbr[up_off[u]:up_off[u + 1]], up_edge[up_off[u]:up_off[u + 1]])
+                extra, other = extra_up.get(u, ()), v
+            else:
+                cand = zip(dn_nbr[dn_off[v]:dn_off[v + 1]], dn_edge[dn_off[v]:dn_off[v + 1]])
+                extra, other = extra_dn.get(v, ()), u
+            return [e for y, e in cand if y == other] + [e for y, e in extra if y == other]
+
+        def out_edges(x: int) -> List[Tuple[int, int]]:
+            """
+            Aristas salientes de x en la jerarquía (hacia arriba y hacia abajo), de mayor
+            a menor rank del vecino: las búsquedas cortan al llegar a nodos ya contraídos.
+            """
+            result = out_cache.get(x)
+            if result is None:
+                result = list(zip(up_nbr[up_off[x]:up_off[x + 1]], up_edge[up_off[x]:up_off[x + 1]]))
+                result += zip(dt_nbr[dt_off[x]:dt_off[x + 1]], dt_edge[dt_off[x]:dt_off[x + 1]])
+                result += extra_up.get(x, ())
+                result += extra_dt.get(x, ())
+                result.sort(key=lambda item: -rank[item[0]])
+                out_cache[x] = result
+            return result
+
+        # 1. Aristas reales: el peso de u -> v es el mínimo entre las aristas paralelas
+        #    del CSR (la jerarquía tiene una arista real por par de nodos)
+        old: Dict[int, float] = {}
+        source = csr.edge_table().source
+        for u, v in {(int(source[e]), csr.nbr_l[e]) for e in edges}:
+            if u == v:
+                continue
+            best_w, best_e = min((csr.w_l[e], e) for e in range(csr.off_l[u], csr.off_l[u + 1])
+                                 if csr.nbr_l[e] == v)
+            for eid in pair_edges(u, v) + dropped.get((u, v), []):
+                if orig[eid] < 0:
+                    continue
+                if w[eid] != best_w:
+                    old.setdefault(eid, w[eid])
+                    w[eid] = best_w
+                orig[eid] = best_e
+
+        # 2. Atajos: peso = suma de sus mitades, en orden de creación (las mitades
+        #    siempre tienen índice menor que el atajo)
+        pq = []
+        for e in old:
+            pq.extend(par[par_off[e]:par_off[e + 1]])
+        heapq.heapify(pq)
+        last = -1
+        while pq:
+            s = heapq.heappop(pq)
+            if s == last:
+                continue
+            last = s
+            nw = w[a[s]] + w[b[s]]
+            if nw != w[s]:
+                old.setdefault(s, w[s])
+                w[s] = nw
+                for i in range(par_off[s], par_off[s + 1]):
+                    heapq.heappush(pq, par[i])
+
+        # 3. Nodos a verificar: el extremo inferior de cada arista que se abarató y los
+        #    nodos cuyos caminos testigo usan una arista que se encareció. Si entre dos
+        #    nodos una arista reemplazada al construir pasa a ser la más barata, vuelve
+        increased = []
+        pairs = set()
+        for e, w0 in old.items():
+            if w[e] == w0:
+                continue
+            if w[e] > w0:
+                increased.append(e)
+            elif in_ch[e]:
+                x = lower(tail[e], head[e])
+                check.append((rank[x], x))
+            if (tail[e], head[e]) in dropped:
+                pairs.add((tail[e], head[e]))
+        for u, v in pairs:
+            best = min((w[e] for e in pair_edges(u, v)), default=math.inf)
+            d = min(dropped[u, v], key=w.__getitem__)
+            if w[d] < best:
+                add_edge(u, v, w[d], orig[d], a[d], b[d])
+        if increased:
+            mask = np.isin(self.ws_edges, np.asarray(increased, dtype=np.int64))
+            check.extend((rank[x], x) for x in np.unique(aux['ws_owner'][mask]).tolist())
+        heapq.heapify(check)
+        if len(set(check)) > max_checks:
+            logger.info(f"Actualización de la CH descartada: {len(set(check))} nodos a verificar")
+            return None
+
+        # 4. Verificación en orden de rank: para cada par u -> x -> t de vecinos de
+        #    mayor rank, testigo en el grafo de nodos de mayor rank que x o atajo nuevo
+        witnesses: Dict[int, Set[int]] = {}
+        n_added = 0
+        while check:
+            rx, x = heapq.heappop(check)
+            if x in witnesses:
+                continue
+            if len(witnesses) >= max_checks:
+                logger.info(f"Actualización de la CH descartada tras verificar {len(witnesses)} nodos")
+                return None
+            ins: Dict[int, Tuple[float, int]] = {}
+            for i in range(dn_off[x], dn_off[x + 1]):
+                u, e = dn_nbr[i], dn_edge[i]
+                if w[e] < ins.get(u, (math.inf,))[0]:
+                    ins[u] = (w[e], e)
+            for u, e in extra_dn.get(x, ()):
+                if w[e] < ins.get(u, (math.inf,))[0]:
+                    ins[u] = (w[e], e)
+            outs: Dict[int, Tuple[float, int]] = {}
+            for t, e in out_edges(x):
+                if rank[t] <= rx:
+                    break
+                if w[e] < outs.get(t, (math.inf,))[0]:
+                    outs[t] = (w[e], e)
+            found: Set[int] = set()
+            if outs:
+                max_out = max(wt for wt, _ in outs.values())
+                for u, (w_ux, e_ux) in ins.items():
+                    parent: Dict[int, Tuple[int, int]] = {}
+                    dist = _overlay_witness_search(out_edges, w, rank, u, rx, outs, w_ux + max_out,
+                                                   settle_limit, parent)
+                    for t, (w_xt, e_xt) in outs.items():
+                        via = w_ux + w_xt
+                        if t == u or via == math.inf:
+                            continue
+                        if dist.get(t, math.inf) <= via:
+                            _add_path(parent, t, found)
+                        else:
+                            add_edge(u, t, via, -1, e_ux, e_xt)
+                            n_added += 1
+            witnesses[x] = found
+
+        up_off_a, up_nbr_a, up_edge_a = _merge_adjacency(self.up_off, self.up_nbr, self.up_edge, extra_up, n)
+        dn_off_a, dn_nbr_a, dn_edge_a = _merge_adjacency(self.dn_off, self.dn_nbr, self.dn_edge, extra_dn, n)
+        ws_owner, ws_edges = aux['ws_owner'], self.ws_edges
+        if witnesses:
+            owners = np.fromiter(witnesses, dtype=np.int64, count=len(witnesses))
+            keep = ~np.isin(ws_owner, owners)
+            ws_owner = np.concatenate([ws_owner[keep], np.repeat(owners, [len(f) for f in witnesses.values()])])
+            ws_edges = np.concatenate([ws_edges[keep], np.fromiter(
+                (e for f in witnesses.values() for e in sorted(f)), dtype=np.int64)])
+            order = np.argsort(ws_owner, kind='stable')
+            ws_owner, ws_edges = ws_owner[order], ws_edges[order]
+        ws_off = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(ws_owner, minlength=n), out=ws_off[1:])
+
+        ch = ContractionHierarchy(
+            rank=self.rank,
+            ch_w=np.asarray(w, dtype=np.float64),
+            ch_orig=np.asarray(orig, dtype=np.int64),
+            ch_a=np.asarray(a, dtype=np.int64),
+            ch_b=np.asarray(b, dtype=np.int64),
+            up_off=up_off_a, up_nbr=up_nbr_a, up_edge=up_edge_a,
+            dn_off=dn_off_a, dn_nbr=dn_nbr_a, dn_edge=dn_edge_a,
+            ws_off=ws_off, ws_edges=ws_edges,
+            checksum=csr.fingerprint(),
+        )
+        logger.info(f"CH actualizada en {time.time() - t0:.3f}s: {len(old)} aristas de la jerarquía "
+                    f"modificadas, {len(witnesses)} nodos verificados, {n_added} atajos nuevos")
+        return ch
+
+    def _auxiliary(self, csr: CSRGraph) -> Dict[str, Any]:
+        """
+        Índices que solo usa update: extremos de cada arista, si está en la jerarquía
+        (in_ch) o fue reemplazada al construir (dropped, por par de nodos), aristas
+        hacia abajo indexadas por origen (dt_*), atajos que contienen a cada arista
+        (par_*) y dueño de cada entrada de ws_edges.
+        """
+        if self._aux is None:
+            n, m = len(self.rank), len(self.ch_w)
+            dn_dst = np.repeat(np.arange(n, dtype=np.int64), np.diff(self.dn_off))
+            in_ch = np.zeros(m, dtype=bool)
+            in_ch[self.up_edge] = True
+            in_ch[self.dn_edge] = True
+            # Extremos: los de la arista CSR para las reales; origen de la primera
+            # mitad y destino de la segunda para los atajos (creados después de sus mitades)
+            real = self.ch_orig >= 0
+            tail = np.full(m, -1, dtype=np.int64)
+            head = np.full(m, -1, dtype=np.int64)
+            tail[real] = csr.edge_table().source[self.ch_orig[real]]
+            head[real] = csr.neighbors[self.ch_orig[real]]
+            tail_l, head_l = tail.tolist(), head.tolist()
+            a_l, b_l = self.a_l, self.b_l
+            for s in np.flatnonzero(~real).tolist():
+                tail_l[s], head_l[s] = tail_l[a_l[s]], head_l[b_l[s]]
+            dropped: Dict[Tuple[int, int], List[int]] = {}
+            for e in np.flatnonzero(~in_ch).tolist():
+                dropped.setdefault((tail_l[e], head_l[e]), []).append(e)
+
+            dt_off, dt_nbr, dt_edge = _group_by(self.dn_nbr, dn_dst, self.dn_edge, n)
+            shortcuts = np.flatnonzero(~real)
+            par_off, _, par = _group_by(np.concatenate([self.ch_a[shortcuts], self.ch_b[shortcuts]]),
+                                        np.zeros(2 * len(shortcuts), dtype=np.int64),
+                                        np.concatenate([shortcuts, shortcuts]), m)
+            self._aux = {
+                'rank': self.rank.tolist(), 'tail': tail_l, 'head': head_l,
+                'in_ch': in_ch.tolist(), 'dropped': dropped,
+                'dt_off': dt_off.tolist(), 'dt_nbr': dt_nbr.tolist(), 'dt_edge': dt_edge.tolist(),
+                'par_off': par_off.tolist(), 'par': par.tolist(),
+                'ws_owner': np.repeat(np.arange(n, dtype=np.int64), np.diff(self.ws_off)),
+            }
+        return self._aux
+
+    # -------------------------------------------------------------------------
+    # Consultas
+    # -------------------------------------------------------------------------
+    def unpack(self, e: int, out: List[int]) -> None:
+        """Agrega a out las aristas CSR reales que forman la arista de la jerarquía e."""
+        stack = [e]
+        orig, a, b = self.orig_l, self.a_l, self.b_l
+        while stack:
+            x = stack.pop()
+            if orig[x] >= 0:
+                out.append(orig[x])
+            else:
+                stack.append(b[x])
+                stack.append(a[x])
+
+
+def _witness_search(
+    out_adj: List[Dict[int, Tuple[float, int]]],
+    source: int,
+    avoid: int,
+    targets: Dict[int, Tuple[float, int]],
+    limit: float,
+    settle_limit: int,
+    parent: Optional[Dict[int, Tuple[int, int]]] = None,
+) -> Dict[int, float]:
+    """
+    Dijkstra local desde source sin pasar por avoid. Se detiene al asentar todos los
+    targets, al superar la distancia limit o al asentar settle_limit nodos. Si se
+    pasa parent, se completa con nodo -> (nodo previo, arista CH) para cada distancia.
+    """
+    dist = {source: 0.0}
+    pq = [(0.0, source)]
+    settled = 0
+    pending = len(targets) - (source in targets)
+    while pq and pending > 0:
+        d, x = heapq.heappop(pq)
+        if d > dist[x]:
+            continue
+        if d > limit or settled >= settle_limit:
+            break
+        settled += 1
+        if x in targets and x != source:
+            pending -= 1
+        for y, (w, e) in out_adj[x].items():
+            if y == avoid:
+                continue
+            nd = d + w
+            if nd < dist.get(y, math.inf):
+                dist[y] = nd
+                heapq.heappush(pq, (nd, y))
+                if parent is not None:
+                    parent[y] = (x, e)
+    return dist
+
+
+def _overlay_witness_search(
+    out_edges,
+    w: List[float],
+    rank: List[int],
+    source: int,
+    min_rank: int,
+    targets: Dict[int, Tuple[float, int]],
+    limit: float,
+    settle_limit: int,
+    parent: Dict[int, Tuple[int, int]],
+) -> Dict[int, float]:
+    """
+    Como _witness_search, pero sobre la jerarquía ya construida restringida a los
+    nodos con rank mayor que min_rank (el grafo remanente al contraer ese nodo).
+    """
+    dist = {source: 0.0}
+    pq = [(0.0, source)]
+    settled = 0
+    pending = len(targets) - (source in targets)
+    while pq and pending > 0:
+        d, x = heapq.heappop(pq)
+        if d > dist[x]:
+            continue
+        if d > limit or settled >= settle_limit:
+            break
+        settled += 1
+        if x in targets and x != source:
+            pending -= 1
+        for y, e in out_edges(x):
+            if rank[y] <= min_rank:
+                break  # out_edges ordena los vecinos de mayor a menor rank
+            nd = d + w[e]
+            if nd < dist.get(y, math.inf):
+                dist[y] = nd
+                heapq.heappush(pq, (nd, y))
+                parent[y] = (x, e)
+    return dist
+
+
+def _add_path(parent: Dict[int, Tuple[int, int]], target: int, out: Set[int]) -> None:
+    """Agrega a out las aristas del camino de la búsqueda testigo hasta target."""
+    while target in parent:
+        target, e = parent[target]
+        out.add(e)
+
+
+def _group_by(
+    owner: np.ndarray, nbr: np.ndarray, edge: np.ndarray, n: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """CSR (offsets, vecinos, aristas) agrupando las entradas por owner (orden estable)."""
+    order = np.argsort(owner, kind='stable')
+    off = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(owner, minlength=n), out=off[1:])
+    return off, nbr[order], edge[order]
+
+
+def _merge_adjacency(
+    off: np.ndarray, nbr: np.ndarray, edge: np.ndarray, extra: Dict[int, List[Tuple[int, int]]], n: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Agrega a una adyacencia CSR las entradas extra[nodo] = [(vecino, arista)] al final de cada nodo."""
+    if not extra:
+        return off, nbr, edge
+    owner = np.repeat(np.arange(n, dtype=np.int64), np.diff(off))
+    ex_owner = np.fromiter((x for x, items in extra.items() for _ in items), dtype=np.int64)
+    ex_nbr = np.fromiter((y for items in extra.values() for y, _ in items), dtype=np.int64)
+    ex_edge = np.fromiter((e for items in extra.values() for _, e in items), dtype=np.int64)
+    return _group_by(np.concatenate([owner, ex_owner]), np.concatenate([nbr, ex_nbr]),
+                     np.concatenate([edge, ex_edge]), n)
+
+
+def _to_csr(adj: List[List[Tuple[int, int]]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    off = np.zeros(len(adj) + 1, dtype=np.int64)
+    np.cumsum([len(a) for a in adj], out=off[1:])
+    nbr = np.fromiter((x for a in adj for x, _ in a), dtype=np.int64, count=int(off[-1]))
+    edge = np.fromiter((e for a in adj for _, e in a), dtype=np.int64, count=int(off[-1]))
+    return off, nbr, edge
+
+
+def ch_query(
+    ch: ContractionHierarchy,
+    s: int,
+    t: int,
+    collect: bool = True,
+) -> Tuple[float, List[int], int, List[Tuple[str, int, int, int]]]:
+    """
+    Búsqueda bidireccional hacia arriba entre los ids densos s y t.
+
+    Devuelve (costo, aristas CSR de la ruta, nodos asentados, relajaciones) donde
+    relajaciones es la lista de (dirección, u, v, arista CSR) de las aristas reales
+    (no atajos) que mejoraron una distancia (solo si collect=True).
+    """
+    dist = ({s: 0.0}, {t: 0.0})
+    parent: Tuple[Dict[int, Tuple[int, int]], ...] = ({}, {})  # nodo -> (nodo previo, arista CH)
+    pqs = ([(0.0, s)], [(0.0, t)])
+    done = (set(), set())
+    graphs = ((ch.up_off_l, ch.up_nbr_l, ch.up_edge_l), (ch.dn_off_l, ch.dn_nbr_l, ch.dn_edge_l))
+    w_l, orig_l = ch.w_l, ch.orig_l
+    best, meet = (0.0, s) if s == t else (math.inf, -1)
+    settled = 0
+    relaxed: List[Tuple[str, int, int, int]] = []
+
+    while pqs[0] or pqs[1]:
+        # Alternar direcciones eligiendo la cola con menor clave
+        side = 0 if pqs[0] and (not pqs[1] or pqs[0][0][0] <= pqs[1][0][0]) else 1
+        pq = pqs[side]
+        d, x = heapq.heappop(pq)
+        if x in done[side] or d > dist[side][x]:
+            continue
+        if d >= best:
+            # Ninguna entrada de esta cola puede mejorar la mejor ruta
+            pq.clear()
+            continue
+        done[side].add(x)
+        settled += 1
+
+        other = dist[1 - side].get(x)
+        if other is not None and d + other < best:
+            best, meet = d + other, x
+
+        my_dist, my_parent = dist[side], parent[side]
+
+        # Stall-on-demand: si un vecino de mayor rank ya alcanza x con menor costo
+        # (por una arista en sentido contrario de la jerarquía), x no es parte de
+        # ninguna ruta óptima hacia arriba y no se expande
+        s_off, s_nbr, s_edge = graphs[1 - side]
+        stalled = False
+        for i in range(s_off[x], s_off[x + 1]):
+            dy = my_dist.get(s_nbr[i])
+            if dy is not None and dy + w_l[s_edge[i]] < d:
+                stalled = True
+                break
+        if stalled:
+            continue
+
+        off, nbr, edge = graphs[side]
+        for i in range(off[x], off[x + 1]):
+            y, e = nbr[i], edge[i]
+            nd = d + w_l[e]
+            if nd < my_dist.get(y, math.inf):
+                my_dist[y] = nd
+                my_parent[y] = (x, e)
+                heapq.heappush(pq, (nd, y))
+                if collect and orig_l[e] >= 0:
+                    if side == 0:
+                        relaxed.append(('forward', x, y, orig_l[e]))
+                    else:
+                        relaxed.append(('backward', y, x, orig_l[e]))
+                o = dist[1 - side].get(y)
+                if o is not None and nd + o < best:
+                    best, meet = nd + o, y
+
+    if meet < 0:
+        return math.inf, [], settled, relaxed
+
+    # Cadena de aristas CH: origen -> encuentro (hacia adelante) y encuentro -> destino
+    fwd: List[int] = []
+    x = meet
+    while x != s:
+        x, e = parent[0][x]
+        fwd.append(e)
+    fwd.reverse()
+    bwd: List[int] = []
+    x = meet
+    while x != t:
+        x, e = parent[1][x]
+        bwd.append(e)
+
+    path: List[int] = []
+    for e in fwd + bwd:
+        ch.unpack(e, path)
+    return best, path, settled, relaxed
+
+
+def load_or_build_ch(csr: CSRGraph, path: Union[str, Path], build: bool = True) -> Optional[ContractionHierarchy]:
+    """
+    Carga la jerarquía guardada junto a la caché del grafo. Si no existe (o es de otro
+    grafo) y build=True, la construye y la guarda; si build=False devuelve None.
+    """
+    if Path(path).exists():
+        try:
+            ch = ContractionHierarchy.load(path, csr)
+            if ch is not None:
+                return ch
+            logger.info(f"CH desactualizada: {path}")
+        except Exception as e:
+            logger.warning(f"No se pudo leer la CH {path}: {e}")
+    if not build:
+        return None
+    ch = ContractionHierarchy.build(csr)
+    try:
+        ch.save(path)
+    except OSError as e:
+        logger.warning(f"No se pudo guardar la CH {path}: {e}")
+    return ch
+
+
+if __name__ == '__main__':
+    # Preprocesamiento offline (desde backend/): python -m app.ch [región]
+    import sys
+
+    from .main import DEFAULT_REGION, REGIONS, load_server_graph
+
+    logging.basicConfig(level=logging.INFO)
+    region = REGIONS[sys.argv[1] if len(sys.argv) > 1 else DEFAULT_REGION]
+    csr = load_server_graph(region.graph_file, region.place, region.radius_m)
+    ch = ContractionHierarchy.build(csr)
+    ch.save(region.ch_file)
+    print(f"CH guardada en {region.ch_file}: {ch.n_shortcuts} atajos")
@@ -0,0 +1,439 @@
+"""
+Representación compacta del grafo de calles en formato CSR (Compressed Sparse Row)
+
+El MultiDiGraph de networkx guarda cada arista como un diccionario de atributos,
+por lo que recorrer vecinos implica varios accesos dict-of-dict por relajación.
+Aquí el grafo se "aplana" una sola vez en arreglos NumPy indexados por un id
+denso de nodo (0..V-1):
+
+- offsets[i] .. offsets[i+1]: rango de aristas salientes del nodo i
+- neighbors[e], weights[e], lengths[e], keys[e]: destino, peso, longitud y clave
+  de la arista e
+- lat[i], lon[i]: coordenadas del nodo i
+
+Los algoritmos de búsqueda trabajan sobre estos arreglos (o sus copias en listas
+de Python, más rápidas de indexar desde un bucle interpretado).
+"""
+import copy
+import hashlib
+import heapq
+import math
+import os
+import threading
+import weakref
+import zlib
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import networkx as nx
+
+DEFAULT_SPEED_KMH = 40.0
+EARTH_RADIUS_M = 6371000.0
+
+
+class CSRGraph:
+    """
+    Grafo dirigido inmutable en formato CSR.
+
+    Los ids densos respetan el orden de los ids OSM (cuando son ordenables), de modo
+    que el desempate de la cola de prioridad es el mismo que sobre networkx. Dentro
+    de cada nodo las aristas conservan el orden de adyacencia original.
+    """
+
+    def __init__(
+        self,
+        node_ids: np.ndarray,
+        lat: np.ndarray,
+        lon: np.ndarray,
+        offsets: np.ndarray,
+        neighbors: np.ndarray,
+        weights: np.ndarray,
+        lengths: np.ndarray,
+        keys: np.ndarray,
+        max_speed: float = DEFAULT_SPEED_KMH / 3.6,
+    ):
+        self.node_ids = node_ids
+        self.lat = lat
+        self.lon = lon
+        self.offsets = offsets
+        self.neighbors = neighbors
+        self.weights = weights
+        self.lengths = lengths
+        self.keys = keys
+        self.max_speed = max_speed  # m/s, para la heurística de A*
+
+        # Copias en listas de Python para los bucles de búsqueda (indexar un
+        # ndarray elemento a elemento es mucho más lento que indexar una lista)
+        self.ids_l: List[Any] = node_ids.tolist()
+        self.lat_l: List[float] = lat.tolist()
+        self.lon_l: List[float] = lon.tolist()
+        self.off_l: List[int] = offsets.tolist()
+        self.nbr_l: List[int] = neighbors.tolist()
+        self.w_l: List[float] = weights.tolist()
+        self.len_l: List[float] = lengths.tolist()
+        self.keys_l: List[Any] = keys.tolist()
+
+        self.index: Dict[Any, int] = {nid: i for i, nid in enumerate(self.ids_l)}
+        self._reverse: Optional[Tuple[List[int], List[int], List[int]]] = None
+        self._edge_table: Optional[EdgeTable] = None
+        self._geometry: Optional[NodeGeometry] = None
+        self._free_buffers: List[SearchBuffers] = []
+        self._buffers_lock = threading.Lock()
+        _GRAPHS.add(self)
+        self._fingerprint: Optional[str] = None
+        # Grafo original (sin parches de pesos) y huella de los pesos parcheados (ver with_weights)
+        self.base: CSRGraph = self
+        self.revision: Optional[str] = None
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def n_edges(self) -> int:
+        return len(self.neighbors)
+
+    def __contains__(self, node_id: Any) -> bool:
+        return node_id in self.index
+
+    @classmethod
+    def from_networkx(cls, G: nx.MultiDiGraph) -> 'CSRGraph':
+        """
+        Construye la representación CSR a partir de un MultiDiGraph con atributos x, y,
+        weight y length (y speed_kph, de donde sale la velocidad máxima).
+        """
+        ids = list(G.nodes)
+        try:
+            ids.sort()
+        except TypeError:
+            pass  # Ids no comparables: se mantiene el orden de inserción
+        index = {nid: i for i, nid in enumerate(ids)}
+
+        n = len(ids)
+        lat = np.empty(n, dtype=np.float64)
+        lon = np.empty(n, dtype=np.float64)
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        neighbors: List[int] = []
+        weights: List[float] = []
+        lengths: List[float] = []
+        keys: List[Any] = []
+        speeds: List[float] = []
+
+        succ = G._succ
+        nodes = G._node
+        for i, u in enumerate(ids):
+            data = nodes[u]
+            lat[i], lon[i] = data['y'], data['x']
+            for v, keydict in succ[u].items():
+                vi = index[v]
+                for k, attr in keydict.items():
+                    neighbors.append(vi)
+                    weights.append(attr['weight'])
+                    lengths.append(attr['length'])
+                    keys.append(k)
+                    s = attr.get('speed_kph')
+                    if s:
+                        try:
+                            speeds.append(float(s))
+                        except (ValueError, TypeError):
+                            pass
+            offsets[i + 1] = len(neighbors)
+
+        return cls(
+            node_ids=_as_array(ids, np.int64),
+            lat=lat,
+            lon=lon,
+            offsets=offsets,
+            neighbors=np.asarray(neighbors, dtype=np.int32),
+            weights=np.asarray(weights, dtype=np.float64),
+            lengths=np.asarray(lengths, dtype=np.float64),
+            keys=_as_array(keys, np.int64),
+            max_speed=(max(speeds) if speeds else DEFAULT_SPEED_KMH) / 3.6,
+        )
+
+    def fingerprint(self) -> str:
+        """Huella de la topología y los pesos, para invalidar preprocesamientos guardados en disco."""
+        if self._fingerprint is None:
+            self._fingerprint = array_digest(self.node_ids, self.offsets, self.neighbors, self.weights,
+                                             self.lengths, self.keys)
+        return self._fingerprint
+
+    def with_weights(self, weights: np.ndarray, changed: List[int]) -> 'CSRGraph':
+        """
+        Copia del grafo con otros pesos (parches en vivo, ver patches.py); changed son
+        las aristas cuyo peso difiere del de este grafo. Comparte la topología, las
+        coordenadas y las tablas derivadas de ellas. Un peso inf corta la arista.
+        """
+        new = copy.copy(self)
+        new.weights = weights
+        w_l = list(self.w_l)
+        for e in changed:
+            w_l[e] = float(weights[e])
+        new.w_l = w_l
+        new._fingerprint = None
+        new._free_buffers = []
+        new._buffers_lock = threading.Lock()
+        _GRAPHS.add(new)
+
+        base = self.base
+        patched = np.flatnonzero(weights != base.weights)
+        new.revision = f"{zlib.crc32(np.ascontiguousarray(weights).tobytes()):08x}" if len(patched) else None
+        # La heurística de A* necesita una cota de la velocidad también en las aristas aceleradas
+        w = weights[patched]
+        fast = (w > 0) & np.isfinite(w)
+        new.max_speed = max(base.max_speed, float((self.lengths[patched][fast] / w[fast]).max())
+                            if fast.any() else 0.0)
+        return new
+
+    def reverse(self) -> Tuple[List[int], List[int], List[int]]:
+        """
+        Grafo inverso en formato CSR (listas de Python), construido una sola vez.
+        Devuelve (offsets, fuentes, aristas): las aristas entrantes al nodo v son
+        aristas[offsets[v]:offsets[v+1]] (índices de arista del grafo directo) con
+        nodo de origen fuentes[...].
+        """
+        if self._reverse is None and self.base is not self:
+            self._reverse = self.base.reverse()  # Solo depende de la topología
+        if self._reverse is None:
+            sources = np.repeat(np.arange(self.n_nodes, dtype=np.int64), np.diff(self.offsets))
+            order = np.argsort(self.neighbors, kind='stable')
+            rev_off = np.zeros(self.n_nodes + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.neighbors, minlength=self.n_nodes), out=rev_off[1:])
+            self._reverse = (rev_off.tolist(), sources[order].tolist(), order.tolist())
+        return self._reverse
+
+    def edge_table(self) -> 'EdgeTable':
+        """Tabla de datos por arista para emitir eventos (ver EdgeTable), construida una sola vez."""
+        if self._edge_table is None:
+            self._edge_table = self.base.edge_table() if self.base is not self else EdgeTable(self)
+        return self._edge_table
+
+    def geometry(self) -> 'NodeGeometry':
+        """Geometría por nodo para la heurística de A* (ver NodeGeometry), construida una sola vez."""
+        if self._geometry is None:
+            self._geometry = self.base.geometry() if self.base is not self else NodeGeometry(self)
+        return self._geometry
+
+    @contextmanager
+    def search_buffers(self) -> Iterator['SearchBuffers']:
+        """
+        Presta un juego de buffers de búsqueda ya reiniciado (nueva generación).
+        Los buffers se reservan una sola vez y se reutilizan entre consultas; cada
+        consulta concurrente usa el suyo.
+        """
+        with self._buffers_lock:
+            buf = self._free_buffers.pop() if self._free_buffers else None
+        if buf is None:
+            buf = SearchBuffers(self.n_nodes)
+        buf.reset()
+        try:
+            yield buf
+        finally:
+            with self._buffers_lock:
+                self._free_buffers.append(buf)
+
+    def best_edge(self, u: int, v: int) -> Optional[int]:
+        """Índice de la arista u->v de menor peso (la primera ante empates), o None si no existe."""
+        nbr, w = self.nbr_l, self.w_l
+        best_e, best_w = None, float('inf')
+        for e in range(self.off_l[u], self.off_l[u + 1]):
+            if nbr[e] == v and w[e] < best_w:
+                best_w, best_e = w[e], e
+        return best_e
+
+    def reconstruct_path(self, orig: int, dest: int, prev: List[int]) -> Tuple[List[int], float]:
+        """
+        Reconstruye la ruta (índices de arista) a partir del arreglo de predecesores.
+        Equivalente a main.reconstruct_path pero sobre ids densos.
+        """
+        path, curr, total_length = [], dest, 0.0
+        while curr != orig:
+            p = prev[curr]
+            if p < 0:
+                break
+            e = self.best_edge(p, curr)
+            if e is None:
+                break
+            path.append(e)
+            total_length += self.len_l[e]
+            curr = p
+        path.reverse()
+        return path, total_length / 1000.0
+
+
+class EdgeTable:
+    """
+    Datos por arista (índice denso de arista CSR) listos para los eventos.
+
+    - source[e]: nodo denso de origen de la arista e (el destino es neighbors[e])
+    - coords[e]: coordenadas empaquetadas (lat_u, lon_u, lat_v, lon_v), arreglo (E, 4)
+    - edge_id_l[e], u_l[e], v_l[e], coords_l[e]: id "u|v|k", ids OSM de los extremos
+      y [[lat_u, lon_u], [lat_v, lon_v]] ya armados, compartidos por todos los eventos
+
+    Así un evento 'visited' o 'path' se arma con accesos por índice, sin formatear
+    el id ni buscar las coordenadas de los dos nodos en cada evento.
+    """
+
+    def __init__(self, csr: CSRGraph):
+        self.source = np.repeat(np.arange(csr.n_nodes, dtype=np.int64), np.diff(csr.offsets))
+        self.coords = np.stack([csr.lat[self.source], csr.lon[self.source],
+                                csr.lat[csr.neighbors], csr.lon[csr.neighbors]], axis=1)
+        ids = csr.ids_l
+        self.u_l: List[Any] = [ids[u] for u in self.source.tolist()]
+        self.v_l: List[Any] = [ids[v] for v in csr.nbr_l]
+        self.edge_id_l: List[str] = [f"{u}|{v}|{k}" for u, v, k in zip(self.u_l, self.v_l, csr.keys_l)]
+        self.coords_l: List[List[List[float]]] = [
+            [[lat_u, lon_u], [lat_v, lon_v]] for lat_u, lon_u, lat_v, lon_v in self.coords.tolist()
+        ]
+
+
+class NodeGeometry:
+    """
+    Geometría por nodo precalculada para la heurística de A*.
+
+    - lat_rad[i], lon_rad[i], cos_lat[i]: coordenadas en radianes y coseno de la latitud
+    - xyz[i]: vector unitario del nodo sobre la esfera, arreglo (V, 3)
+    - x_l, y_l, z_l: las componentes de xyz en listas, para la heurística escalar
+
+    La distancia de círculo máximo sale de la cuerda c entre los vectores
+    unitarios: d = 2 R asin(c / 2), la misma que da haversine pero sin senos ni
+    cosenos por evaluación (solo restas, una raíz y un arcoseno).
+    """
+
+    def __init__(self, csr: CSRGraph):
+        self.lat_rad = np.radians(csr.lat)
+        self.lon_rad = np.radians(csr.lon)
+        self.cos_lat = np.cos(self.lat_rad)
+        self.xyz = np.stack([self.cos_lat * np.cos(self.lon_rad), self.cos_lat * np.sin(self.lon_rad),
+                             np.sin(self.lat_rad)], axis=1)
+        self.x_l: List[float] = self.xyz[:, 0].tolist()
+        self.y_l: List[float] = self.xyz[:, 1].tolist()
+        self.z_l: List[float] = self.xyz[:, 2].tolist()
+
+    def distance_m(self, nodes: Union[np.ndarray, slice, List[int]], target: int) -> np.ndarray:
+        """Distancia de círculo máximo (m) de cada nodo de nodes al nodo target, vectorizada."""
+        d = self.xyz[nodes] - self.xyz[target]
+        chord = np.sqrt(np.einsum('ij,ij->i', d, d))
+        return 2 * EARTH_RADIUS_M * np.arcsin(np.minimum(chord * 0.5, 1.0))
+
+    def heuristic_batch(self, nodes: Union[np.ndarray, slice, List[int]], target: int,
+                        max_speed: float) -> np.ndarray:
+        """
+        Heurística de A* (segundos hasta target a velocidad max_speed) de un lote de
+        nodos a la vez, p. ej. todos los vecinos de un nodo: csr.neighbors[off[u]:off[u+1]].
+        """
+        return self.distance_m(nodes, target) / max_speed
+
+    def heuristic(self, target: int, max_speed: float) -> Callable[[int], float]:
+        """Heurística escalar h(v) hacia target, para los bucles de búsqueda."""
+        xs, ys, zs = self.x_l, self.y_l, self.z_l
+        tx, ty, tz = xs[target], ys[target], zs[target]
+        scale = 2 * EARTH_RADIUS_M / max_speed
+        asin, sqrt = math.asin, math.sqrt
+
+        def h(v: int) -> float:
+            dx, dy, dz = xs[v] - tx, ys[v] - ty, zs[v] - tz
+            return asin(min(sqrt(dx * dx + dy * dy + dz * dz) * 0.5, 1.0)) * scale
+        return h
+
+
+class SearchBuffers:
+    """
+    Estado por nodo reutilizable entre consultas, con reinicio por generación.
+
+    dist[v] y prev[v] solo son válidos si seen[v] == gen, y v está cerrado si
+    closed[v] == gen. Reiniciar es incrementar gen (O(1)), así que el costo de una
+    consulta escala con la región explorada y no con el tamaño del grafo.
+    """
+
+    def __init__(self, n_nodes: int):
+        self.dist: List[float] = [math.inf] * n_nodes
+        self.prev: List[int] = [-1] * n_nodes
+        self.seen: List[int] = [0] * n_nodes
+        self.closed: List[int] = [0] * n_nodes
+        self.gen = 0
+
+    def reset(self) -> int:
+        self.gen += 1
+        return self.gen
+
+
+def dijkstra_all(csr: CSRGraph, sources: List[int], reverse: bool = False) -> List[float]:
+    """
+    Dijkstra uno-a-todos (o multi-origen) sin emisión de eventos.
+    Con reverse=True recorre el grafo inverso: devuelve la distancia de cada nodo HACIA las fuentes.
+    """
+    if reverse:
+        off, nbr_of, edge_of = csr.reverse()
+    else:
+        off, nbr_of, edge_of = csr.off_l, csr.nbr_l, None
+    wts = csr.w_l
+    dist = [math.inf] * csr.n_nodes
+    pq = []
+    for s in sources:
+        dist[s] = 0.0
+        pq.append((0.0, s))
+    heapq.heapify(pq)
+    while pq:
+        d, u = heapq.heappop(pq)
+        if d > dist[u]:
+            continue
+        for i in range(off[u], off[u + 1]):
+            v = nbr_of[i]
+            nd = d + wts[edge_of[i] if edge_of is not None else i]
+            if nd < dist[v]:
+                dist[v] = nd
+                heapq.heappush(pq, (nd, v))
+    return dist
+
+
+def array_digest(*arrays: np.ndarray) -> str:
+    """SHA-1 (hex) del tipo, la forma y el contenido de los arreglos."""
+    digest = hashlib.sha1()
+    for arr in arrays:
+        digest.update(f"{arr.dtype.str}{arr.shape}".encode())
+        digest.update(repr(arr.tolist()).encode() if arr.dtype == object else np.ascontiguousarray(arr).tobytes())
+    return digest.hexdigest()
+
+
+def _as_array(values: List[Any], dtype) -> np.ndarray:
+    """Convierte a un arreglo del tipo pedido, o de objetos si los valores no son enteros."""
+    if all(isinstance(v, (int, np.integer)) for v in values):
+        try:
+            return np.asarray(values, dtype=dtype)
+        except OverflowError:
+            pass
+    return np.asarray(values, dtype=object)
+
+
+_CSR_CACHE: 'weakref.WeakKeyDictionary[nx.MultiDiGraph, CSRGraph]' = weakref.WeakKeyDictionary()
+# Grafos vivos, para rehacer sus locks en los procesos hijos (ver _reinit_locks_after_fork)
+_GRAPHS: 'weakref.WeakSet[CSRGraph]' = weakref.WeakSet()
+
+
+def _reinit_locks_after_fork() -> None:
+    """
+    Los workers de búsqueda (streaming.py) se crean con fork mientras el threadpool
+    del servidor puede estar usando los buffers de un grafo: el hijo heredaría ese
+    lock tomado, sin el thread que lo libera, y se bloquearía en su primera búsqueda.
+    """
+    for csr in list(_GRAPHS):
+        csr._buffers_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reinit_locks_after_fork)
+
+
+def get_csr(G: Union[nx.MultiDiGraph, CSRGraph]) -> CSRGraph:
+    """
+    Devuelve la representación CSR del grafo, construyéndola una sola vez por grafo.
+    Si ya se recibe un CSRGraph se devuelve tal cual.
+    """
+    if isinstance(G, CSRGraph):
+        return G
+    csr = _CSR_CACHE.get(G)
+    if csr is None:
+        csr = CSRGraph.from_networkx(G)
+        _CSR_CACHE[G] = csr
+    return csr
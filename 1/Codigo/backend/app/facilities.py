@@ -0,0 +1,119 @@
+"""
+Fuente más cercana (muchos-a-uno): de N candidatos (depósitos), ¿cuál llega antes a un punto?
+
+Con /ws/run hace falta una búsqueda por candidato. Acá alcanza con una: Dijkstra
+desde el destino sobre el grafo inverso (csr.reverse) asienta los nodos en orden
+de su costo HACIA el destino, así que el primer candidato asentado es el que
+llega antes, el segundo el que le sigue, etc. La búsqueda se detiene al asentar
+k candidatos, así que su costo depende de lo lejos que esté el k-ésimo y no de
+cuántos candidatos haya. La ruta de cada candidato sale del árbol de la misma
+búsqueda: para cada nodo se guarda la primera arista de su camino al destino.
+
+Sembrar todos los candidatos con costo 0 en el grafo directo y buscar el
+destino también da el ganador en una pasada, pero cada nodo queda con un solo
+candidato y no se obtienen los k mejores con sus costos exactos.
+"""
+import heapq
+import math
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .csr import CSRGraph
+from .routing import route_polyline
+
+MAX_SOURCES = 1000
+
+
+class SourceRoute:
+    """Candidato que llega al destino: id denso, costo (segundos) y aristas CSR de su ruta."""
+
+    def __init__(self, source: int, cost: float, edges: List[int]):
+        self.source = source
+        self.cost = cost
+        self.edges = edges
+
+
+def nearest_sources(
+    csr: CSRGraph,
+    sources: Sequence[int],
+    target: int,
+    k: int = 1,
+    relaxed: Optional[List[int]] = None,
+) -> Tuple[List[SourceRoute], int]:
+    """
+    Los k candidatos (ids densos) que llegan antes a target, ordenados por costo, y
+    los nodos asentados. Los candidatos sin ruta al destino no aparecen y los
+    repetidos cuentan una vez. relaxed: si se da, se agregan las aristas que
+    mejoraron una distancia.
+    """
+    off, nbr_of, edge_of = csr.reverse()
+    wts, nbr = csr.w_l, csr.nbr_l
+    pending = set(sources)
+    k = min(k, len(pending))
+    found: List[Tuple[int, float]] = []
+    heappush, heappop = heapq.heappush, heapq.heappop
+
+    with csr.search_buffers() as buf:
+        # prev[v] guarda la arista CSR por la que v sigue hacia el destino
+        gen, dist, nxt, seen, closed = buf.gen, buf.dist, buf.prev, buf.seen, buf.closed
+        dist[target], seen[target] = 0.0, gen
+        pq = [(0.0, target)]
+        settled = 0
+        while pq and len(found) < k:
+            d, u = heappop(pq)
+            if closed[u] == gen:
+                continue
+            closed[u] = gen
+            settled += 1
+            if u in pending:
+                found.append((u, d))
+                if len(found) == k:
+                    break
+            for i in range(off[u], off[u + 1]):
+                v = nbr_of[i]
+                if closed[v] == gen:
+                    continue
+                e = edge_of[i]
+                nd = d + wts[e]
+                if (seen[v] != gen or nd < dist[v]) and nd != math.inf:
+                    seen[v] = gen
+                    dist[v] = nd
+                    nxt[v] = e
+                    heappush(pq, (nd, v))
+                    if relaxed is not None:
+                        relaxed.append(e)
+
+        routes = []
+        for source, cost in found:
+            edges, v = [], source
+            while v != target:
+                e = nxt[v]
+                edges.append(e)
+                v = nbr[e]
+            routes.append(SourceRoute(source, cost, edges))
+    return routes, settled
+
+
+def compute_nearest_source(csr: CSRGraph, sources: Sequence[int], target: int, k: int = 1) -> Optional[Dict[str, Any]]:
+    """
+    Candidato que llega antes a target (ids densos) como {dest, source, polyline,
+    distance_m, duration_s, nodes_explored, time_s, sources}, donde sources son los
+    k mejores ({source, duration_s, distance_m}, en orden), o None si ninguno llega.
+    """
+    t0 = time.time()
+    routes, settled = nearest_sources(csr, sources, target, k)
+    if not routes:
+        return None
+    best = routes[0]
+    length = csr.len_l
+    return {
+        'dest': csr.ids_l[target],
+        'source': csr.ids_l[best.source],
+        'polyline': route_polyline(csr, best.source, best.edges),
+        'distance_m': sum(length[e] for e in best.edges),
+        'duration_s': best.cost,
+        'nodes_explored': settled,
+        'time_s': time.time() - t0,
+        'sources': [{'source': csr.ids_l[r.source], 'duration_s': r.cost,
+                     'distance_m': sum(length[e] for e in r.edges)} for r in routes],
+    }
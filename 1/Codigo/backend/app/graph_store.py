@@ -0,0 +1,105 @@
+"""
+Formato en disco del grafo CSR, versionado y mapeable en memoria
+
+En lugar de serializar con pickle el MultiDiGraph completo de osmnx (con todos
+los atributos de cada arista, incluidos los de estilo), se guardan solo los
+arreglos que usan los algoritmos, cada uno en su propio .npy, más un header JSON:
+
+    graph_cache_corrientes.graph/
+        header.json     versión del formato, tamaños, velocidad máxima, metadatos
+        node_ids.npy  lat.npy  lon.npy  offsets.npy
+        neighbors.npy  weights.npy  lengths.npy  keys.npy
+
+Los .npy se abren con mmap, así que cargar el grafo no requiere osmnx ni
+reconstruir el MultiDiGraph.
+
+Conversión desde la caché pickle existente (desde backend/):
+    python -m app.graph_store [graph_cache_corrientes.pkl] [graph_cache_corrientes.graph]
+"""
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+import numpy as np
+
+from .csr import CSRGraph
+
+logger = logging.getLogger(__name__)
+
+GRAPH_FORMAT = 'realtime-route-graph'
+GRAPH_FORMAT_VERSION = 1
+HEADER_FILE = 'header.json'
+ARRAYS = ('node_ids', 'lat', 'lon', 'offsets', 'neighbors', 'weights', 'lengths', 'keys')
+
+
+class GraphFormatError(ValueError):
+    """El directorio no contiene un grafo válido para esta versión del formato."""
+
+
+def save_graph(csr: CSRGraph, path: Union[str, Path], meta: Optional[Dict[str, Any]] = None) -> None:
+    """Guarda el grafo CSR en el directorio path (se crea si no existe)."""
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    arrays = {}
+    for name in ARRAYS:
+        arr = getattr(csr, name)
+        if arr.dtype == object:
+            raise GraphFormatError(f"'{name}' tiene valores no enteros; no se puede guardar sin pickle")
+        np.save(path / f"{name}.npy", np.ascontiguousarray(arr))
+        arrays[name] = {'dtype': arr.dtype.str, 'shape': list(arr.shape)}
+    header = {
+        'format': GRAPH_FORMAT,
+        'version': GRAPH_FORMAT_VERSION,
+        'n_nodes': csr.n_nodes,
+        'n_edges': csr.n_edges,
+        'max_speed_mps': csr.max_speed,
+        'fingerprint': csr.fingerprint(),
+        'arrays': arrays,
+        'meta': meta or {},
+    }
+    # El header se escribe al final: un directorio sin header no se considera válido
+    (path / HEADER_FILE).write_text(json.dumps(header, indent=2))
+
+
+def read_header(path: Union[str, Path]) -> Dict[str, Any]:
+    """Lee y valida el header JSON del grafo guardado en path."""
+    header_path = Path(path) / HEADER_FILE
+    if not header_path.exists():
+        raise GraphFormatError(f"No existe {header_path}")
+    header = json.loads(header_path.read_text())
+    if header.get('format') != GRAPH_FORMAT or header.get('version') != GRAPH_FORMAT_VERSION:
+        raise GraphFormatError(
+            f"Formato {header.get('format')} v{header.get('version')} no soportado "
+            f"(se espera {GRAPH_FORMAT} v{GRAPH_FORMAT_VERSION})")
+    return header
+
+
+def load_graph(path: Union[str, Path], mmap: bool = True) -> CSRGraph:
+    """Carga el grafo CSR guardado con save_graph, mapeando los arreglos en memoria."""
+    path = Path(path)
+    header = read_header(path)
+    arrays = {}
+    for name in ARRAYS:
+        arr = np.load(path / f"{name}.npy", mmap_mode='r' if mmap else None, allow_pickle=False)
+        spec = header['arrays'][name]
+        if arr.dtype.str != spec['dtype'] or list(arr.shape) != spec['shape']:
+            raise GraphFormatError(f"'{name}.npy' no coincide con el header")
+        arrays[name] = arr
+    return CSRGraph(**arrays, max_speed=header['max_speed_mps'])
+
+
+if __name__ == '__main__':
+    import pickle
+    import sys
+    import time
+
+    logging.basicConfig(level=logging.INFO)
+    src = Path(sys.argv[1] if len(sys.argv) > 1 else 'graph_cache_corrientes.pkl')
+    dst = Path(sys.argv[2]) if len(sys.argv) > 2 else src.with_suffix('.graph')
+    t0 = time.time()
+    with open(src, 'rb') as f:
+        G = pickle.load(f)
+    csr = CSRGraph.from_networkx(G)
+    save_graph(csr, dst, meta={'source': src.name})
+    print(f"Grafo convertido en {time.time() - t0:.1f}s: {csr.n_nodes} nodos, {csr.n_edges} aristas -> {dst}")
@@ -0,0 +1,267 @@
+"""
+Isócronas: todo lo alcanzable desde un nodo en N minutos
+
+Una sola búsqueda Dijkstra uno-a-todos (el mismo núcleo que dijkstra_stream, con
+los buffers por generación de csr.SearchBuffers) se detiene al superar el mayor
+de los presupuestos pedidos; con esas distancias se resuelven todos los
+presupuestos a la vez:
+
+- aristas alcanzadas: las que se recorren completas dentro del presupuesto, con
+  el índice del menor presupuesto que las alcanza (las isócronas están anidadas)
+- polígono: se rasteriza sobre una grilla de cell_m metros la red alcanzada
+  (nodos, aristas completas y el tramo recorrido de las aristas a medio camino),
+  se cierran los huecos de una celda entre calles y se trazan los contornos de
+  la grilla como MultiPolygon GeoJSON (anillos exteriores antihorarios, huecos
+  horarios)
+
+Los costos son los pesos del grafo cargado (incluidos los parches); no se usan
+perfiles de tráfico.
+"""
+import heapq
+import math
+from typing import Any, Dict, List, Sequence, Set, Tuple
+
+import numpy as np
+
+from .csr import CSRGraph
+from .spatial import EARTH_RADIUS_M
+
+MAX_BUDGETS = 8
+DEFAULT_CELL_M = 100.0
+
+Ring = List[Tuple[float, float]]
+
+
+def bounded_dijkstra(csr: CSRGraph, source: int, budget: float) -> Tuple[List[int], List[float]]:
+    """
+    Nodos (ids densos) a distancia <= budget de source, en orden de asentamiento,
+    y sus distancias. La búsqueda se detiene al sacar de la cola un nodo más lejano.
+    """
+    off, nbr, wts = csr.off_l, csr.nbr_l, csr.w_l
+    nodes: List[int] = []
+    dists: List[float] = []
+    with csr.search_buffers() as buf:
+        gen, dist, seen, closed = buf.gen, buf.dist, buf.seen, buf.closed
+        dist[source], seen[source] = 0.0, gen
+        pq = [(0.0, source)]
+        while pq:
+            d, u = heapq.heappop(pq)
+            if closed[u] == gen:
+                continue
+            if d > budget:
+                break
+            closed[u] = gen
+            nodes.append(u)
+            dists.append(d)
+            for e in range(off[u], off[u + 1]):
+                v = nbr[e]
+                nd = d + wts[e]
+                if (seen[v] != gen or nd < dist[v]) and nd <= budget:
+                    seen[v] = gen
+                    dist[v] = nd
+                    heapq.heappush(pq, (nd, v))
+    return nodes, dists
+
+
+def compute_isochrones(
+    csr: CSRGraph,
+    source: int,
+    budgets: Sequence[float],
+    cell_m: float = DEFAULT_CELL_M,
+    include_edges: bool = True,
+    compact_edges: bool = False,
+) -> Dict[str, Any]:
+    """
+    Isócronas desde source (id denso) para cada presupuesto en segundos, con una
+    sola búsqueda. Devuelve un FeatureCollection GeoJSON (un Feature por
+    presupuesto, en el orden recibido) más nodes_explored y, con include_edges,
+    'edges': [{edge_id, coords, budget_index}] con las aristas alcanzadas. Con
+    compact_edges, 'edges' es (índices de arista CSR, índices de presupuesto), sin
+    coordenadas, para guardar en caché (ver edge_features).
+    """
+    nodes, dists = bounded_dijkstra(csr, source, max(budgets))
+    node_dist = np.full(csr.n_nodes, np.inf)
+    node_dist[nodes] = dists
+
+    et = csr.edge_table()
+    # Aristas que salen de nodos alcanzados: distancia al inicio y peso
+    first = np.flatnonzero(np.isfinite(node_dist[et.source]))
+    start = node_dist[et.source[first]]
+    weight = csr.weights[first]
+    end = start + weight
+
+    # Proyección equirectangular local (como spatial.GridIndex) centrada en el origen
+    lat0, lon0 = float(csr.lat[source]), float(csr.lon[source])
+    cos0 = math.cos(math.radians(lat0))
+    scale_x, scale_y = math.radians(1) * EARTH_RADIUS_M * cos0, math.radians(1) * EARTH_RADIUS_M
+    coords = et.coords[first]
+    x_u, y_u = (coords[:, 1] - lon0) * scale_x, (coords[:, 0] - lat0) * scale_y
+    x_v, y_v = (coords[:, 3] - lon0) * scale_x, (coords[:, 2] - lat0) * scale_y
+    node_x = (csr.lon[nodes] - lon0) * scale_x
+    node_y = (csr.lat[nodes] - lat0) * scale_y
+    node_d = np.asarray(dists)
+
+    features = []
+    for budget in budgets:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            frac = np.where(weight > 0, np.clip((budget - start) / weight, 0.0, 1.0), 1.0)
+        frac[start > budget] = 0.0
+        within = node_d <= budget
+        cells = _rasterize(node_x[within], node_y[within], x_u, y_u, x_v, y_v, frac, cell_m)
+        polygons = _trace_polygons(cells, cell_m)
+        features.append({
+            'type': 'Feature',
+            'properties': {
+                'budget_s': budget,
+                'minutes': budget / 60.0,
+                'nodes': int(within.sum()),
+                'edges': int((end <= budget).sum()),
+                'area_km2': len(cells) * cell_m * cell_m / 1e6,
+            },
+            'geometry': {
+                'type': 'MultiPolygon',
+                'coordinates': [[[[lon0 + x / scale_x, lat0 + y / scale_y] for x, y in ring] for ring in polygon]
+                                for polygon in polygons],
+            },
+        })
+
+    result: Dict[str, Any] = {'type': 'FeatureCollection', 'features': features, 'nodes_explored': len(nodes)}
+    if include_edges:
+        # Índice del menor presupuesto que recorre la arista completa
+        order = sorted(range(len(budgets)), key=lambda i: budgets[i])
+        sorted_budgets = np.asarray([budgets[i] for i in order])
+        reached = end <= sorted_budgets[-1]
+        rank = np.searchsorted(sorted_budgets, end[reached], side='left')
+        compact = (first[reached].tolist(), [order[r] for r in rank.tolist()])
+        result['edges'] = compact if compact_edges else edge_features(csr, compact)
+    return result
+
+
+def edge_features(csr: CSRGraph, compact: Tuple[List[int], List[int]]) -> List[Dict[str, Any]]:
+    """Aristas alcanzadas [{edge_id, coords, budget_index}] a partir de su forma compacta."""
+    et = csr.edge_table()
+    edge_ids, edge_coords = et.edge_id_l, et.coords_l
+    return [{'edge_id': edge_ids[e], 'coords': edge_coords[e], 'budget_index': b} for e, b in zip(*compact)]
+
+
+def _rasterize(
+    node_x: np.ndarray, node_y: np.ndarray,
+    x_u: np.ndarray, y_u: np.ndarray, x_v: np.ndarray, y_v: np.ndarray,
+    frac: np.ndarray, cell_m: float,
+) -> Set[Tuple[int, int]]:
+    """Celdas (cx, cy) tocadas por los nodos y por el tramo [0, frac] de cada arista, con huecos cerrados."""
+    seg = frac > 0
+    x_u, y_u, frac = x_u[seg], y_u[seg], frac[seg]
+    dx, dy = (x_v[seg] - x_u) * frac, (y_v[seg] - y_u) * frac
+    # Puntos cada media celda a lo largo de cada tramo
+    steps = np.ceil(np.hypot(dx, dy) / (cell_m / 2)).astype(np.int64) + 1
+    owner = np.repeat(np.arange(len(steps)), steps)
+    offsets = np.zeros(len(steps) + 1, dtype=np.int64)
+    np.cumsum(steps, out=offsets[1:])
+    t = (np.arange(offsets[-1]) - offsets[owner]) / np.maximum(steps[owner] - 1, 1)
+    xs = np.concatenate([node_x, x_u[owner] + dx[owner] * t])
+    ys = np.concatenate([node_y, y_u[owner] + dy[owner] * t])
+    if len(xs) == 0:
+        return set()
+
+    cx = np.floor(xs / cell_m).astype(np.int64)
+    cy = np.floor(ys / cell_m).astype(np.int64)
+    x0, y0 = int(cx.min()) - 2, int(cy.min()) - 2
+    grid = np.zeros((int(cy.max()) - y0 + 3, int(cx.max()) - x0 + 3), dtype=bool)
+    grid[cy - y0, cx - x0] = True
+    # Cierre morfológico 3x3: rellena las manzanas de una celda entre calles alcanzadas
+    grid = _erode(_dilate(grid))
+    ys_, xs_ = np.nonzero(grid)
+    return set(zip((xs_ + x0).tolist(), (ys_ + y0).tolist()))
+
+
+def _dilate(grid: np.ndarray) -> np.ndarray:
+    out = grid.copy()
+    out[1:, :] |= grid[:-1, :]
+    out[:-1, :] |= grid[1:, :]
+    rows = out.copy()
+    out[:, 1:] |= rows[:, :-1]
+    out[:, :-1] |= rows[:, 1:]
+    return out
+
+
+def _erode(grid: np.ndarray) -> np.ndarray:
+    return ~_dilate(~grid)
+
+
+def _trace_polygons(cells: Set[Tuple[int, int]], cell_m: float) -> List[List[Ring]]:
+    """
+    Contornos de un conjunto de celdas como polígonos [exterior, huecos...] en metros.
+    Los bordes se orientan con la celda llena a la izquierda, así que los exteriores
+    quedan antihorarios y los huecos horarios.
+    """
+    # Bordes dirigidos entre vértices de la grilla: (vértice inicial) -> [vértices finales]
+    edges: Dict[Tuple[int, int], List[Tuple[int, int]]] = {}
+    for x, y in cells:
+        if (x, y - 1) not in cells:
+            edges.setdefault((x, y), []).append((x + 1, y))
+        if (x + 1, y) not in cells:
+            edges.setdefault((x + 1, y), []).append((x + 1, y + 1))
+        if (x, y + 1) not in cells:
+            edges.setdefault((x + 1, y + 1), []).append((x, y + 1))
+        if (x - 1, y) not in cells:
+            edges.setdefault((x, y + 1), []).append((x, y))
+
+    rings: List[List[Tuple[int, int]]] = []
+    while edges:
+        start = next(iter(edges))
+        ring = [start]
+        prev, curr = start, _pop_edge(edges, start, None)
+        while curr != start:
+            ring.append(curr)
+            prev, curr = curr, _pop_edge(edges, curr, (curr[0] - prev[0], curr[1] - prev[1]))
+        rings.append(_drop_collinear(ring))
+
+    outers = [r for r in rings if _signed_area(r) > 0]
+    polygons: List[List[Ring]] = [[r] for r in outers]
+    areas = [_signed_area(r) for r in outers]
+    for hole in (r for r in rings if _signed_area(r) < 0):
+        # Centro de la celda vacía a la derecha del primer borde: está dentro del hueco
+        (ax, ay), (bx, by) = hole[0], hole[1]
+        dx, dy = (bx > ax) - (bx < ax), (by > ay) - (by < ay)
+        px, py = ax + dx * 0.5 + dy * 0.5, ay + dy * 0.5 - dx * 0.5
+        containing = [i for i, outer in enumerate(outers) if _contains(outer, px, py)]
+        if containing:
+            polygons[min(containing, key=lambda i: areas[i])].append(hole)
+    return [[[(x * cell_m, y * cell_m) for x, y in ring + ring[:1]] for ring in polygon] for polygon in polygons]
+
+
+def _pop_edge(edges, vertex, direction):
+    """Saca un borde que sale de vertex; en los vértices compartidos en diagonal gira a la izquierda."""
+    out = edges[vertex]
+    i = 0
+    if len(out) > 1 and direction is not None:
+        left = (-direction[1], direction[0])
+        i = next((j for j, (x, y) in enumerate(out) if (x - vertex[0], y - vertex[1]) == left), 0)
+    nxt = out.pop(i)
+    if not out:
+        del edges[vertex]
+    return nxt
+
+
+def _drop_collinear(ring: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    out = []
+    n = len(ring)
+    for i, (x, y) in enumerate(ring):
+        (px, py), (nx, ny) = ring[i - 1], ring[(i + 1) % n]
+        if (x - px) * (ny - y) - (y - py) * (nx - x) != 0:
+            out.append((x, y))
+    return out
+
+
+def _signed_area(ring: List[Tuple[int, int]]) -> float:
+    return sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(ring, ring[1:] + ring[:1])) / 2
+
+
+def _contains(ring: List[Tuple[int, int]], px: float, py: float) -> bool:
+    """Punto en polígono por cruce de rayo (el punto nunca cae sobre un borde de la grilla)."""
+    inside = False
+    for (x0, y0), (x1, y1) in zip(ring, ring[1:] + ring[:1]):
+        if (y0 > py) != (y1 > py) and px < x0 + (py - y0) * (x1 - x0) / (y1 - y0):
+            inside = not inside
+    return inside
@@ -7,21 +7,52 @@ Conceptos de IA aplicados:
 - A*: Búsqueda informada con heurística admisible (distancia haversine / velocidad máxima)
 - Heurística admisible: nunca sobreestima el costo real, garantizando optimalidad
 """
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Query, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Query, HTTPException, Header, BackgroundTasks
+from fastapi.responses import JSONResponse, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+import io
 import json
 import logging
 import math
 import asyncio
+import contextlib
 import heapq
+import hmac
 import time
 import os
+import weakref
 import pickle
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional, Iterator, Dict, Any, List, Tuple
+from typing import Optional, Iterator, AsyncIterator, Dict, Any, List, Tuple, Union
 import networkx as nx # mapa convertido en grafo
-import osmnx as # mapa de corrientes
+import numpy as np
+# osmnx (mapa de corrientes) se importa solo al descargar el grafo: arrancar desde
+# el formato CSR en disco no lo necesita
+
+from pydantic import BaseModel, Field
+
+from .csr import EARTH_RADIUS_M, CSRGraph, get_csr
+from .graph_store import GraphFormatError, load_graph, save_graph
+from .spatial import get_spatial_index, load_or_build_spatial_index
+from .ch import ContractionHierarchy, ch_query, load_or_build_ch
+from .alternatives import MAX_ALTERNATIVES, alternative_routes
+from .facilities import MAX_SOURCES, compute_nearest_source, nearest_sources
+from .alt import LandmarkTables, load_or_build_landmarks
+from .regions import GraphRegistry, Region, RegionState
+from .routing import compute_route
+from .isochrones import DEFAULT_CELL_M, MAX_BUDGETS, compute_isochrones, edge_features
+from .traffic import TrafficProfiles, load_traffic_profiles, parse_departure
+from .patches import active_patches, apply_patches, resolve_patches
+from .matrix import shutdown_pool, travel_time_matrix
+from .metrics import (ACTIVE_SESSIONS, CACHE_HIT_RATIO, CONTENT_TYPE_LATEST, ROUTE_REQUESTS, count_events,
+                      observe_search, profile_search, render_metrics)
+from .streaming import shutdown_search_pool, stream_search
+from .route_cache import RouteRecorder, cache_from_env, replay_stream
+from .tiles import MAX_TILE_ZOOM, MIN_TILE_ZOOM, TileIndex
+from .ws_protocol import (BINARY_VERSION, DEFAULT_BATCH_MS, DEFAULT_BATCH_SIZE, PROTOCOLS,
+                          batch_events, encode_frames, tag_event)
 
 
 # =============================================================================
@@ -31,9 +62,27 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 CACHE_FILE = Path('graph_cache_corrientes.pkl')
+GRAPH_FILE = CACHE_FILE.with_suffix('.graph')  # Formato CSR versionado (ver graph_store.py)
+SPATIAL_INDEX_FILE = CACHE_FILE.with_suffix('.spatial.npz')
+CH_FILE = CACHE_FILE.with_suffix('.ch.npz')
+ALT_FILE = CACHE_FILE.with_suffix('.alt.npz')
+TILE_CACHE_DIR = CACHE_FILE.with_suffix('.tiles')  # Teselas binarias por versión del grafo (ver tiles.py)
+TRAFFIC_FILE = CACHE_FILE.with_suffix('.traffic.npz')  # Perfiles de velocidad por franja (ver traffic.py)
 PLACE = 'Corrientes, Corrientes, Argentina'
 RADIUS = 9000
 DEFAULT_SPEED_KMH = 40
+GRAPH_CACHE_VERSION = 'v1'  # Formato de la caché; la versión reportada agrega la huella del grafo
+
+# Regiones servidas (ver regions.py): la región por defecto se carga al arrancar
+# (GRAPH, CH, LANDMARKS, TRAFFIC) y las demás recién en su primera consulta
+DEFAULT_REGION = 'corrientes'
+REGIONS: Dict[str, Region] = {
+    DEFAULT_REGION: Region(DEFAULT_REGION, PLACE, RADIUS, CACHE_FILE),
+    'resistencia': Region('resistencia', 'Resistencia, Chaco, Argentina', 9000),
+    'posadas': Region('posadas', 'Posadas, Misiones, Argentina', 9000),
+}
+# Memoria estimada máxima de las regiones cargadas a demanda (la por defecto no cuenta)
+REGION_MEMORY_MB = int(os.environ.get('REGION_MEMORY_MB', '1024'))
 
 # Colores para visualización
 COLOR_UNVISITED = "#444444"  # Calles sin explorar
@@ -55,14 +104,22 @@ def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     return 2 * R * math.asin(math.sqrt(a))
 
 
-async def run_sync_generator_async(gen: Iterator[Dict[str, Any]], speed: float = 1.0):
+async def run_sync_generator_async(gen: Union[Iterator[Any], AsyncIterator[Any]], speed: float = 1.0):
     """
-    Adaptador para iterar un generador síncrono y emitir items de forma asíncrona.
-    Soporta throttling ajustable mediante el parámetro speed.
+    Adaptador para iterar un generador síncrono (o los eventos que llegan de un
+    worker de búsqueda, ver streaming.py) y emitir items de forma asíncrona.
+    Soporta throttling ajustable mediante el parámetro speed (inf = sin pausas).
     """
-    for item in gen:
+    delay = max(0.0, 0.001 / max(0.01, speed))
+    if not hasattr(gen, '__aiter__'):
+        for item in gen:
+            yield item
+            await asyncio.sleep(delay)
+        return
+    async for item in gen:
         yield item
-        await asyncio.sleep(max(0.0, 0.001 / max(0.01, speed)))
+        if delay:
+            await asyncio.sleep(delay)
 
 
 # =============================================================================
@@ -84,6 +141,8 @@ def load_or_download_graph(
         print(f"Grafo cargado: {len(G.nodes)} nodos, {len(G.edges)} aristas")
         return G
     
+    import osmnx as ox
+    
     print(f"Descargando grafo para {place} (radio: {radius}m)...")
     gdf = ox.geocode_to_gdf(place)
     center_point = (gdf.geometry.centroid.y.iloc[0], gdf.geometry.centroid.x.iloc[0])
@@ -110,8 +169,56 @@ def load_or_download_graph(
     return G
 
 
-def get_edge_sample(G: nx.MultiDiGraph, decimate: int = 10) -> Dict[str, List[Tuple[float, float]]]:
+def load_server_graph(graph_file: Path = GRAPH_FILE, place: str = PLACE, radius: int = RADIUS) -> CSRGraph:
+    """
+    Carga el grafo en formato CSR desde graph_file. Si no existe (o es de otra
+    versión del formato) lo genera a partir de la caché pickle (mismo nombre con
+    extensión .pkl) o de una descarga de place, y lo guarda para los próximos arranques.
+    """
+    if graph_file.exists():
+        try:
+            return load_graph(graph_file)
+        except (GraphFormatError, OSError, ValueError, KeyError) as e:
+            logger.warning(f"No se pudo leer el grafo {graph_file}: {e}")
+    csr = get_csr(load_or_download_graph(place, radius, str(graph_file.with_suffix('.pkl'))))
+    try:
+        save_graph(csr, graph_file, meta={'place': place, 'radius_m': radius})
+    except (GraphFormatError, OSError) as e:
+        logger.warning(f"No se pudo guardar el grafo {graph_file}: {e}")
+    return csr
+
+
+def load_region(region: Region, build_ch: bool = False) -> RegionState:
+    """
+    Carga el grafo de una región con sus tablas y preprocesamientos (índice
+    espacial, landmarks ALT y, si están en disco, CH y perfiles de tráfico).
+    Con build_ch la CH se construye si no está guardada.
+    """
+    logger.info(f"Cargando grafo de {region.name}...")
+    t0 = time.time()
+    csr = load_server_graph(region.graph_file, region.place, region.radius_m)
+    logger.info(f"Grafo cargado en {time.time() - t0:.2f}s: {csr.n_nodes} nodos, {csr.n_edges} aristas")
+    t0 = time.time()
+    csr.edge_table()  # Antes del fork de los workers de búsqueda: la heredan
+    csr.geometry()
+    logger.info(f"Tablas de aristas y de nodos listas en {time.time() - t0:.2f}s")
+    t0 = time.time()
+    load_or_build_spatial_index(csr, region.spatial_index_file)
+    logger.info(f"Índice espacial listo en {time.time() - t0:.2f}s")
+    landmarks = load_or_build_landmarks(csr, region.alt_file)
+    ch = load_or_build_ch(csr, region.ch_file, build=build_ch)
+    if ch is not None:
+        logger.info(f"Contraction Hierarchies disponibles ({ch.n_shortcuts} atajos)")
+    traffic = load_traffic_profiles(csr, region.traffic_file)
+    if traffic is not None:
+        logger.info(f"Perfiles de tráfico disponibles ({traffic.n_profiles} aristas con observaciones)")
+    return RegionState(region, csr, ch, landmarks, traffic)
+
+
+def get_edge_sample(G: Union[nx.MultiDiGraph, CSRGraph], decimate: int = 10) -> Dict[str, List[Tuple[float, float]]]:
     """Obtiene una muestra de aristas del grafo para visualización inicial."""
+    if isinstance(G, CSRGraph):
+        return _csr_edge_sample(G, decimate)
     out = {}
     i = 0
     for u, v, k in G.edges(keys=True):
@@ -124,16 +231,38 @@ def get_edge_sample(G: nx.MultiDiGraph, decimate: int = 10) -> Dict[str, List[Tu
     return out
 
 
+def _csr_edge_sample(csr: CSRGraph, decimate: int) -> Dict[str, List[List[float]]]:
+    """Muestra de aristas por índice sobre la tabla de aristas precalculada."""
+    et = csr.edge_table()
+    edge_ids, coords = et.edge_id_l, et.coords_l
+    return {edge_ids[e]: coords[e] for e in range(0, csr.n_edges, decimate)}
+
+
 def find_nearest_node(G: nx.MultiDiGraph, lat: float, lon: float) -> Optional[int]:
-    """Encuentra el nodo más cercano a las coordenadas dadas usando distancia Haversine."""
-    if len(G.nodes) == 0:
-        return None
-    min_dist, nearest = float('inf'), None
-    for node_id, data in G.nodes(data=True):
-        dist = haversine_m(lat, lon, data['y'], data['x'])
-        if dist < min_dist:
-            min_dist, nearest = dist, node_id
-    return nearest
+    """
+    Encuentra el nodo más cercano a las coordenadas dadas usando distancia Haversine.
+    Usa el índice espacial en grilla del grafo (ver spatial.py) en lugar de recorrer todos los nodos.
+    """
+    csr = get_csr(G)
+    nearest = get_spatial_index(csr).nearest(lat, lon)
+    return None if nearest is None else csr.ids_l[nearest]
+
+
+def find_k_nearest_nodes(
+    G: nx.MultiDiGraph, 
+    points: List[Tuple[float, float]], 
+    k: int = 1
+) -> List[List[Dict[str, Any]]]:
+    """Para cada punto (lat, lon) devuelve los k nodos más cercanos con sus coordenadas y distancia en metros."""
+    csr = get_csr(G)
+    index = get_spatial_index(csr)
+    out = []
+    for idx, dist in index.nearest_batch(points, k=k):
+        out.append([
+            {'node_id': csr.ids_l[i], 'lat': csr.lat_l[i], 'lon': csr.lon_l[i], 'dist_m': d}
+            for i, d in zip(idx.tolist(), dist.tolist())
+        ])
+    return out
 
 
 # =============================================================================
@@ -168,20 +297,32 @@ def reconstruct_path(
     return path, total_length / 1000.0
 
 
-def compute_max_speed(G: nx.MultiDiGraph, default_speed_kmh: float = 40.0) -> float:
+# Velocidad máxima (km/h, None si ninguna arista trae speed_kph) por grafo networkx
+_MAX_SPEED_KMH: 'weakref.WeakKeyDictionary[nx.MultiDiGraph, Optional[float]]' = weakref.WeakKeyDictionary()
+
+
+def compute_max_speed(G: Union[nx.MultiDiGraph, CSRGraph], default_speed_kmh: float = 40.0) -> float:
     """
     Calcula la velocidad máxima del grafo para usar en la heurística de A*.
     Esto asegura que la heurística sea ADMISIBLE (nunca sobreestima el costo real).
+    Un CSRGraph ya la trae calculada (o leída del header del formato en disco); en
+    un MultiDiGraph se recorren las aristas una sola vez por grafo (como en get_csr,
+    se asume que no se modifica después de la primera consulta).
     """
-    speeds = []
-    for _, _, _, d in G.edges(keys=True, data=True):
-        s = d.get('speed_kph')
-        if s:
-            try:
-                speeds.append(float(s))
-            except (ValueError, TypeError):
-                pass
-    return (max(speeds) if speeds else default_speed_kmh) / 3.6
+    if isinstance(G, CSRGraph):
+        return G.max_speed
+    if G not in _MAX_SPEED_KMH:
+        speeds = []
+        for _, _, _, d in G.edges(keys=True, data=True):
+            s = d.get('speed_kph')
+            if s:
+                try:
+                    speeds.append(float(s))
+                except (ValueError, TypeError):
+                    pass
+        _MAX_SPEED_KMH[G] = max(speeds) if speeds else None
+    max_kmh = _MAX_SPEED_KMH[G]
+    return (max_kmh if max_kmh is not None else default_speed_kmh) / 3.6
 
 
 def dijkstra_stream(
@@ -189,7 +330,9 @@ def dijkstra_stream(
     orig: int, 
     dest: int, 
     decimate: int = 1, 
-    progress_every: int = 500
+    progress_every: int = 500,
+    departure: Optional[float] = None,
+    traffic: Optional[TrafficProfiles] = None
 ) -> Iterator[Dict[str, Any]]:
     """
     ALGORITMO DE DIJKSTRA (Búsqueda de Costo Uniforme)
@@ -198,66 +341,78 @@ def dijkstra_stream(
     Garantiza encontrar el camino óptimo (menor costo total).
     
     Complejidad: O((V + E) log V) con cola de prioridad.
+    
+    Se ejecuta sobre la representación CSR del grafo (ver csr.py); los eventos
+    emitidos son idénticos a los de la versión original sobre networkx.
+    
+    Con departure (segundos desde medianoche) y perfiles de tráfico los costos
+    son tiempos de viaje según la hora de entrada a cada arista (ver traffic.py).
     """
     t0 = time.time()
-    dist = {n: float('inf') for n in G.nodes}
-    prev = {n: None for n in G.nodes}
-    visited = set()
-    dist[orig] = 0
-    pq = [(0, orig)]  # Cola de prioridad: (distancia, nodo)
-    nodes_explored = 0
+    csr = get_csr(G)
+    off, nbr, wts = csr.off_l, csr.nbr_l, csr.w_l
+    edge_time = traffic.travel_time if traffic is not None and departure is not None else None
+    # Datos de los eventos por índice de arista (ver csr.EdgeTable)
+    et = csr.edge_table()
+    edge_ids, us, vs, keys, coords = et.edge_id_l, et.u_l, et.v_l, csr.keys_l, et.coords_l
+    o, t = csr.index[orig], csr.index[dest]
     
-    yield {'type': 'status', 'msg': 'started', 'algorithm': 'dijkstra', 'orig': orig, 'dest': dest}
-    
-    i = 0
-    while pq: #seleccionar de la cola de prioridad el nodo con menor distancia
-        d, node = heapq.heappop(pq)
+    # Estado por nodo en buffers reutilizables con reinicio por generación (ver
+    # csr.SearchBuffers): el costo por consulta escala con la región explorada
+    with csr.search_buffers() as buf:
+        gen, dist, prev, seen, visited = buf.gen, buf.dist, buf.prev, buf.seen, buf.closed
+        dist[o], seen[o] = 0, gen
+        pq = [(0, o)]  # Cola de prioridad: (distancia, nodo)
+        nodes_explored = 0
         
-        if node in visited:
-            continue
-        
-        visited.add(node)
-        nodes_explored += 1
+        yield {'type': 'status', 'msg': 'started', 'algorithm': 'dijkstra', 'orig': orig, 'dest': dest}
         
-        if node == dest:
-            yield {'type': 'status', 'msg': 'reached_dest', 'node': node}
-            break
-        
-        # Explorar vecinos (expansión del nodo)
-        for u, v, k, data in G.out_edges(node, keys=True, data=True):
-            w = data['weight']
-            new_dist = dist[node] + w
+        i = 0
+        while pq: #seleccionar de la cola de prioridad el nodo con menor distancia
+            d, node = heapq.heappop(pq)
             
-            # Relajación de arista: actualizar si encontramos camino más corto
-            if new_dist < dist[v]:
-                dist[v] = new_dist
-                prev[v] = node
-                heapq.heappush(pq, (dist[v], v))
+            if visited[node] == gen:
+                continue
+            
+            visited[node] = gen
+            nodes_explored += 1
+            
+            if node == t:
+                yield {'type': 'status', 'msg': 'reached_dest', 'node': dest}
+                break
+            
+            # Explorar vecinos (expansión del nodo)
+            d_node = dist[node]
+            for e in range(off[node], off[node + 1]):
+                v = nbr[e]
+                w = wts[e] if edge_time is None else edge_time(e, departure + d_node)
+                new_dist = d_node + w
                 
-                if i % decimate == 0:
-                    u_node, v_node = G.nodes[u], G.nodes[v]
-                    yield {
-                        'type': 'visited', 'edge_id': f"{u}|{v}|{k}",
-                        'u': u, 'v': v, 'k': k, 'weight': w,
-                        'coords': [[u_node['y'], u_node['x']], [v_node['y'], v_node['x']]]
-                    }
-                i += 1
+                # Relajación de arista: actualizar si encontramos camino más corto
+                if seen[v] != gen or new_dist < dist[v]:
+                    if new_dist == math.inf:
+                        continue  # Arista cortada por un parche (ver patches.py)
+                    seen[v] = gen
+                    dist[v] = new_dist
+                    prev[v] = node
+                    heapq.heappush(pq, (new_dist, v))
+                    
+                    if i % decimate == 0:
+                        yield {
+                            'type': 'visited', 'edge_id': edge_ids[e],
+                            'u': us[e], 'v': vs[e], 'k': keys[e], 'weight': w, 'coords': coords[e]
+                        }
+                    i += 1
+            
+            if nodes_explored % progress_every == 0:
+                yield {'type': 'progress', 'explored': nodes_explored}
         
-        if nodes_explored % progress_every == 0:
-            yield {'type': 'progress', 'explored': nodes_explored}
+        elapsed = time.time() - t0
+        path_edges, total_km = csr.reconstruct_path(o, t, prev) if seen[t] == gen else ([], 0.0)
+        arrival = departure + dist[t] if edge_time is not None and seen[t] == gen else None
+    yield from _path_events(csr, o, path_edges)
     
-    elapsed = time.time() - t0
-    path_edges, total_km = reconstruct_path(G, orig, dest, prev)
-    
-    for order, (u, v, k) in enumerate(path_edges):
-        u_node, v_node = G.nodes[u], G.nodes[v]
-        yield {
-            'type': 'path', 'edge_id': f"{u}|{v}|{k}",
-            'u': u, 'v': v, 'k': k, 'order': order,
-            'coords': [[u_node['y'], u_node['x']], [v_node['y'], v_node['x']]]
-        }
-    
-    yield {'type': 'done', 'nodes_explored': nodes_explored, 'time_s': elapsed, 'distance_km': total_km}
+    yield _done_event(nodes_explored, elapsed, total_km, departure if edge_time is not None else None, arrival)
 
 
 def astar_stream(
@@ -265,7 +420,10 @@ def astar_stream(
     orig: int, 
     dest: int, 
     decimate: int = 1, 
-    progress_every: int = 500
+    progress_every: int = 500,
+    landmarks: Optional[LandmarkTables] = None,
+    departure: Optional[float] = None,
+    traffic: Optional[TrafficProfiles] = None
 ) -> Iterator[Dict[str, Any]]:
     """
     ALGORITMO A* (Búsqueda Informada)
@@ -280,62 +438,219 @@ def astar_stream(
     - Garantiza encontrar el camino óptimo
     
     Ventaja sobre Dijkstra: explora menos nodos al guiarse hacia el destino.
+    
+    Modo ALT (landmarks != None): la heurística es la máxima cota por desigualdad
+    triangular respecto de los landmarks precalculados (ver alt.py), también
+    admisible y consistente pero mucho más ajustada.
+    
+    Con departure y perfiles de tráfico (no combinable con ALT, cuyas tablas son
+    de pesos estáticos) g(n) es el tiempo de llegada y la velocidad máxima de la
+    heurística incluye la de los perfiles, así que sigue siendo admisible.
     """
     t0 = time.time()
-    dest_lat, dest_lon = G.nodes[dest]['y'], G.nodes[dest]['x']
-    max_speed = compute_max_speed(G)
-    
-    # Función heurística admisible
-    def h(node: int) -> float:
-        lat, lon = G.nodes[node]['y'], G.nodes[node]['x']
-        return haversine_m(lat, lon, dest_lat, dest_lon) / max_speed
-    
-    g_score = {n: float('inf') for n in G.nodes}
-    f_score = {n: float('inf') for n in G.nodes}
-    prev = {n: None for n in G.nodes}
-    closed = set()
-    
-    g_score[orig] = 0
-    f_score[orig] = h(orig)
-    pq = [(f_score[orig], orig)]  # Cola de prioridad: (f_score, nodo)
+    csr = get_csr(G)
+    off, nbr, wts = csr.off_l, csr.nbr_l, csr.w_l
+    edge_time = traffic.travel_time if traffic is not None and departure is not None else None
+    if edge_time is not None and landmarks is not None:
+        raise ValueError('ALT no admite pesos dependientes del horario')
+    et = csr.edge_table()
+    edge_ids, us, vs, keys, coords = et.edge_id_l, et.u_l, et.v_l, csr.keys_l, et.coords_l
+    o, t = csr.index[orig], csr.index[dest]
+    
+    if landmarks is not None:
+        algorithm = 'alt'
+        h = landmarks.heuristic(t, s=o)
+    else:
+        algorithm = 'astar'
+        max_speed = csr.max_speed if edge_time is None else traffic.max_speed
+        
+        # Función heurística admisible: distancia de círculo máximo (igual a haversine)
+        # a partir de los vectores unitarios precalculados de cada nodo (ver NodeGeometry).
+        # En la relajación se evalúa en línea, sin el costo de una llamada por vecino.
+        geometry = csr.geometry()
+        h = geometry.heuristic(t, max_speed)
+        xs, ys, zs = geometry.x_l, geometry.y_l, geometry.z_l
+        tx, ty, tz = xs[t], ys[t], zs[t]
+        scale = 2 * EARTH_RADIUS_M / max_speed
+        asin, sqrt = math.asin, math.sqrt
+    
+    # Estado por nodo en buffers reutilizables, como en dijkstra_stream
+    with csr.search_buffers() as buf:
+        gen, g_score, prev, seen, closed = buf.gen, buf.dist, buf.prev, buf.seen, buf.closed
+        g_score[o], seen[o] = 0, gen
+        pq = [(h(o), o)]  # Cola de prioridad: (f_score, nodo)
+        nodes_explored = 0
+        
+        yield {'type': 'status', 'msg': 'started', 'algorithm': algorithm, 'orig': orig, 'dest': dest}
+        
+        i = 0
+        while pq:
+            _, node = heapq.heappop(pq)
+            
+            if closed[node] == gen:
+                continue
+            
+            closed[node] = gen
+            nodes_explored += 1
+            
+            if node == t:
+                yield {'type': 'status', 'msg': 'reached_dest', 'node': dest}
+                break
+            
+            # Explorar vecinos
+            g_node = g_score[node]
+            for e in range(off[node], off[node + 1]):
+                v = nbr[e]
+                if closed[v] == gen:
+                    continue
+                
+                w = wts[e] if edge_time is None else edge_time(e, departure + g_node)
+                tentative_g = g_node + w
+                
+                # Relajación de arista con heurística
+                if seen[v] != gen or tentative_g < g_score[v]:
+                    if tentative_g == math.inf:
+                        continue  # Arista cortada por un parche (ver patches.py)
+                    seen[v] = gen
+                    prev[v] = node
+                    g_score[v] = tentative_g
+                    if algorithm == 'astar':
+                        dx, dy, dz = xs[v] - tx, ys[v] - ty, zs[v] - tz
+                        h_v = asin(min(sqrt(dx * dx + dy * dy + dz * dz) * 0.5, 1.0)) * scale
+                    else:
+                        h_v = h(v)
+                    heapq.heappush(pq, (tentative_g + h_v, v))  # f(n) = g(n) + h(n)
+                    
+                    if i % decimate == 0:
+                        yield {
+                            'type': 'visited', 'edge_id': edge_ids[e],
+                            'u': us[e], 'v': vs[e], 'k': keys[e], 'weight': w,
+                            'coords': coords[e]
+                        }
+                    i += 1
+            
+            if nodes_explored % progress_every == 0:
+                yield {'type': 'progress', 'explored': nodes_explored}
+        
+        elapsed = time.time() - t0
+        path_edges, total_km = csr.reconstruct_path(o, t, prev) if seen[t] == gen else ([], 0.0)
+        arrival = departure + g_score[t] if edge_time is not None and seen[t] == gen else None
+    yield from _path_events(csr, o, path_edges)
+    
+    yield _done_event(nodes_explored, elapsed, total_km, departure if edge_time is not None else None, arrival)
+
+
+def _done_event(
+    nodes_explored: int,
+    elapsed: float,
+    distance_km: float,
+    departure: Optional[float] = None,
+    arrival: Optional[float] = None
+) -> Dict[str, Any]:
+    """Evento 'done'; con pesos dependientes del horario agrega la salida y la llegada (segundos)."""
+    event = {'type': 'done', 'nodes_explored': nodes_explored, 'time_s': elapsed, 'distance_km': distance_km}
+    if departure is not None:
+        event['departure_s'] = departure
+        event['arrival_s'] = arrival
+    return event
+
+
+def bidirectional_stream(
+    G: nx.MultiDiGraph, 
+    orig: int, 
+    dest: int, 
+    decimate: int = 1, 
+    progress_every: int = 500,
+    heuristic: bool = False
+) -> Iterator[Dict[str, Any]]:
+    """
+    DIJKSTRA / A* BIDIRECCIONAL
+    
+    Concepto IA: dos búsquedas simultáneas, una desde el origen (forward) sobre las
+    aristas salientes y otra desde el destino (backward) sobre las entrantes. Se
+    expande siempre la frontera con menor clave; mu es el mejor costo de un camino
+    que une ambas fronteras. La búsqueda termina cuando
+    
+        min_clave_forward + min_clave_backward >= mu
+    
+    porque ningún camino no explorado puede mejorar mu. En rutas largas cada frontera
+    cubre aproximadamente la mitad del "radio", asentando cerca de la mitad de nodos.
+    
+    Con heuristic=True (A* bidireccional) se usa el potencial promedio consistente
+        p_f(v) = (h_t(v) - h_s(v)) / 2,   p_b(v) = -p_f(v)
+    con h = haversine / velocidad máxima; las claves son d + p y el criterio de
+    parada es el mismo.
+    
+    Los eventos 'visited' llevan 'direction': 'forward' | 'backward'.
+    """
+    t0 = time.time()
+    csr = get_csr(G)
+    ids = csr.ids_l
+    et = csr.edge_table()
+    edge_ids, us, vs, keys, coords = et.edge_id_l, et.u_l, et.v_l, csr.keys_l, et.coords_l
+    wts = csr.w_l
+    o, t = csr.index[orig], csr.index[dest]
+    # (offsets, vecino, índice de arista) para cada dirección
+    rev_off, rev_src, rev_edge = csr.reverse()
+    graphs = ((csr.off_l, csr.nbr_l, None), (rev_off, rev_src, rev_edge))
+    
+    if heuristic:
+        algorithm = 'biastar'
+        geometry = csr.geometry()
+        h_t, h_s = geometry.heuristic(t, 2 * csr.max_speed), geometry.heuristic(o, 2 * csr.max_speed)
+        
+        def p_f(v: int) -> float:
+            return h_t(v) - h_s(v)
+        potentials = (p_f, lambda v: -p_f(v))
+    else:
+        algorithm = 'bidijkstra'
+        potentials = None
+    
+    dist = ({o: 0.0}, {t: 0.0})
+    prev: Tuple[Dict[int, Tuple[int, int]], ...] = ({}, {})  # nodo -> (nodo previo, arista)
+    closed = (set(), set())
+    start_keys = (potentials[0](o), potentials[1](t)) if potentials else (0.0, 0.0)
+    pqs = ([(start_keys[0], o)], [(start_keys[1], t)])
+    mu, meet = (0.0, o) if o == t else (math.inf, -1)
     nodes_explored = 0
     
-    yield {'type': 'status', 'msg': 'started', 'algorithm': 'astar', 'orig': orig, 'dest': dest}
+    yield {'type': 'status', 'msg': 'started', 'algorithm': algorithm, 'orig': orig, 'dest': dest}
     
     i = 0
-    while pq:
-        _, node = heapq.heappop(pq)
-        
-        if node in closed:
+    while pqs[0] and pqs[1]:
+        if pqs[0][0][0] + pqs[1][0][0] >= mu:
+            break  # Las fronteras se encontraron: mu es óptimo
+        side = 0 if pqs[0][0][0] <= pqs[1][0][0] else 1
+        _, node = heapq.heappop(pqs[side])
+        if node in closed[side]:
             continue
-        
-        closed.add(node)
+        closed[side].add(node)
         nodes_explored += 1
         
-        if node == dest:
-            yield {'type': 'status', 'msg': 'reached_dest', 'node': node}
-            break
-        
-        # Explorar vecinos
-        for u, v, k, data in G.out_edges(node, keys=True, data=True):
-            if v in closed:
-                continue
+        my_dist, other_dist, my_prev = dist[side], dist[1 - side], prev[side]
+        off, nbr_of, edge_of = graphs[side]
+        pot = potentials[side] if potentials else None
+        direction = 'forward' if side == 0 else 'backward'
+        d_node = my_dist[node]
+        for j in range(off[node], off[node + 1]):
+            v = nbr_of[j]
+            e = j if edge_of is None else edge_of[j]
+            new_dist = d_node + wts[e]
             
-            tentative_g = g_score[node] + data['weight']
-            
-            # Relajación de arista con heurística
-            if tentative_g < g_score[v]:
-                prev[v] = node
-                g_score[v] = tentative_g
-                f_score[v] = tentative_g + h(v)  # f(n) = g(n) + h(n)
-                heapq.heappush(pq, (f_score[v], v))
+            if new_dist < my_dist.get(v, math.inf):
+                my_dist[v] = new_dist
+                my_prev[v] = (node, e)
+                heapq.heappush(pqs[side], (new_dist + pot(v) if pot else new_dist, v))
+                
+                other = other_dist.get(v)
+                if other is not None and new_dist + other < mu:
+                    mu, meet = new_dist + other, v
                 
                 if i % decimate == 0:
-                    u_node, v_node = G.nodes[u], G.nodes[v]
                     yield {
-                        'type': 'visited', 'edge_id': f"{u}|{v}|{k}",
-                        'u': u, 'v': v, 'k': k, 'weight': data['weight'],
-                        'coords': [[u_node['y'], u_node['x']], [v_node['y'], v_node['x']]]
+                        'type': 'visited', 'edge_id': edge_ids[e],
+                        'u': us[e], 'v': vs[e], 'k': keys[e], 'weight': wts[e], 'direction': direction,
+                        'coords': coords[e]
                     }
                 i += 1
         
@@ -343,19 +658,226 @@ def astar_stream(
             yield {'type': 'progress', 'explored': nodes_explored}
     
     elapsed = time.time() - t0
-    path_edges, total_km = reconstruct_path(G, orig, dest, prev)
+    path_edges: List[int] = []
+    if meet >= 0:
+        yield {'type': 'status', 'msg': 'reached_dest', 'node': dest, 'meeting_node': ids[meet]}
+        x = meet
+        while x != o:
+            x, e = prev[0][x]
+            path_edges.append(e)
+        path_edges.reverse()
+        x = meet
+        while x != t:
+            x, e = prev[1][x]
+            path_edges.append(e)
+    yield from _path_events(csr, o, path_edges)
     
-    for order, (u, v, k) in enumerate(path_edges):
-        u_node, v_node = G.nodes[u], G.nodes[v]
-        yield {
-            'type': 'path', 'edge_id': f"{u}|{v}|{k}",
-            'u': u, 'v': v, 'k': k, 'order': order,
-            'coords': [[u_node['y'], u_node['x']], [v_node['y'], v_node['x']]]
+    total_km = sum(csr.len_l[e] for e in path_edges) / 1000.0
+    yield {'type': 'done', 'nodes_explored': nodes_explored, 'time_s': elapsed, 'distance_km': total_km}
+
+
+def _path_events(
+    csr: CSRGraph,
+    o: int,
+    path_edges: List[int],
+    route_index: Optional[int] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Emite un evento 'path' por cada arista de la ruta (índices de arista CSR desde el
+    origen o). Con varias rutas, route_index indica a cuál pertenece cada arista.
+    """
+    et = csr.edge_table()
+    for order, e in enumerate(path_edges):
+        event = {
+            'type': 'path', 'edge_id': et.edge_id_l[e],
+            'u': et.u_l[e], 'v': et.v_l[e], 'k': csr.keys_l[e], 'order': order, 'coords': et.coords_l[e]
         }
+        if route_index is not None:
+            event['route_index'] = route_index
+        yield event
+
+
+def ch_stream(
+    G: nx.MultiDiGraph, 
+    ch: ContractionHierarchy, 
+    orig: int, 
+    dest: int, 
+    decimate: int = 1
+) -> Iterator[Dict[str, Any]]:
+    """
+    CONTRACTION HIERARCHIES (consulta sobre grafo preprocesado)
+    
+    Búsqueda bidireccional que solo asciende en la jerarquía de nodos; los atajos
+    de la ruta se desempaquetan en aristas reales. Emite los mismos tipos de evento
+    que Dijkstra/A*; los 'visited' corresponden a aristas reales relajadas e indican
+    la dirección de la búsqueda ('forward' desde el origen, 'backward' desde el destino).
+    """
+    t0 = time.time()
+    csr = get_csr(G)
+    et = csr.edge_table()
+    o, t = csr.index[orig], csr.index[dest]
+    
+    yield {'type': 'status', 'msg': 'started', 'algorithm': 'ch', 'orig': orig, 'dest': dest}
+    
+    cost, path_edges, nodes_explored, relaxed = ch_query(ch, o, t)
+    elapsed = time.time() - t0
+    
+    for i, (direction, u, v, e) in enumerate(relaxed):
+        if i % decimate == 0:
+            yield {
+                'type': 'visited', 'edge_id': et.edge_id_l[e],
+                'u': et.u_l[e], 'v': et.v_l[e], 'k': csr.keys_l[e], 'weight': csr.w_l[e], 'direction': direction,
+                'coords': et.coords_l[e]
+            }
+    
+    if path_edges or o == t:
+        yield {'type': 'status', 'msg': 'reached_dest', 'node': dest}
+    yield from _path_events(csr, o, path_edges)
     
+    total_km = sum(csr.len_l[e] for e in path_edges) / 1000.0
     yield {'type': 'done', 'nodes_explored': nodes_explored, 'time_s': elapsed, 'distance_km': total_km}
 
 
+def alternatives_stream(
+    G: nx.MultiDiGraph,
+    orig: int,
+    dest: int,
+    routes: int = 3,
+    decimate: int = 1
+) -> Iterator[Dict[str, Any]]:
+    """
+    RUTAS ALTERNATIVAS (método de plateaus, ver alternatives.py)
+    
+    Un árbol de caminos mínimos hacia el destino y otro desde el origen, calculados
+    una sola vez, dan hasta `routes` rutas: la óptima y alternativas de costo
+    cercano que no se superponen demasiado. Los 'visited' indican la dirección
+    ('backward' el árbol hacia el destino, 'forward' el del origen); los 'path'
+    llevan 'route_index' (0 = la óptima) y 'done' agrega el resumen de cada ruta.
+    """
+    t0 = time.time()
+    csr = get_csr(G)
+    et = csr.edge_table()
+    o, t = csr.index[orig], csr.index[dest]
+    
+    yield {'type': 'status', 'msg': 'started', 'algorithm': 'alternatives', 'orig': orig, 'dest': dest}
+    
+    found, nodes_explored, relaxed = alternative_routes(csr, o, t, k=routes)
+    elapsed = time.time() - t0
+    
+    for i, (direction, e) in enumerate(relaxed):
+        if i % decimate == 0:
+            yield {
+                'type': 'visited', 'edge_id': et.edge_id_l[e],
+                'u': et.u_l[e], 'v': et.v_l[e], 'k': csr.keys_l[e], 'weight': csr.w_l[e], 'direction': direction,
+                'coords': et.coords_l[e]
+            }
+    
+    if found:
+        yield {'type': 'status', 'msg': 'reached_dest', 'node': dest}
+    summary = []
+    for index, route in enumerate(found):
+        yield from _path_events(csr, o, route.edges, route_index=index)
+        summary.append({'route_index': index, 'cost_s': route.cost,
+                        'distance_km': sum(csr.len_l[e] for e in route.edges) / 1000.0})
+    
+    done = _done_event(nodes_explored, elapsed, summary[0]['distance_km'] if summary else 0.0)
+    done['routes'] = summary
+    yield done
+
+
+def nearest_source_stream(
+    G: nx.MultiDiGraph,
+    sources: List[int],
+    dest: int,
+    k: int = 1,
+    decimate: int = 1
+) -> Iterator[Dict[str, Any]]:
+    """
+    FUENTE MÁS CERCANA (muchos-a-uno, ver facilities.py)
+    
+    Una sola búsqueda Dijkstra desde el destino sobre el grafo inverso asienta los
+    candidatos en orden de costo hasta el destino y se detiene al asentar k. Los
+    'visited' son 'backward'; los 'path' son la ruta del ganador (desde su nodo) y
+    'done' agrega 'source' (el ganador) y 'sources' (los k mejores con costo y distancia).
+    """
+    t0 = time.time()
+    csr = get_csr(G)
+    et = csr.edge_table()
+    t = csr.index[dest]
+    
+    yield {'type': 'status', 'msg': 'started', 'algorithm': 'nearest', 'orig': None, 'dest': dest,
+           'sources': sources}
+    
+    relaxed: List[int] = []
+    found, nodes_explored = nearest_sources(csr, [csr.index[s] for s in sources], t, k=k, relaxed=relaxed)
+    elapsed = time.time() - t0
+    
+    for i, e in enumerate(relaxed):
+        if i % decimate == 0:
+            yield {
+                'type': 'visited', 'edge_id': et.edge_id_l[e],
+                'u': et.u_l[e], 'v': et.v_l[e], 'k': csr.keys_l[e], 'weight': csr.w_l[e], 'direction': 'backward',
+                'coords': et.coords_l[e]
+            }
+    
+    if not found:
+        yield _done_event(nodes_explored, elapsed, 0.0)
+        return
+    best = found[0]
+    yield {'type': 'status', 'msg': 'reached_dest', 'node': dest}
+    yield from _path_events(csr, best.source, best.edges)
+    
+    summary = [{'source': csr.ids_l[r.source], 'cost_s': r.cost,
+                'distance_km': sum(csr.len_l[e] for e in r.edges) / 1000.0} for r in found]
+    done = _done_event(nodes_explored, elapsed, summary[0]['distance_km'])
+    done['source'] = summary[0]['source']
+    done['sources'] = summary
+    yield done
+
+
+def build_search(spec: Dict[str, Any]) -> Iterator[Any]:
+    """
+    Eventos de una consulta de /ws/run; se ejecuta en un worker de búsqueda (ver
+    streaming.py), que hereda GRAPH, CH, LANDMARKS y TRAFFIC del servidor y las
+    regiones ya cargadas.
+    
+    spec: alg, orig, dest, decimate y, opcionales, region, result_only (solo inicio, ruta
+    y 'done'), protocol / batch_size / batch_ms (agrupar los 'visited'),
+    departure (segundos desde medianoche, pesos según TRAFFIC), routes (cantidad
+    de rutas con alg='alternatives'), sources y k (candidatos y cantidad de
+    mejores con alg='nearest', que no usa orig), profile (perfil cProfile en 'done', ver
+    metrics.py) y request_id (sesiones persistentes). Devuelve frames ya
+    serializados (ver ws_protocol.encode_frames).
+    """
+    alg, orig, dest, decimate = spec['alg'], spec['orig'], spec['dest'], spec.get('decimate', 1)
+    departure = spec.get('departure')
+    state = get_region(spec.get('region'))
+    G, traffic = state.graph, state.traffic
+    if alg == 'dijkstra':
+        gen = dijkstra_stream(G, orig, dest, decimate=decimate, departure=departure, traffic=traffic)
+    elif alg == 'astar':
+        gen = astar_stream(G, orig, dest, decimate=decimate, departure=departure, traffic=traffic)
+    elif alg == 'alt':
+        gen = astar_stream(G, orig, dest, decimate=decimate, landmarks=state.landmarks)
+    elif alg in ('bidijkstra', 'biastar'):
+        gen = bidirectional_stream(G, orig, dest, decimate=decimate, heuristic=alg == 'biastar')
+    elif alg == 'alternatives':
+        gen = alternatives_stream(G, orig, dest, routes=spec.get('routes', 3), decimate=decimate)
+    elif alg == 'nearest':
+        gen = nearest_source_stream(G, spec['sources'], dest, k=spec.get('k', 1), decimate=decimate)
+    else:
+        gen = ch_stream(G, state.ch, orig, dest, decimate=decimate)
+    
+    if spec.get('profile'):
+        gen = profile_search(gen)
+    if spec.get('result_only'):
+        gen = (e for e in gen if e['type'] not in ('visited', 'progress'))
+    gen = count_events(gen)
+    if not spec.get('result_only') and spec.get('protocol', 'events') != 'events':
+        gen = batch_events(gen, spec.get('batch_size', DEFAULT_BATCH_SIZE), spec.get('batch_ms', DEFAULT_BATCH_MS))
+    return encode_frames(gen, spec.get('protocol', 'events'), spec.get('request_id'))
+
+
 # =============================================================================
 # APLICACIÓN FASTAPI
 # =============================================================================
@@ -373,22 +895,91 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-GRAPH: Optional[nx.MultiDiGraph] = None
+GRAPH: Optional[Union[nx.MultiDiGraph, CSRGraph]] = None  # CSRGraph en el servidor; los tests pueden usar networkx
+CH: Optional[ContractionHierarchy] = None  # Solo si hay CH en caché o CH_PREPROCESS=1
+LANDMARKS: Optional[LandmarkTables] = None
+TRAFFIC: Optional[TrafficProfiles] = None  # Solo si hay perfiles en TRAFFIC_FILE (python -m app.traffic)
+ROUTE_CACHE = cache_from_env()
+CACHE_HIT_RATIO.labels('route').set_function(lambda: ROUTE_CACHE.stats()['hit_ratio'])
+
+
+def graph_version(G: Optional[Union[nx.MultiDiGraph, CSRGraph]] = None) -> str:
+    """
+    Versión del grafo G (por defecto GRAPH): cambia si cambian la topología o los
+    pesos (también por parches). Grafos de regiones distintas tienen versiones distintas.
+    """
+    revision = get_csr(GRAPH if G is None else G).revision
+    return network_version(G) if revision is None else f"{network_version(G)}-{revision}"
+
+
+def network_version(G: Optional[Union[nx.MultiDiGraph, CSRGraph]] = None) -> str:
+    """Versión del grafo original (sin parches de pesos), para lo que solo depende de la geometría."""
+    fingerprint = get_csr(GRAPH if G is None else G).base.fingerprint()
+    return f"{GRAPH_CACHE_VERSION}-{fingerprint[:8]}"
+
+
+def _region_evicted(state: RegionState) -> None:
+    """Libera los workers de búsqueda, el pool de matrices y las teselas de una región desalojada del registro."""
+    shutdown_search_pool(state.region.name)
+    shutdown_pool(state.region.name, wait=False)
+    _TILE_INDEXES.pop(state.region.name, None)
+
+
+REGISTRY = GraphRegistry({name: r for name, r in REGIONS.items() if name != DEFAULT_REGION},
+                         load_region, REGION_MEMORY_MB * 2 ** 20, on_evict=_region_evicted)
+
+
+def get_region(name: Optional[str] = None) -> Optional[RegionState]:
+    """
+    Estado de la región name, cargándola si hace falta (ver regions.py). La región
+    por defecto (name None o DEFAULT_REGION) es la de GRAPH, CH, LANDMARKS y
+    TRAFFIC, o None si todavía no se cargó. KeyError si la región no existe.
+    """
+    if name is None or name == DEFAULT_REGION:
+        return RegionState(REGIONS[DEFAULT_REGION], GRAPH, CH, LANDMARKS, TRAFFIC) if GRAPH is not None else None
+    return REGISTRY.get(name)
+
+
+async def require_region(name: Optional[str]) -> RegionState:
+    """get_region para los endpoints: 404 si la región no existe, 503 si no se pudo cargar."""
+    if name is not None and name not in REGIONS:
+        raise HTTPException(status_code=404, detail=f"Región desconocida: {name}")
+    if name is None or name == DEFAULT_REGION:
+        state = get_region()
+    else:
+        # Una región fría se carga fuera del event loop (lee o descarga el grafo)
+        state = REGISTRY.peek(name)
+        if state is None:
+            try:
+                state = await run_in_threadpool(REGISTRY.get, name)
+            except Exception as e:
+                logger.error(f"No se pudo cargar la región {name}: {e}")
+                raise HTTPException(status_code=503, detail=f"No se pudo cargar la región {name}")
+    if state is None:
+        raise HTTPException(status_code=503, detail="Grafo no cargado")
+    return state
 
 
 @app.on_event("startup")
 async def startup_event():
     """Inicializa el grafo al arrancar la aplicación"""
-    global GRAPH
+    global GRAPH, CH, LANDMARKS, TRAFFIC
     try:
-        logger.info("Cargando grafo...")
-        GRAPH = load_or_download_graph()
-        logger.info(f"Grafo cargado: {len(GRAPH.nodes)} nodos, {len(GRAPH.edges)} aristas")
+        # Solo la región por defecto: las demás se cargan en su primera consulta
+        state = load_region(REGIONS[DEFAULT_REGION], build_ch=os.environ.get('CH_PREPROCESS') == '1')
+        GRAPH, CH, LANDMARKS, TRAFFIC = state.graph, state.ch, state.landmarks, state.traffic
     except Exception as e:
         logger.error(f"Error al cargar el grafo: {e}")
         raise
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Libera los pools de procesos de las matrices origen-destino y de las búsquedas"""
+    shutdown_pool()
+    shutdown_search_pool()
+
+
 @app.get('/')
 async def root():
     """Endpoint raíz"""
@@ -398,51 +989,707 @@ async def root():
         "endpoints": {
             "graph_meta": "/api/graph-meta",
             "edges_sample": "/api/edges-sample?decimate=10",
+            "tiles": "/api/tiles/{z}/{x}/{y}",
             "find_nearest": "/api/find-nearest?lat=-27.47&lon=-58.83",
+            "find_nearest_batch": "POST /api/find-nearest",
+            "route": "/api/route?orig=ID&dest=ID&alg=astar",
+            "ch_route": "/api/ch/route?orig=ID&dest=ID",
+            "matrix": "POST /api/matrix?format=json|npy",
+            "admin_patches": "POST /api/admin/patches (X-Admin-Token)",
+            "isochrone": "/api/isochrone?orig=ID&minutes=10",
+            "regions": "/api/regions",
+            "metrics": "/api/metrics",
+            "prometheus": "/metrics",
             "websocket": "/ws/run"
         }
     }
 
 
 @app.get('/api/graph-meta')
-async def graph_meta():
-    """Retorna metadatos del grafo cargado."""
-    if GRAPH is None:
-        raise HTTPException(status_code=503, detail="Grafo no cargado")
-    
-    lats = [n['y'] for _, n in GRAPH.nodes(data=True)]
-    lons = [n['x'] for _, n in GRAPH.nodes(data=True)]
+async def graph_meta(region: Optional[str] = Query(None)):
+    """Retorna metadatos del grafo cargado (de la región por defecto o de region)."""
+    state = await require_region(region)
+    csr = get_csr(state.graph)
     
     return JSONResponse(content={
-        'place': PLACE,
-        'radius_m': RADIUS,
-        'nodes_total': len(GRAPH.nodes),
-        'edges_total': len(GRAPH.edges),
-        'bbox': [min(lats), min(lons), max(lats), max(lons)],
-        'graph_cache_version': 'v1'
+        'region': state.region.name,
+        'place': state.region.place,
+        'radius_m': state.region.radius_m,
+        'nodes_total': csr.n_nodes,
+        'edges_total': csr.n_edges,
+        'bbox': [float(csr.lat.min()), float(csr.lon.min()), float(csr.lat.max()), float(csr.lon.max())],
+        'graph_cache_version': graph_version(state.graph)
     })
 
 
+@app.get('/api/regions')
+async def regions():
+    """Regiones configuradas (la primera es la por defecto) y cuáles están cargadas en memoria."""
+    stats = REGISTRY.stats()
+    loaded = {r['name'] for r in stats['loaded']} | ({DEFAULT_REGION} if GRAPH is not None else set())
+    return JSONResponse(content={
+        'default': DEFAULT_REGION,
+        'regions': [{**r.to_dict(), 'loaded': name in loaded} for name, r in REGIONS.items()],
+        'registry': stats,
+    })
+
+
+@app.get('/api/metrics')
+async def metrics():
+    """Contadores de la caché de rutas (aciertos, fallos, desalojos), de la de isócronas y del registro de regiones."""
+    return JSONResponse(content={'route_cache': ROUTE_CACHE.stats(), 'isochrone_cache': isochrone_cache_stats(),
+                                 'regions': REGISTRY.stats()})
+
+
+@app.get('/metrics')
+async def prometheus_metrics():
+    """Métricas en formato Prometheus (ver metrics.py)."""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
+EDGE_SAMPLE_CACHE_SIZE = 8
+_EDGE_SAMPLE_CACHE: Dict[Tuple[str, int], bytes] = {}
+
+
 @app.get('/api/edges-sample')
-async def edges_sample(decimate: int = Query(10, ge=1, le=1000)):
-    """Retorna una muestra de aristas del grafo para visualización inicial."""
-    if GRAPH is None:
-        raise HTTPException(status_code=503, detail="Grafo no cargado")
-    return JSONResponse(content={'edges': get_edge_sample(GRAPH, decimate=decimate)})
+async def edges_sample(decimate: int = Query(10, ge=1, le=1000), region: Optional[str] = Query(None)):
+    """
+    Retorna una muestra de aristas del grafo para visualización inicial. La
+    respuesta ya serializada se guarda por (versión del grafo, decimate).
+    """
+    state = await require_region(region)
+    key = (network_version(state.graph), decimate)
+    body = _EDGE_SAMPLE_CACHE.get(key)
+    if body is None:
+        body = json.dumps({'edges': get_edge_sample(state.graph, decimate=decimate)}).encode()
+        if len(_EDGE_SAMPLE_CACHE) >= EDGE_SAMPLE_CACHE_SIZE:
+            _EDGE_SAMPLE_CACHE.pop(next(iter(_EDGE_SAMPLE_CACHE)))
+        _EDGE_SAMPLE_CACHE[key] = body
+    return Response(content=body, media_type='application/json')
+
+
+_TILE_INDEXES: Dict[str, TileIndex] = {}  # Por región
+
+
+def get_tile_index(state: RegionState) -> TileIndex:
+    """
+    Generador de teselas del grafo de una región; se recrea si cambia la versión
+    del grafo (los parches de pesos no cambian las teselas).
+    """
+    name = state.region.name
+    version = network_version(state.graph)
+    index = _TILE_INDEXES.get(name)
+    if index is None or index.version != version:
+        cache_dir = TILE_CACHE_DIR if name == DEFAULT_REGION else state.region.tile_cache_dir
+        index = _TILE_INDEXES[name] = TileIndex(get_csr(state.graph), version, cache_dir=cache_dir)
+    return index
+
+
+@app.get('/api/tiles/{z}/{x}/{y}')
+async def road_tile(z: int, x: int, y: int, if_none_match: Optional[str] = Header(None),
+                    region: Optional[str] = Query(None)):
+    """
+    Tesela binaria z/x/y con todas las aristas de la red vial (formato en tiles.py).
+    Responde 304 si el cliente ya tiene la misma versión (If-None-Match).
+    """
+    if not MIN_TILE_ZOOM <= z <= MAX_TILE_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=404, detail="Tesela fuera de rango")
+    
+    index = get_tile_index(await require_region(region))
+    etag = index.etag(z, x, y)
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if if_none_match is not None and etag in [t.strip() for t in if_none_match.split(',')]:
+        return Response(status_code=304, headers=headers)
+    data = await run_in_threadpool(index.tile, z, x, y)
+    return Response(content=data, media_type='application/octet-stream', headers=headers)
 
 
 @app.get('/api/find-nearest')
-async def find_nearest(lat: float = Query(...), lon: float = Query(...)):
-    """Encuentra el nodo más cercano a las coordenadas dadas."""
-    if GRAPH is None:
-        raise HTTPException(status_code=503, detail="Grafo no cargado")
+async def find_nearest(
+    lat: float = Query(...), 
+    lon: float = Query(...), 
+    k: int = Query(1, ge=1, le=100),
+    region: Optional[str] = Query(None)
+):
+    """Encuentra el nodo más cercano a las coordenadas dadas (y opcionalmente los k más cercanos)."""
+    state = await require_region(region)
     
-    nearest = find_nearest_node(GRAPH, lat, lon)
-    if nearest is None:
+    candidates = find_k_nearest_nodes(state.graph, [(lat, lon)], k=k)[0]
+    if not candidates:
         raise HTTPException(status_code=404, detail="No se encontró ningún nodo")
     
-    node_data = GRAPH.nodes[nearest]
-    return JSONResponse(content={'node_id': nearest, 'lat': node_data['y'], 'lon': node_data['x']})
+    nearest = candidates[0]
+    content = {'node_id': nearest['node_id'], 'lat': nearest['lat'], 'lon': nearest['lon']}
+    if k > 1:
+        content['candidates'] = candidates
+    return JSONResponse(content=content)
+
+
+class NearestBatchRequest(BaseModel):
+    """Cuerpo de /api/find-nearest (POST): lista de puntos [lat, lon]."""
+    points: List[Tuple[float, float]] = Field(..., max_length=10000)
+    k: int = Field(1, ge=1, le=100)
+
+
+@app.post('/api/find-nearest')
+async def find_nearest_batch(req: NearestBatchRequest, region: Optional[str] = Query(None)):
+    """Encuentra los nodos más cercanos para muchos puntos en una sola llamada."""
+    state = await require_region(region)
+    
+    return JSONResponse(content={'results': find_k_nearest_nodes(state.graph, req.points, k=req.k)})
+
+
+class MatrixRequest(BaseModel):
+    """
+    Cuerpo de /api/matrix: cada punto es un id de nodo o un par [lat, lon], que se
+    ajusta al nodo más cercano. Si no se indican targets se usan los sources.
+    """
+    sources: List[Union[int, Tuple[float, float]]] = Field(..., min_length=1, max_length=1000)
+    targets: Optional[List[Union[int, Tuple[float, float]]]] = Field(None, min_length=1, max_length=1000)
+
+
+def _resolve_points(csr: CSRGraph, points: List[Union[int, Tuple[float, float]]]) -> List[int]:
+    """Convierte ids de nodo o coordenadas en ids densos del grafo CSR."""
+    index = get_spatial_index(csr)
+    out = []
+    for p in points:
+        if isinstance(p, int):
+            if p not in csr:
+                raise HTTPException(status_code=404, detail=f"Nodo {p} no está en el grafo")
+            out.append(csr.index[p])
+        else:
+            out.append(index.nearest(p[0], p[1]))
+    return out
+
+
+def _is_node_or_point(p: Any) -> bool:
+    """Si p es un id de nodo (entero) o un par [lat, lon] de números."""
+    if isinstance(p, bool):
+        return False
+    if isinstance(p, int):
+        return True
+    return isinstance(p, list) and len(p) == 2 and all(
+        isinstance(c, (int, float)) and not isinstance(c, bool) for c in p)
+
+
+@app.post('/api/matrix')
+async def travel_matrix(
+    req: MatrixRequest,
+    format: str = Query('json', pattern='^(json|npy)$'),
+    region: Optional[str] = Query(None)
+):
+    """
+    Matriz de tiempos de viaje (segundos) entre todos los sources y targets.
+    
+    format=json: {"sources": [...], "targets": [...], "durations_s": [[...]]} (null = sin ruta)
+    format=npy: arreglo float64 de NumPy (inf = sin ruta); los ids van en los
+    headers X-Sources / X-Targets
+    """
+    state = await require_region(region)
+    csr = get_csr(state.graph)
+    sources = _resolve_points(csr, req.sources)
+    targets = _resolve_points(csr, req.targets) if req.targets is not None else sources
+    matrix = await run_in_threadpool(travel_time_matrix, csr, sources, targets, pool_key=state.region.name)
+    
+    source_ids = [csr.ids_l[i] for i in sources]
+    target_ids = [csr.ids_l[i] for i in targets]
+    if format == 'npy':
+        buf = io.BytesIO()
+        np.save(buf, matrix)
+        return Response(content=buf.getvalue(), media_type='application/octet-stream', headers={
+            'X-Sources': ','.join(map(str, source_ids)),
+            'X-Targets': ','.join(map(str, target_ids)),
+        })
+    return JSONResponse(content={
+        'sources': source_ids,
+        'targets': target_ids,
+        'durations_s': [[v if v != math.inf else None for v in row] for row in matrix.tolist()],
+    })
+
+
+def _ch_unavailable(state: RegionState) -> str:
+    """Motivo por el que la región no tiene CH (ver _rebuild_ch)."""
+    if state.region.name in _CH_REBUILDS:
+        return "Contraction Hierarchies en reconstrucción tras un parche"
+    return "Contraction Hierarchies no disponibles"
+
+
+@app.get('/api/ch/route')
+async def ch_route(orig: int = Query(...), dest: int = Query(...), region: Optional[str] = Query(None)):
+    """Calcula la ruta óptima entre dos nodos usando Contraction Hierarchies (sin streaming)."""
+    state = await require_region(region)
+    if state.ch is None:
+        raise HTTPException(status_code=503, detail=_ch_unavailable(state))
+    
+    csr = get_csr(state.graph)
+    if orig not in csr or dest not in csr:
+        raise HTTPException(status_code=404, detail="orig o dest no están en el grafo")
+    
+    t0 = time.time()
+    cost, path_edges, nodes_explored, _ = ch_query(state.ch, csr.index[orig], csr.index[dest], collect=False)
+    elapsed = time.time() - t0
+    if cost == math.inf:
+        raise HTTPException(status_code=404, detail="No existe ruta entre orig y dest")
+    
+    edges = list(_path_events(csr, csr.index[orig], path_edges))
+    return JSONResponse(content={
+        'orig': orig,
+        'dest': dest,
+        'travel_time_s': cost,
+        'distance_km': sum(csr.len_l[e] for e in path_edges) / 1000.0,
+        'nodes_explored': nodes_explored,
+        'time_s': elapsed,
+        'edges': [{'edge_id': e['edge_id'], 'coords': e['coords']} for e in edges],
+    })
+
+
+@app.get('/api/route')
+async def route(
+    orig: Optional[int] = Query(None),
+    dest: Optional[int] = Query(None),
+    orig_lat: Optional[float] = Query(None),
+    orig_lon: Optional[float] = Query(None),
+    dest_lat: Optional[float] = Query(None),
+    dest_lon: Optional[float] = Query(None),
+    alg: str = Query('astar', pattern='^(dijkstra|astar)$'),
+    region: Optional[str] = Query(None)
+):
+    """
+    Ruta óptima sin streaming ni eventos de exploración (ver routing.py): la ruta
+    como polyline codificada (precisión 5) con distance_m y duration_s. Cada
+    extremo es un id de nodo (orig / dest) o el nodo más cercano a lat/lon.
+    """
+    csr = get_csr((await require_region(region)).graph)
+    
+    def resolve(node: Optional[int], lat: Optional[float], lon: Optional[float], name: str) -> int:
+        if node is not None:
+            if node not in csr:
+                raise HTTPException(status_code=404, detail=f"Nodo {node} no está en el grafo")
+            return csr.index[node]
+        if lat is None or lon is None:
+            raise HTTPException(status_code=400, detail=f"Se espera {name} o {name}_lat y {name}_lon")
+        return get_spatial_index(csr).nearest(lat, lon)
+    
+    o, t = resolve(orig, orig_lat, orig_lon, 'orig'), resolve(dest, dest_lat, dest_lon, 'dest')
+    result = await run_in_threadpool(compute_route, csr, o, t, alg)
+    if result is None:
+        raise HTTPException(status_code=404, detail="No existe ruta entre orig y dest")
+    ROUTE_REQUESTS.labels(alg, 'rest').inc()
+    return JSONResponse(content=result)
+
+
+class NearestSourceRequest(BaseModel):
+    """
+    Cuerpo de /api/nearest-source: candidatos y destino como ids de nodo o pares
+    [lat, lon] (se ajustan al nodo más cercano); k es la cantidad de mejores candidatos.
+    """
+    sources: List[Union[int, Tuple[float, float]]] = Field(..., min_length=1, max_length=MAX_SOURCES)
+    dest: Union[int, Tuple[float, float]]
+    k: int = Field(1, ge=1, le=MAX_SOURCES)
+
+
+@app.post('/api/nearest-source')
+async def nearest_source(req: NearestSourceRequest, region: Optional[str] = Query(None)):
+    """
+    Candidato que llega antes a dest, en una sola búsqueda (ver facilities.py): su
+    ruta como polyline codificada con distance_m y duration_s, y en sources los k
+    mejores candidatos en orden de duración.
+    """
+    csr = get_csr((await require_region(region)).graph)
+    sources = _resolve_points(csr, req.sources)
+    dest = _resolve_points(csr, [req.dest])[0]
+    result = await run_in_threadpool(compute_nearest_source, csr, sources, dest, req.k)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Ningún candidato tiene ruta hasta dest")
+    ROUTE_REQUESTS.labels('nearest', 'rest').inc()
+    return JSONResponse(content=result)
+
+
+ISOCHRONE_CACHE_SIZE = 64
+MAX_ISOCHRONE_MINUTES = 180
+# LRU por (versión del grafo, nodo, presupuestos, celda, aristas); las aristas se guardan compactas
+_ISOCHRONE_CACHE: 'OrderedDict[Tuple[Any, ...], Dict[str, Any]]' = OrderedDict()
+_ISOCHRONE_STATS = {'hits': 0, 'misses': 0}
+
+
+def isochrone_cache_stats() -> Dict[str, Any]:
+    """Tamaño, aciertos y fallos de la caché de isócronas."""
+    lookups = _ISOCHRONE_STATS['hits'] + _ISOCHRONE_STATS['misses']
+    return {'size': len(_ISOCHRONE_CACHE), 'maxsize': ISOCHRONE_CACHE_SIZE, **_ISOCHRONE_STATS,
+            'hit_ratio': _ISOCHRONE_STATS['hits'] / lookups if lookups else 0.0}
+
+
+CACHE_HIT_RATIO.labels('isochrone').set_function(lambda: isochrone_cache_stats()['hit_ratio'])
+
+
+@app.get('/api/isochrone')
+async def isochrone(
+    minutes: List[float] = Query(...),
+    orig: Optional[int] = Query(None),
+    lat: Optional[float] = Query(None),
+    lon: Optional[float] = Query(None),
+    cell_m: float = Query(DEFAULT_CELL_M, ge=20, le=1000),
+    edges: bool = Query(True),
+    region: Optional[str] = Query(None)
+):
+    """
+    Isócronas: lo alcanzable desde orig (o el nodo más cercano a lat/lon) en cada
+    uno de los presupuestos minutes (se repite el parámetro: minutes=5&minutes=10),
+    con una sola búsqueda (ver isochrones.py). Responde un FeatureCollection
+    GeoJSON con un MultiPolygon por presupuesto y, con edges=true, las aristas
+    alcanzadas. Los resultados se guardan por (versión del grafo, nodo, presupuestos).
+    """
+    if not 1 <= len(minutes) <= MAX_BUDGETS or not all(0 < m <= MAX_ISOCHRONE_MINUTES for m in minutes):
+        raise HTTPException(status_code=400, detail=(
+            f"Se esperan entre 1 y {MAX_BUDGETS} presupuestos entre 0 y {MAX_ISOCHRONE_MINUTES} minutos"))
+    
+    state = await require_region(region)
+    csr = get_csr(state.graph)
+    if orig is not None:
+        if orig not in csr:
+            raise HTTPException(status_code=404, detail=f"Nodo {orig} no está en el grafo")
+        source = csr.index[orig]
+    elif lat is not None and lon is not None:
+        source = get_spatial_index(csr).nearest(lat, lon)
+    else:
+        raise HTTPException(status_code=400, detail="Se espera orig o lat y lon")
+    
+    budgets = tuple(m * 60.0 for m in minutes)
+    key = (graph_version(state.graph), source, budgets, cell_m, edges)
+    result = _ISOCHRONE_CACHE.get(key)
+    cached = result is not None
+    _ISOCHRONE_STATS['hits' if cached else 'misses'] += 1
+    if cached:
+        _ISOCHRONE_CACHE.move_to_end(key)
+    else:
+        t0 = time.time()
+        result = await run_in_threadpool(compute_isochrones, csr, source, budgets, cell_m, edges, True)
+        result['time_s'] = time.time() - t0
+        _ISOCHRONE_CACHE[key] = result
+        while len(_ISOCHRONE_CACHE) > ISOCHRONE_CACHE_SIZE:
+            _ISOCHRONE_CACHE.popitem(last=False)
+    content = {'orig': csr.ids_l[source], 'budgets_s': list(budgets), **result, 'cached': cached}
+    if edges:
+        content['edges'] = edge_features(csr, result['edges'])
+    return JSONResponse(content=content)
+
+
+# =============================================================================
+# ADMINISTRACIÓN: PARCHES DE PESOS EN VIVO (ver patches.py)
+# =============================================================================
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')  # Sin token la API de administración queda deshabilitada
+_PATCH_LOCK = asyncio.Lock()
+_CH_REBUILDS: Dict[str, CSRGraph] = {}  # Región -> grafo cuya CH se reconstruye en segundo plano
+
+
+class EdgePatch(BaseModel):
+    """Parche de una arista u->v (todas las paralelas si no se indica key); ver patches.py."""
+    u: int
+    v: int
+    key: Optional[int] = None
+    weight: Optional[float] = Field(None, gt=0)
+    speed_kph: Optional[float] = Field(None, gt=0)
+    closed: bool = False
+    reset: bool = False
+
+
+class PatchRequest(BaseModel):
+    """Cuerpo de /api/admin/patches: parches aplicados juntos y en forma atómica."""
+    edges: List[EdgePatch] = Field(..., min_length=1, max_length=100000)
+
+
+def _require_admin(token: Optional[str]) -> None:
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="API de administración deshabilitada (definir ADMIN_TOKEN)")
+    if token is None or not hmac.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Token de administración inválido")
+
+
+async def _rebuild_ch(name: str, csr: CSRGraph) -> None:
+    """
+    Contrae de nuevo el grafo csr de la región name tras un parche demasiado grande
+    para actualizar la CH (ver patches.py). Se construye fuera de _PATCH_LOCK y se
+    instala solo si la región sigue con ese grafo: si otro parche lo cambió, ese
+    parche ya programó su propia reconstrucción.
+    """
+    global CH
+    try:
+        ch = await run_in_threadpool(ContractionHierarchy.build, csr)
+        async with _PATCH_LOCK:
+            state = get_region() if name == DEFAULT_REGION else REGISTRY.peek(name)
+            if state is None or get_csr(state.graph) is not csr:
+                logger.info(f"CH reconstruida de {name} descartada: el grafo cambió mientras tanto")
+                return
+            if name == DEFAULT_REGION:
+                CH = ch
+            else:
+                REGISTRY.replace(name, RegionState(state.region, state.graph, ch, state.landmarks, state.traffic))
+            logger.info(f"CH de {name} reconstruida tras el parche: {ch.n_shortcuts} atajos")
+    except Exception as e:
+        logger.error(f"No se pudo reconstruir la CH de {name}: {e}")
+    finally:
+        if _CH_REBUILDS.get(name) is csr:
+            del _CH_REBUILDS[name]
+
+
+@app.post('/api/admin/patches')
+async def patch_edges(
+    req: PatchRequest,
+    background: BackgroundTasks,
+    x_admin_token: Optional[str] = Header(None),
+    region: Optional[str] = Query(None)
+):
+    """
+    Aplica parches de pesos (cortes, obras, anegamientos) al grafo en vivo de la
+    región. El grafo, la CH, los landmarks y los perfiles de tráfico se actualizan
+    en forma incremental fuera del event loop y se reemplazan juntos; la versión del
+    grafo cambia, lo que invalida la caché de rutas y recrea los workers de búsqueda.
+    Si la CH no se pudo actualizar se reconstruye en segundo plano ('pending' la
+    incluye hasta que esté lista). Los parches de una región cargada a demanda se
+    pierden si se la desaloja.
+    """
+    global GRAPH, CH, LANDMARKS, TRAFFIC
+    _require_admin(x_admin_token)
+    
+    async with _PATCH_LOCK:
+        state = await require_region(region)
+        csr = get_csr(state.graph)
+        try:
+            changes = resolve_patches(csr, [p.model_dump() for p in req.edges])
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        update = await run_in_threadpool(apply_patches, csr, changes, ch=state.ch, landmarks=state.landmarks,
+                                         traffic=state.traffic)
+        # Sin await entre las asignaciones: ninguna consulta ve una mezcla de versiones
+        if state.region.name == DEFAULT_REGION:
+            GRAPH, CH, LANDMARKS, TRAFFIC = update.csr, update.ch, update.landmarks, update.traffic
+        else:
+            REGISTRY.replace(state.region.name,
+                             RegionState(state.region, update.csr, update.ch, update.landmarks, update.traffic))
+        # También si la CH del grafo anterior seguía en reconstrucción: esa se descarta
+        name = state.region.name
+        if 'ch' in update.pending or (update.changed and name in _CH_REBUILDS):
+            _CH_REBUILDS[name] = update.csr
+            background.add_task(_rebuild_ch, name, update.csr)
+        pending = ['ch'] if name in _CH_REBUILDS else []
+    
+    return JSONResponse(content={
+        'graph_cache_version': graph_version(update.csr),
+        'edges_changed': len(update.changed),
+        'edges_patched': len(active_patches(update.csr)),
+        'timings_ms': {k: v * 1000 for k, v in update.timings.items()},
+        'pending': pending,
+    })
+
+
+@app.get('/api/admin/patches')
+async def list_patches(x_admin_token: Optional[str] = Header(None), region: Optional[str] = Query(None)):
+    """Aristas con parche activo (peso actual, None si está cortada, y peso original)."""
+    _require_admin(x_admin_token)
+    state = await require_region(region)
+    return JSONResponse(content={'graph_cache_version': graph_version(state.graph),
+                                 'patches': active_patches(get_csr(state.graph))})
+
+
+MAX_SESSION_REQUESTS = 4  # Consultas en curso a la vez en una sesión persistente
+
+
+async def run_route_request(ws: WebSocket, params: Dict[str, Any], request_id: Any = None) -> None:
+    """
+    Valida y ejecuta una consulta de /ws/run enviando sus eventos por ws. Con
+    request_id (sesión persistente) cada mensaje lleva {"id": request_id}.
+    Los errores de validación se envían como {"type": "error"} y no se lanzan.
+    """
+    async def send_event(event: Dict[str, Any]) -> None:
+        await ws.send_text(json.dumps(tag_event(event, request_id)))
+
+    alg = params.get('alg', 'dijkstra')
+    orig = params.get('orig')
+    dest = params.get('dest')
+    decimate = params.get('params', {}).get('decimate', 1)
+    speed = params.get('params', {}).get('speed', 1.0)
+    result_only = bool(params.get('params', {}).get('result_only', False))
+    protocol = params.get('params', {}).get('protocol', 'events')
+    batch_size = int(params.get('params', {}).get('batch_size', DEFAULT_BATCH_SIZE))
+    batch_ms = float(params.get('params', {}).get('batch_ms', DEFAULT_BATCH_MS))
+    profile = bool(params.get('params', {}).get('profile', False))
+    region = params.get('region')
+    
+    try:
+        state = await require_region(region)
+    except HTTPException as e:
+        await send_event({'type': 'error', 'msg': e.detail})
+        return
+    csr = get_csr(state.graph)
+    
+    sources = params.get('sources')
+    if alg == 'nearest':
+        if dest is None or not isinstance(sources, list) or not 1 <= len(sources) <= MAX_SOURCES \
+                or not all(_is_node_or_point(s) for s in sources):
+            await send_event({'type': 'error', 'msg': f'dest y sources (lista de 1 a {MAX_SOURCES} nodos o pares [lat, lon]) son requeridos'})
+            return
+        # Los pares [lat, lon] se ajustan al nodo más cercano, como en /api/nearest-source
+        index = get_spatial_index(csr)
+        sources = [s if isinstance(s, int) else csr.ids_l[index.nearest(s[0], s[1])] for s in sources]
+        if dest not in csr or any(s not in csr for s in sources):
+            await send_event({'type': 'error', 'msg': 'dest o algún nodo de sources no están en el grafo'})
+            return
+    else:
+        if orig is None or dest is None:
+            await send_event({'type': 'error', 'msg': 'orig y dest son requeridos'})
+            return
+        
+        if orig not in csr or dest not in csr:
+            await send_event({'type': 'error', 'msg': 'orig o dest no están en el grafo'})
+            return
+    
+    if alg not in ['dijkstra', 'astar', 'alt', 'bidijkstra', 'biastar', 'ch', 'alternatives', 'nearest']:
+        await send_event({'type': 'error', 'msg': f'Algoritmo desconocido: {alg}'})
+        return
+    
+    if protocol not in PROTOCOLS:
+        await send_event({'type': 'error', 'msg': f'Protocolo desconocido: {protocol}'})
+        return
+    
+    if protocol == 'binary' and request_id is not None and not isinstance(request_id, int):
+        await send_event({'type': 'error', 'msg': 'El protocolo binario requiere un id entero'})
+        return
+    
+    if alg == 'ch' and state.ch is None:
+        await send_event({'type': 'error', 'msg': _ch_unavailable(state)})
+        return
+    
+    if alg == 'alt' and state.landmarks is None:
+        await send_event({'type': 'error', 'msg': 'Landmarks ALT no disponibles'})
+        return
+    
+    departure = params.get('params', {}).get('departure')
+    if departure is not None:
+        try:
+            departure = parse_departure(departure)
+        except ValueError as e:
+            await send_event({'type': 'error', 'msg': str(e)})
+            return
+        if alg not in ('dijkstra', 'astar'):
+            await send_event({'type': 'error', 'msg': 'La hora de salida solo se admite con dijkstra y astar'})
+            return
+        if state.traffic is None:
+            await send_event({'type': 'error', 'msg': 'Perfiles de tráfico no disponibles'})
+            return
+    
+    routes = params.get('params', {}).get('routes', 3)
+    if alg == 'alternatives' and (not isinstance(routes, int) or isinstance(routes, bool)
+                                  or not 1 <= routes <= MAX_ALTERNATIVES):
+        await send_event({'type': 'error', 'msg': f'routes debe ser un entero entre 1 y {MAX_ALTERNATIVES}'})
+        return
+    
+    k = params.get('params', {}).get('k', 1)
+    if alg == 'nearest' and (not isinstance(k, int) or isinstance(k, bool) or not 1 <= k <= MAX_SOURCES):
+        await send_event({'type': 'error', 'msg': f'k debe ser un entero entre 1 y {MAX_SOURCES}'})
+        return
+    
+    cache_key = (alg, orig, dest, graph_version(state.graph))
+    if departure is not None:
+        cache_key += (departure,)
+    if alg == 'alternatives':
+        cache_key += (routes,)
+    if alg == 'nearest':
+        cache_key += (tuple(sources), k)
+    if result_only and not profile:
+        cached = ROUTE_CACHE.get(cache_key)
+        if cached is not None:
+            logger.info(f"Ruta {alg} {orig} -> {dest} servida desde la caché")
+            ROUTE_REQUESTS.labels(alg, 'cache').inc()
+            for event in replay_stream(cached):
+                await send_event(event)
+            return
+    
+    origin = orig if alg != 'nearest' else f"{len(sources)} fuentes"
+    logger.info(f"Ejecutando {alg} desde {origin} hasta {dest}")
+    
+    spec = {'alg': alg, 'orig': orig, 'dest': dest, 'decimate': decimate, 'result_only': result_only,
+            'protocol': protocol, 'batch_size': batch_size, 'batch_ms': batch_ms, 'request_id': request_id,
+            'departure': departure, 'routes': routes, 'sources': sources, 'k': k, 'profile': profile,
+            'region': state.region.name}
+    # La búsqueda corre en un worker (ver streaming.py), con un pool por región; aquí solo se envían los eventos
+    items = stream_search(build_search, spec, context=state.context(), pool_key=state.region.name)
+    recorder = RouteRecorder(ROUTE_CACHE, cache_key)
+    if protocol != 'events' and not result_only:
+        await send_event({'type': 'protocol', 'mode': protocol, 'version': BINARY_VERSION,
+                          'batch_size': batch_size, 'batch_ms': batch_ms})
+    # Sin exploración que animar (result_only) no hay pausas; en los modos por
+    # lotes la pausa de run_sync_generator_async se aplica por frame. Si la
+    # consulta se cancela, aclosing termina el worker en el acto
+    bytes_sent, done = 0, None
+    async with contextlib.aclosing(items):
+        async for payload, event in run_sync_generator_async(items, speed=speed if not result_only else math.inf):
+            if isinstance(payload, bytes):
+                await ws.send_bytes(payload)
+            else:
+                await ws.send_text(payload)
+            bytes_sent += len(payload)
+            if event is not None:
+                if event['type'] == 'done':
+                    done = event
+                if not profile:  # Un 'done' con perfil no va a la caché
+                    recorder.observe(event)
+    if done is not None:
+        observe_search(alg, protocol, done, bytes_sent)
+
+
+async def _run_session(ws: WebSocket, first: Dict[str, Any]) -> None:
+    """
+    Sesión persistente: cada mensaje es una consulta con "id" (elegido por el
+    cliente) o {"type": "cancel", "id": ...}. Las consultas corren en paralelo
+    (hasta MAX_SESSION_REQUESTS) y sus eventos se multiplexan por el id.
+    """
+    tasks: Dict[Any, asyncio.Task] = {}
+    
+    async def send_error(msg: str, request_id: Any = None) -> None:
+        await ws.send_text(json.dumps(tag_event({'type': 'error', 'msg': msg}, request_id)))
+    
+    async def run(request_id: Any, params: Dict[str, Any]) -> None:
+        try:
+            await run_route_request(ws, params, request_id)
+        except asyncio.CancelledError:
+            logger.info(f"Consulta {request_id} cancelada")
+            with contextlib.suppress(Exception):
+                await ws.send_text(json.dumps({'type': 'cancelled', 'id': request_id}))
+        except Exception as e:
+            logger.error(f"Error en la consulta {request_id}: {e}", exc_info=True)
+            with contextlib.suppress(Exception):
+                await send_error(str(e), request_id)
+        finally:
+            tasks.pop(request_id, None)
+    
+    message: Optional[Dict[str, Any]] = first
+    try:
+        while True:
+            if message is not None:
+                request_id = message.get('id')
+                if message.get('type') == 'cancel':
+                    task = tasks.get(request_id)
+                    if task is not None:
+                        task.cancel()
+                elif request_id is None or isinstance(request_id, (dict, list)):
+                    await send_error('Cada consulta de la sesión requiere un id')
+                elif request_id in tasks:
+                    await send_error(f'La consulta {request_id} ya está en curso', request_id)
+                elif len(tasks) >= MAX_SESSION_REQUESTS:
+                    await send_error(f'Máximo {MAX_SESSION_REQUESTS} consultas en curso por sesión', request_id)
+                else:
+                    tasks[request_id] = asyncio.create_task(run(request_id, message))
+            
+            raw = await ws.receive_text()
+            try:
+                message = json.loads(raw)
+            except json.JSONDecodeError:
+                await send_error('JSON inválido')
+                message = None
+    finally:
+        # Cliente desconectado: se cancelan (y se terminan sus workers) las consultas pendientes
+        for task in list(tasks.values()):
+            task.cancel()
 
 
 @app.websocket('/ws/run')
@@ -451,10 +1698,38 @@ async def ws_run(ws: WebSocket):
     WebSocket para ejecutar algoritmos de búsqueda en tiempo real.
     
     Protocolo:
-        Cliente envía: {"alg": "dijkstra"|"astar", "orig": node_id, "dest": node_id, "params": {...}}
+        Cliente envía: {"alg": "dijkstra"|"astar"|"alt"|"bidijkstra"|"biastar"|"ch"|"alternatives"|"nearest", "orig": node_id, "dest": node_id, "params": {...}}
         Servidor emite: {"type": "status"|"visited"|"path"|"progress"|"done"|"error", ...}
+    
+    Sin "id" la conexión atiende una sola consulta y se cierra tras 'done'. Si el
+    primer mensaje trae "id" la sesión es persistente: el cliente puede enviar más
+    consultas (cada una con su id, los eventos llevan el id) y cancelar una en curso
+    con {"type": "cancel", "id": ...}, a lo que el servidor responde
+    {"type": "cancelled", "id": ...} y termina la búsqueda.
+    
+    Con params.result_only = true solo se emiten el inicio, la ruta y 'done'; si la
+    ruta ya está en la caché se reproduce al instante (con "cached": true).
+    
+    params.protocol = "events" (por defecto) | "columnar" | "binary" negocia el modo
+    de envío (ver ws_protocol.py): en los modos por lotes el servidor responde
+    primero {"type": "protocol", ...} y agrupa los 'visited' en frames de hasta
+    params.batch_size eventos o params.batch_ms milisegundos.
+    
+    Con alg = "alternatives", params.routes (1 a 5, 3 por defecto) es la cantidad
+    máxima de rutas; los eventos 'path' llevan 'route_index'.
+    
+    Con alg = "nearest" no hay orig: "sources" es la lista de candidatos (ids de nodo
+    o pares [lat, lon]) y params.k (1 por defecto) la cantidad de mejores; 'done'
+    agrega 'source' (el que llega antes a dest) y 'sources' (ver facilities.py).
+    
+    Con params.profile = true la búsqueda corre bajo cProfile y 'done' agrega
+    'profile' con las funciones de más tiempo (no usa ni llena la caché de rutas).
+    
+    "region" (junto a "alg") elige el grafo de una de las REGIONS; sin ella se usa
+    la región por defecto. orig y dest son ids de nodo de esa región.
     """
     await ws.accept()
+    ACTIVE_SESSIONS.inc()
     
     try:
         raw = await ws.receive_text()
@@ -466,40 +1741,11 @@ async def ws_run(ws: WebSocket):
             await ws.close()
             return
         
-        alg = params.get('alg', 'dijkstra')
-        orig = params.get('orig')
-        dest = params.get('dest')
-        decimate = params.get('params', {}).get('decimate', 1)
-        speed = params.get('params', {}).get('speed', 1.0)
-        
-        if GRAPH is None:
-            await ws.send_text(json.dumps({'type': 'error', 'msg': 'Grafo no cargado'}))
-            await ws.close()
-            return
-        
-        if orig is None or dest is None:
-            await ws.send_text(json.dumps({'type': 'error', 'msg': 'orig y dest son requeridos'}))
-            await ws.close()
-            return
-        
-        if orig not in GRAPH.nodes or dest not in GRAPH.nodes:
-            await ws.send_text(json.dumps({'type': 'error', 'msg': 'orig o dest no están en el grafo'}))
-            await ws.close()
+        if 'id' in params:
+            await _run_session(ws, params)
             return
         
-        if alg not in ['dijkstra', 'astar']:
-            await ws.send_text(json.dumps({'type': 'error', 'msg': f'Algoritmo desconocido: {alg}'}))
-            await ws.close()
-            return
-        
-        logger.info(f"Ejecutando {alg} desde {orig} hasta {dest}")
-        
-        gen = dijkstra_stream(GRAPH, orig, dest, decimate=decimate) if alg == 'dijkstra' \
-              else astar_stream(GRAPH, orig, dest, decimate=decimate)
-        
-        async for event in run_sync_generator_async(gen, speed=speed):
-            await ws.send_text(json.dumps(event))
-        
+        await run_route_request(ws, params)
         await ws.close()
     
     except WebSocketDisconnect:
@@ -515,3 +1761,5 @@ async def ws_run(ws: WebSocket):
                 await ws.close()
             except:
                 pass
+    finally:
+        ACTIVE_SESSIONS.dec()
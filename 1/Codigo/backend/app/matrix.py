@@ -0,0 +1,161 @@
+"""
+Matrices origen-destino de tiempos de viaje (muchos a muchos)
+
+Cada fila de la matriz es una búsqueda Dijkstra uno-a-muchos desde un origen que
+se detiene en cuanto todos los destinos fueron asentados, con estado disperso
+(solo los nodos tocados). Las filas se reparten en un pool de procesos: los
+workers reciben el grafo CSR una sola vez al iniciarse (con fork lo heredan sin
+copiarlo) y luego solo viajan índices de nodo y filas de resultados.
+"""
+import heapq
+import logging
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from .csr import CSRGraph
+
+logger = logging.getLogger(__name__)
+
+# Por debajo de esta cantidad de orígenes no conviene pagar el costo del pool
+MIN_ROWS_FOR_POOL = 4
+MAX_WORKERS = max(1, min(4, (os.cpu_count() or 1)))
+
+
+def one_to_many(csr: CSRGraph, source: int, targets: Sequence[int]) -> List[float]:
+    """
+    Costos desde source (id denso) hasta cada target; inf si es inalcanzable.
+    Se detiene cuando todos los targets están asentados.
+    """
+    off, nbr, wts = csr.off_l, csr.nbr_l, csr.w_l
+    pending = set(targets)
+    dist = {source: 0.0}
+    settled = set()
+    pq = [(0.0, source)]
+    while pq and pending:
+        d, u = heapq.heappop(pq)
+        if u in settled:
+            continue
+        settled.add(u)
+        pending.discard(u)
+        for e in range(off[u], off[u + 1]):
+            v = nbr[e]
+            nd = d + wts[e]
+            if nd < dist.get(v, math.inf):
+                dist[v] = nd
+                heapq.heappush(pq, (nd, v))
+    return [dist[t] if t in settled else math.inf for t in targets]
+
+
+# -----------------------------------------------------------------------------
+# Pool de procesos
+# -----------------------------------------------------------------------------
+_WORKER_CSR: Optional[CSRGraph] = None
+
+
+def _init_worker(csr: CSRGraph) -> None:
+    global _WORKER_CSR
+    _WORKER_CSR = csr
+
+
+def _worker_rows(sources: List[int], targets: List[int]) -> List[List[float]]:
+    return [one_to_many(_WORKER_CSR, s, targets) for s in sources]
+
+
+class _MatrixPool:
+    """
+    Pool de procesos de un grafo. Se retira (retired) cuando su región pasa a otro
+    grafo (parches) o se desaloja; se detiene recién cuando terminan las matrices
+    que lo estaban usando.
+    """
+
+    def __init__(self, csr: CSRGraph):
+        self.csr = csr
+        # fork: los workers heredan el grafo de solo lectura sin serializarlo
+        methods = multiprocessing.get_all_start_methods()
+        ctx = multiprocessing.get_context('fork' if 'fork' in methods else None)
+        self.executor = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=ctx,
+                                            initializer=_init_worker, initargs=(csr,))
+        self.active = 0
+        self.retired = False
+
+
+# Un pool por región (clave), como streaming._POOLS; _POOLS_LOCK protege el dict y los contadores
+_POOLS: Dict[Any, _MatrixPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def _retire(pool: _MatrixPool) -> bool:
+    """Marca el pool como retirado (con el lock tomado); True si ya se puede detener."""
+    pool.retired = True
+    return pool.active == 0
+
+
+@contextmanager
+def _borrow_pool(csr: CSRGraph, key: Any = None) -> Iterator[ProcessPoolExecutor]:
+    """
+    Presta el pool de la región key para el grafo csr, creándolo si hace falta. Si
+    la región tenía un pool de otro grafo se retira: las matrices en curso lo
+    siguen usando y el último en devolverlo lo detiene.
+    """
+    stale = None
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None or pool.csr is not csr:
+            if pool is not None and _retire(pool):
+                stale = pool
+            pool = _POOLS[key] = _MatrixPool(csr)
+        pool.active += 1
+    if stale is not None:
+        stale.executor.shutdown(wait=False)
+    try:
+        yield pool.executor
+    finally:
+        with _POOLS_LOCK:
+            pool.active -= 1
+            finished = pool.retired and pool.active == 0
+        if finished:
+            pool.executor.shutdown(wait=False)
+
+
+def shutdown_pool(*keys: Any, wait: bool = True) -> None:
+    """
+    Detiene los pools de las regiones dadas (todos si no se indica ninguna), p. ej.
+    al desalojar una región o al apagar el servidor. Los que tienen matrices en
+    curso se detienen cuando terminan.
+    """
+    with _POOLS_LOCK:
+        names = keys or list(_POOLS)
+        idle = [pool for pool in (_POOLS.pop(name, None) for name in names) if pool is not None and _retire(pool)]
+    for pool in idle:
+        pool.executor.shutdown(wait=wait)
+
+
+def travel_time_matrix(
+    csr: CSRGraph,
+    sources: Sequence[int],
+    targets: Sequence[int],
+    parallel: bool = True,
+    pool_key: Any = None,
+) -> np.ndarray:
+    """
+    Matriz (len(sources) x len(targets)) de tiempos de viaje en segundos entre ids
+    densos de nodo; np.inf donde no hay ruta. pool_key identifica la región (un
+    pool de procesos por región).
+    """
+    sources, targets = list(sources), list(targets)
+    if not parallel or len(sources) < MIN_ROWS_FOR_POOL or MAX_WORKERS == 1:
+        rows = [one_to_many(csr, s, targets) for s in sources]
+    else:
+        chunk = max(1, math.ceil(len(sources) / (MAX_WORKERS * 4)))
+        with _borrow_pool(csr, pool_key) as pool:
+            futures = [pool.submit(_worker_rows, sources[i:i + chunk], targets)
+                       for i in range(0, len(sources), chunk)]
+            rows = [row for f in futures for row in f.result()]
+    return np.asarray(rows, dtype=np.float64).reshape(len(sources), len(targets))
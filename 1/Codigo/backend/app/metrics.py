@@ -0,0 +1,113 @@
+"""
+Métricas Prometheus y perfilado por consulta
+
+El servidor expone en /metrics (formato de texto de Prometheus):
+
+- route_search_seconds{algorithm}: duración de la búsqueda (time_s de 'done')
+- route_nodes_explored{algorithm}: nodos explorados por búsqueda
+- route_events_emitted{algorithm}: eventos enviados al cliente por búsqueda
+  (después de result_only y antes de agrupar en lotes)
+- route_bytes_sent{algorithm, protocol}: bytes de los frames enviados por búsqueda
+  (en los frames de texto, caracteres)
+- route_requests_total{algorithm, source}: consultas de /ws/run ejecutadas
+  (source="search") o servidas desde la caché de rutas (source="cache"), y
+  rutas sin streaming de /api/route (source="rest")
+- ws_active_sessions: conexiones abiertas de /ws/run
+- cache_hit_ratio{cache}: fracción de aciertos de la caché de rutas y de isócronas
+
+Las métricas se registran en el proceso del servidor, a partir de los frames y
+del evento 'done' que llegan de los workers de búsqueda (ver streaming.py).
+
+Perfilado (params.profile en /ws/run): profile_search corre la búsqueda bajo
+cProfile, activándolo solo mientras el generador calcula el próximo evento, así
+que no cuenta la serialización ni el envío. El evento 'done' lleva las funciones
+con más tiempo propio. cProfile agrega overhead por llamada: el time_s de una
+consulta perfilada no es comparable con el de una normal.
+"""
+import cProfile
+import os
+import pstats
+from typing import Any, Dict, Iterator, List
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+PROFILE_TOP = 15  # Funciones informadas en el perfil
+
+_COUNT_BUCKETS = (10, 30, 100, 300, 1e3, 3e3, 1e4, 3e4, 1e5, 3e5, 1e6)
+
+SEARCH_SECONDS = Histogram(
+    'route_search_seconds', 'Duración de la búsqueda (time_s del evento done)', ['algorithm'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+NODES_EXPLORED = Histogram(
+    'route_nodes_explored', 'Nodos explorados por búsqueda', ['algorithm'], buckets=_COUNT_BUCKETS,
+)
+EVENTS_EMITTED = Histogram(
+    'route_events_emitted', 'Eventos enviados al cliente por búsqueda', ['algorithm'], buckets=_COUNT_BUCKETS,
+)
+BYTES_SENT = Histogram(
+    'route_bytes_sent', 'Bytes enviados al cliente por búsqueda', ['algorithm', 'protocol'],
+    buckets=(1e3, 1e4, 1e5, 1e6, 1e7, 1e8),
+)
+ROUTE_REQUESTS = Counter(
+    'route_requests_total', 'Consultas de ruteo por algoritmo y origen del resultado', ['algorithm', 'source'],
+)
+ACTIVE_SESSIONS = Gauge('ws_active_sessions', 'Conexiones abiertas de /ws/run')
+CACHE_HIT_RATIO = Gauge('cache_hit_ratio', 'Fracción de aciertos de las cachés de resultados', ['cache'])
+
+
+def observe_search(algorithm: str, protocol: str, done: Dict[str, Any], bytes_sent: int) -> None:
+    """Registra una búsqueda completada a partir de su evento 'done' y los bytes enviados."""
+    ROUTE_REQUESTS.labels(algorithm, 'search').inc()
+    SEARCH_SECONDS.labels(algorithm).observe(done.get('time_s', 0.0))
+    NODES_EXPLORED.labels(algorithm).observe(done.get('nodes_explored', 0))
+    if 'events_emitted' in done:
+        EVENTS_EMITTED.labels(algorithm).observe(done['events_emitted'])
+    BYTES_SENT.labels(algorithm, protocol).observe(bytes_sent)
+
+
+def render_metrics() -> bytes:
+    """Todas las métricas registradas en el formato de texto de Prometheus."""
+    return generate_latest()
+
+
+def count_events(gen: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Agrega a 'done' la cantidad de eventos emitidos (incluido el propio 'done')."""
+    n = 0
+    for event in gen:
+        n += 1
+        if event['type'] == 'done':
+            event = {**event, 'events_emitted': n}
+        yield event
+
+
+def profile_search(gen: Iterator[Dict[str, Any]], top: int = PROFILE_TOP) -> Iterator[Dict[str, Any]]:
+    """Itera gen bajo cProfile y agrega a 'done' el perfil (ver _summary)."""
+    profiler = cProfile.Profile()
+    while True:
+        profiler.enable()
+        try:
+            event = next(gen)
+        except StopIteration:
+            return
+        finally:
+            profiler.disable()
+        if event['type'] == 'done':
+            event = {**event, 'profile': _summary(profiler, top)}
+        yield event
+
+
+def _summary(profiler: cProfile.Profile, top: int) -> Dict[str, Any]:
+    """{mode, total_s, functions: [{function, calls, tottime_s, cumtime_s}]} ordenado por tiempo propio."""
+    stats = pstats.Stats(profiler).stats
+    rows = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)
+    functions: List[Dict[str, Any]] = []
+    for (filename, line, name), (_, calls, tottime, cumtime, _) in rows[:top]:
+        label = name if filename == '~' else f"{os.path.basename(filename)}:{line}({name})"
+        functions.append({'function': label, 'calls': calls, 'tottime_s': tottime, 'cumtime_s': cumtime})
+    return {
+        'mode': 'cprofile',
+        'total_s': sum(row[2] for row in stats.values()),
+        'functions': functions,
+    }
+
@@ -0,0 +1,186 @@
+"""
+Implementación de referencia de Dijkstra y A* directamente sobre networkx
+
+Es la versión original de los algoritmos, que recorre G.out_edges(...) con acceso
+dict-of-dict en cada relajación. La aplicación usa las versiones sobre CSR de
+main.py; esta se conserva para validar que ambas emiten exactamente los mismos
+eventos y para medir la mejora en benchmarks/.
+"""
+import heapq
+import time
+from typing import Iterator, Dict, Any
+import networkx as nx
+
+from .main import haversine_m, reconstruct_path, compute_max_speed
+
+
+def dijkstra_stream_nx(
+    G: nx.MultiDiGraph, 
+    orig: int, 
+    dest: int, 
+    decimate: int = 1, 
+    progress_every: int = 500
+) -> Iterator[Dict[str, Any]]:
+    """
+    ALGORITMO DE DIJKSTRA (Búsqueda de Costo Uniforme)
+    
+    Concepto IA: Expande siempre el nodo con menor costo acumulado g(n).
+    Garantiza encontrar el camino óptimo (menor costo total).
+    
+    Complejidad: O((V + E) log V) con cola de prioridad.
+    """
+    t0 = time.time()
+    dist = {n: float('inf') for n in G.nodes}
+    prev = {n: None for n in G.nodes}
+    visited = set()
+    dist[orig] = 0
+    pq = [(0, orig)]  # Cola de prioridad: (distancia, nodo)
+    nodes_explored = 0
+    
+    yield {'type': 'status', 'msg': 'started', 'algorithm': 'dijkstra', 'orig': orig, 'dest': dest}
+    
+    i = 0
+    while pq: #seleccionar de la cola de prioridad el nodo con menor distancia
+        d, node = heapq.heappop(pq)
+        
+        if node in visited:
+            continue
+        
+        visited.add(node)
+        nodes_explored += 1
+        
+        if node == dest:
+            yield {'type': 'status', 'msg': 'reached_dest', 'node': node}
+            break
+        
+        # Explorar vecinos (expansión del nodo)
+        for u, v, k, data in G.out_edges(node, keys=True, data=True):
+            w = data['weight']
+            new_dist = dist[node] + w
+            
+            # Relajación de arista: actualizar si encontramos camino más corto
+            if new_dist < dist[v]:
+                dist[v] = new_dist
+                prev[v] = node
+                heapq.heappush(pq, (dist[v], v))
+                
+                if i % decimate == 0:
+                    u_node, v_node = G.nodes[u], G.nodes[v]
+                    yield {
+                        'type': 'visited', 'edge_id': f"{u}|{v}|{k}",
+                        'u': u, 'v': v, 'k': k, 'weight': w,
+                        'coords': [[u_node['y'], u_node['x']], [v_node['y'], v_node['x']]]
+                    }
+                i += 1
+        
+        if nodes_explored % progress_every == 0:
+            yield {'type': 'progress', 'explored': nodes_explored}
+    
+    elapsed = time.time() - t0
+    path_edges, total_km = reconstruct_path(G, orig, dest, prev)
+    
+    for order, (u, v, k) in enumerate(path_edges):
+        u_node, v_node = G.nodes[u], G.nodes[v]
+        yield {
+            'type': 'path', 'edge_id': f"{u}|{v}|{k}",
+            'u': u, 'v': v, 'k': k, 'order': order,
+            'coords': [[u_node['y'], u_node['x']], [v_node['y'], v_node['x']]]
+        }
+    
+    yield {'type': 'done', 'nodes_explored': nodes_explored, 'time_s': elapsed, 'distance_km': total_km}
+
+
+def astar_stream_nx(
+    G: nx.MultiDiGraph, 
+    orig: int, 
+    dest: int, 
+    decimate: int = 1, 
+    progress_every: int = 500
+) -> Iterator[Dict[str, Any]]:
+    """
+    ALGORITMO A* (Búsqueda Informada)
+    
+    Concepto IA: Usa función de evaluación f(n) = g(n) + h(n)
+    - g(n): costo real desde origen hasta n
+    - h(n): heurística (estimación del costo de n al destino)
+    
+    Heurística: distancia_haversine / velocidad_máxima
+    - Es ADMISIBLE: nunca sobreestima (distancia recta ≤ distancia real,
+      dividida por velocidad máxima ≤ tiempo real)
+    - Garantiza encontrar el camino óptimo
+    
+    Ventaja sobre Dijkstra: explora menos nodos al guiarse hacia el destino.
+    """
+    t0 = time.time()
+    dest_lat, dest_lon = G.nodes[dest]['y'], G.nodes[dest]['x']
+    max_speed = compute_max_speed(G)
+    
+    # Función heurística admisible
+    def h(node: int) -> float:
+        lat, lon = G.nodes[node]['y'], G.nodes[node]['x']
+        return haversine_m(lat, lon, dest_lat, dest_lon) / max_speed
+    
+    g_score = {n: float('inf') for n in G.nodes}
+    f_score = {n: float('inf') for n in G.nodes}
+    prev = {n: None for n in G.nodes}
+    closed = set()
+    
+    g_score[orig] = 0
+    f_score[orig] = h(orig)
+    pq = [(f_score[orig], orig)]  # Cola de prioridad: (f_score, nodo)
+    nodes_explored = 0
+    
+    yield {'type': 'status', 'msg': 'started', 'algorithm': 'astar', 'orig': orig, 'dest': dest}
+    
+    i = 0
+    while pq:
+        _, node = heapq.heappop(pq)
+        
+        if node in closed:
+            continue
+        
+        closed.add(node)
+        nodes_explored += 1
+        
+        if node == dest:
+            yield {'type': 'status', 'msg': 'reached_dest', 'node': node}
+            break
+        
+        # Explorar vecinos
+        for u, v, k, data in G.out_edges(node, keys=True, data=True):
+            if v in closed:
+                continue
+            
+            tentative_g = g_score[node] + data['weight']
+            
+            # Relajación de arista con heurística
+            if tentative_g < g_score[v]:
+                prev[v] = node
+                g_score[v] = tentative_g
+                f_score[v] = tentative_g + h(v)  # f(n) = g(n) + h(n)
+                heapq.heappush(pq, (f_score[v], v))
+                
+                if i % decimate == 0:
+                    u_node, v_node = G.nodes[u], G.nodes[v]
+                    yield {
+                        'type': 'visited', 'edge_id': f"{u}|{v}|{k}",
+                        'u': u, 'v': v, 'k': k, 'weight': data['weight'],
+                        'coords': [[u_node['y'], u_node['x']], [v_node['y'], v_node['x']]]
+                    }
+                i += 1
+        
+        if nodes_explored % progress_every == 0:
+            yield {'type': 'progress', 'explored': nodes_explored}
+    
+    elapsed = time.time() - t0
+    path_edges, total_km = reconstruct_path(G, orig, dest, prev)
+    
+    for order, (u, v, k) in enumerate(path_edges):
+        u_node, v_node = G.nodes[u], G.nodes[v]
+        yield {
+            'type': 'path', 'edge_id': f"{u}|{v}|{k}",
+            'u': u, 'v': v, 'k': k, 'order': order,
+            'coords': [[u_node['y'], u_node['x']], [v_node['y'], v_node['x']]]
+        }
+    
+    yield {'type': 'done', 'nodes_explored': nodes_explored, 'time_s': elapsed, 'distance_km': total_km}
@@ -0,0 +1,160 @@
+"""
+Parches de pesos sobre el grafo en vivo (cortes de calle, obras, anegamientos)
+
+Hasta ahora la única forma de cambiar la red era borrar la caché y volver a
+descargarla. Un parche asigna un peso nuevo a aristas concretas del grafo cargado:
+
+- weight: segundos para recorrer la arista
+- speed_kph: velocidad; el peso pasa a ser length / velocidad
+- closed: corta la arista (peso inf: ninguna búsqueda la usa)
+- reset: vuelve al peso original del grafo en disco
+
+apply_patches no modifica nada: arma un CSRGraph nuevo (que comparte topología y
+coordenadas con el anterior) y actualiza sobre él los preprocesamientos en forma
+incremental (LandmarkTables.update, ContractionHierarchy.update, perfiles de
+tráfico). El servidor reemplaza todo junto, así que las consultas en curso
+terminan con el grafo anterior y las nuevas ven el parcheado. Como la versión del
+grafo incluye una huella de los pesos parcheados, las cachés (rutas, workers)
+quedan invalidadas solas.
+
+Si el parche afecta a demasiados nodos de la CH, reconstruirla sale más barato
+que actualizarla, pero contraer el grafo entero lleva decenas de segundos en una
+ciudad. apply_patches no la reconstruye: la deja pendiente (ch None y 'ch' en
+pending) y el servidor la construye en segundo plano, sin frenar otros parches;
+mientras tanto el modo CH responde que no está disponible.
+
+Los parches viven en memoria: al reiniciar se vuelve al grafo guardado en disco.
+"""
+import logging
+import math
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .alt import LandmarkTables
+from .ch import ContractionHierarchy
+from .csr import CSRGraph
+from .traffic import TrafficProfiles
+
+logger = logging.getLogger(__name__)
+
+PATCH_KINDS = ('weight', 'speed_kph', 'closed', 'reset')
+
+
+def resolve_patches(csr: CSRGraph, patches: List[Dict[str, Any]]) -> Dict[int, float]:
+    """
+    Traduce los parches a {índice de arista CSR: peso nuevo}. Cada parche tiene u y v
+    (ids de nodo), key opcional (sin key se aplica a todas las aristas paralelas
+    u->v) y exactamente uno de weight, speed_kph, closed o reset. Si dos parches
+    tocan la misma arista gana el último. Lanza ValueError si alguno es inválido.
+    """
+    changes: Dict[int, float] = {}
+    for i, patch in enumerate(patches):
+        kinds = [k for k in PATCH_KINDS if patch.get(k) is not None and patch.get(k) is not False]
+        if len(kinds) != 1:
+            raise ValueError(f"Parche {i}: se espera exactamente uno de {', '.join(PATCH_KINDS)}")
+        u, v, key = patch.get('u'), patch.get('v'), patch.get('key')
+        if u not in csr or v not in csr:
+            raise ValueError(f"Parche {i}: el nodo {u if u not in csr else v} no está en el grafo")
+        ui, vi = csr.index[u], csr.index[v]
+        edges = [e for e in range(csr.off_l[ui], csr.off_l[ui + 1])
+                 if csr.nbr_l[e] == vi and (key is None or csr.keys_l[e] == key)]
+        if not edges:
+            raise ValueError(f"Parche {i}: no existe la arista {u}->{v}" + (f" con key {key}" if key is not None else ''))
+
+        kind = kinds[0]
+        for e in edges:
+            if kind == 'weight':
+                weight = float(patch['weight'])
+            elif kind == 'speed_kph':
+                weight = csr.len_l[e] / (float(patch['speed_kph']) / 3.6)
+            elif kind == 'closed':
+                weight = math.inf
+            else:
+                weight = float(csr.base.weights[e])
+            if kind in ('weight', 'speed_kph') and not weight > 0:
+                raise ValueError(f"Parche {i}: el peso debe ser positivo")
+            changes[e] = weight
+    return changes
+
+
+class GraphUpdate:
+    """
+    Resultado de apply_patches: grafo y preprocesamientos para los pesos nuevos,
+    aristas cuyo peso cambió, segundos de cada etapa (graph, alt, ch, traffic) y
+    preprocesamientos que no se pudieron actualizar y quedan por reconstruir (None).
+    """
+
+    def __init__(
+        self,
+        csr: CSRGraph,
+        ch: Optional[ContractionHierarchy],
+        landmarks: Optional[LandmarkTables],
+        traffic: Optional[TrafficProfiles],
+        changed: List[int],
+        timings: Dict[str, float],
+        pending: List[str],
+    ):
+        self.csr = csr
+        self.ch = ch
+        self.landmarks = landmarks
+        self.traffic = traffic
+        self.changed = changed
+        self.timings = timings
+        self.pending = pending
+
+
+def apply_patches(
+    csr: CSRGraph,
+    changes: Dict[int, float],
+    ch: Optional[ContractionHierarchy] = None,
+    landmarks: Optional[LandmarkTables] = None,
+    traffic: Optional[TrafficProfiles] = None,
+) -> GraphUpdate:
+    """Aplica {arista: peso} (ver resolve_patches) sin modificar csr ni los preprocesamientos recibidos."""
+    timings: Dict[str, float] = {}
+    pending: List[str] = []
+    changed = sorted(e for e, w in changes.items() if w != csr.w_l[e])
+    if not changed:
+        return GraphUpdate(csr, ch, landmarks, traffic, [], timings, pending)
+
+    t0 = time.perf_counter()
+    weights = np.array(csr.weights, dtype=np.float64)
+    weights[changed] = [changes[e] for e in changed]
+    new = csr.with_weights(weights, changed)
+    timings['graph'] = time.perf_counter() - t0
+
+    if landmarks is not None:
+        t0 = time.perf_counter()
+        # Solo las disminuciones requieren corregir las tablas (ver alt.py)
+        landmarks = landmarks.update(new, [e for e in changed if weights[e] < csr.w_l[e]])
+        timings['alt'] = time.perf_counter() - t0
+    if ch is not None:
+        t0 = time.perf_counter()
+        ch = ch.update(new, changed)
+        if ch is None:
+            # Parche demasiado grande para actualizar la jerarquía: hay que volver a contraer
+            pending.append('ch')
+        timings['ch'] = time.perf_counter() - t0
+    if traffic is not None:
+        t0 = time.perf_counter()
+        traffic = traffic.for_graph(new)
+        timings['traffic'] = time.perf_counter() - t0
+
+    logger.info(f"Parche aplicado a {len(changed)} aristas en {sum(timings.values()):.3f}s " +
+                ', '.join(f"{k} {v * 1000:.1f} ms" for k, v in timings.items()) +
+                (f" (a reconstruir: {', '.join(pending)})" if pending else ''))
+    return GraphUpdate(new, ch, landmarks, traffic, changed, timings, pending)
+
+
+def active_patches(csr: CSRGraph) -> List[Dict[str, Any]]:
+    """Aristas cuyo peso difiere del grafo original, con el peso actual (None = cortada) y el original."""
+    patched = np.flatnonzero(csr.weights != csr.base.weights).tolist()
+    et = csr.edge_table()
+    return [{
+        'u': et.u_l[e], 'v': et.v_l[e], 'key': csr.keys_l[e],
+        'weight': csr.w_l[e] if csr.w_l[e] != math.inf else None,
+        'base_weight': csr.base.w_l[e],
+        'closed': csr.w_l[e] == math.inf,
+    } for e in patched]
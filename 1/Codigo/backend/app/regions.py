@@ -0,0 +1,204 @@
+"""
+Registro de grafos por región (ciudad) con carga diferida y desalojo LRU
+
+Cada región tiene su propio lugar de OSM, radio y caché en disco (el pickle y los
+archivos derivados: formato CSR, índice espacial, CH, landmarks, tráfico, teselas).
+GraphRegistry carga el grafo de una región recién la primera vez que se lo pide
+(con el loader que recibe; el del servidor es main.load_region), así que el
+arranque no depende de cuántas regiones estén configuradas.
+
+Los grafos cargados se guardan en orden LRU. Cuando la memoria estimada
+(estimate_memory) pasa de max_bytes se desalojan los que llevan más tiempo sin
+usarse, nunca el recién pedido. Desalojar solo suelta la referencia del
+registro: una consulta en curso sobre esa región termina con el grafo que ya
+tenía, y la próxima lo vuelve a cargar desde disco. on_evict permite liberar lo
+asociado a la región (workers de búsqueda, teselas).
+"""
+import logging
+import os
+import threading
+import weakref
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .csr import get_csr
+
+logger = logging.getLogger(__name__)
+
+# Bytes por elemento de las copias en listas de Python de los arreglos (medido
+# con tracemalloc sobre el CSR, la tabla de aristas, la geometría y los landmarks)
+LIST_ITEM_BYTES = 56
+
+
+class Region:
+    """Región configurada: lugar de OSM, radio de descarga y archivos de caché."""
+
+    def __init__(self, name: str, place: str, radius_m: int, cache_file: Optional[Union[str, Path]] = None):
+        self.name = name
+        self.place = place
+        self.radius_m = radius_m
+        self.cache_file = Path(cache_file) if cache_file is not None else Path(f"graph_cache_{name}.pkl")
+        # Mismos sufijos que los archivos de la región por defecto (ver main.py)
+        self.graph_file = self.cache_file.with_suffix('.graph')
+        self.spatial_index_file = self.cache_file.with_suffix('.spatial.npz')
+        self.ch_file = self.cache_file.with_suffix('.ch.npz')
+        self.alt_file = self.cache_file.with_suffix('.alt.npz')
+        self.traffic_file = self.cache_file.with_suffix('.traffic.npz')
+        self.tile_cache_dir = self.cache_file.with_suffix('.tiles')
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'name': self.name, 'place': self.place, 'radius_m': self.radius_m}
+
+
+class RegionState:
+    """
+    Grafo cargado de una región con sus preprocesamientos (CH, landmarks, perfiles
+    de tráfico). Se reemplaza entero al aplicar parches, como los globales de main.py.
+    """
+
+    def __init__(self, region: Region, graph: Any, ch: Any = None, landmarks: Any = None, traffic: Any = None):
+        self.region = region
+        self.graph = graph
+        self.ch = ch
+        self.landmarks = landmarks
+        self.traffic = traffic
+        self.memory_bytes = 0  # Lo completa el registro al guardarla (estimate_memory)
+
+    def context(self) -> Tuple[Any, ...]:
+        """Objetos de los que dependen los workers de búsqueda (ver streaming.stream_search)."""
+        return (self.graph, self.ch, self.landmarks, self.traffic)
+
+
+def estimate_memory(state: RegionState) -> int:
+    """
+    Memoria aproximada de una región: los arreglos NumPy del grafo (y de sus tablas
+    de aristas y de nodos) y de los preprocesamientos, más sus copias en listas.
+    """
+    csr = get_csr(state.graph)
+    objects = (csr, csr.edge_table(), csr.geometry(), state.ch, state.landmarks, state.traffic)
+    total = 0
+    for obj in objects:
+        if obj is None:
+            continue
+        for value in vars(obj).values():
+            if isinstance(value, np.ndarray):
+                total += value.nbytes + LIST_ITEM_BYTES * value.size
+    return total
+
+
+class GraphRegistry:
+    """Grafos por región cargados a demanda, con desalojo LRU por memoria."""
+
+    def __init__(
+        self,
+        regions: Dict[str, Region],
+        loader: Callable[[Region], RegionState],
+        max_bytes: int,
+        on_evict: Optional[Callable[[RegionState], None]] = None,
+    ):
+        self.regions = regions
+        self.loader = loader
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self._loaded: 'OrderedDict[str, RegionState]' = OrderedDict()
+        self._lock = threading.Lock()
+        # Un lock de carga por región: dos consultas simultáneas a una región fría la cargan una sola vez
+        self._loading = {name: threading.Lock() for name in regions}
+        self.loads = 0
+        self.evictions = 0
+        _REGISTRIES.add(self)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.regions
+
+    def peek(self, name: str) -> Optional[RegionState]:
+        """Estado de la región si ya está cargada, sin cargarla ni tocar el orden LRU."""
+        with self._lock:
+            return self._loaded.get(name)
+
+    def get(self, name: str) -> RegionState:
+        """Estado de la región, cargándola si hace falta. KeyError si no está configurada."""
+        region = self.regions[name]
+        with self._lock:
+            state = self._loaded.get(name)
+            if state is not None:
+                self._loaded.move_to_end(name)
+                return state
+        with self._loading[name]:
+            with self._lock:
+                state = self._loaded.get(name)
+                if state is not None:  # La cargó otra consulta mientras esta esperaba
+                    self._loaded.move_to_end(name)
+                    return state
+            t0 = time.time()
+            state = self.loader(region)
+            state.memory_bytes = estimate_memory(state)
+            logger.info(f"Región {name} cargada en {time.time() - t0:.2f}s "
+                        f"({state.memory_bytes / 2 ** 20:.0f} MB estimados)")
+            with self._lock:
+                self._loaded[name] = state
+                self.loads += 1
+                evicted = self._evict(keep=name)
+        for old in evicted:
+            self._evicted(old)
+        return state
+
+    def replace(self, name: str, state: RegionState) -> None:
+        """Reemplaza el estado de una región cargada (p. ej. tras aplicar parches)."""
+        state.memory_bytes = estimate_memory(state)
+        with self._lock:
+            self._loaded[name] = state
+            self._loaded.move_to_end(name)
+            evicted = self._evict(keep=name)
+        for old in evicted:
+            self._evicted(old)
+
+    def memory_bytes(self) -> int:
+        with self._lock:
+            return sum(s.memory_bytes for s in self._loaded.values())
+
+    def _evict(self, keep: str) -> List[RegionState]:
+        """Saca del registro las regiones menos usadas hasta entrar en max_bytes (con el lock tomado)."""
+        evicted = []
+        total = sum(s.memory_bytes for s in self._loaded.values())
+        for name in list(self._loaded):
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            state = self._loaded.pop(name)
+            total -= state.memory_bytes
+            self.evictions += 1
+            evicted.append(state)
+        return evicted
+
+    def _evicted(self, state: RegionState) -> None:
+        logger.info(f"Región {state.region.name} desalojada ({state.memory_bytes / 2 ** 20:.0f} MB estimados)")
+        if self.on_evict is not None:
+            self.on_evict(state)
+
+    def stats(self) -> Dict[str, Any]:
+        """Regiones cargadas (de la menos a la más recientemente usada), memoria y contadores."""
+        with self._lock:
+            loaded = [{'name': name, 'memory_bytes': s.memory_bytes} for name, s in self._loaded.items()]
+        return {'loaded': loaded, 'memory_bytes': sum(r['memory_bytes'] for r in loaded),
+                'max_bytes': self.max_bytes, 'loads': self.loads, 'evictions': self.evictions}
+
+
+# Registros vivos: los workers de búsqueda (fork) heredan sus locks, ver csr._reinit_locks_after_fork
+_REGISTRIES: 'weakref.WeakSet[GraphRegistry]' = weakref.WeakSet()
+
+
+def _reinit_locks_after_fork() -> None:
+    """En el proceso hijo, locks nuevos en lugar de los que algún thread del padre tenía tomados."""
+    for registry in list(_REGISTRIES):
+        registry._lock = threading.Lock()
+        registry._loading = {name: threading.Lock() for name in registry._loading}
+
+
+os.register_at_fork(after_in_child=_reinit_locks_after_fork)
+
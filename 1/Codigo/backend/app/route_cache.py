@@ -0,0 +1,138 @@
+"""
+Caché de resultados de rutas con desalojo LRU
+
+Guarda, por (algoritmo, origen, destino, versión del grafo), los eventos 'status'
+y 'path' (en el orden en que se emitieron) y el evento 'done' de una búsqueda ya
+completada. Incluir la versión del grafo en la
+clave hace que cualquier cambio del grafo invalide las entradas viejas sin tener
+que recorrerlas.
+
+Opcionalmente las entradas se escriben también en disco (un JSON por clave), de
+modo que sobreviven a un reinicio del servidor.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+RouteKey = Tuple[Any, ...]  # (alg, orig, dest, versión del grafo[, hora de salida][, cantidad de rutas])
+
+
+class RouteCache:
+    """LRU en memoria (y opcionalmente en disco) de resultados de rutas."""
+
+    def __init__(self, maxsize: int = 1024, disk_dir: Optional[Union[str, Path]] = None):
+        self.maxsize = maxsize
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+        self._entries: 'OrderedDict[RouteKey, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _disk_path(self, key: RouteKey) -> Path:
+        digest = hashlib.sha1(json.dumps(key, default=str).encode()).hexdigest()
+        return self.disk_dir / f"{digest}.json"
+
+    def get(self, key: RouteKey) -> Optional[Dict[str, Any]]:
+        """Devuelve {'events': [...], 'done': {...}} o None; actualiza los contadores."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+        if self.disk_dir is not None:
+            path = self._disk_path(key)
+            if path.exists():
+                try:
+                    entry = json.loads(path.read_text())
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Entrada de caché de rutas ilegible {path}: {e}")
+                else:
+                    self._store(key, entry)
+                    with self._lock:
+                        self.hits += 1
+                    return entry
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: RouteKey, events: List[Dict[str, Any]], done: Dict[str, Any]) -> None:
+        """Guarda el resultado de una búsqueda completada (eventos 'status' y 'path', y 'done')."""
+        entry = {'events': events, 'done': done}
+        self._store(key, entry)
+        if self.disk_dir is not None:
+            try:
+                self._disk_path(key).write_text(json.dumps(entry))
+            except OSError as e:
+                logger.warning(f"No se pudo escribir la caché de rutas en disco: {e}")
+
+    def _store(self, key: RouteKey, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Vacía la caché en memoria (las entradas en disco quedan, pero su clave incluye la versión)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'disk': str(self.disk_dir) if self.disk_dir else None,
+            }
+
+
+class RouteRecorder:
+    """Observa los eventos de una búsqueda y, si termina, guarda su ruta en la caché."""
+
+    def __init__(self, cache: RouteCache, key: RouteKey):
+        self.cache = cache
+        self.key = key
+        self.events: List[Dict[str, Any]] = []
+
+    def observe(self, event: Dict[str, Any]) -> None:
+        if event['type'] in ('status', 'path'):
+            self.events.append(event)
+        elif event['type'] == 'done':
+            self.cache.put(self.key, self.events, event)
+
+
+def replay_stream(entry: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Eventos de una ruta cacheada: los 'status' y 'path' originales y 'done', sin
+    exploración; el inicio y 'done' llevan "cached": true.
+    """
+    for event in entry['events']:
+        if event['type'] == 'status' and event['msg'] == 'started':
+            event = {**event, 'cached': True}
+        yield event
+    yield {**entry['done'], 'cached': True}
+
+
+def cache_from_env() -> RouteCache:
+    """Caché configurada por ROUTE_CACHE_SIZE y ROUTE_CACHE_DIR (opcional, para persistir en disco)."""
+    return RouteCache(
+        maxsize=int(os.environ.get('ROUTE_CACHE_SIZE', '1024')),
+        disk_dir=os.environ.get('ROUTE_CACHE_DIR') or None,
+    )
@@ -0,0 +1,137 @@
+"""
+Ruta óptima sin streaming: solo el resultado final, para consumidores de la API
+
+dijkstra_stream / astar_stream arman y emiten un evento por relajación para la
+animación; un cliente que solo quiere la ruta paga esos diccionarios aunque los
+descarte. shortest_path es el mismo Dijkstra / A* sobre el CSR sin ningún evento
+(ni siquiera los de progreso): el bucle solo toca los buffers de búsqueda y la
+cola de prioridad. compute_route devuelve la ruta como polyline codificada
+(algoritmo de Google, precisión 5: lo que aceptan Leaflet, Mapbox y OSRM) con su
+distancia y duración.
+"""
+import heapq
+import math
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .csr import EARTH_RADIUS_M, CSRGraph
+
+ALGORITHMS = ('dijkstra', 'astar')
+POLYLINE_PRECISION = 5
+
+
+def shortest_path(csr: CSRGraph, o: int, t: int, algorithm: str = 'astar') -> Tuple[float, List[int], int]:
+    """
+    Costo, aristas de la ruta (índices CSR) y nodos explorados de o a t (ids densos).
+    Sin ruta el costo es inf y la lista queda vacía. A* usa la misma heurística que
+    astar_stream (ver csr.NodeGeometry), así que explora los mismos nodos.
+    """
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Algoritmo desconocido: {algorithm}")
+    off, nbr, wts = csr.off_l, csr.nbr_l, csr.w_l
+    astar = algorithm == 'astar'
+    if astar:
+        geometry = csr.geometry()
+        xs, ys, zs = geometry.x_l, geometry.y_l, geometry.z_l
+        tx, ty, tz = xs[t], ys[t], zs[t]
+        scale = 2 * EARTH_RADIUS_M / csr.max_speed
+        asin, sqrt = math.asin, math.sqrt
+    heappush, heappop = heapq.heappush, heapq.heappop
+
+    with csr.search_buffers() as buf:
+        gen, dist, prev, seen, closed = buf.gen, buf.dist, buf.prev, buf.seen, buf.closed
+        dist[o], seen[o] = 0, gen
+        pq = [(0.0, o)]
+        nodes_explored = 0
+        while pq:
+            _, node = heappop(pq)
+            if closed[node] == gen:
+                continue
+            closed[node] = gen
+            nodes_explored += 1
+            if node == t:
+                break
+            d_node = dist[node]
+            for e in range(off[node], off[node + 1]):
+                v = nbr[e]
+                if closed[v] == gen:
+                    continue
+                new_dist = d_node + wts[e]
+                if (seen[v] != gen or new_dist < dist[v]) and new_dist != math.inf:
+                    seen[v] = gen
+                    dist[v] = new_dist
+                    prev[v] = node
+                    if astar:
+                        dx, dy, dz = xs[v] - tx, ys[v] - ty, zs[v] - tz
+                        heappush(pq, (new_dist + asin(min(sqrt(dx * dx + dy * dy + dz * dz) * 0.5, 1.0)) * scale, v))
+                    else:
+                        heappush(pq, (new_dist, v))
+        if seen[t] != gen:
+            return math.inf, [], nodes_explored
+        path_edges, _ = csr.reconstruct_path(o, t, prev)
+        return dist[t], path_edges, nodes_explored
+
+
+def encode_polyline(points: Sequence[Tuple[float, float]], precision: int = POLYLINE_PRECISION) -> str:
+    """Codifica puntos (lat, lon) con el algoritmo de polyline de Google."""
+    factor = 10 ** precision
+    out: List[str] = []
+    prev_lat = prev_lon = 0
+    for lat, lon in points:
+        ilat, ilon = round(lat * factor), round(lon * factor)
+        for delta in (ilat - prev_lat, ilon - prev_lon):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                out.append(chr((0x20 | (value & 0x1f)) + 63))
+                value >>= 5
+            out.append(chr(value + 63))
+        prev_lat, prev_lon = ilat, ilon
+    return ''.join(out)
+
+
+def decode_polyline(encoded: str, precision: int = POLYLINE_PRECISION) -> List[Tuple[float, float]]:
+    """Inversa de encode_polyline."""
+    factor = 10 ** precision
+    points: List[Tuple[float, float]] = []
+    coords = [0, 0]
+    i = 0
+    while i < len(encoded):
+        for j in range(2):
+            shift = result = 0
+            while True:
+                b = ord(encoded[i]) - 63
+                i += 1
+                result |= (b & 0x1f) << shift
+                shift += 5
+                if b < 0x20:
+                    break
+            coords[j] += ~(result >> 1) if result & 1 else result >> 1
+        points.append((coords[0] / factor, coords[1] / factor))
+    return points
+
+
+def route_polyline(csr: CSRGraph, o: int, path_edges: List[int]) -> str:
+    """Polyline codificada de la ruta que sale de o (id denso) por las aristas CSR dadas."""
+    lat, lon, nbr = csr.lat_l, csr.lon_l, csr.nbr_l
+    return encode_polyline([(lat[o], lon[o])] + [(lat[nbr[e]], lon[nbr[e]]) for e in path_edges])
+
+
+def compute_route(csr: CSRGraph, o: int, t: int, algorithm: str = 'astar') -> Optional[Dict[str, Any]]:
+    """
+    Ruta de o a t (ids densos) como {orig, dest, algorithm, polyline, distance_m,
+    duration_s, nodes_explored, time_s}, o None si no existe ruta.
+    """
+    t0 = time.time()
+    cost, path_edges, nodes_explored = shortest_path(csr, o, t, algorithm)
+    if cost == math.inf:
+        return None
+    return {
+        'orig': csr.ids_l[o],
+        'dest': csr.ids_l[t],
+        'algorithm': algorithm,
+        'polyline': route_polyline(csr, o, path_edges),
+        'distance_m': sum(csr.len_l[e] for e in path_edges),
+        'duration_s': cost,
+        'nodes_explored': nodes_explored,
+        'time_s': time.time() - t0,
+    }
@@ -0,0 +1,248 @@
+"""
+Índice espacial de nodos en grilla (grid bucket index)
+
+find_nearest_node recorría todos los nodos calculando haversine por cada click
+(O(V) llamadas de Python). Este índice proyecta las coordenadas a metros con una
+proyección equirectangular local y agrupa los nodos en celdas cuadradas; una
+consulta revisa solo los anillos de celdas alrededor del punto hasta que ninguna
+celda no revisada pueda contener un nodo más cercano.
+
+El índice se guarda como .npz junto a la caché del grafo para no reconstruirlo.
+"""
+import logging
+import math
+import weakref
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .csr import EARTH_RADIUS_M, CSRGraph, array_digest
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 2  # 2: huella SHA-1 de las coordenadas
+NODES_PER_CELL = 4
+# Margen para absorber la diferencia entre la proyección local y haversine
+PROJECTION_SLACK = 0.99
+
+
+def haversine_np(lat1: float, lon1: float, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """Versión vectorizada de haversine_m: distancia en metros de un punto a muchos."""
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    dphi = np.radians(lat2 - lat1)
+    dlambda = np.radians(lon2 - lon1)
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+class GridIndex:
+    """
+    Índice de vecino más cercano sobre una grilla regular en coordenadas proyectadas.
+
+    Los nodos se guardan ordenados por celda (order) con un arreglo de offsets por
+    celda (cell_start), igual que el CSR de aristas.
+    """
+
+    def __init__(
+        self,
+        lat: np.ndarray,
+        lon: np.ndarray,
+        lat0: float,
+        cell_size: float,
+        origin: Tuple[float, float],
+        shape: Tuple[int, int],
+        order: np.ndarray,
+        cell_start: np.ndarray,
+    ):
+        self.lat = lat
+        self.lon = lon
+        self.lat0 = lat0
+        self.cos0 = math.cos(math.radians(lat0))
+        self.cell_size = cell_size
+        self.origin = origin
+        self.shape = shape
+        self.order = order
+        self.cell_start = cell_start
+        self.x, self.y = self._project(lat, lon)
+
+    # -------------------------------------------------------------------------
+    # Construcción y persistencia
+    # -------------------------------------------------------------------------
+    @classmethod
+    def build(cls, lat: np.ndarray, lon: np.ndarray) -> 'GridIndex':
+        """Construye el índice para las coordenadas dadas (indexadas por id denso de nodo)."""
+        lat0 = float(lat.mean()) if len(lat) else 0.0
+        cos0 = math.cos(math.radians(lat0))
+        x = np.radians(lon) * EARTH_RADIUS_M * cos0
+        y = np.radians(lat) * EARTH_RADIUS_M
+        if len(lat) == 0:
+            x0 = y0 = 0.0
+            width = height = 1.0
+        else:
+            x0, y0 = float(x.min()), float(y.min())
+            width, height = max(float(x.max()) - x0, 1.0), max(float(y.max()) - y0, 1.0)
+
+        # Tamaño de celda para ~NODES_PER_CELL nodos por celda en promedio
+        cell_size = max(math.sqrt(width * height * NODES_PER_CELL / max(len(lat), 1)), 1.0)
+        nx_cells = int(width // cell_size) + 1
+        ny_cells = int(height // cell_size) + 1
+
+        cx = ((x - x0) // cell_size).astype(np.int64)
+        cy = ((y - y0) // cell_size).astype(np.int64)
+        cell = cy * nx_cells + cx
+        order = np.argsort(cell, kind='stable')
+        counts = np.bincount(cell, minlength=nx_cells * ny_cells)
+        cell_start = np.zeros(nx_cells * ny_cells + 1, dtype=np.int64)
+        np.cumsum(counts, out=cell_start[1:])
+
+        return cls(lat, lon, lat0, cell_size, (x0, y0), (nx_cells, ny_cells),
+                   order.astype(np.int64), cell_start)
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Guarda el índice en un .npz."""
+        np.savez(
+            path,
+            version=INDEX_VERSION,
+            checksum=_checksum(self.lat, self.lon),
+            lat0=self.lat0,
+            cell_size=self.cell_size,
+            origin=np.asarray(self.origin),
+            shape=np.asarray(self.shape),
+            order=self.order,
+            cell_start=self.cell_start,
+        )
+
+    @classmethod
+    def load(cls, path: Union[str, Path], lat: np.ndarray, lon: np.ndarray) -> Optional['GridIndex']:
+        """Carga el índice desde un .npz; devuelve None si no corresponde a estas coordenadas."""
+        with np.load(path) as data:
+            if int(data['version']) != INDEX_VERSION or str(data['checksum']) != _checksum(lat, lon):
+                return None
+            return cls(
+                lat, lon,
+                lat0=float(data['lat0']),
+                cell_size=float(data['cell_size']),
+                origin=tuple(data['origin'].tolist()),
+                shape=tuple(data['shape'].tolist()),
+                order=data['order'],
+                cell_start=data['cell_start'],
+            )
+
+    # -------------------------------------------------------------------------
+    # Consultas
+    # -------------------------------------------------------------------------
+    def _project(self, lat, lon):
+        return (np.radians(lon) * EARTH_RADIUS_M * self.cos0,
+                np.radians(lat) * EARTH_RADIUS_M)
+
+    def _cells(self, cx0: int, cx1: int, cy0: int, cy1: int) -> np.ndarray:
+        """Nodos contenidos en el rectángulo de celdas [cx0, cx1] x [cy0, cy1] (recortado a la grilla)."""
+        nx_cells, ny_cells = self.shape
+        cx0, cx1 = max(cx0, 0), min(cx1, nx_cells - 1)
+        cy0, cy1 = max(cy0, 0), min(cy1, ny_cells - 1)
+        if cx0 > cx1 or cy0 > cy1:
+            return np.empty(0, dtype=np.int64)
+        chunks = []
+        for cy in range(cy0, cy1 + 1):
+            row = cy * nx_cells
+            a, b = self.cell_start[row + cx0], self.cell_start[row + cx1 + 1]
+            if b > a:
+                chunks.append(self.order[a:b])
+        return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int64)
+
+    def query(self, lat: float, lon: float, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Devuelve (índices, distancias_m) de los k nodos más cercanos, ordenados por distancia haversine.
+        """
+        n = len(self.lat)
+        k = min(k, n)
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        qx, qy = self._project(lat, lon)
+        gx, gy = (qx - self.origin[0]) / self.cell_size, (qy - self.origin[1]) / self.cell_size
+        nx_cells, ny_cells = self.shape
+        if not (0 <= gx < nx_cells and 0 <= gy < ny_cells):
+            # Punto fuera de la grilla: búsqueda exhaustiva vectorizada
+            return self._top_k(lat, lon, np.arange(n), k)
+
+        cx, cy = int(gx), int(gy)
+        # Distancia desde el punto al borde de su celda (en metros)
+        fx, fy = (gx - cx) * self.cell_size, (gy - cy) * self.cell_size
+        edge = min(fx, self.cell_size - fx, fy, self.cell_size - fy)
+        max_ring = max(nx_cells, ny_cells)
+
+        r = 0
+        while True:
+            cand = self._cells(cx - r, cx + r, cy - r, cy + r)
+            # Toda celda fuera del anillo r está al menos a esta distancia
+            bound = (edge + r * self.cell_size) * PROJECTION_SLACK
+            if len(cand) >= k:
+                idx, dist = self._top_k(lat, lon, cand, k)
+                if dist[-1] <= bound or r >= max_ring:
+                    return idx, dist
+            elif r >= max_ring:
+                return self._top_k(lat, lon, cand, len(cand))
+            r += 1
+
+    def _top_k(self, lat: float, lon: float, cand: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        d = haversine_np(lat, lon, self.lat[cand], self.lon[cand])
+        if k < len(cand):
+            part = np.argpartition(d, k - 1)[:k]
+        else:
+            part = np.arange(len(cand))
+        # Orden estable por (distancia, índice) para resultados deterministas
+        sel = part[np.lexsort((cand[part], d[part]))]
+        return cand[sel], d[sel]
+
+    def nearest(self, lat: float, lon: float) -> Optional[int]:
+        """Índice (id denso) del nodo más cercano, o None si el índice está vacío."""
+        idx, _ = self.query(lat, lon, k=1)
+        return int(idx[0]) if len(idx) else None
+
+    def nearest_batch(self, points: Sequence[Tuple[float, float]], k: int = 1) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """k vecinos más cercanos para cada punto (lat, lon)."""
+        return [self.query(lat, lon, k=k) for lat, lon in points]
+
+
+def _checksum(lat: np.ndarray, lon: np.ndarray) -> str:
+    """Huella de las coordenadas para detectar un índice guardado de otro grafo."""
+    return array_digest(lat, lon)
+
+
+_INDEX_CACHE: 'weakref.WeakKeyDictionary[CSRGraph, GridIndex]' = weakref.WeakKeyDictionary()
+
+
+def get_spatial_index(csr: CSRGraph) -> GridIndex:
+    """
+    Devuelve el índice espacial del grafo, construyéndolo una sola vez. Los grafos
+    con pesos parcheados comparten el del grafo original (mismas coordenadas).
+    """
+    index = _INDEX_CACHE.get(csr.base)
+    if index is None:
+        index = GridIndex.build(csr.lat, csr.lon)
+        _INDEX_CACHE[csr.base] = index
+    return index
+
+
+def load_or_build_spatial_index(csr: CSRGraph, path: Union[str, Path]) -> GridIndex:
+    """
+    Carga el índice espacial guardado junto a la caché del grafo, o lo construye y lo guarda.
+    """
+    index = None
+    if Path(path).exists():
+        try:
+            index = GridIndex.load(path, csr.lat, csr.lon)
+        except Exception as e:
+            logger.warning(f"No se pudo leer el índice espacial {path}: {e}")
+        if index is None:
+            logger.info(f"Índice espacial desactualizado, reconstruyendo: {path}")
+    if index is None:
+        index = GridIndex.build(csr.lat, csr.lon)
+        try:
+            index.save(path)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar el índice espacial {path}: {e}")
+    _INDEX_CACHE[csr.base] = index
+    return index
@@ -0,0 +1,288 @@
+"""
+Ejecución de las búsquedas fuera del event loop
+
+Los generadores de búsqueda (dijkstra_stream, astar_stream, ...) son síncronos y
+CPU-intensivos: iterarlos dentro del handler async bloquea el event loop de
+uvicorn y congela al resto de los clientes. Tampoco alcanza con un thread: el
+bucle de relajación retiene el GIL y el event loop, que lo suelta en cada
+syscall, espera hasta sys.getswitchinterval() para recuperarlo cada vez.
+
+Por eso cada búsqueda corre en un proceso worker de un pool acotado, como las
+matrices de matrix.py: los workers se crean con fork y heredan el grafo, la CH y
+los landmarks de solo lectura; por el pipe solo viajan la descripción de la
+consulta y los eventos, en bloques de CHUNK_EVENTS.
+
+- Backpressure: el worker tiene EVENT_QUEUE_SIZE / CHUNK_EVENTS créditos; cada
+  bloque enviado consume uno y el servidor lo devuelve recién cuando consumió el
+  bloque. Si el cliente es lento el worker se detiene: nunca hay más de
+  EVENT_QUEUE_SIZE eventos en vuelo por sesión.
+- Si la sesión se abandona a mitad (cliente desconectado) el worker se termina,
+  así no sigue gastando CPU en una búsqueda que nadie mira.
+
+Con SEARCH_WORKERS=0 las búsquedas se iteran dentro del event loop (modo anterior).
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import stat
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Connection
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SEARCH_WORKERS = int(os.environ.get('SEARCH_WORKERS', str(max(1, min(4, os.cpu_count() or 1)))))
+EVENT_QUEUE_SIZE = 256
+CHUNK_EVENTS = 64
+CHUNK_MS = 20.0  # Un bloque incompleto se envía igual pasado este tiempo
+
+SearchFactory = Callable[[Dict[str, Any]], Iterator[Any]]
+
+_ACK = 'ack'
+
+
+def _close_inherited_sockets(keep: int) -> None:
+    """
+    Cierra en el worker los sockets heredados del servidor (conexiones de clientes,
+    socket de escucha, pipes de otros workers): si el worker los mantuviera
+    abiertos, un WebSocket cerrado por el servidor seguiría abierto a nivel TCP.
+    """
+    try:
+        fds = [int(fd) for fd in os.listdir('/proc/self/fd')]
+    except OSError:
+        fds = list(range(3, 1024))
+    for fd in fds:
+        if fd <= 2 or fd == keep:
+            continue
+        try:
+            if stat.S_ISSOCK(os.fstat(fd).st_mode):
+                os.close(fd)
+        except OSError:
+            pass
+
+
+def _worker_main(conn: Connection, factory: SearchFactory) -> None:
+    """Bucle del proceso worker: recibe consultas y devuelve sus eventos en bloques."""
+    _close_inherited_sockets(conn.fileno())
+    max_credits = max(1, EVENT_QUEUE_SIZE // CHUNK_EVENTS)
+    while True:
+        try:
+            spec = conn.recv()
+        except EOFError:
+            return
+        if not isinstance(spec, dict):
+            continue  # Créditos atrasados de la consulta anterior
+        credits = max_credits
+
+        def send_chunk(chunk: List[Any]) -> None:
+            nonlocal credits
+            while credits == 0:
+                if conn.recv() == _ACK:
+                    credits += 1
+            conn.send(('items', chunk))
+            credits -= 1
+            while conn.poll():
+                if conn.recv() == _ACK:
+                    credits += 1
+
+        gen = None
+        try:
+            gen = factory(spec)
+            chunk: List[Any] = []
+            started = 0.0
+            for item in gen:
+                if not chunk:
+                    started = time.monotonic()
+                chunk.append(item)
+                if len(chunk) >= CHUNK_EVENTS or (time.monotonic() - started) * 1000 >= CHUNK_MS:
+                    send_chunk(chunk)
+                    chunk = []
+            if chunk:
+                send_chunk(chunk)
+            conn.send(('end', None))
+        except Exception as e:
+            try:
+                conn.send(('error', e))
+            except Exception:
+                conn.send(('error', RuntimeError(str(e))))
+        finally:
+            if gen is not None:
+                gen.close()
+
+
+class _Worker:
+    def __init__(self, factory: SearchFactory):
+        # fork: el worker hereda los grafos y preprocesamientos ya cargados. Los locks
+        # que el threadpool del servidor pudiera tener tomados se rehacen en el hijo
+        # (os.register_at_fork en csr.py y regions.py)
+        ctx = multiprocessing.get_context('fork')
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, factory), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class SearchPool:
+    """Pool de procesos de búsqueda asociado a un contexto (grafo, CH, landmarks)."""
+
+    def __init__(self, factory: SearchFactory, context: Tuple[Any, ...], size: int):
+        self.factory = factory
+        self.context = context
+        self.size = size
+        self.idle: List[_Worker] = []
+        self.busy = 0
+        self.closed = False
+        # acquire en espera de un worker, en orden de llegada; release y shutdown los despiertan
+        self._waiters: Deque[asyncio.Future] = deque()
+        # Un thread por worker espera sus mensajes en el pipe (bloqueado en E/S,
+        # sin retener el GIL), así el event loop no depende de add_reader
+        self.readers = ThreadPoolExecutor(max_workers=max(1, size), thread_name_prefix='search-pipe')
+
+    def matches(self, factory: SearchFactory, context: Tuple[Any, ...]) -> bool:
+        return factory is self.factory and len(context) == len(self.context) and \
+            all(a is b for a, b in zip(context, self.context))
+
+    async def acquire(self) -> Optional[_Worker]:
+        """Worker libre (esperando si están todos ocupados), o None si el pool se cerró mientras tanto."""
+        # Cada espera es un future de su propio event loop y no un asyncio.Condition:
+        # el pool sobrevive a distintos event loops (tests, reinicios) y una
+        # Condition queda atada al primero que la usa
+        while not self.closed and not self.idle and self.busy >= self.size:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self._wake()  # Lo despertaron justo antes de cancelarlo: el turno pasa al siguiente
+                raise
+        if self.closed:
+            return None  # Un pool cerrado no crea workers: sus threads lectores ya pueden estar liberados
+        self.busy += 1
+        if self.idle:
+            return self.idle.pop()
+        try:
+            return _Worker(self.factory)
+        except Exception:
+            self.busy -= 1
+            raise
+
+    def release(self, worker: _Worker, reusable: bool) -> None:
+        self.busy -= 1
+        if reusable and not self.closed:
+            self.idle.append(worker)
+        else:
+            worker.kill()
+        if self.closed and self.busy == 0:
+            self.readers.shutdown(wait=False)
+        self._wake()
+
+    def _wake(self, everyone: bool = False) -> None:
+        """Despierta al primer acquire en espera (a todos con everyone), desde el event loop de cada uno."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.get_loop().call_soon_threadsafe(self._set_woken, waiter)
+                if not everyone:
+                    return
+
+    def _set_woken(self, waiter: asyncio.Future) -> None:
+        if waiter.done():
+            self._wake()  # Se canceló mientras tanto: el turno pasa al siguiente
+        else:
+            waiter.set_result(None)
+
+    def shutdown(self) -> None:
+        # Las búsquedas en curso (p. ej. al reemplazarse el grafo por un parche)
+        # terminan con sus workers; los threads lectores se liberan con la última
+        self.closed = True
+        for worker in self.idle:
+            worker.kill()
+        self.idle.clear()
+        if self.busy == 0:
+            self.readers.shutdown(wait=False)
+        # Los que esperaban un worker reciben None y pasan al pool que lo reemplace
+        self._wake(everyone=True)
+
+
+# Un pool por clave (la región del grafo, ver regions.py): alternar entre regiones no recrea los workers
+_POOLS: Dict[Any, SearchPool] = {}
+
+
+def _get_pool(factory: SearchFactory, context: Tuple[Any, ...], key: Any = None) -> SearchPool:
+    """Pool para el contexto dado; se recrea si cambió el grafo, la CH o los landmarks."""
+    pool = _POOLS.get(key)
+    if pool is None or not pool.matches(factory, context):
+        if pool is not None:
+            pool.shutdown()
+        pool = _POOLS[key] = SearchPool(factory, context, SEARCH_WORKERS)
+    return pool
+
+
+def shutdown_search_pool(*keys: Any) -> None:
+    """
+    Termina los workers de búsqueda de los pools keys (p. ej. al desalojar una
+    región) o, sin argumentos, los de todos (al apagar el servidor).
+    """
+    for key in keys or list(_POOLS):
+        pool = _POOLS.pop(key, None)
+        if pool is not None:
+            pool.shutdown()
+
+
+async def stream_search(
+    factory: SearchFactory,
+    spec: Dict[str, Any],
+    context: Tuple[Any, ...] = (),
+    pool_key: Any = None,
+) -> AsyncIterator[Any]:
+    """
+    Itera factory(spec) en un worker y entrega sus items. context son los objetos
+    de los que depende factory: si cambian, los workers se vuelven a crear.
+    Cada pool_key tiene su propio pool de workers.
+    """
+    if SEARCH_WORKERS <= 0:
+        gen = factory(spec)
+        try:
+            for item in gen:
+                yield item
+        finally:
+            gen.close()
+        return
+
+    pool = _get_pool(factory, context, pool_key)
+    worker = await pool.acquire()
+    while worker is None:
+        # El pool se reemplazó (parche, desalojo) mientras se esperaba un worker: se
+        # usa el vigente de la región, sin volver a crear uno con el contexto viejo
+        pool = _POOLS.get(pool_key) or _get_pool(factory, context, pool_key)
+        worker = await pool.acquire()
+    loop = asyncio.get_running_loop()
+    finished = False
+    try:
+        worker.conn.send(spec)
+        while True:
+            try:
+                kind, value = await loop.run_in_executor(pool.readers, worker.conn.recv)
+            except (EOFError, OSError):
+                kind, value = 'error', RuntimeError('El worker de búsqueda terminó inesperadamente')
+            if kind == 'end':
+                finished = True
+                break
+            if kind == 'error':
+                finished = True
+                raise value
+            for item in value:
+                yield item
+            worker.conn.send(_ACK)
+    finally:
+        # Un worker abandonado a mitad de búsqueda se termina en lugar de esperarlo
+        pool.release(worker, reusable=finished and worker.process.is_alive())
@@ -0,0 +1,203 @@
+"""
+Redes viales sintéticas para pruebas de carga y de escala, sin acceso a OSM
+
+load_or_download_graph necesita red si no hay caché; este generador arma una red
+con aspecto de ciudad de cualquier tamaño (de 10k a millones de nodos) con los
+mismos atributos que el grafo de osmnx (x, y, weight, length, speed_kph), así que
+pasa por el mismo camino de carga:
+
+- grilla de manzanas con las esquinas desplazadas al azar (jitter)
+- jerarquía de calles por línea: autopistas cada HIGHWAY_EVERY filas / columnas
+  (y el borde, como avenida de circunvalación), avenidas cada ARTERIAL_EVERY,
+  ambas doble mano, y calles locales de 30 o 40 km/h
+- calles locales de mano única (oneway_ratio) con sentidos alternados entre
+  líneas vecinas, como en un damero real: la red sigue siendo fuertemente conexa
+- algunas cuadras locales doble mano eliminadas (dropout) para romper la grilla
+- length = distancia haversine entre las esquinas por un factor de sinuosidad
+  >= 1, así que la heurística de A* (haversine / velocidad máxima) es admisible
+
+Todo se genera con NumPy: SyntheticNetwork.to_csr arma el CSRGraph sin pasar por
+networkx (para los tamaños grandes) y to_networkx el MultiDiGraph equivalente.
+
+Uso (desde backend/):
+    python -m app.synthetic 200000 graph_cache_sintetica.pkl    # pickle, como la caché de osmnx
+    python -m app.synthetic 2000000 graph_cache_sintetica.graph  # formato CSR en disco (graph_store.py)
+"""
+import math
+from typing import Tuple
+
+import networkx as nx
+import numpy as np
+
+from .csr import EARTH_RADIUS_M, CSRGraph
+
+LAT0, LON0 = -27.47, -58.83  # Esquina suroeste (Corrientes)
+BLOCK_M = 100.0
+HIGHWAY_EVERY = 50
+ARTERIAL_EVERY = 10
+HIGHWAY_KPH, ARTERIAL_KPH = 80.0, 60.0
+LOCAL_KPH = (30.0, 40.0)
+MAX_SINUOSITY = 1.15
+
+
+class SyntheticNetwork:
+    """
+    Red sintética en arreglos: lat / lon por nodo (ids 0..n-1) y, por arista
+    dirigida, u, v, length (m) y speed_kph. El orden de las aristas es el de
+    inserción en to_networkx, así que to_csr coincide con CSRGraph.from_networkx.
+    """
+
+    def __init__(self, lat: np.ndarray, lon: np.ndarray, u: np.ndarray, v: np.ndarray,
+                 length: np.ndarray, speed_kph: np.ndarray):
+        self.lat = lat
+        self.lon = lon
+        self.u = u
+        self.v = v
+        self.length = length
+        self.speed_kph = speed_kph
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.lat)
+
+    @property
+    def n_edges(self) -> int:
+        return len(self.u)
+
+    @property
+    def weight(self) -> np.ndarray:
+        """Segundos para recorrer cada arista, como en load_or_download_graph."""
+        return self.length / (self.speed_kph / 3.6)
+
+    def to_networkx(self) -> nx.MultiDiGraph:
+        """MultiDiGraph con los atributos del grafo de osmnx que usa el servidor."""
+        G = nx.MultiDiGraph()
+        G.add_nodes_from((i, {'x': x, 'y': y}) for i, (y, x) in enumerate(zip(self.lat.tolist(), self.lon.tolist())))
+        G.add_edges_from(
+            (u, v, {'length': length, 'speed_kph': speed, 'weight': w})
+            for u, v, length, speed, w in zip(self.u.tolist(), self.v.tolist(), self.length.tolist(),
+                                              self.speed_kph.tolist(), self.weight.tolist())
+        )
+        return G
+
+    def to_csr(self) -> CSRGraph:
+        """CSRGraph directo desde los arreglos (igual a CSRGraph.from_networkx(self.to_networkx()))."""
+        order = np.argsort(self.u, kind='stable')
+        offsets = np.zeros(self.n_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.u, minlength=self.n_nodes), out=offsets[1:])
+        return CSRGraph(
+            node_ids=np.arange(self.n_nodes, dtype=np.int64),
+            lat=self.lat,
+            lon=self.lon,
+            offsets=offsets,
+            neighbors=self.v[order].astype(np.int32),
+            weights=self.weight[order],
+            lengths=self.length[order],
+            keys=np.zeros(self.n_edges, dtype=np.int64),
+            max_speed=float(self.speed_kph.max()) / 3.6,
+        )
+
+
+def _grid_shape(n_nodes: int) -> Tuple[int, int]:
+    """Filas y columnas de una grilla casi cuadrada con al menos n_nodes esquinas."""
+    rows = max(2, int(math.sqrt(n_nodes)))
+    return rows, max(2, -(-n_nodes // rows))
+
+
+def _line_classes(n: int, oneway_ratio: float, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Velocidad (km/h) y sentido de cada línea de la grilla: +1 / -1 mano única,
+    0 doble mano. Las líneas de mano única alternan el sentido.
+    """
+    idx = np.arange(n)
+    speed = rng.choice(LOCAL_KPH, size=n)
+    direction = np.where(rng.random(n) < oneway_ratio, np.where(idx % 2 == 0, 1, -1), 0)
+    arterial = idx % ARTERIAL_EVERY == 0
+    highway = (idx % HIGHWAY_EVERY == 0) | (idx == n - 1)
+    speed[arterial] = ARTERIAL_KPH
+    speed[highway] = HIGHWAY_KPH
+    direction[arterial | highway] = 0
+    return speed, direction
+
+
+def _haversine(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    a = np.sin((phi2 - phi1) / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(np.radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+def generate_road_network(
+    n_nodes: int,
+    seed: int = 0,
+    block_m: float = BLOCK_M,
+    jitter: float = 0.25,
+    oneway_ratio: float = 0.5,
+    dropout: float = 0.05,
+) -> SyntheticNetwork:
+    """
+    Red con aspecto de ciudad de (al menos) n_nodes esquinas. jitter es el
+    desplazamiento máximo de cada esquina como fracción de la cuadra, oneway_ratio
+    la fracción de calles locales de mano única y dropout la de cuadras locales
+    doble mano eliminadas. Misma semilla, misma red.
+    """
+    rng = np.random.default_rng(seed)
+    rows, cols = _grid_shape(n_nodes)
+    dlat = block_m / 111_320.0
+    dlon = block_m / (111_320.0 * math.cos(math.radians(LAT0)))
+    r, c = np.divmod(np.arange(rows * cols), cols)
+    lat = LAT0 + (r + rng.uniform(-jitter, jitter, rows * cols)) * dlat
+    lon = LON0 + (c + rng.uniform(-jitter, jitter, rows * cols)) * dlon
+
+    row_speed, row_dir = _line_classes(rows, oneway_ratio, rng)
+    col_speed, col_dir = _line_classes(cols, oneway_ratio, rng)
+    # Cuadras horizontales (a lo largo de una fila) y verticales (a lo largo de una columna)
+    hr, hc = np.divmod(np.arange(rows * (cols - 1)), cols - 1)
+    h_from, h_speed, h_dir = hr * cols + hc, row_speed[hr], row_dir[hr]
+    vr, vc = np.divmod(np.arange((rows - 1) * cols), cols)
+    v_from, v_speed, v_dir = vr * cols + vc, col_speed[vc], col_dir[vc]
+    a = np.concatenate([h_from, v_from])
+    b = np.concatenate([h_from + 1, v_from + cols])
+    speed = np.concatenate([h_speed, v_speed])
+    direction = np.concatenate([h_dir, v_dir])
+
+    local_two_way = (direction == 0) & (speed < ARTERIAL_KPH)
+    keep = ~(local_two_way & (rng.random(len(a)) < dropout))
+    a, b, speed, direction = a[keep], b[keep], speed[keep], direction[keep]
+    length = _haversine(lat[a], lon[a], lat[b], lon[b]) * rng.uniform(1.0, MAX_SINUOSITY, len(a))
+
+    forward, backward = direction >= 0, direction <= 0
+    return SyntheticNetwork(
+        lat=lat,
+        lon=lon,
+        u=np.concatenate([a[forward], b[backward]]).astype(np.int64),
+        v=np.concatenate([b[forward], a[backward]]).astype(np.int64),
+        length=np.concatenate([length[forward], length[backward]]),
+        speed_kph=np.concatenate([speed[forward], speed[backward]]).astype(np.float64),
+    )
+
+
+def make_road_graph(n_nodes: int, seed: int = 0, **kwargs) -> nx.MultiDiGraph:
+    """generate_road_network(...).to_networkx(): el MultiDiGraph listo para el servidor."""
+    return generate_road_network(n_nodes, seed, **kwargs).to_networkx()
+
+
+if __name__ == '__main__':
+    # Generación offline (desde backend/): python -m app.synthetic NODOS destino.pkl|destino.graph [semilla]
+    import pickle
+    import sys
+    import time
+    from pathlib import Path
+
+    from .graph_store import save_graph
+
+    n, out = int(sys.argv[1]), Path(sys.argv[2])
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    t0 = time.time()
+    network = generate_road_network(n, seed)
+    print(f"Red sintética: {network.n_nodes} nodos, {network.n_edges} aristas en {time.time() - t0:.1f}s")
+    if out.suffix == '.graph':
+        save_graph(network.to_csr(), out, meta={'place': 'sintética', 'nodes': n, 'seed': seed})
+    else:
+        with open(out, 'wb') as f:
+            pickle.dump(network.to_networkx(), f)
+    print(f"Guardada en {out}")
@@ -68,3 +68,67 @@ def test_reconstruct_path():
     assert len(path_edges) > 0, "Debe haber aristas en la ruta"
     assert distance >= 0, "La distancia debe ser no negativa"
 
+
+
+def test_bidirectional_matches_dijkstra():
+    """Test que Dijkstra y A* bidireccionales encuentran rutas del mismo costo que Dijkstra"""
+    import math
+    import random
+    from app.csr import get_csr
+    from app.main import bidirectional_stream
+    from app.main import haversine_m
+
+    # Grafo con longitudes >= distancia en línea recta, para que la heurística sea admisible
+    rng = random.Random(21)
+    G = nx.MultiDiGraph()
+    for i in range(150):
+        G.add_node(i, x=-58.83 + rng.uniform(0, 0.05), y=-27.47 + rng.uniform(0, 0.05))
+    for _ in range(600):
+        u, v = rng.randrange(150), rng.randrange(150)
+        speed = rng.choice([30, 40, 60])
+        length = haversine_m(G.nodes[u]['y'], G.nodes[u]['x'], G.nodes[v]['y'], G.nodes[v]['x']) * rng.uniform(1, 1.5)
+        G.add_edge(u, v, length=length, weight=length / (speed / 3.6), speed_kph=speed)
+    csr = get_csr(G)
+
+    def route_cost(events):
+        return sum(csr.w_l[csr.best_edge(csr.index[e['u']], csr.index[e['v']])]
+                   for e in events if e['type'] == 'path')
+
+    nodes = list(G.nodes)
+    for _ in range(40):
+        orig, dest = rng.choice(nodes), rng.choice(nodes)
+        expected = route_cost(dijkstra_stream(G, orig, dest))
+        for heuristic in (False, True):
+            events = list(bidirectional_stream(G, orig, dest, heuristic=heuristic))
+            assert events[-1]['type'] == 'done'
+            assert math.isclose(route_cost(events), expected, abs_tol=1e-9)
+            path = [e for e in events if e['type'] == 'path']
+            if path:
+                assert path[0]['u'] == orig and path[-1]['v'] == dest
+            assert all(e['direction'] in ('forward', 'backward') for e in events if e['type'] == 'visited')
+
+
+def test_bench_suite_report():
+    """Test que la suite de benchmarks usa consultas reproducibles y arma un reporte comparable"""
+    from benchmarks.bench_suite import compare_reports, run_suite
+    from benchmarks.common import bucketed_pairs, make_grid_graph
+    from app.csr import get_csr
+
+    G = make_grid_graph(side=20)
+    csr = get_csr(G)
+    assert bucketed_pairs(csr, 3, seed=1) == bucketed_pairs(csr, 3, seed=1)
+    # La grilla mide 2 km: no hay pares de más de 5 km y el rango queda vacío
+    assert bucketed_pairs(csr, 3)['larga'] == []
+
+    report = run_suite(G, n_queries=2, repeat=1)
+    assert set(report['results']) == {'dijkstra', 'astar'}
+    for modes in report['results'].values():
+        assert set(modes) == {'events', 'silent'}
+        for buckets in modes.values():
+            assert set(buckets) == {'corta', 'media'}
+            for r in buckets.values():
+                assert r['queries'] == 2 and r['p50_ms'] <= r['p95_ms'] and r['peak_memory_kb'] > 0
+    # Mismas consultas en ambos modos: mismos nodos explorados
+    dijkstra = report['results']['dijkstra']
+    assert dijkstra['events']['media']['nodes_explored_mean'] == dijkstra['silent']['media']['nodes_explored_mean']
+    assert len(compare_reports(report, report)) == 2 * 2 * 2
@@ -0,0 +1,45 @@
+"""
+Tests de la heurística ALT (landmarks)
+"""
+import math
+import random
+
+from app.alt import LandmarkTables, load_or_build_landmarks
+from app.csr import dijkstra_all, get_csr
+from app.main import astar_stream, dijkstra_stream
+from app.tests.test_csr import make_random_graph
+
+
+def test_alt_heuristic_is_admissible():
+    """Test que h(v) nunca sobreestima el costo real hasta el destino"""
+    G = make_random_graph(n=120, m=480, seed=4)
+    csr = get_csr(G)
+    tables = LandmarkTables.build(csr, n_landmarks=6)
+    rng = random.Random(0)
+    for _ in range(10):
+        s, t = rng.randrange(csr.n_nodes), rng.randrange(csr.n_nodes)
+        h = tables.heuristic(t, s=s)
+        to_t = dijkstra_all(csr, [t], reverse=True)
+        for v in range(csr.n_nodes):
+            if to_t[v] < math.inf:
+                assert h(v) <= to_t[v] + 1e-9
+
+
+def test_alt_stream_finds_optimal_route(tmp_path):
+    """Test que A* con ALT encuentra rutas de igual costo que Dijkstra"""
+    G = make_random_graph(n=120, m=480, seed=4)
+    csr = get_csr(G)
+    tables = load_or_build_landmarks(csr, tmp_path / 'graph.alt.npz')
+    assert LandmarkTables.load(tmp_path / 'graph.alt.npz', csr) is not None
+
+    def route_cost(events):
+        return sum(csr.w_l[csr.best_edge(csr.index[e['u']], csr.index[e['v']])]
+                   for e in events if e['type'] == 'path')
+
+    rng = random.Random(9)
+    nodes = list(G.nodes)
+    for _ in range(30):
+        orig, dest = rng.choice(nodes), rng.choice(nodes)
+        alt_events = list(astar_stream(G, orig, dest, landmarks=tables))
+        assert alt_events[0]['algorithm'] == 'alt'
+        assert math.isclose(route_cost(alt_events), route_cost(dijkstra_stream(G, orig, dest)), abs_tol=1e-9)
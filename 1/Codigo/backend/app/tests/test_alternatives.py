@@ -0,0 +1,85 @@
+"""
+Tests de las rutas alternativas (método de plateaus)
+"""
+import math
+import random
+
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.alternatives import MAX_OVERLAP, MAX_STRETCH, alternative_routes
+from app.csr import get_csr
+from app.route_cache import RouteCache
+from app.tests.test_ch import dijkstra_cost
+from benchmarks.common import make_grid_graph
+
+
+def check_route(csr, s, t, route):
+    """La ruta es un camino de s a t sin nodos repetidos y su costo es la suma de los pesos"""
+    et = csr.edge_table()
+    nodes = [s]
+    for e in route.edges:
+        assert et.source[e] == nodes[-1]
+        nodes.append(csr.nbr_l[e])
+    assert nodes[-1] == t and len(set(nodes)) == len(nodes)
+    assert math.isclose(route.cost, sum(csr.w_l[e] for e in route.edges), rel_tol=1e-9)
+
+
+def test_alternatives_are_valid_and_different():
+    """Test que la primera ruta es la óptima y las demás cumplen los límites de costo y superposición"""
+    csr = get_csr(make_grid_graph(12, seed=2))
+    rng = random.Random(4)
+    total = 0
+    for _ in range(20):
+        s, t = rng.randrange(csr.n_nodes), rng.randrange(csr.n_nodes)
+        routes, settled, relaxed = alternative_routes(csr, s, t, k=4)
+        assert 1 <= len(routes) <= 4 and settled > 0 and relaxed
+        assert math.isclose(routes[0].cost, dijkstra_cost(csr, s, t), rel_tol=1e-9)
+        for i, route in enumerate(routes):
+            check_route(csr, s, t, route)
+            assert route.cost <= routes[0].cost * MAX_STRETCH + 1e-9
+            for other in routes[:i]:
+                shared = sum(csr.w_l[e] for e in set(route.edges) & set(other.edges))
+                assert shared <= MAX_OVERLAP * route.cost + 1e-9
+        total += len(routes)
+        # k=1 es la ruta óptima sola
+        assert [r.edges for r in alternative_routes(csr, s, t, k=1, collect=False)[0]] == [routes[0].edges]
+    assert total > 20, "En una grilla debería haber alternativas para la mayoría de los pares"
+
+
+def test_alternatives_unreachable():
+    """Test que sin camino no hay rutas"""
+    G = make_grid_graph(5)
+    G.add_node(10**9, x=-58.0, y=-27.0)
+    csr = get_csr(G)
+    routes, _, _ = alternative_routes(csr, 0, csr.index[10**9], k=3)
+    assert routes == []
+
+
+def test_ws_alternatives(monkeypatch):
+    """Test del modo 'alternatives' de /ws/run: route_index en los 'path' y resumen en 'done'"""
+    G = make_grid_graph(10, seed=1)
+    nodes = sorted(G.nodes)
+    monkeypatch.setattr(main, 'GRAPH', G)
+    monkeypatch.setattr(main, 'ROUTE_CACHE', RouteCache(maxsize=8))
+    client = TestClient(main.app)
+
+    def events(params):
+        msg = {'alg': 'alternatives', 'orig': nodes[0], 'dest': nodes[-1], 'params': {'speed': 100, **params}}
+        received = []
+        with client.websocket_connect('/ws/run') as ws:
+            ws.send_json(msg)
+            while not received or received[-1]['type'] not in ('done', 'error'):
+                received.append(ws.receive_json())
+        return received
+
+    received = events({'routes': 3, 'result_only': True})
+    done = received[-1]
+    assert done['type'] == 'done'
+    indexes = {e['route_index'] for e in received if e['type'] == 'path'}
+    assert indexes == {r['route_index'] for r in done['routes']} and 0 in indexes and len(indexes) <= 3
+    costs = [r['cost_s'] for r in done['routes']]
+    assert costs == sorted(costs) and done['distance_km'] == done['routes'][0]['distance_km']
+
+    assert events({'routes': 0})[-1]['type'] == 'error'
+    assert events({'routes': 6})[-1]['type'] == 'error'
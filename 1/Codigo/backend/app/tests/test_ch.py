@@ -0,0 +1,60 @@
+"""
+Tests de Contraction Hierarchies
+"""
+import math
+import random
+
+from app.ch import ContractionHierarchy, ch_query, load_or_build_ch
+from app.csr import get_csr
+from app.main import ch_stream, dijkstra_stream
+from app.tests.test_csr import make_random_graph
+
+
+def dijkstra_cost(csr, s, t):
+    """Costo óptimo de referencia (suma de pesos de la ruta de dijkstra_stream)."""
+    events = list(dijkstra_stream(csr, csr.ids_l[s], csr.ids_l[t]))
+    if s != t and not any(e['type'] == 'path' for e in events):
+        return math.inf
+    return sum(csr.w_l[csr.best_edge(csr.index[e['u']], csr.index[e['v']])]
+               for e in events if e['type'] == 'path')
+
+
+def test_ch_query_matches_dijkstra():
+    """Test que CH encuentra rutas del mismo costo que Dijkstra y con aristas contiguas"""
+    G = make_random_graph(n=150, m=500, seed=11)
+    csr = get_csr(G)
+    ch = ContractionHierarchy.build(csr)
+    rng = random.Random(5)
+    for _ in range(100):
+        s, t = rng.randrange(csr.n_nodes), rng.randrange(csr.n_nodes)
+        cost, path, _, _ = ch_query(ch, s, t)
+        expected = dijkstra_cost(csr, s, t)
+        if expected == math.inf:
+            assert cost == math.inf and path == []
+            continue
+        assert math.isclose(cost, expected, rel_tol=1e-9, abs_tol=1e-9)
+        assert math.isclose(sum(csr.w_l[e] for e in path), cost, rel_tol=1e-9, abs_tol=1e-9)
+        node = s
+        for e in path:
+            assert csr.off_l[node] <= e < csr.off_l[node + 1], "Las aristas de la ruta deben ser contiguas"
+            node = csr.nbr_l[e]
+        assert node == t
+
+
+def test_ch_persistence_and_stream(tmp_path):
+    """Test de guardado/carga de la CH y de los eventos emitidos por ch_stream"""
+    G = make_random_graph(n=80, m=300, seed=2)
+    csr = get_csr(G)
+    path = tmp_path / 'graph.ch.npz'
+    assert load_or_build_ch(csr, path, build=False) is None
+    built = load_or_build_ch(csr, path)
+    loaded = load_or_build_ch(csr, path, build=False)
+    assert loaded is not None and loaded.n_shortcuts == built.n_shortcuts
+
+    orig, dest = csr.ids_l[0], csr.ids_l[-1]
+    events = list(ch_stream(G, loaded, orig, dest))
+    assert events[0]['algorithm'] == 'ch'
+    assert events[-1]['type'] == 'done'
+    path = [e for e in events if e['type'] == 'path']
+    assert path and path[0]['u'] == orig and path[-1]['v'] == dest
+    assert all(a['v'] == b['u'] for a, b in zip(path, path[1:]))
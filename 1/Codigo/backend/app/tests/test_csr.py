@@ -0,0 +1,137 @@
+"""
+Tests de la representación CSR y de su equivalencia con la versión sobre networkx
+"""
+import random
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from app.csr import CSRGraph, get_csr
+from app.main import astar_stream, compute_max_speed, dijkstra_stream, haversine_m
+from app.nx_search import astar_stream_nx, dijkstra_stream_nx
+
+
+def make_random_graph(n=60, m=240, seed=7, exact=True):
+    """
+    Crea un grafo aleatorio con aristas paralelas y pesos repetidos (para ejercitar desempates).
+    Con exact=False las longitudes son flotantes cualesquiera, cuyas sumas redondean.
+    """
+    rng = random.Random(seed)
+    G = nx.MultiDiGraph()
+    for i in range(n):
+        G.add_node(1000 - i, x=-58.83 + rng.uniform(0, 0.05), y=-27.47 + rng.uniform(0, 0.05))
+    nodes = list(G.nodes)
+    for _ in range(m):
+        u, v = rng.choice(nodes), rng.choice(nodes)
+        length = rng.choice([100.0, 200.0, 300.0]) if exact else rng.uniform(20.0, 400.0)
+        G.add_edge(u, v, length=length, weight=length / 10.0, speed_kph=36)
+    return G
+
+
+def strip_time(events):
+    return [{k: v for k, v in e.items() if k != 'time_s'} for e in events]
+
+
+def test_csr_structure():
+    """Test que el CSR conserva nodos, aristas y orden de ids"""
+    G = make_random_graph()
+    csr = CSRGraph.from_networkx(G)
+
+    assert csr.n_nodes == len(G.nodes)
+    assert csr.n_edges == len(G.edges)
+    assert csr.ids_l == sorted(G.nodes)
+    assert get_csr(G) is get_csr(G), "El CSR debe construirse una sola vez por grafo"
+
+
+def test_csr_streams_match_networkx():
+    """Test que Dijkstra y A* sobre CSR emiten exactamente los mismos eventos"""
+    rng = random.Random(1)
+    # Pesos repetidos (desempates) y pesos flotantes que no se recuperan restando sumas
+    for G in (make_random_graph(), make_random_graph(n=300, m=1200, seed=11, exact=False)):
+        nodes = list(G.nodes)
+        for _ in range(20):
+            orig, dest = rng.choice(nodes), rng.choice(nodes)
+            for decimate in (1, 3):
+                assert strip_time(dijkstra_stream(G, orig, dest, decimate=decimate)) == \
+                    strip_time(dijkstra_stream_nx(G, orig, dest, decimate=decimate))
+                assert strip_time(astar_stream(G, orig, dest, decimate=decimate)) == \
+                    strip_time(astar_stream_nx(G, orig, dest, decimate=decimate))
+
+
+def test_search_buffers_reused_without_stale_state():
+    """Test que los buffers reutilizados no arrastran estado de la consulta anterior"""
+    G = make_random_graph()
+    G.add_node(1, x=-58.8, y=-27.46)  # Nodo aislado: inalcanzable
+    nodes = sorted(G.nodes)
+    list(dijkstra_stream(G, nodes[-1], nodes[1]))
+
+    # Generador abandonado a mitad de camino: al cerrarse devuelve sus buffers
+    gen = astar_stream(G, nodes[-1], nodes[2])
+    next(gen)
+    gen.close()
+    assert len(get_csr(G)._free_buffers) == 1
+
+    for stream in (dijkstra_stream, astar_stream):
+        events = list(stream(G, nodes[-1], 1))
+        assert not [e for e in events if e['type'] == 'path']
+        assert events[-1]['distance_km'] == 0.0
+
+
+def test_edge_table_and_cached_edge_sample(monkeypatch):
+    """Test que la tabla de aristas coincide con el grafo y que /api/edges-sample se cachea por decimate"""
+    from fastapi.testclient import TestClient
+    import app.main as main
+
+    G = make_random_graph()
+    csr = get_csr(G)
+    et = csr.edge_table()
+    assert csr.edge_table() is et
+    for e in range(csr.n_edges):
+        u, v = int(et.source[e]), csr.nbr_l[e]
+        assert et.edge_id_l[e] == f"{csr.ids_l[u]}|{csr.ids_l[v]}|{csr.keys_l[e]}"
+        assert et.coords_l[e] == [[csr.lat_l[u], csr.lon_l[u]], [csr.lat_l[v], csr.lon_l[v]]]
+    assert {f"{u}|{v}|{k}" for u, v, k in G.edges(keys=True)} == set(et.edge_id_l)
+
+    monkeypatch.setattr(main, 'GRAPH', G)
+    monkeypatch.setattr(main, '_EDGE_SAMPLE_CACHE', {})
+    client = TestClient(main.app)
+    first = client.get('/api/edges-sample', params={'decimate': 3}).json()['edges']
+    assert len(first) == len(range(0, csr.n_edges, 3))
+    assert client.get('/api/edges-sample', params={'decimate': 3}).json()['edges'] == first
+    assert list(main._EDGE_SAMPLE_CACHE) == [(main.graph_version(), 3)]
+
+
+def test_node_geometry_heuristic():
+    """Test que la heurística precalculada coincide con haversine / velocidad máxima, escalar y por lotes"""
+    G = make_random_graph()
+    csr = get_csr(G)
+    geometry = csr.geometry()
+    assert csr.geometry() is geometry
+    assert csr.max_speed == pytest.approx(compute_max_speed(G)) == pytest.approx(10.0)
+    t = 5
+    expected = np.array([haversine_m(csr.lat_l[v], csr.lon_l[v], csr.lat_l[t], csr.lon_l[t])
+                         for v in range(csr.n_nodes)]) / csr.max_speed
+    h = geometry.heuristic(t, csr.max_speed)
+    assert [h(v) for v in range(csr.n_nodes)] == pytest.approx(expected, rel=1e-9, abs=1e-9)
+    assert h(t) == 0.0
+    # Lote de vecinos de un nodo, como en una expansión
+    u = 3
+    batch = csr.neighbors[csr.off_l[u]:csr.off_l[u + 1]]
+    np.testing.assert_allclose(geometry.heuristic_batch(batch, t, csr.max_speed), expected[batch], rtol=1e-9)
+
+
+def test_fingerprint_detects_permuted_weights_and_topology():
+    """Test que la huella cambia al permutar pesos o cambiar un destino, aunque las sumas coincidan"""
+    def make(weights, v=2):
+        G = nx.MultiDiGraph()
+        for i in range(3):
+            G.add_node(i, x=-58.83 + 0.001 * i, y=-27.47)
+        G.add_edge(0, 1, length=100.0, weight=weights[0], speed_kph=36)
+        G.add_edge(1, v, length=100.0, weight=weights[1], speed_kph=36)
+        return CSRGraph.from_networkx(G)
+
+    base = make([5.0, 50.0])
+    assert base.fingerprint() == make([5.0, 50.0]).fingerprint()
+    assert base.fingerprint() != make([50.0, 5.0]).fingerprint()
+    assert base.fingerprint() != make([5.0, 50.0], v=0).fingerprint()
@@ -0,0 +1,102 @@
+"""
+Tests de la búsqueda de la fuente más cercana (muchos-a-uno, grafo inverso)
+"""
+import math
+import random
+
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.csr import dijkstra_all, get_csr
+from app.facilities import nearest_sources
+from app.route_cache import RouteCache
+from app.routing import decode_polyline
+from app.tests.test_traffic import make_geometric_graph
+
+
+def test_nearest_sources_match_per_source_dijkstra():
+    """Test que los k mejores candidatos y sus costos coinciden con una búsqueda por candidato"""
+    csr = get_csr(make_geometric_graph(n=200, m=800, seed=5))
+    rng = random.Random(3)
+    for _ in range(10):
+        t = rng.randrange(csr.n_nodes)
+        sources = rng.sample(range(csr.n_nodes), 15)
+        to_t = dijkstra_all(csr, [t], reverse=True)
+        expected = sorted((to_t[s], s) for s in sources if to_t[s] != math.inf)
+
+        routes, settled = nearest_sources(csr, sources + sources[:3], t, k=5)
+        assert len(routes) == min(5, len(expected))
+        assert all(math.isclose(r.cost, c) for r, (c, _) in zip(routes, expected))
+        assert 0 < settled <= csr.n_nodes
+        for r in routes:
+            # La ruta va del candidato al destino y su costo es la suma de los pesos
+            node = r.source
+            for e in r.edges:
+                assert csr.edge_table().source[e] == node
+                node = csr.nbr_l[e]
+            assert node == t
+            assert math.isclose(r.cost, sum(csr.w_l[e] for e in r.edges), abs_tol=1e-9)
+
+        # Con k=1 la búsqueda se detiene antes
+        best, fewer = nearest_sources(csr, sources, t, k=1)
+        assert best[0].cost == routes[0].cost and fewer <= settled
+
+    # El destino como candidato gana con costo 0 y ruta vacía
+    routes, _ = nearest_sources(csr, [7, 3], 3, k=2)
+    assert routes[0].source == 3 and routes[0].cost == 0 and routes[0].edges == []
+
+
+def test_nearest_source_endpoints(monkeypatch):
+    """Test de /api/nearest-source y del modo 'nearest' de /ws/run"""
+    G = make_geometric_graph(n=200, m=800, seed=5)
+    csr = get_csr(G)
+    monkeypatch.setattr(main, 'GRAPH', G)
+    monkeypatch.setattr(main, 'ROUTE_CACHE', RouteCache(maxsize=8))
+    client = TestClient(main.app)
+    sources, dest = [csr.ids_l[i] for i in (10, 50, 90, 130)], csr.ids_l[170]
+
+    resp = client.post('/api/nearest-source', json={'sources': sources, 'dest': dest, 'k': 3})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body['source'] == body['sources'][0]['source'] and len(body['sources']) == 3
+    durations = [s['duration_s'] for s in body['sources']]
+    assert durations == sorted(durations) and body['duration_s'] == durations[0]
+    points = decode_polyline(body['polyline'])
+    start = G.nodes[body['source']]
+    assert points[0] == (round(start['y'], 5), round(start['x'], 5))
+    assert client.post('/api/nearest-source', json={'sources': [10 ** 9], 'dest': dest}).status_code == 404
+    assert client.post('/api/nearest-source', json={'sources': [], 'dest': dest}).status_code == 422
+
+    def events(msg):
+        received = []
+        with client.websocket_connect('/ws/run') as ws:
+            ws.send_json({'alg': 'nearest', 'dest': dest, **msg})
+            while not received or received[-1]['type'] not in ('done', 'error'):
+                received.append(ws.receive_json())
+        return received
+
+    received = events({'sources': sources, 'params': {'speed': 100, 'k': 3}})
+    done = received[-1]
+    assert done['type'] == 'done' and done['source'] == body['source']
+    assert [s['source'] for s in done['sources']] == [s['source'] for s in body['sources']]
+    assert math.isclose(done['distance_km'] * 1000, body['distance_m'])
+    assert all(e['direction'] == 'backward' for e in received if e['type'] == 'visited')
+    path = [e for e in received if e['type'] == 'path']
+    assert path[0]['u'] == body['source'] and path[-1]['v'] == dest
+
+    # La repetición cacheada conserva los 'status' originales (candidatos y llegada)
+    replay = events({'sources': sources, 'params': {'speed': 100, 'k': 3, 'result_only': True}})
+    assert replay[-1]['cached'] and replay[0]['cached'] and replay[0]['sources'] == sources
+    statuses = [e for e in received if e['type'] == 'status']
+    assert [e for e in replay if e['type'] == 'status'] == [{**statuses[0], 'cached': True}] + statuses[1:]
+    assert any(e['msg'] == 'reached_dest' for e in statuses)
+
+    # Un candidato como [lat, lon] se ajusta al nodo más cercano
+    point = [G.nodes[sources[0]]['y'], G.nodes[sources[0]]['x']]
+    started = events({'sources': [point] + sources[1:], 'params': {'k': 3}})[0]
+    assert started['sources'] == sources
+
+    assert events({'params': {}})[-1]['type'] == 'error'
+    assert events({'sources': [[1.0]], 'params': {}})[-1]['type'] == 'error'
+    assert events({'sources': sources, 'params': {'k': 0}})[-1]['type'] == 'error'
+    assert events({'sources': [10 ** 9], 'params': {}})[-1]['type'] == 'error'
@@ -0,0 +1,62 @@
+"""
+Tests del formato en disco del grafo CSR
+"""
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.csr import get_csr
+from app.graph_store import GraphFormatError, load_graph, save_graph
+from app.main import astar_stream, dijkstra_stream
+from app.tests.test_csr import make_random_graph, strip_time
+
+
+def test_roundtrip_preserves_graph_and_search(tmp_path):
+    """Test que el grafo leído de disco es idéntico y da las mismas búsquedas"""
+    G = make_random_graph(n=80, m=300, seed=3)
+    csr = get_csr(G)
+    save_graph(csr, tmp_path / 'g.graph')
+    loaded = load_graph(tmp_path / 'g.graph')
+
+    for name in ('node_ids', 'offsets', 'neighbors', 'weights', 'lengths', 'keys', 'lat', 'lon'):
+        assert np.array_equal(getattr(loaded, name), getattr(csr, name))
+    assert loaded.fingerprint() == csr.fingerprint()
+    assert loaded.max_speed == pytest.approx(main.compute_max_speed(G))
+
+    orig, dest = csr.ids_l[0], csr.ids_l[-1]
+    assert strip_time(dijkstra_stream(loaded, orig, dest)) == strip_time(dijkstra_stream(G, orig, dest))
+    assert strip_time(astar_stream(loaded, orig, dest)) == strip_time(astar_stream(G, orig, dest))
+
+
+def test_rejects_other_format_version(tmp_path):
+    """Test que un header de otra versión del formato se rechaza"""
+    path = tmp_path / 'g.graph'
+    save_graph(get_csr(make_random_graph()), path)
+    header = json.loads((path / 'header.json').read_text())
+    header['version'] += 1
+    (path / 'header.json').write_text(json.dumps(header))
+    with pytest.raises(GraphFormatError):
+        load_graph(path)
+
+
+def test_server_runs_on_csr_graph_without_osmnx():
+    """Test que la API funciona con el grafo CSR y que importarla no carga osmnx"""
+    csr = get_csr(make_random_graph(n=40, m=150, seed=2))
+    main.GRAPH = csr
+    try:
+        client = TestClient(main.app)
+        meta = client.get('/api/graph-meta').json()
+        assert (meta['nodes_total'], meta['edges_total']) == (csr.n_nodes, csr.n_edges)
+        assert len(client.get('/api/edges-sample?decimate=1').json()['edges']) == csr.n_edges
+    finally:
+        main.GRAPH = None
+
+    backend = Path(__file__).resolve().parents[2]
+    code = "import sys, app.main; assert 'osmnx' not in sys.modules"
+    subprocess.run([sys.executable, '-c', code], cwd=backend, check=True)
@@ -0,0 +1,110 @@
+"""
+Tests de las isócronas (búsqueda acotada y polígonos)
+"""
+import math
+from collections import OrderedDict
+
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.csr import dijkstra_all, get_csr
+from app.isochrones import _trace_polygons, bounded_dijkstra, compute_isochrones
+from app.route_cache import RouteCache
+from app.tests.test_traffic import make_geometric_graph
+
+
+def ring_area(ring):
+    return sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(ring, ring[1:])) / 2
+
+
+def inside(ring, x, y):
+    result = False
+    for (x0, y0), (x1, y1) in zip(ring, ring[1:]):
+        if (y0 > y) != (y1 > y) and x < x0 + (y - y0) * (x1 - x0) / (y1 - y0):
+            result = not result
+    return result
+
+
+def test_trace_polygons():
+    """Test de contornos: orientación, huecos y celdas que se tocan en diagonal"""
+    # Anillo de 3x3 celdas sin la del centro: un polígono con un hueco
+    cells = {(x, y) for x in range(3) for y in range(3)} - {(1, 1)}
+    polygons = _trace_polygons(cells, 10.0)
+    assert len(polygons) == 1 and len(polygons[0]) == 2
+    outer, hole = polygons[0]
+    assert ring_area(outer) == 900 and ring_area(hole) == -100
+    assert outer[0] == outer[-1] and len(outer) == 5
+
+    # Celdas en diagonal: dos polígonos separados
+    polygons = _trace_polygons({(0, 0), (1, 1)}, 1.0)
+    assert sorted(ring_area(p[0]) for p in polygons) == [1, 1]
+    assert _trace_polygons(set(), 1.0) == []
+
+
+def test_isochrones_match_dijkstra():
+    """Test que la búsqueda acotada coincide con Dijkstra y que cada presupuesto contiene a sus nodos"""
+    G = make_geometric_graph(n=200, m=800, seed=7)
+    csr = get_csr(G)
+    full = dijkstra_all(csr, [0])
+    budgets = [120.0, 60.0, 240.0]
+    nodes, dists = bounded_dijkstra(csr, 0, max(budgets))
+    assert sorted(nodes) == [v for v in range(csr.n_nodes) if full[v] <= max(budgets)]
+    assert all(math.isclose(d, full[v]) for v, d in zip(nodes, dists))
+
+    result = compute_isochrones(csr, 0, budgets, cell_m=50.0)
+    assert result['nodes_explored'] == len(nodes)
+    features = result['features']
+    assert [f['properties']['budget_s'] for f in features] == budgets
+    for feature in features:
+        budget = feature['properties']['budget_s']
+        polygons = feature['geometry']['coordinates']
+        for v in range(csr.n_nodes):
+            if full[v] <= budget:
+                x, y = float(csr.lon[v]), float(csr.lat[v])
+                assert any(inside(p[0], x, y) and not any(inside(h, x, y) for h in p[1:]) for p in polygons)
+    areas = {f['properties']['budget_s']: f['properties']['area_km2'] for f in features}
+    assert areas[60.0] <= areas[120.0] <= areas[240.0]
+
+    # Cada arista alcanzada lleva el menor presupuesto que la recorre completa
+    et = csr.edge_table()
+    for edge in result['edges']:
+        e = next(e for e in range(csr.n_edges) if et.edge_id_l[e] == edge['edge_id'])
+        end = full[int(et.source[e])] + csr.w_l[e]
+        assert end <= budgets[edge['budget_index']]
+        assert not any(end <= b < budgets[edge['budget_index']] for b in budgets)
+    assert len(result['edges']) == features[2]['properties']['edges']
+
+
+def test_isochrone_endpoint(monkeypatch):
+    """Test de validación y caché de /api/isochrone"""
+    G = make_geometric_graph()
+    nodes = sorted(G.nodes)
+    monkeypatch.setattr(main, 'GRAPH', G)
+    monkeypatch.setattr(main, 'ROUTE_CACHE', RouteCache(maxsize=8))
+    monkeypatch.setattr(main, '_ISOCHRONE_CACHE', OrderedDict())
+    monkeypatch.setattr(main, 'ISOCHRONE_CACHE_SIZE', 2)
+    client = TestClient(main.app)
+
+    res = client.get('/api/isochrone', params={'orig': nodes[0], 'minutes': [1, 2]})
+    assert res.status_code == 200
+    data = res.json()
+    assert data['type'] == 'FeatureCollection' and len(data['features']) == 2 and not data['cached']
+    assert data['budgets_s'] == [60.0, 120.0] and 'edges' in data
+    again = client.get('/api/isochrone', params={'orig': nodes[0], 'minutes': [1, 2]}).json()
+    assert again['cached'] and again['features'] == data['features'] and again['edges'] == data['edges']
+
+    lat, lon = G.nodes[nodes[0]]['y'], G.nodes[nodes[0]]['x']
+    near = client.get('/api/isochrone', params={'lat': lat, 'lon': lon, 'minutes': 1, 'edges': False}).json()
+    assert near['orig'] == nodes[0] and 'edges' not in near
+
+    # LRU: un acierto refresca la entrada, así que al llenarse sale la menos usada
+    params = {'orig': nodes[0], 'minutes': [1, 2]}
+    assert client.get('/api/isochrone', params=params).json()['cached']
+    client.get('/api/isochrone', params={'orig': nodes[1], 'minutes': 1})
+    assert client.get('/api/isochrone', params=params).json()['cached']
+    assert not client.get('/api/isochrone', params={'orig': nodes[0], 'minutes': 1, 'edges': False}).json()['cached']
+
+    assert client.get('/api/isochrone', params={'orig': nodes[0], 'minutes': 0}).status_code == 400
+    assert client.get('/api/isochrone', params={'orig': nodes[0], 'minutes': [1] * 9}).status_code == 400
+    assert client.get('/api/isochrone', params={'minutes': 1}).status_code == 400
+    assert client.get('/api/isochrone', params={'orig': -1, 'minutes': 1}).status_code == 404
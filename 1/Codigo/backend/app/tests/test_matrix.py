@@ -0,0 +1,70 @@
+"""
+Tests de la matriz origen-destino de tiempos de viaje
+"""
+import io
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.csr import dijkstra_all, get_csr
+from app import matrix
+from app.matrix import travel_time_matrix
+from app.tests.test_csr import make_random_graph
+
+
+def test_matrix_matches_one_to_all_dijkstra(monkeypatch):
+    """Test que cada fila coincide con Dijkstra uno-a-todos, en serie y con el pool de procesos"""
+    monkeypatch.setattr(matrix, 'MAX_WORKERS', 2)
+    G = make_random_graph(n=100, m=350, seed=8)
+    csr = get_csr(G)
+    sources, targets = list(range(0, 100, 9)), list(range(3, 100, 7))
+    expected = np.array([[dijkstra_all(csr, [s])[t] for t in targets] for s in sources])
+
+    assert np.array_equal(travel_time_matrix(csr, sources, targets, parallel=False), expected)
+    assert np.array_equal(travel_time_matrix(csr, sources, targets, parallel=True), expected)
+    matrix.shutdown_pool()
+
+
+def test_matrix_pool_per_region_survives_graph_change(monkeypatch):
+    """Test que cambiar el grafo de una región no detiene el pool que usa una matriz en curso"""
+    monkeypatch.setattr(matrix, 'MAX_WORKERS', 2)
+    csr1 = get_csr(make_random_graph(n=60, m=200, seed=2))
+    csr2 = get_csr(make_random_graph(n=60, m=200, seed=3))
+    sources = list(range(0, 60, 6))
+    expected = travel_time_matrix(csr1, sources, sources, parallel=False)
+    try:
+        with matrix._borrow_pool(csr1, 'a') as pool:
+            # Otra consulta de la misma región con un grafo nuevo (parches) y otra región
+            travel_time_matrix(csr2, sources, sources, pool_key='a')
+            travel_time_matrix(csr1, sources, sources, pool_key='b')
+            rows = pool.submit(matrix._worker_rows, sources, sources).result()
+            assert np.array_equal(np.asarray(rows), expected)
+        assert matrix._POOLS['a'].csr is csr2 and matrix._POOLS['b'].csr is csr1
+        b = matrix._POOLS['b']
+        matrix.shutdown_pool('b')
+        assert 'b' not in matrix._POOLS and b.retired and b.active == 0
+    finally:
+        matrix.shutdown_pool()
+    assert matrix._POOLS == {}
+
+
+def test_matrix_endpoint_json_and_npy():
+    """Test del endpoint /api/matrix con ids de nodo y coordenadas"""
+    G = make_random_graph(n=60, m=200, seed=1)
+    csr = get_csr(G)
+    main.GRAPH = G
+    try:
+        client = TestClient(main.app)
+        body = {'sources': [csr.ids_l[0], [-27.45, -58.81]], 'targets': [csr.ids_l[5]]}
+        resp = client.post('/api/matrix', json=body)
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data['sources'][0] == csr.ids_l[0] and len(data['durations_s']) == 2
+
+        resp = client.post('/api/matrix?format=npy', json=body)
+        matrix = np.load(io.BytesIO(resp.content))
+        assert matrix.shape == (2, 1)
+        assert resp.headers['X-Targets'] == str(csr.ids_l[5])
+    finally:
+        main.GRAPH = None
@@ -0,0 +1,61 @@
+"""
+Tests de las métricas Prometheus y del perfilado por consulta
+"""
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+import app.main as main
+from app.route_cache import RouteCache
+from app.tests.test_traffic import make_geometric_graph
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_metrics_and_profile(monkeypatch):
+    """Test que /metrics registra las búsquedas y que params.profile agrega el perfil a 'done'"""
+    G = make_geometric_graph()
+    nodes = sorted(G.nodes)
+    monkeypatch.setattr(main, 'GRAPH', G)
+    monkeypatch.setattr(main, 'ROUTE_CACHE', RouteCache(maxsize=8))
+    client = TestClient(main.app)
+
+    def run(**params):
+        msg = {'alg': 'dijkstra', 'orig': nodes[0], 'dest': nodes[-1], 'params': {'speed': 100, **params}}
+        received = []
+        with client.websocket_connect('/ws/run') as ws:
+            ws.send_json(msg)
+            while not received or received[-1]['type'] not in ('done', 'error'):
+                received.append(ws.receive_json())
+        return received
+
+    searches = sample('route_requests_total', algorithm='dijkstra', source='search')
+    observed = sample('route_search_seconds_count', algorithm='dijkstra')
+    sent = sample('route_bytes_sent_sum', algorithm='dijkstra', protocol='events')
+
+    events = run()
+    done = events[-1]
+    assert done['events_emitted'] == len(events) and 'profile' not in done
+    assert sample('route_requests_total', algorithm='dijkstra', source='search') == searches + 1
+    assert sample('route_search_seconds_count', algorithm='dijkstra') == observed + 1
+    assert sample('route_bytes_sent_sum', algorithm='dijkstra', protocol='events') > sent
+    assert sample('ws_active_sessions') == 0
+
+    # result_only: la primera consulta busca y la segunda sale de la caché
+    monkeypatch.setattr(main, 'ROUTE_CACHE', RouteCache(maxsize=8))
+    run(result_only=True)
+    run(result_only=True)
+    assert sample('cache_hit_ratio', cache='route') == 0.5
+    assert sample('route_requests_total', algorithm='dijkstra', source='cache') >= 1
+
+    # Con perfil se vuelve a buscar (no se usa la caché) y 'done' trae las funciones
+    profiled = run(result_only=True, profile=True)[-1]
+    assert 'cached' not in profiled
+    profile = profiled['profile']
+    assert profile['mode'] == 'cprofile' and profile['total_s'] > 0
+    assert any('dijkstra_stream' in f['function'] for f in profile['functions'])
+    assert 'profile' not in main.ROUTE_CACHE.get(('dijkstra', nodes[0], nodes[-1], main.graph_version()))['done']
+
+    text = client.get('/metrics').text
+    assert 'route_nodes_explored_bucket' in text and 'route_events_emitted_count' in text
@@ -0,0 +1,182 @@
+"""
+Tests de los parches de pesos en vivo (cortes y cambios de velocidad)
+"""
+import asyncio
+import math
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.alt import LandmarkTables
+from app.ch import ContractionHierarchy, ch_query
+from app.csr import dijkstra_all, get_csr
+from app.main import astar_stream
+from app.patches import active_patches, apply_patches, resolve_patches
+from app.route_cache import RouteCache
+from app.tests.test_ch import dijkstra_cost
+from app.tests.test_traffic import make_geometric_graph
+
+
+def random_patches(csr, rng, n):
+    """n parches al azar: aumentos, disminuciones, cortes y vueltas al peso original"""
+    et = csr.edge_table()
+    patches = []
+    for e in rng.sample([e for e in range(csr.n_edges) if csr.base.w_l[e] > 0], n):
+        patch = {'u': et.u_l[e], 'v': et.v_l[e], 'key': csr.keys_l[e]}
+        kind = rng.choice(['up', 'down', 'closed', 'reset'])
+        if kind == 'up':
+            patch['weight'] = csr.base.w_l[e] * rng.uniform(1.5, 10)
+        elif kind == 'down':
+            patch['weight'] = csr.base.w_l[e] * rng.uniform(0.2, 0.9)
+        else:
+            patch[kind] = True
+        patches.append(patch)
+    return patches
+
+
+def test_incremental_updates_stay_exact():
+    """Test que la CH y los landmarks actualizados dan costos óptimos tras varias tandas de parches"""
+    G = make_geometric_graph(n=150, m=600, seed=3)
+    csr = get_csr(G)
+    ch = ContractionHierarchy.build(csr)
+    landmarks = LandmarkTables.build(csr, n_landmarks=4)
+    rng = random.Random(8)
+
+    for _ in range(4):
+        update = apply_patches(csr, resolve_patches(csr, random_patches(csr, rng, 40)), landmarks=landmarks)
+        # Sin límite de nodos a verificar: en un grafo tan chico apply_patches reconstruiría la CH
+        assert ch.update(update.csr, update.changed, max_checks=0) is None
+        ch = ch.update(update.csr, update.changed, max_checks=update.csr.n_nodes)
+        csr, landmarks = update.csr, update.landmarks
+        assert csr.base is get_csr(G)
+
+        for _ in range(40):
+            s, t = rng.randrange(csr.n_nodes), rng.randrange(csr.n_nodes)
+            expected = dijkstra_cost(csr, s, t)
+            cost, path, _, _ = ch_query(ch, s, t)
+            if expected == math.inf:
+                assert cost == math.inf
+                continue
+            assert math.isclose(cost, expected, rel_tol=1e-9, abs_tol=1e-9)
+            assert all(csr.w_l[e] < math.inf for e in path), "La ruta no debe usar aristas cortadas"
+
+            # ALT: la heurística sigue siendo admisible y A* encuentra el óptimo
+            h = landmarks.heuristic(t, s=s)
+            to_t = dijkstra_all(csr, [t], reverse=True)
+            assert all(h(v) <= to_t[v] + 1e-9 for v in range(csr.n_nodes) if to_t[v] < math.inf)
+            events = list(astar_stream(csr, csr.ids_l[s], csr.ids_l[t], landmarks=landmarks))
+            alt_cost = sum(csr.w_l[csr.best_edge(csr.index[e['u']], csr.index[e['v']])]
+                           for e in events if e['type'] == 'path')
+            assert math.isclose(alt_cost, expected, rel_tol=1e-9, abs_tol=1e-9)
+
+
+def test_resolve_patches_and_closures():
+    """Test de la traducción de parches, del corte de aristas y de la vuelta al grafo original"""
+    G = make_geometric_graph(n=40, m=160, seed=5)
+    csr = get_csr(G)
+    et = csr.edge_table()
+    e = 0
+    u, v = et.u_l[e], et.v_l[e]
+    with pytest.raises(ValueError):
+        resolve_patches(csr, [{'u': u, 'v': v}])
+    with pytest.raises(ValueError):
+        resolve_patches(csr, [{'u': u, 'v': v, 'weight': 1.0, 'closed': True}])
+    with pytest.raises(ValueError):
+        resolve_patches(csr, [{'u': -1, 'v': v, 'closed': True}])
+    with pytest.raises(ValueError):
+        resolve_patches(csr, [{'u': u, 'v': v, 'weight': 0}])
+    assert resolve_patches(csr, [{'u': u, 'v': v, 'key': csr.keys_l[e], 'speed_kph': 36}])[e] == \
+        pytest.approx(csr.len_l[e] / 10)
+
+    # Cortar todas las aristas que salen del origen deja sin ruta
+    s = csr.ids_l[0]
+    out = [{'u': s, 'v': csr.ids_l[csr.nbr_l[x]], 'closed': True} for x in range(csr.off_l[0], csr.off_l[1])]
+    patched = apply_patches(csr, resolve_patches(csr, out)).csr
+    assert patched.revision is not None and patched.fingerprint() != csr.fingerprint()
+    assert all(p['closed'] for p in active_patches(patched))
+    t = next(x for x in range(1, csr.n_nodes) if dijkstra_cost(csr, 0, x) < math.inf)
+    assert dijkstra_cost(patched, 0, t) == math.inf
+    assert not any(e['type'] == 'path' for e in astar_stream(patched, s, csr.ids_l[t]))
+
+    # reset vuelve a los pesos originales
+    restored = apply_patches(patched, resolve_patches(patched, [{**p, 'closed': False, 'reset': True} for p in out])).csr
+    assert restored.revision is None and active_patches(restored) == []
+    assert restored.fingerprint() == csr.fingerprint()
+
+
+def test_admin_patch_endpoint(monkeypatch):
+    """Test de autenticación, validación y cambio de versión de /api/admin/patches"""
+    G = make_geometric_graph(n=40, m=160, seed=5)
+    csr = get_csr(G)
+    monkeypatch.setattr(main, 'GRAPH', G)
+    monkeypatch.setattr(main, 'CH', None)
+    monkeypatch.setattr(main, 'LANDMARKS', None)
+    monkeypatch.setattr(main, 'TRAFFIC', None)
+    monkeypatch.setattr(main, 'ROUTE_CACHE', RouteCache(maxsize=8))
+    client = TestClient(main.app)
+    et = csr.edge_table()
+    body = {'edges': [{'u': et.u_l[0], 'v': et.v_l[0], 'closed': True}]}
+
+    monkeypatch.setattr(main, 'ADMIN_TOKEN', None)
+    assert client.post('/api/admin/patches', json=body).status_code == 403
+    monkeypatch.setattr(main, 'ADMIN_TOKEN', 'secreto')
+    assert client.post('/api/admin/patches', json=body).status_code == 401
+    assert client.post('/api/admin/patches', json=body, headers={'X-Admin-Token': 'otro'}).status_code == 401
+
+    headers = {'X-Admin-Token': 'secreto'}
+    bad = {'edges': [{'u': et.u_l[0], 'v': -5, 'closed': True}]}
+    assert client.post('/api/admin/patches', json=bad, headers=headers).status_code == 400
+    assert client.post('/api/admin/patches', json={'edges': [{'u': 1, 'v': 2, 'weight': -1}]},
+                       headers=headers).status_code == 422
+
+    version = main.graph_version()
+    tiles_version = main.network_version()
+    res = client.post('/api/admin/patches', json=body, headers=headers)
+    assert res.status_code == 200
+    data = res.json()
+    assert data['edges_changed'] >= 1 and data['graph_cache_version'] != version
+    assert main.graph_version() == data['graph_cache_version']
+    assert main.network_version() == tiles_version  # La geometría no cambia: los tiles siguen valiendo
+
+    listed = client.get('/api/admin/patches', headers=headers).json()['patches']
+    assert {(p['u'], p['v']) for p in listed} == {(et.u_l[0], et.v_l[0])}
+    assert all(p['closed'] and p['weight'] is None for p in listed)
+
+    body['edges'][0] = {**body['edges'][0], 'closed': False, 'reset': True}
+    assert client.post('/api/admin/patches', json=body, headers=headers).json()['graph_cache_version'] == version
+
+
+def test_large_patch_rebuilds_ch_in_background(monkeypatch):
+    """Test que un parche demasiado grande para actualizar la CH la reconstruye aparte y la instala"""
+    G = make_geometric_graph(n=150, m=600, seed=3)
+    csr = get_csr(G)
+    ch = ContractionHierarchy.build(csr)
+    monkeypatch.setattr(main, 'GRAPH', G)
+    monkeypatch.setattr(main, 'CH', ch)
+    monkeypatch.setattr(main, 'LANDMARKS', None)
+    monkeypatch.setattr(main, 'TRAFFIC', None)
+    monkeypatch.setattr(main, 'ROUTE_CACHE', RouteCache(maxsize=8))
+    monkeypatch.setattr(main, 'ADMIN_TOKEN', 'secreto')
+    client = TestClient(main.app)
+
+    body = {'edges': random_patches(csr, random.Random(8), 40)}
+    res = client.post('/api/admin/patches', json=body, headers={'X-Admin-Token': 'secreto'})
+    assert res.status_code == 200 and res.json()['pending'] == ['ch']
+    # TestClient espera las tareas en segundo plano: la CH nueva ya está instalada
+    patched = main.GRAPH
+    assert main.CH is not ch and main.CH is not None and main._CH_REBUILDS == {}
+    rng = random.Random(2)
+    for _ in range(20):
+        s, t = rng.randrange(patched.n_nodes), rng.randrange(patched.n_nodes)
+        expected = dijkstra_cost(patched, s, t)
+        assert math.isclose(ch_query(main.CH, s, t, collect=False)[0], expected, rel_tol=1e-9, abs_tol=1e-9) \
+            or expected == math.inf
+
+    # Una reconstrucción para un grafo que ya no está se descarta
+    rebuilt = main.CH
+    main._CH_REBUILDS[main.DEFAULT_REGION] = csr
+    asyncio.run(main._rebuild_ch(main.DEFAULT_REGION, csr))
+    assert main.CH is rebuilt and main._CH_REBUILDS == {}
+
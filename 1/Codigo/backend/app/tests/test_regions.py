@@ -0,0 +1,103 @@
+"""
+Tests del registro de grafos por región (carga diferida, desalojo LRU y parámetro region)
+"""
+import networkx as nx
+import pytest
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app import matrix, streaming
+from app.regions import GraphRegistry, Region, RegionState, estimate_memory
+from app.route_cache import RouteCache
+from app.tests.test_traffic import make_geometric_graph
+
+
+def make_region_graph(seed):
+    """Grafo de otra ciudad: ids de nodo distintos de los de la región por defecto"""
+    return nx.relabel_nodes(make_geometric_graph(seed=seed), lambda n: n + 1000 * seed)
+
+
+def test_registry_lazy_load_and_lru():
+    """Test que las regiones se cargan recién al pedirlas y se desaloja la menos usada"""
+    regions = {name: Region(name, f"{name}, Argentina", 5000) for name in ('a', 'b', 'c')}
+    loaded, evicted = [], []
+
+    def loader(region):
+        loaded.append(region.name)
+        return RegionState(region, make_region_graph(len(loaded)))
+
+    size = estimate_memory(RegionState(regions['a'], make_region_graph(9)))
+    registry = GraphRegistry(regions, loader, max_bytes=int(size * 2.5), on_evict=lambda s: evicted.append(s))
+    assert loaded == [] and registry.peek('a') is None
+
+    a = registry.get('a')
+    assert registry.get('a') is a and a.memory_bytes > 0
+    registry.get('b')
+    registry.get('a')  # 'b' pasa a ser la menos usada
+    registry.get('c')
+    assert loaded == ['a', 'b', 'c']
+    assert [s.region.name for s in evicted] == ['b']
+    assert [r['name'] for r in registry.stats()['loaded']] == ['a', 'c']
+    assert registry.stats()['evictions'] == 1
+
+    registry.get('b')  # Vuelve a cargarse desde el loader
+    assert loaded == ['a', 'b', 'c', 'b'] and registry.peek('a') is None
+    assert registry.memory_bytes() <= registry.max_bytes
+    with pytest.raises(KeyError):
+        registry.get('z')
+
+
+def test_region_parameter(monkeypatch):
+    """Test que los endpoints y /ws/run usan el grafo de la región pedida, cargado a demanda"""
+    G = make_geometric_graph()
+    other = Region('otra', 'Otra, Argentina', 5000)
+    calls = []
+
+    def loader(region):
+        calls.append(region.name)
+        return RegionState(region, make_region_graph(3))
+
+    monkeypatch.setattr(main, 'GRAPH', G)
+    monkeypatch.setattr(main, 'ROUTE_CACHE', RouteCache(maxsize=8))
+    monkeypatch.setattr(main, 'REGIONS', {main.DEFAULT_REGION: main.REGIONS[main.DEFAULT_REGION], 'otra': other})
+    monkeypatch.setattr(main, 'REGISTRY', GraphRegistry({'otra': other}, loader, max_bytes=2 ** 30))
+    client = TestClient(main.app)
+
+    listing = client.get('/api/regions').json()
+    assert [r['loaded'] for r in listing['regions']] == [True, False] and calls == []
+
+    meta = client.get('/api/graph-meta', params={'region': 'otra'}).json()
+    assert meta['region'] == 'otra' and meta['place'] == 'Otra, Argentina' and calls == ['otra']
+    assert meta['graph_cache_version'] != client.get('/api/graph-meta').json()['graph_cache_version']
+
+    nodes = sorted(main.REGISTRY.peek('otra').graph.nodes)
+    route = client.get('/api/route', params={'region': 'otra', 'orig': nodes[0], 'dest': nodes[-1]})
+    assert route.status_code == 200 and route.json()['orig'] == nodes[0]
+    # Los ids de la otra región no existen en la región por defecto
+    assert client.get('/api/route', params={'orig': nodes[0], 'dest': nodes[-1]}).status_code == 404
+    assert client.get('/api/graph-meta', params={'region': 'marte'}).status_code == 404
+
+    monkeypatch.setattr(matrix, 'MAX_WORKERS', 2)
+    try:
+        with client.websocket_connect('/ws/run') as ws:
+            ws.send_json({'alg': 'astar', 'orig': nodes[0], 'dest': nodes[-1], 'region': 'otra',
+                          'params': {'speed': 100, 'result_only': True}})
+            events = [ws.receive_json()]
+            while events[-1]['type'] not in ('done', 'error'):
+                events.append(ws.receive_json())
+        assert events[-1]['type'] == 'done' and events[-1]['distance_km'] * 1000 == pytest.approx(
+            route.json()['distance_m'])
+        with client.websocket_connect('/ws/run') as ws:
+            ws.send_json({'alg': 'astar', 'orig': nodes[0], 'dest': nodes[-1], 'region': 'marte'})
+            assert ws.receive_json() == {'type': 'error', 'msg': 'Región desconocida: marte'}
+
+        body = {'sources': nodes[:4], 'targets': nodes[-2:]}
+        assert client.post('/api/matrix', params={'region': 'otra'}, json=body).status_code == 200
+        # Desalojar la región libera sus workers de búsqueda y su pool de matrices
+        assert 'otra' in streaming._POOLS and 'otra' in matrix._POOLS
+        main._region_evicted(main.REGISTRY.peek('otra'))
+        assert 'otra' not in streaming._POOLS and 'otra' not in matrix._POOLS
+    finally:
+        streaming.shutdown_search_pool('otra')
+        matrix.shutdown_pool('otra')
+    assert calls == ['otra']
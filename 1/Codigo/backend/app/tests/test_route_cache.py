@@ -0,0 +1,53 @@
+"""
+Tests de la caché de resultados de rutas
+"""
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.route_cache import RouteCache
+from app.tests.test_csr import make_random_graph
+
+
+def test_lru_eviction_and_disk_backing(tmp_path):
+    """Test que se desaloja la entrada menos usada y que el disco la recupera"""
+    cache = RouteCache(maxsize=2, disk_dir=tmp_path)
+    for i in range(3):
+        cache.put(('dijkstra', i, i + 1, 'v1'), [], {'type': 'done', 'i': i})
+    assert cache.stats()['evictions'] == 1 and cache.stats()['size'] == 2
+
+    # La entrada 0 salió de memoria pero sigue en disco
+    assert cache.get(('dijkstra', 0, 1, 'v1'))['done']['i'] == 0
+    assert cache.get(('dijkstra', 0, 1, 'v2')) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_ws_result_only_replays_cached_route(monkeypatch):
+    """Test que una ruta repetida en modo result_only se sirve desde la caché"""
+    G = make_random_graph(n=80, m=300, seed=4)
+    nodes = sorted(G.nodes)
+    monkeypatch.setattr(main, 'ROUTE_CACHE', RouteCache(maxsize=8))
+    monkeypatch.setattr(main, 'GRAPH', G)
+    client = TestClient(main.app)
+    msg = {'alg': 'dijkstra', 'orig': nodes[0], 'dest': nodes[-1], 'params': {'speed': 100}}
+
+    with client.websocket_connect('/ws/run') as ws:
+        ws.send_json(msg)
+        first = []
+        while not first or first[-1]['type'] not in ('done', 'error'):
+            first.append(ws.receive_json())
+    assert any(e['type'] == 'visited' for e in first)
+
+    msg['params']['result_only'] = True
+    with client.websocket_connect('/ws/run') as ws:
+        ws.send_json(msg)
+        second = []
+        while not second or second[-1]['type'] not in ('done', 'error'):
+            second.append(ws.receive_json())
+
+    assert second[-1]['cached'] is True
+    assert {e['type'] for e in second} <= {'status', 'path', 'done'}
+    assert [e for e in second if e['type'] == 'path'] == [e for e in first if e['type'] == 'path']
+    # Los 'status' originales (inicio y llegada al destino) se repiten tal cual
+    assert [e['msg'] for e in second if e['type'] == 'status'] == ['started', 'reached_dest']
+    stats = client.get('/api/metrics').json()['route_cache']
+    assert (stats['hits'], stats['misses']) == (1, 0)
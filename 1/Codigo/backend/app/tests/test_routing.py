@@ -0,0 +1,65 @@
+"""
+Tests de la ruta sin streaming (kernel, polyline y /api/route)
+"""
+import math
+
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.csr import get_csr
+from app.main import astar_stream, dijkstra_stream
+from app.route_cache import RouteCache
+from app.routing import compute_route, decode_polyline, encode_polyline, shortest_path
+from app.tests.test_traffic import make_geometric_graph
+
+
+def test_encode_polyline():
+    """Test con el ejemplo de la documentación de Google y la ida y vuelta"""
+    points = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+    assert encode_polyline(points) == '_p~iF~ps|U_ulLnnqC_mqNvxq`@'
+    assert decode_polyline(encode_polyline(points)) == points
+    assert encode_polyline([]) == ''
+
+
+def test_shortest_path_matches_streams():
+    """Test que el kernel da la misma ruta y los mismos nodos explorados que los streams"""
+    G = make_geometric_graph(n=200, m=800, seed=7)
+    csr = get_csr(G)
+    for alg, stream in (('dijkstra', dijkstra_stream), ('astar', astar_stream)):
+        for o, t in ((0, 150), (3, 77), (42, 42)):
+            events = list(stream(G, csr.ids_l[o], csr.ids_l[t]))
+            done = events[-1]
+            path = [e['edge_id'] for e in events if e['type'] == 'path']
+            cost, path_edges, explored = shortest_path(csr, o, t, alg)
+            assert explored == done['nodes_explored']
+            assert [csr.edge_table().edge_id_l[e] for e in path_edges] == path
+            assert math.isclose(sum(csr.len_l[e] for e in path_edges) / 1000, done['distance_km'])
+            assert math.isclose(cost, sum(csr.w_l[e] for e in path_edges))
+
+            route = compute_route(csr, o, t, alg)
+            points = decode_polyline(route['polyline'])
+            assert len(points) == len(path_edges) + 1
+            assert math.isclose(points[-1][0], csr.lat_l[t], abs_tol=1e-5)
+            assert route['duration_s'] == cost
+
+
+def test_route_endpoint(monkeypatch):
+    """Test de /api/route por id y por coordenadas, y de sus errores"""
+    G = make_geometric_graph()
+    nodes = sorted(G.nodes)
+    monkeypatch.setattr(main, 'GRAPH', G)
+    monkeypatch.setattr(main, 'ROUTE_CACHE', RouteCache(maxsize=8))
+    client = TestClient(main.app)
+
+    data = client.get('/api/route', params={'orig': nodes[0], 'dest': nodes[-1]}).json()
+    assert data['orig'] == nodes[0] and data['dest'] == nodes[-1] and data['algorithm'] == 'astar'
+    assert data['polyline'] and data['distance_m'] > 0 and data['duration_s'] > 0
+
+    lat, lon = G.nodes[nodes[-1]]['y'], G.nodes[nodes[-1]]['x']
+    near = client.get('/api/route', params={'orig': nodes[0], 'dest_lat': lat, 'dest_lon': lon,
+                                            'alg': 'dijkstra'}).json()
+    assert near['dest'] == nodes[-1] and math.isclose(near['duration_s'], data['duration_s'])
+
+    assert client.get('/api/route', params={'orig': nodes[0]}).status_code == 400
+    assert client.get('/api/route', params={'orig': -1, 'dest': nodes[0]}).status_code == 404
+    assert client.get('/api/route', params={'orig': nodes[0], 'dest': nodes[1], 'alg': 'ch'}).status_code == 422
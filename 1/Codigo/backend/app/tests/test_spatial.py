@@ -0,0 +1,59 @@
+"""
+Tests del índice espacial de nodos
+"""
+import random
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.csr import get_csr
+from app.main import find_nearest_node, haversine_m
+from app.spatial import GridIndex, load_or_build_spatial_index
+from app.tests.test_csr import make_random_graph
+
+
+def brute_force_nearest(G, lat, lon, k=1):
+    dists = sorted((haversine_m(lat, lon, d['y'], d['x']), n) for n, d in G.nodes(data=True))
+    return [n for _, n in dists[:k]]
+
+
+def test_nearest_matches_brute_force():
+    """Test que el índice devuelve el mismo nodo que la búsqueda exhaustiva"""
+    G = make_random_graph(n=300, m=600)
+    rng = random.Random(3)
+    for _ in range(200):
+        # Incluye puntos fuera del bbox del grafo
+        lat, lon = -27.47 + rng.uniform(-0.02, 0.07), -58.83 + rng.uniform(-0.02, 0.07)
+        assert find_nearest_node(G, lat, lon) == brute_force_nearest(G, lat, lon)[0]
+
+
+def test_k_nearest_and_persistence(tmp_path):
+    """Test de k vecinos y de guardado/carga del índice"""
+    G = make_random_graph(n=300, m=600)
+    csr = get_csr(G)
+    path = tmp_path / 'index.spatial.npz'
+    built = load_or_build_spatial_index(csr, path)
+    loaded = GridIndex.load(path, csr.lat, csr.lon)
+    assert loaded is not None
+    assert np.array_equal(loaded.order, built.order)
+
+    idx, dist = loaded.query(-27.45, -58.81, k=5)
+    assert [csr.ids_l[i] for i in idx] == brute_force_nearest(G, -27.45, -58.81, k=5)
+    assert list(dist) == sorted(dist)
+
+
+def test_find_nearest_batch_endpoint():
+    """Test del endpoint POST /api/find-nearest con varios puntos"""
+    G = make_random_graph(n=100, m=200)
+    main.GRAPH = G
+    try:
+        client = TestClient(main.app)
+        points = [[-27.46, -58.82], [-27.44, -58.80]]
+        resp = client.post('/api/find-nearest', json={'points': points, 'k': 2})
+        assert resp.status_code == 200
+        results = resp.json()['results']
+        assert len(results) == 2 and all(len(r) == 2 for r in results)
+        assert results[0][0]['node_id'] == brute_force_nearest(G, *points[0])[0]
+    finally:
+        main.GRAPH = None
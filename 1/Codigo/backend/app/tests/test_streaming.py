@@ -0,0 +1,155 @@
+"""
+Tests de la ejecución de búsquedas en procesos worker con backpressure
+"""
+import asyncio
+import multiprocessing
+import time
+
+import pytest
+
+from app import streaming
+from app.csr import get_csr
+from app.streaming import stream_search
+from app.tests.test_csr import make_random_graph
+
+PRODUCED = multiprocessing.get_context('fork').Value('i', 0)
+
+
+def _factory(spec):
+    """Generador de prueba: cuenta lo producido en memoria compartida."""
+    if spec.get('busy_s'):
+        t_end = time.perf_counter() + spec['busy_s']
+        while time.perf_counter() < t_end:
+            sum(range(1000))
+    for i in range(spec.get('n', 0)):
+        with PRODUCED.get_lock():
+            PRODUCED.value += 1
+        yield i
+    if spec.get('fail'):
+        raise ValueError('falla')
+
+
+def _search_factory(spec):
+    """Búsqueda real sobre el grafo del servidor, heredado por el worker con el fork."""
+    with _SERVER_GRAPH[0].search_buffers():
+        yield 'ok'
+
+
+_SERVER_GRAPH = []
+
+
+@pytest.fixture(autouse=True)
+def _fresh_pool():
+    streaming.shutdown_search_pool()
+    PRODUCED.value = 0
+    yield
+    streaming.shutdown_search_pool()
+
+
+def test_slow_consumer_bounds_production_and_abandon_kills_worker():
+    """Test que un consumidor lento frena al worker y que abandonar la sesión lo termina"""
+    async def consume():
+        got = []
+        agen = stream_search(_factory, {'n': 100_000})
+        async for item in agen:
+            got.append(item)
+            if len(got) == 3:
+                await asyncio.sleep(0.3)  # El worker se queda sin créditos
+                break
+        await agen.aclose()
+        return got
+
+    assert asyncio.run(consume()) == [0, 1, 2]
+    assert PRODUCED.value <= streaming.EVENT_QUEUE_SIZE + 2 * streaming.CHUNK_EVENTS
+    pool = streaming._POOLS[None]
+    assert pool.busy == 0 and not pool.idle
+
+
+def test_errors_propagate_worker_is_reused_and_loop_stays_responsive():
+    """Test que los errores llegan al consumidor, el worker se reutiliza y el loop no se bloquea"""
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(ticker())
+        with pytest.raises(ValueError):
+            async for _ in stream_search(_factory, {'n': 5, 'fail': True, 'busy_s': 0.3}):
+                pass
+        items = [i async for i in stream_search(_factory, {'n': 5})]
+        task.cancel()
+        return items, ticks
+
+    items, ticks = asyncio.run(run())
+    assert items == list(range(5))
+    assert ticks > 10
+    assert len(streaming._POOLS[None].idle) == 1
+
+
+def test_waiting_request_moves_to_replacement_pool(monkeypatch):
+    """Test que una consulta que espera un worker cuando se reemplaza el pool usa el nuevo"""
+    monkeypatch.setattr(streaming, 'SEARCH_WORKERS', 1)
+    old, new = (object(),), (object(),)
+
+    async def run(spec, context, delay=0.0):
+        await asyncio.sleep(delay)
+        return [i async for i in stream_search(_factory, spec, context=context)]
+
+    async def scenario():
+        return await asyncio.gather(
+            run({'n': 2, 'busy_s': 0.3}, old),  # A: ocupa el único worker
+            run({'n': 3}, old, delay=0.05),  # B: espera un worker del pool viejo
+            run({'n': 4}, new, delay=0.1),  # C: contexto nuevo, cierra el pool viejo
+        )
+
+    assert asyncio.run(scenario()) == [[0, 1], [0, 1, 2], [0, 1, 2, 3]]
+    pool = streaming._POOLS[None]
+    assert pool.context == new and pool.busy == 0 and not pool.closed
+
+
+def test_waiters_are_woken_in_order_and_cancellation_passes_the_turn(monkeypatch):
+    """Test que las consultas en espera reciben el worker por orden y una cancelada no lo retiene"""
+    monkeypatch.setattr(streaming, 'SEARCH_WORKERS', 1)
+    finished = []
+
+    async def run(name, spec, delay):
+        await asyncio.sleep(delay)
+        items = [i async for i in stream_search(_factory, spec)]
+        finished.append(name)
+        return items
+
+    async def scenario():
+        first = asyncio.create_task(run('a', {'n': 1, 'busy_s': 0.3}, 0.0))
+        waiting = [asyncio.create_task(run(name, {'n': 2}, 0.05 + i * 0.02)) for i, name in enumerate('bcd')]
+        await asyncio.sleep(0.15)
+        waiting[0].cancel()  # 'b' deja de esperar: el worker pasa a 'c'
+        results = await asyncio.gather(first, *waiting[1:])
+        with pytest.raises(asyncio.CancelledError):
+            await waiting[0]
+        return results
+
+    assert asyncio.run(scenario()) == [[0], [0, 1], [0, 1]]
+    assert finished == ['a', 'c', 'd']
+    pool = streaming._POOLS[None]
+    assert pool.busy == 0 and len(pool.idle) == 1 and not pool._waiters
+
+
+def test_worker_forked_while_a_thread_holds_graph_locks():
+    """Test que un worker creado mientras otro thread usa los buffers del grafo no hereda el lock tomado"""
+    csr = get_csr(make_random_graph())
+    _SERVER_GRAPH[:] = [csr]
+
+    async def run():
+        return [i async for i in stream_search(_search_factory, {}, context=(csr,))]
+
+    try:
+        with csr._buffers_lock:  # Como un thread del threadpool en medio de compute_route
+            items = asyncio.run(asyncio.wait_for(run(), timeout=10))
+    finally:
+        _SERVER_GRAPH.clear()
+    assert items == ['ok']
+
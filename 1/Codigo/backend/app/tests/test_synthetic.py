@@ -0,0 +1,57 @@
+"""
+Tests del generador de redes viales sintéticas
+"""
+import networkx as nx
+import numpy as np
+import pytest
+
+from app.csr import CSRGraph
+from app.main import astar_stream, dijkstra_stream, haversine_m
+from app.routing import shortest_path
+from app.synthetic import ARTERIAL_KPH, HIGHWAY_KPH, LOCAL_KPH, generate_road_network, make_road_graph
+
+
+def test_synthetic_network_attributes():
+    """Test que la red tiene los atributos del grafo de osmnx, clases de velocidad y calles de mano única"""
+    G = make_road_graph(2500, seed=3)
+    assert G.number_of_nodes() == 2500 and isinstance(G, nx.MultiDiGraph)
+    speeds = set()
+    one_way = 0
+    for u, v, data in G.edges(data=True):
+        assert set(data) == {'length', 'weight', 'speed_kph'}
+        # length >= distancia en línea recta: la heurística de A* sigue siendo admisible
+        nu, nv = G.nodes[u], G.nodes[v]
+        assert data['length'] >= haversine_m(nu['y'], nu['x'], nv['y'], nv['x']) - 1e-6
+        assert data['weight'] == pytest.approx(data['length'] / (data['speed_kph'] / 3.6))
+        speeds.add(data['speed_kph'])
+        one_way += not G.has_edge(v, u)
+    assert speeds == {HIGHWAY_KPH, ARTERIAL_KPH, *LOCAL_KPH}
+    assert one_way > 0.1 * G.number_of_edges()
+
+    # Las manos únicas alternadas no dejan zonas aisladas
+    largest = max(nx.strongly_connected_components(G), key=len)
+    assert len(largest) > 0.95 * G.number_of_nodes()
+
+    # Misma semilla, misma red
+    again = generate_road_network(2500, seed=3)
+    assert np.array_equal(again.u, generate_road_network(2500, seed=3).u)
+    assert not np.array_equal(again.length, generate_road_network(2500, seed=4).length)
+
+
+def test_synthetic_csr_matches_networkx():
+    """Test que to_csr arma el mismo CSR que from_networkx sobre el MultiDiGraph generado"""
+    network = generate_road_network(900, seed=1)
+    csr = network.to_csr()
+    ref = CSRGraph.from_networkx(network.to_networkx())
+    for attr in ('node_ids', 'lat', 'lon', 'offsets', 'neighbors', 'weights', 'lengths', 'keys'):
+        assert np.array_equal(getattr(csr, attr), getattr(ref, attr)), attr
+    assert csr.max_speed == pytest.approx(ref.max_speed)
+
+    # Las búsquedas corren sobre el CSR directo igual que sobre el grafo de networkx
+    o, t = 0, csr.n_nodes - 1
+    cost, _, _ = shortest_path(csr, o, t, 'astar')
+    assert cost == pytest.approx(shortest_path(ref, o, t, 'dijkstra')[0])
+    done = [e for e in astar_stream(csr, o, t) if e['type'] == 'done'][-1]
+    ref_done = [e for e in dijkstra_stream(ref, o, t) if e['type'] == 'done'][-1]
+    assert done['distance_km'] == pytest.approx(ref_done['distance_km'])
+    assert done['nodes_explored'] < ref_done['nodes_explored']
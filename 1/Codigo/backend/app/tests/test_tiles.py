@@ -0,0 +1,111 @@
+"""
+Tests de las teselas binarias de la red vial
+"""
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.csr import get_csr
+from app.tiles import TileIndex, decode_tile
+from app.tests.test_csr import make_random_graph
+
+
+def _tile_of(lat, lon, z):
+    n = 1 << z
+    lat_r = math.radians(lat)
+    return int((lon + 180.0) / 360.0 * n), int((1.0 - math.asinh(math.tan(lat_r)) / math.pi) / 2.0 * n)
+
+
+def test_tiles_cover_every_edge_with_quantized_coords(tmp_path):
+    """Test que las teselas que cubren el grafo contienen todas las aristas con coordenadas precisas"""
+    G = make_random_graph(n=80, m=300, seed=8)
+    csr = get_csr(G)
+    index = TileIndex(csr, 'v-test', cache_dir=tmp_path)
+    z = 14
+    x0, y0 = _tile_of(float(csr.lat.max()), float(csr.lon.min()), z)
+    x1, y1 = _tile_of(float(csr.lat.min()), float(csr.lon.max()), z)
+
+    seen = {}
+    for x in range(x0, x1 + 1):
+        for y in range(y0, y1 + 1):
+            tile = decode_tile(index.tile(z, x, y))
+            assert (tile['z'], tile['x'], tile['y']) == (z, x, y)
+            assert tile['edges'] == sorted(tile['edges'])
+            seen.update(zip(tile['edges'], tile['coords']))
+    assert sorted(seen) == list(range(csr.n_edges))
+
+    coords = csr.edge_table().coords_l
+    for e, c in seen.items():
+        assert sum(c, []) == pytest.approx(sum(coords[e], []), abs=1e-5)  # ~1 m
+
+    # Segunda instancia: lee del disco sin regenerar
+    assert (tmp_path / 'v-test' / str(z) / str(x0) / f'{y0}.bin').exists()
+    assert TileIndex(csr, 'v-test', cache_dir=tmp_path).tile(z, x0, y0) == index.tile(z, x0, y0)
+
+
+def test_concurrent_misses_write_the_same_tile(monkeypatch, tmp_path):
+    """Test que dos consultas que generan la misma tesela a la vez no pisan el temporal de la otra"""
+    csr = get_csr(make_random_graph(n=80, m=300, seed=8))
+    index = TileIndex(csr, 'v-test', cache_dir=tmp_path, memory_size=0)
+    z = 14
+    x, y = _tile_of(float(csr.lat.mean()), float(csr.lon.mean()), z)
+    barrier = threading.Barrier(4)
+    build = index._build
+
+    def slow_build(*args):
+        data = build(*args)
+        barrier.wait(timeout=5)  # Las cuatro consultas llegan juntas a escribir el archivo
+        return data
+
+    monkeypatch.setattr(index, '_build', slow_build)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda _: index.tile(z, x, y), range(4)))
+    assert len(set(results)) == 1
+    tile_dir = tmp_path / 'v-test' / str(z) / str(x)
+    assert [p.name for p in tile_dir.iterdir()] == [f'{y}.bin']
+    assert (tile_dir / f'{y}.bin').read_bytes() == results[0]
+
+
+def test_disk_errors_still_serve_the_tile(monkeypatch, tmp_path):
+    """Test que un disco lleno o de solo lectura no impide servir la tesela ni deja temporales"""
+    csr = get_csr(make_random_graph(n=80, m=300, seed=8))
+    index = TileIndex(csr, 'v-test', cache_dir=tmp_path)
+    z = 14
+    x, y = _tile_of(float(csr.lat.mean()), float(csr.lon.mean()), z)
+
+    def full_disk(self, target):
+        raise OSError(28, 'No space left on device')
+
+    monkeypatch.setattr(Path, 'replace', full_disk)
+    data = index.tile(z, x, y)
+    assert data == index._build(z, x, y)
+    assert list((tmp_path / 'v-test' / str(z) / str(x)).iterdir()) == []
+    # Queda en la LRU de memoria: no se vuelve a generar
+    monkeypatch.setattr(index, '_build', None)
+    assert index.tile(z, x, y) == data
+
+
+def test_tile_endpoint_etag_and_range(monkeypatch, tmp_path):
+    """Test que el endpoint responde 304 con el ETag vigente y 404 fuera de rango"""
+    G = make_random_graph(n=80, m=300, seed=9)
+    monkeypatch.setattr(main, 'GRAPH', G)
+    monkeypatch.setattr(main, 'TILE_CACHE_DIR', tmp_path)
+    monkeypatch.setattr(main, '_TILE_INDEXES', {})
+    client = TestClient(main.app)
+
+    csr = get_csr(G)
+    x, y = _tile_of(float(csr.lat_l[0]), float(csr.lon_l[0]), 14)
+    first = client.get(f'/api/tiles/14/{x}/{y}')
+    assert first.status_code == 200 and first.headers['content-type'] == 'application/octet-stream'
+    assert decode_tile(first.content)['edges']
+
+    again = client.get(f'/api/tiles/14/{x}/{y}', headers={'If-None-Match': first.headers['etag']})
+    assert again.status_code == 304 and not again.content
+    assert client.get(f'/api/tiles/14/{x}/{y}', headers={'If-None-Match': '"otra"'}).status_code == 200
+    assert client.get('/api/tiles/14/99999/0').status_code == 404
+    assert client.get('/api/tiles/2/0/0').status_code == 404
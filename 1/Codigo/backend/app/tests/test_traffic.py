@@ -0,0 +1,153 @@
+"""
+Tests de los pesos dependientes del horario (perfiles de tráfico)
+"""
+import random
+
+import networkx as nx
+import pytest
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.csr import get_csr
+from app.main import astar_stream, dijkstra_stream, haversine_m
+from app.route_cache import RouteCache
+from app.tests.test_csr import make_random_graph
+from app.traffic import BUCKET_S, DAY_S, N_BUCKETS, TrafficProfiles, parse_departure
+
+
+def make_geometric_graph(n=60, m=240, seed=11):
+    """Grafo con longitudes >= distancia en línea recta, para que la heurística de A* sea admisible"""
+    rng = random.Random(seed)
+    G = nx.MultiDiGraph()
+    for i in range(n):
+        G.add_node(i, x=-58.83 + rng.uniform(0, 0.02), y=-27.47 + rng.uniform(0, 0.02))
+    for _ in range(m):
+        u, v = rng.randrange(n), rng.randrange(n)
+        speed = rng.choice([30, 40, 60])
+        length = haversine_m(G.nodes[u]['y'], G.nodes[u]['x'], G.nodes[v]['y'], G.nodes[v]['x']) * rng.uniform(1, 1.5)
+        G.add_edge(u, v, length=length, weight=length / (speed / 3.6), speed_kph=speed)
+    return G
+
+
+def make_profiles(G, tmp_path, seed=3):
+    """Perfiles desde un CSV con velocidades aleatorias en la mitad de las aristas"""
+    rng = random.Random(seed)
+    path = tmp_path / 'obs.csv'
+    lines = ['u,v,key,time,speed_kph']
+    for u, v, k in list(G.edges(keys=True))[::2]:
+        for b in rng.sample(range(N_BUCKETS), 40):
+            lines.append(f"{u},{v},{k},{b * BUCKET_S // 3600:02d}:{b * BUCKET_S % 3600 // 60:02d},{rng.uniform(3, 90):.1f}")
+    path.write_text('\n'.join(lines) + '\n')
+    return TrafficProfiles.from_csv(get_csr(G), path)
+
+
+def test_parse_departure():
+    """Test que la hora de salida acepta segundos y HH:MM[:SS] y rechaza valores inválidos"""
+    assert parse_departure('08:30') == 8 * 3600 + 30 * 60
+    assert parse_departure('23:59:59') == DAY_S - 1
+    assert parse_departure(120) == 120.0
+    for bad in ('25:00', '8', 'mañana', -1, DAY_S, True):
+        with pytest.raises(ValueError):
+            parse_departure(bad)
+
+
+def test_csv_profiles_and_fifo(tmp_path):
+    """Test que los perfiles promedian el CSV, se guardan y el tiempo de viaje cumple FIFO"""
+    G = make_random_graph(n=40, m=160, seed=5)
+    csr = get_csr(G)
+    path = tmp_path / 'obs.csv'
+    u, v, k = next(iter(G.edges(keys=True)))
+    path.write_text(f"u,v,key,time,speed_kph\n{u},{v},{k},08:05,20\n{u},{v},{k},08:10,40\n"
+                    f"{u},{v},{k},2024-05-02T08:14:00,30\n{u},{v},{k},08:15,0\n999999,1,0,08:00,10\n")
+    profiles = TrafficProfiles.from_csv(csr, path)
+    et = csr.edge_table()
+    e = next(e for e in range(csr.n_edges) if (et.u_l[e], et.v_l[e], csr.keys_l[e]) == (u, v, k))
+    assert profiles.n_profiles == 1
+    assert profiles.speeds.dtype.name == 'float16'
+    p = profiles.edge_profile[e]
+    assert float(profiles.speeds[p, 32]) == 30.0  # 08:00-08:15: promedio de 20, 40 y 30
+    assert float(profiles.speeds[p, 0]) == pytest.approx(36.0, rel=1e-3)  # Sin datos: flujo libre
+    # Velocidad 0 acotada a MIN_SPEED_KMH (1 km/h) en lugar de un tiempo infinito
+    assert csr.w_l[e] < profiles.travel_time(e, 8 * 3600 + 15 * 60) < DAY_S
+
+    profiles.save(tmp_path / 't.npz')
+    loaded = TrafficProfiles.load(tmp_path / 't.npz', csr)
+    assert loaded is not None and (loaded.edge_profile == profiles.edge_profile).all()
+
+    # FIFO: salir más tarde nunca hace llegar antes (también al pasar la medianoche)
+    profiles = make_profiles(G, tmp_path)
+    for e in range(0, csr.n_edges, 7):
+        arrivals = [t + profiles.travel_time(e, t) for t in range(DAY_S - 3 * BUCKET_S, DAY_S + BUCKET_S, 37)]
+        assert all(a <= b + 1e-6 for a, b in zip(arrivals, arrivals[1:]))
+
+
+def _earliest_arrivals(csr, profiles, o, departure):
+    """Llegadas más tempranas por relajación repetida (Bellman-Ford), como referencia"""
+    arrival = {o: departure}
+    changed = True
+    while changed:
+        changed = False
+        for u in list(arrival):
+            for e in range(csr.off_l[u], csr.off_l[u + 1]):
+                t = arrival[u] + profiles.travel_time(e, arrival[u])
+                v = csr.nbr_l[e]
+                if t < arrival.get(v, float('inf')) - 1e-9:
+                    arrival[v] = t
+                    changed = True
+    return arrival
+
+
+def test_time_dependent_searches_are_exact(tmp_path):
+    """Test que Dijkstra y A* dependientes del horario encuentran la llegada más temprana"""
+    G = make_geometric_graph()
+    csr = get_csr(G)
+    profiles = make_profiles(G, tmp_path)
+    rng = random.Random(4)
+    nodes = sorted(G.nodes)
+    for _ in range(20):
+        o, t = rng.sample(nodes, 2)
+        departure = float(rng.randrange(DAY_S))
+        reference = _earliest_arrivals(csr, profiles, csr.index[o], departure)
+        results = []
+        for stream in (dijkstra_stream, astar_stream):
+            done = list(stream(G, o, t, departure=departure, traffic=profiles))[-1]
+            assert done['departure_s'] == departure
+            results.append(done['arrival_s'])
+        if csr.index[t] in reference:
+            assert results[0] == pytest.approx(reference[csr.index[t]])
+            assert results[1] == pytest.approx(reference[csr.index[t]])
+        else:
+            assert results == [None, None]
+
+    # Sin hora de salida los perfiles no cambian nada
+    o, t = nodes[0], nodes[-1]
+    static = list(dijkstra_stream(G, o, t))[-1]
+    assert 'arrival_s' not in static
+    assert list(dijkstra_stream(G, o, t, traffic=profiles))[-1]['distance_km'] == static['distance_km']
+
+
+def test_ws_departure_param(monkeypatch, tmp_path):
+    """Test que /ws/run acepta la hora de salida con perfiles y la rechaza sin ellos"""
+    G = make_geometric_graph()
+    nodes = sorted(G.nodes)
+    monkeypatch.setattr(main, 'GRAPH', G)
+    monkeypatch.setattr(main, 'ROUTE_CACHE', RouteCache(maxsize=8))
+    monkeypatch.setattr(main, 'TRAFFIC', None)
+    client = TestClient(main.app)
+    msg = {'alg': 'dijkstra', 'orig': nodes[0], 'dest': nodes[-1],
+           'params': {'speed': 100, 'result_only': True, 'departure': '08:30'}}
+
+    def last_event(msg):
+        with client.websocket_connect('/ws/run') as ws:
+            ws.send_json(msg)
+            while True:
+                event = ws.receive_json()
+                if event['type'] in ('done', 'error'):
+                    return event
+
+    assert last_event(msg) == {'type': 'error', 'msg': 'Perfiles de tráfico no disponibles'}
+    monkeypatch.setattr(main, 'TRAFFIC', make_profiles(G, tmp_path))
+    done = last_event(msg)
+    assert done['departure_s'] == 8 * 3600 + 30 * 60 and done['arrival_s'] >= done['departure_s']
+    assert last_event({**msg, 'params': {**msg['params'], 'departure': '8h'}})['type'] == 'error'
+    assert last_event({**msg, 'alg': 'bidijkstra'})['type'] == 'error'
@@ -0,0 +1,113 @@
+"""
+Tests de los modos por lotes del WebSocket (columnar y binario)
+"""
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.route_cache import RouteCache
+from app.ws_protocol import batch_events, decode_binary, encode_binary, encode_columnar
+from app.main import bidirectional_stream
+from app.tests.test_csr import make_random_graph
+
+
+def _run(client, msg):
+    """Ejecuta una búsqueda y devuelve los eventos 'visited' (expandiendo los lotes) y el 'done'."""
+    visited, done = [], None
+    with client.websocket_connect('/ws/run') as ws:
+        ws.send_json(msg)
+        while done is None:
+            frame = ws.receive()
+            if frame.get('bytes') is not None:
+                visited.extend(decode_binary(frame['bytes']))
+                continue
+            event = json.loads(frame['text'])
+            if event['type'] == 'visited':
+                visited.append(event)
+            elif event['type'] == 'visited_batch':
+                visited.extend({'u': u, 'v': v, 'k': k} for u, v, k in zip(event['u'], event['v'], event['k']))
+            elif event['type'] in ('done', 'error'):
+                done = event
+    return [(e['u'], e['v'], e['k']) for e in visited], done
+
+
+def test_binary_roundtrip_and_batching():
+    """Test que los lotes respetan el orden y que el frame binario se decodifica igual"""
+    G = make_random_graph(n=80, m=300, seed=5)
+    nodes = sorted(G.nodes)
+    events = list(bidirectional_stream(G, nodes[0], nodes[-1]))
+    items = list(batch_events(iter(events), batch_size=7, batch_ms=1e9))
+
+    flat = [e for item in items for e in (item if isinstance(item, list) else [item])]
+    assert flat == events
+    assert all(len(item) <= 7 for item in items if isinstance(item, list))
+
+    batch = [e for e in events if e['type'] == 'visited']
+    assert all(e['id'] == 9 for e in decode_binary(encode_binary(batch, request_id=9)))
+    decoded = decode_binary(encode_binary(batch))
+    for a, b in zip(decoded, batch):
+        assert (a['edge_id'], a['direction']) == (b['edge_id'], b['direction'])
+        assert sum(a['coords'], []) == pytest.approx(sum(b['coords'], []), abs=1e-5)
+    assert encode_columnar(batch)['n'] == len(batch)
+
+
+def test_ws_batched_modes_match_event_mode(monkeypatch):
+    """Test que los modos columnar y binario entregan los mismos 'visited' que el modo por eventos"""
+    G = make_random_graph(n=80, m=300, seed=6)
+    nodes = sorted(G.nodes)
+    monkeypatch.setattr(main, 'GRAPH', G)
+    monkeypatch.setattr(main, 'ROUTE_CACHE', RouteCache(maxsize=8))
+    client = TestClient(main.app)
+
+    base = {'alg': 'dijkstra', 'orig': nodes[0], 'dest': nodes[-1], 'params': {'speed': 100}}
+    expected, done = _run(client, base)
+    for protocol in ('columnar', 'binary'):
+        got, got_done = _run(client, {**base, 'params': {'speed': 100, 'protocol': protocol, 'batch_size': 16}})
+        assert got == expected
+        assert got_done['distance_km'] == done['distance_km']
+
+    _, error = _run(client, {**base, 'params': {'protocol': 'xml'}})
+    assert error['type'] == 'error'
+
+
+def test_ws_session_multiplexes_requests_and_cancels(monkeypatch):
+    """Test que una sesión persistente atiende varias consultas por id y cancela la pedida"""
+    G = make_random_graph(n=80, m=300, seed=7)
+    nodes = sorted(G.nodes)
+    monkeypatch.setattr(main, 'GRAPH', G)
+    monkeypatch.setattr(main, 'ROUTE_CACHE', RouteCache(maxsize=8))
+    client = TestClient(main.app)
+
+    with client.websocket_connect('/ws/run') as ws:
+        # Consulta lenta (una pausa larga por evento) que se cancela a mitad
+        ws.send_json({'id': 1, 'alg': 'dijkstra', 'orig': nodes[0], 'dest': nodes[-1], 'params': {'speed': 0.01}})
+        assert ws.receive_json()['id'] == 1
+        ws.send_json({'type': 'cancel', 'id': 1})
+        ws.send_json({'id': 2, 'alg': 'astar', 'orig': nodes[0], 'dest': nodes[-1],
+                      'params': {'speed': 100, 'protocol': 'binary', 'batch_size': 16}})
+        events, cancelled = [], False
+        while True:
+            frame = ws.receive()
+            if frame.get('bytes') is not None:
+                events.extend(decode_binary(frame['bytes']))
+                continue
+            event = json.loads(frame['text'])
+            if event['type'] == 'cancelled':
+                assert event['id'] == 1
+                cancelled = True
+                continue
+            assert not (cancelled and event['id'] == 1)
+            events.append(event)
+            if event['type'] == 'done' and event['id'] == 2:
+                break
+        assert cancelled
+        assert {e['id'] for e in events if e['type'] == 'visited'} == {2}
+
+        # La conexión sigue abierta para otra consulta; sin id se rechaza
+        ws.send_json({'alg': 'dijkstra', 'orig': nodes[0], 'dest': nodes[-1]})
+        assert ws.receive_json()['type'] == 'error'
+        ws.send_json({'id': 'b', 'alg': 'dijkstra', 'orig': nodes[0], 'dest': nodes[1], 'params': {'speed': 100}})
+        while (event := ws.receive_json())['type'] != 'done':
+            assert event['id'] == 'b'
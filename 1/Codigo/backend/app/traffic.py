@@ -0,0 +1,199 @@
+"""
+Pesos dependientes del horario (perfiles de velocidad por arista)
+
+El peso estático de una arista es length / speed_kph, igual a toda hora. Con
+perfiles de tráfico cada arista observada tiene una velocidad por franja de
+15 minutos (96 por día) y el costo de recorrerla depende de la hora de entrada.
+
+- Almacenamiento: matriz float16 (perfiles x 96) de velocidades en km/h, más el
+  índice de perfil de cada arista (-1 = sin observaciones: peso estático). Se
+  guarda en un .npz junto a la caché del grafo.
+- FIFO: el tiempo de viaje no se toma de la velocidad a la hora de entrada (eso
+  permitiría "llegar antes saliendo después" al cambiar de franja) sino que se
+  integra la distancia recorrida franja por franja. Así llegar más tarde a una
+  arista nunca hace salir antes de ella, y Dijkstra / A* sobre tiempos de
+  llegada siguen siendo exactos.
+- Observaciones: CSV con columnas u, v, [key], time, speed_kph (time "HH:MM",
+  "HH:MM:SS" o fecha ISO). Se promedia por arista y franja; las franjas sin datos
+  usan la velocidad de flujo libre de la arista.
+
+Construcción offline (desde backend/): python -m app.traffic observaciones.csv
+"""
+import csv
+import logging
+from array import array
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+import numpy as np
+
+from .csr import CSRGraph
+
+logger = logging.getLogger(__name__)
+
+TRAFFIC_VERSION = 2  # 2: huella SHA-1 del grafo (CSRGraph.fingerprint)
+BUCKET_S = 15 * 60
+N_BUCKETS = 24 * 3600 // BUCKET_S
+DAY_S = 24 * 3600
+MIN_SPEED_KMH = 1.0  # Cota inferior: una velocidad 0 haría infinito el tiempo de viaje
+
+
+def parse_departure(value: Any) -> float:
+    """Hora de salida en segundos desde medianoche: número de segundos o "HH:MM[:SS]"."""
+    if isinstance(value, bool):
+        raise ValueError(f"Hora de salida inválida: {value!r}")
+    if isinstance(value, (int, float)):
+        if not 0 <= value < DAY_S:
+            raise ValueError(f"Hora de salida fuera de rango: {value}")
+        return float(value)
+    try:
+        parts = [int(p) for p in str(value).split(':')]
+    except ValueError:
+        raise ValueError(f"Hora de salida inválida: {value!r}") from None
+    if not 2 <= len(parts) <= 3 or not (0 <= parts[0] < 24 and 0 <= parts[1] < 60) or \
+            (len(parts) == 3 and not 0 <= parts[2] < 60):
+        raise ValueError(f"Hora de salida inválida: {value!r}")
+    return float(parts[0] * 3600 + parts[1] * 60 + (parts[2] if len(parts) == 3 else 0))
+
+
+def _time_of_day(value: str) -> float:
+    value = value.strip()
+    if 'T' in value or '-' in value:
+        ts = datetime.fromisoformat(value)
+        return float(ts.hour * 3600 + ts.minute * 60 + ts.second)
+    return parse_departure(value)
+
+
+class TrafficProfiles:
+    """
+    Perfiles de velocidad por franja de 15 minutos.
+
+    speeds[p, b]: velocidad (km/h, float16) del perfil p en la franja b
+    edge_profile[e]: perfil de la arista e, o -1 si usa su peso estático
+    """
+
+    def __init__(self, csr: CSRGraph, speeds: np.ndarray, edge_profile: np.ndarray, checksum: str):
+        self.speeds = np.asarray(speeds, dtype=np.float16).reshape(-1, N_BUCKETS)
+        self.edge_profile = np.asarray(edge_profile, dtype=np.int32)
+        self.checksum = checksum
+        # Perfiles tal como se cargaron; edge_profile puede tener aristas anuladas por parches
+        self.base_profile = self.edge_profile
+        # Copias para el bucle de relajación: índices en lista y velocidades en m/s
+        # como array('f') plano (indexarlo devuelve un float de Python sin pasar por NumPy)
+        self._profile_l = self.edge_profile.tolist()
+        ms = np.maximum(self.speeds.astype(np.float32), MIN_SPEED_KMH) / np.float32(3.6)
+        self._ms = array('f', ms.ravel().tobytes())
+        self._len_l, self._w_l = csr.len_l, csr.w_l
+        # m/s, cota para la heurística de A*: ningún perfil puede superarla
+        self.max_speed = max(csr.max_speed, float(ms.max()) if ms.size else 0.0)
+
+    @property
+    def n_profiles(self) -> int:
+        return len(self.speeds)
+
+    def travel_time(self, e: int, t: float) -> float:
+        """Segundos para recorrer la arista e entrando a los t segundos desde medianoche."""
+        p = self._profile_l[e]
+        if p < 0:
+            return self._w_l[e]
+        ms, base = self._ms, p * N_BUCKETS
+        remaining = self._len_l[e]
+        time = t
+        while True:
+            day_t = time % DAY_S
+            b = int(day_t // BUCKET_S)
+            speed = ms[base + b]
+            span = (b + 1) * BUCKET_S - day_t
+            if speed * span >= remaining:
+                return time + remaining / speed - t
+            remaining -= speed * span
+            time += span
+
+    def for_graph(self, csr: CSRGraph) -> 'TrafficProfiles':
+        """
+        Perfiles para una versión parcheada del grafo (ver patches.py): las aristas
+        con parche usan su peso parcheado (o quedan cortadas) en lugar del perfil.
+        """
+        edge_profile = self.base_profile.copy()
+        edge_profile[csr.weights != csr.base.weights] = -1
+        profiles = TrafficProfiles(csr, self.speeds, edge_profile, self.checksum)
+        profiles.base_profile = self.base_profile
+        return profiles
+
+    @classmethod
+    def from_csv(cls, csr: CSRGraph, path: Union[str, Path]) -> 'TrafficProfiles':
+        """Promedia las observaciones del CSV por arista y franja (ver docstring del módulo)."""
+        sums: Dict[Tuple[int, int], float] = {}
+        counts: Dict[Tuple[int, int], int] = {}
+        skipped = 0
+        with open(path, newline='') as f:
+            for row in csv.DictReader(f):
+                try:
+                    u, v = csr.index[int(row['u'])], csr.index[int(row['v'])]
+                    key = int(row['key']) if row.get('key') not in (None, '') else None
+                    bucket = int(_time_of_day(row['time']) // BUCKET_S)
+                    speed = float(row['speed_kph'])
+                except (KeyError, ValueError):
+                    skipped += 1
+                    continue
+                edges = [e for e in range(csr.off_l[u], csr.off_l[u + 1])
+                         if csr.nbr_l[e] == v and (key is None or csr.keys_l[e] == key)]
+                if not edges:
+                    skipped += 1
+                for e in edges:
+                    sums[e, bucket] = sums.get((e, bucket), 0.0) + speed
+                    counts[e, bucket] = counts.get((e, bucket), 0) + 1
+        if skipped:
+            logger.warning(f"{skipped} observaciones de tráfico ignoradas (arista o formato inválidos)")
+
+        observed = sorted({e for e, _ in sums})
+        edge_profile = np.full(csr.n_edges, -1, dtype=np.int32)
+        edge_profile[observed] = np.arange(len(observed), dtype=np.int32)
+        # Franjas sin datos: velocidad de flujo libre (la del peso estático)
+        free_flow = [csr.len_l[e] / csr.w_l[e] * 3.6 if csr.w_l[e] > 0 else csr.max_speed * 3.6 for e in observed]
+        speeds = np.repeat(np.asarray(free_flow, dtype=np.float64)[:, None], N_BUCKETS, axis=1)
+        for (e, b), total in sums.items():
+            speeds[edge_profile[e], b] = total / counts[e, b]
+        return cls(csr, speeds.astype(np.float16), edge_profile, csr.fingerprint())
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Guarda los perfiles en un .npz."""
+        np.savez(path, version=TRAFFIC_VERSION, checksum=self.checksum,
+                 speeds=self.speeds, edge_profile=self.edge_profile)
+
+    @classmethod
+    def load(cls, path: Union[str, Path], csr: CSRGraph) -> Optional['TrafficProfiles']:
+        """Carga los perfiles; devuelve None si fueron calculados para otro grafo o pesos."""
+        with np.load(path) as data:
+            if int(data['version']) != TRAFFIC_VERSION or str(data['checksum']) != csr.fingerprint():
+                return None
+            return cls(csr, data['speeds'], data['edge_profile'], str(data['checksum']))
+
+
+def load_traffic_profiles(csr: CSRGraph, path: Union[str, Path]) -> Optional[TrafficProfiles]:
+    """Perfiles guardados junto a la caché del grafo, o None si no hay (o están desactualizados)."""
+    if not Path(path).exists():
+        return None
+    try:
+        profiles = TrafficProfiles.load(path, csr)
+        if profiles is None:
+            logger.info(f"Perfiles de tráfico desactualizados: {path}")
+        return profiles
+    except Exception as e:
+        logger.warning(f"No se pudieron leer los perfiles de tráfico {path}: {e}")
+        return None
+
+
+if __name__ == '__main__':
+    # Construcción offline (desde backend/): python -m app.traffic observaciones.csv [región]
+    import sys
+
+    from .main import DEFAULT_REGION, REGIONS, load_server_graph
+
+    logging.basicConfig(level=logging.INFO)
+    region = REGIONS[sys.argv[2] if len(sys.argv) > 2 else DEFAULT_REGION]
+    csr = load_server_graph(region.graph_file, region.place, region.radius_m)
+    profiles = TrafficProfiles.from_csv(csr, sys.argv[1])
+    profiles.save(region.traffic_file)
+    print(f"Perfiles de tráfico guardados en {region.traffic_file}: {profiles.n_profiles} aristas con observaciones")
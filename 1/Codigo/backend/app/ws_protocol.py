@@ -0,0 +1,177 @@
+"""
+Modos de protocolo del WebSocket /ws/run
+
+El modo original ("events") envía un mensaje JSON por evento. Para exploraciones
+grandes eso son cientos de miles de frames chicos, cada uno con su json.dumps y
+su pausa. El cliente puede negociar en params.protocol un modo por lotes:
+
+- "columnar": los eventos 'visited' se agrupan en un mensaje JSON
+  {"type": "visited_batch", "n": N, "u": [...], "v": [...], "k": [...],
+   "weight": [...], "coords": [lat_u, lon_u, lat_v, lon_v, ...], "direction": [...]}
+  (coords redondeadas a 6 decimales, ~0.1 m; direction solo en bidireccionales).
+
+- "binary": los eventos 'visited' se agrupan en un frame binario little-endian:
+
+      offset 0   uint8   versión (BINARY_VERSION)
+      offset 1   uint8   tipo (1 = visited)
+      offset 2   uint8   flags (bit 0: hay arreglo direction; bit 1: hay id de consulta)
+      offset 3   uint8   reservado
+      offset 4   uint32  N
+      offset 8   int64       id de la consulta, si flags & 2 (sesiones persistentes)
+                 int64[N]    u
+                 int64[N]    v
+                 int32[N]    k
+                 float32[N]  weight
+                 float32[4N] coords (lat_u, lon_u, lat_v, lon_v por arista)
+                 uint8[N]    direction (0 = forward, 1 = backward), si flags & 1
+
+  Cada arreglo queda alineado a su tamaño, así que el cliente puede leerlos con
+  TypedArrays sobre el mismo ArrayBuffer sin copiar.
+
+En ambos modos el resto de los eventos (status, progress, path, done, error)
+siguen siendo mensajes JSON individuales y se respeta el orden: un lote se envía
+antes de cualquier evento que no sea 'visited'. Un lote se cierra al llegar a
+batch_size eventos o cuando pasan batch_ms desde su primer evento.
+
+En una sesión persistente (varias consultas por conexión) cada mensaje JSON lleva
+el "id" de su consulta y los frames binarios lo llevan tras el header; por eso
+ahí el id de una consulta binaria tiene que ser un entero.
+"""
+import json
+import struct
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+PROTOCOLS = ('events', 'columnar', 'binary')
+BINARY_VERSION = 1
+KIND_VISITED = 1
+FLAG_DIRECTION = 1
+FLAG_REQUEST_ID = 2
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_BATCH_MS = 50.0
+
+_HEADER = struct.Struct('<BBBBI')
+_REQUEST_ID = struct.Struct('<q')
+
+
+def batch_events(
+    gen: Iterator[Dict[str, Any]],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    batch_ms: float = DEFAULT_BATCH_MS,
+) -> Iterator[Union[Dict[str, Any], List[Dict[str, Any]]]]:
+    """Agrupa los eventos 'visited' consecutivos en listas; el resto pasa tal cual."""
+    batch: List[Dict[str, Any]] = []
+    started = 0.0
+    for event in gen:
+        if event['type'] == 'visited':
+            if not batch:
+                started = time.monotonic()
+            batch.append(event)
+            if len(batch) >= batch_size or (time.monotonic() - started) * 1000 >= batch_ms:
+                yield batch
+                batch = []
+            continue
+        if batch:
+            yield batch
+            batch = []
+        yield event
+    if batch:
+        yield batch
+
+
+def encode_columnar(batch: List[Dict[str, Any]], request_id: Any = None) -> Dict[str, Any]:
+    """Lote de eventos 'visited' como un mensaje JSON con columnas."""
+    coords = []
+    for e in batch:
+        (lat_u, lon_u), (lat_v, lon_v) = e['coords']
+        coords.extend((round(lat_u, 6), round(lon_u, 6), round(lat_v, 6), round(lon_v, 6)))
+    msg = {
+        'type': 'visited_batch',
+        'n': len(batch),
+        'u': [e['u'] for e in batch],
+        'v': [e['v'] for e in batch],
+        'k': [e['k'] for e in batch],
+        'weight': [e['weight'] for e in batch],
+        'coords': coords,
+    }
+    if 'direction' in batch[0]:
+        msg['direction'] = [e['direction'] for e in batch]
+    if request_id is not None:
+        msg['id'] = request_id
+    return msg
+
+
+def encode_binary(batch: List[Dict[str, Any]], request_id: Optional[int] = None) -> bytes:
+    """Lote de eventos 'visited' como frame binario (formato en el docstring del módulo)."""
+    has_direction = 'direction' in batch[0]
+    flags = (FLAG_DIRECTION if has_direction else 0) | (FLAG_REQUEST_ID if request_id is not None else 0)
+    parts = [
+        _HEADER.pack(BINARY_VERSION, KIND_VISITED, flags, 0, len(batch)),
+        _REQUEST_ID.pack(request_id) if request_id is not None else b'',
+        np.fromiter((e['u'] for e in batch), dtype='<i8', count=len(batch)).tobytes(),
+        np.fromiter((e['v'] for e in batch), dtype='<i8', count=len(batch)).tobytes(),
+        np.fromiter((e['k'] for e in batch), dtype='<i4', count=len(batch)).tobytes(),
+        np.fromiter((e['weight'] for e in batch), dtype='<f4', count=len(batch)).tobytes(),
+        np.array([e['coords'] for e in batch], dtype='<f4').tobytes(),
+    ]
+    if has_direction:
+        parts.append(bytes(e['direction'] == 'backward' for e in batch))
+    return b''.join(parts)
+
+
+def tag_event(event: Dict[str, Any], request_id: Any = None) -> Dict[str, Any]:
+    """Copia del evento con el id de su consulta (sin id, el evento tal cual)."""
+    return event if request_id is None else {**event, 'id': request_id}
+
+
+def encode_frames(
+    items: Iterator[Union[Dict[str, Any], List[Dict[str, Any]]]],
+    protocol: str = 'events',
+    request_id: Any = None,
+) -> Iterator[Tuple[Union[str, bytes], Optional[Dict[str, Any]]]]:
+    """
+    Serializa eventos (o lotes de batch_events) a frames listos para enviar. Cada
+    frame va con su evento original si es 'status', 'path' o 'done' (para la caché de rutas).
+    Se ejecuta en el worker de búsqueda, así el event loop no serializa nada.
+    """
+    for item in items:
+        if isinstance(item, list):
+            if protocol == 'binary':
+                yield encode_binary(item, request_id), None
+            else:
+                yield json.dumps(encode_columnar(item, request_id)), None
+        else:
+            yield json.dumps(tag_event(item, request_id)), (item if item['type'] in ('status', 'path', 'done') else None)
+
+
+def decode_binary(frame: bytes) -> List[Dict[str, Any]]:
+    """Inversa de encode_binary (referencia para clientes y tests)."""
+    version, kind, flags, _, n = _HEADER.unpack_from(frame, 0)
+    if version != BINARY_VERSION or kind != KIND_VISITED:
+        raise ValueError(f"Frame binario no soportado (versión {version}, tipo {kind})")
+    offset = _HEADER.size
+    request_id = None
+    if flags & FLAG_REQUEST_ID:
+        request_id, = _REQUEST_ID.unpack_from(frame, offset)
+        offset += _REQUEST_ID.size
+    cols = {}
+    for name, dtype, count in (('u', '<i8', n), ('v', '<i8', n), ('k', '<i4', n),
+                               ('weight', '<f4', n), ('coords', '<f4', 4 * n)):
+        cols[name] = np.frombuffer(frame, dtype, count, offset)
+        offset += cols[name].nbytes
+    u, v, k, w = cols['u'], cols['v'], cols['k'], cols['weight']
+    coords = cols['coords'].reshape(n, 2, 2)
+    direction = np.frombuffer(frame, np.uint8, n, offset) if flags & FLAG_DIRECTION else None
+    events = []
+    for i in range(n):
+        event = {
+            'type': 'visited', 'edge_id': f"{u[i]}|{v[i]}|{k[i]}",
+            'u': int(u[i]), 'v': int(v[i]), 'k': int(k[i]), 'weight': float(w[i]),
+            'coords': coords[i].tolist(),
+        }
+        if direction is not None:
+            event['direction'] = 'backward' if direction[i] else 'forward'
+        events.append(tag_event(event, request_id))
+    return events
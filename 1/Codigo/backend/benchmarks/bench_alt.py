@@ -0,0 +1,49 @@
+"""
+Benchmark: nodos explorados por A* (haversine / velocidad máxima) vs. A* con ALT
+
+Uso (desde backend/):
+    python -m benchmarks.bench_alt [n_queries] [n_landmarks]
+
+Usa un conjunto fijo de consultas (semilla 42) para que los resultados sean comparables.
+"""
+import sys
+import time
+
+from app.alt import LandmarkTables
+from app.csr import get_csr
+from app.main import astar_stream, dijkstra_stream
+from benchmarks.common import load_bench_graph, random_pairs
+
+
+def _run(gen):
+    t0 = time.perf_counter()
+    done = [e for e in gen if e['type'] == 'done'][0]
+    return done['nodes_explored'], time.perf_counter() - t0
+
+
+def main(n_queries: int = 50, n_landmarks: int = 8):
+    G = load_bench_graph()
+    csr = get_csr(G)
+    t0 = time.perf_counter()
+    tables = LandmarkTables.build(csr, n_landmarks=n_landmarks)
+    print(f"Preprocesamiento ALT: {time.perf_counter() - t0:.2f}s, {tables.n_landmarks} landmarks, "
+          f"{(tables.from_lm.nbytes + tables.to_lm.nbytes) / 1e6:.1f} MB")
+
+    totals = {'dijkstra': [0, 0.0], 'astar': [0, 0.0], 'alt': [0, 0.0]}
+    for orig, dest in random_pairs(G, n_queries):
+        for name, gen in (('dijkstra', dijkstra_stream(G, orig, dest, decimate=10 ** 9)),
+                          ('astar', astar_stream(G, orig, dest, decimate=10 ** 9)),
+                          ('alt', astar_stream(G, orig, dest, decimate=10 ** 9, landmarks=tables))):
+            explored, elapsed = _run(gen)
+            totals[name][0] += explored
+            totals[name][1] += elapsed
+
+    base = totals['astar'][0]
+    for name, (explored, elapsed) in totals.items():
+        print(f"{name:9s} {explored / n_queries:9.0f} nodos/consulta ({explored / base:6.1%} de A*) "
+              f"{elapsed / n_queries * 1000:8.2f} ms/consulta")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 8)
@@ -0,0 +1,45 @@
+"""
+Benchmark: rutas alternativas (método de plateaus) para K = 1..5
+
+Para cada K mide el tiempo por consulta, cuántas rutas se encuentran en promedio,
+su costo relativo a la óptima y la superposición máxima con las rutas anteriores.
+Los dos árboles de búsqueda se calculan una vez por consulta, así que pasar de K=1
+a K=5 solo agrega la selección de candidatos.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_alternatives [n_queries]
+"""
+import sys
+import time
+
+from app.alternatives import MAX_ALTERNATIVES, alternative_routes
+from app.csr import get_csr
+from benchmarks.common import load_bench_graph, random_pairs
+
+
+def main(n_queries: int = 30):
+    G = load_bench_graph()
+    csr = get_csr(G)
+    csr.edge_table()
+    csr.reverse()
+    pairs = [(csr.index[o], csr.index[d]) for o, d in random_pairs(G, n_queries)]
+    print(f"{csr.n_nodes} nodos, {csr.n_edges} aristas, {n_queries} consultas\n")
+    print(f"{'K':>2} {'ms/consulta':>12} {'rutas':>6} {'costo/óptimo':>13} {'superposición':>14}")
+    for k in range(1, MAX_ALTERNATIVES + 1):
+        found, stretch, overlap, n_alt = 0, 0.0, 0.0, 0
+        t0 = time.perf_counter()
+        results = [alternative_routes(csr, s, t, k=k, collect=False)[0] for s, t in pairs]
+        elapsed = time.perf_counter() - t0
+        for routes in results:
+            found += len(routes)
+            for i, route in enumerate(routes[1:], 1):
+                n_alt += 1
+                stretch += route.cost / routes[0].cost
+                overlap += max(sum(csr.w_l[e] for e in set(route.edges) & set(other.edges))
+                               for other in routes[:i]) / route.cost
+        print(f"{k:>2} {elapsed / n_queries * 1000:>12.1f} {found / n_queries:>6.2f} "
+              f"{stretch / n_alt if n_alt else 1.0:>13.3f} {overlap / n_alt if n_alt else 0.0:>14.2f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 30)
@@ -0,0 +1,34 @@
+"""
+Benchmark: búsquedas unidireccionales vs. bidireccionales (nodos asentados y tiempo)
+
+Uso (desde backend/):
+    python -m benchmarks.bench_bidirectional [n_queries]
+"""
+import sys
+import time
+
+from app.main import astar_stream, bidirectional_stream, dijkstra_stream
+from benchmarks.common import load_bench_graph, random_pairs
+
+NO_EVENTS = 10 ** 9  # decimate enorme: casi sin eventos 'visited'
+
+
+def main(n_queries: int = 50):
+    G = load_bench_graph()
+    runners = {
+        'dijkstra': lambda o, d: dijkstra_stream(G, o, d, decimate=NO_EVENTS),
+        'bidijkstra': lambda o, d: bidirectional_stream(G, o, d, decimate=NO_EVENTS),
+        'astar': lambda o, d: astar_stream(G, o, d, decimate=NO_EVENTS),
+        'biastar': lambda o, d: bidirectional_stream(G, o, d, decimate=NO_EVENTS, heuristic=True),
+    }
+    pairs = random_pairs(G, n_queries)
+    for name, run in runners.items():
+        explored, t0 = 0, time.perf_counter()
+        for orig, dest in pairs:
+            explored += [e for e in run(orig, dest) if e['type'] == 'done'][0]['nodes_explored']
+        elapsed = time.perf_counter() - t0
+        print(f"{name:11s} {explored / n_queries:9.0f} nodos/consulta {elapsed / n_queries * 1000:8.2f} ms/consulta")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
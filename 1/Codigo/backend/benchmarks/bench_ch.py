@@ -0,0 +1,45 @@
+"""
+Benchmark: preprocesamiento y consultas de Contraction Hierarchies vs. Dijkstra
+
+Uso (desde backend/):
+    python -m benchmarks.bench_ch [n_queries]
+"""
+import sys
+import time
+
+from app.ch import ContractionHierarchy, ch_query
+from app.csr import get_csr
+from app.main import dijkstra_stream
+from benchmarks.common import load_bench_graph, random_pairs
+
+
+def main(n_queries: int = 200):
+    G = load_bench_graph()
+    csr = get_csr(G)
+    t0 = time.perf_counter()
+    ch = ContractionHierarchy.build(csr)
+    print(f"Preprocesamiento CH: {time.perf_counter() - t0:.1f}s, {ch.n_shortcuts} atajos "
+          f"({csr.n_nodes} nodos, {csr.n_edges} aristas)")
+
+    pairs = [(csr.index[o], csr.index[d]) for o, d in random_pairs(G, n_queries)]
+    t0 = time.perf_counter()
+    settled = 0
+    for s, t in pairs:
+        settled += ch_query(ch, s, t, collect=False)[2]
+    t_ch = (time.perf_counter() - t0) / n_queries
+
+    sample = pairs[:20]
+    t0 = time.perf_counter()
+    explored = 0
+    for s, t in sample:
+        for e in dijkstra_stream(csr, csr.ids_l[s], csr.ids_l[t], decimate=10 ** 9):
+            if e['type'] == 'done':
+                explored += e['nodes_explored']
+    t_dij = (time.perf_counter() - t0) / len(sample)
+
+    print(f"CH       {t_ch * 1000:8.2f} ms/consulta, {settled / n_queries:8.0f} nodos asentados")
+    print(f"Dijkstra {t_dij * 1000:8.2f} ms/consulta, {explored / len(sample):8.0f} nodos explorados")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
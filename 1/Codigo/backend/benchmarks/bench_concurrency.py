@@ -0,0 +1,109 @@
+"""
+Benchmark: N sesiones /ws/run simultáneas, búsquedas en el event loop vs. en procesos worker
+
+Uso (desde backend/):
+    python -m benchmarks.bench_concurrency [n_sesiones] [lado_grilla]
+
+Levanta uvicorn en un proceso aparte (sin startup, con la grilla sintética), abre N
+WebSockets a la vez con rutas largas (protocolo binario: pocos frames, el caso en
+que la búsqueda casi no cede el control) y, en paralelo, consulta /api/find-nearest
+cada 20 ms. Reporta el tiempo total, el tiempo medio por sesión y la latencia de
+/api/find-nearest (p50 / máx) mientras corren las búsquedas: con las búsquedas
+en el event loop esa latencia crece hasta la duración de una búsqueda entera.
+"""
+import asyncio
+import json
+import logging
+import multiprocessing
+import socket
+import statistics
+import sys
+import time
+
+import httpx
+import uvicorn
+import websockets
+
+from app import main as server
+from app import streaming
+from app.route_cache import RouteCache
+from benchmarks.common import make_grid_graph
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+async def _session(url: str, orig, dest) -> float:
+    t0 = time.perf_counter()
+    async with websockets.connect(url, max_size=None) as ws:
+        await ws.send(json.dumps({'alg': 'dijkstra', 'orig': orig, 'dest': dest,
+                                  'params': {'speed': 1000, 'protocol': 'binary', 'batch_ms': 200}}))
+        async for frame in ws:
+            if isinstance(frame, str) and json.loads(frame)['type'] in ('done', 'error'):
+                break
+    return time.perf_counter() - t0
+
+
+async def _probe(base: str, stop: asyncio.Event, latencies: list) -> None:
+    async with httpx.AsyncClient(base_url=base) as client:
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            await client.get('/api/find-nearest', params={'lat': -27.46, 'lon': -58.82})
+            latencies.append(time.perf_counter() - t0)
+            await asyncio.sleep(0.02)
+
+
+async def _run(port: int, pairs) -> None:
+    latencies: list = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe(f'http://127.0.0.1:{port}', stop, latencies))
+    t0 = time.perf_counter()
+    durations = await asyncio.gather(*(_session(f'ws://127.0.0.1:{port}/ws/run', o, d) for o, d in pairs))
+    total = time.perf_counter() - t0
+    stop.set()
+    await probe
+    print(f"  total {total:6.2f}s | sesión media {statistics.mean(durations):6.2f}s | "
+          f"find-nearest p50 {statistics.median(latencies) * 1000:7.1f} ms, "
+          f"máx {max(latencies) * 1000:7.1f} ms ({len(latencies)} consultas)")
+
+
+def _serve(port: int, workers: int) -> None:
+    streaming.SEARCH_WORKERS = workers
+    uvicorn.run(server.app, host='127.0.0.1', port=port, lifespan='off', log_level='warning')
+
+
+def _wait_port(port: int) -> None:
+    while True:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+
+
+def main(n_sessions: int = 4, side: int = 100):
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+    G = make_grid_graph(side=side)
+    server.GRAPH = server.get_csr(G)
+    server.ROUTE_CACHE = RouteCache(maxsize=0)
+    nodes = sorted(G.nodes)
+    pairs = [(nodes[i], nodes[-1 - i]) for i in range(n_sessions)]
+
+    for workers, label in ((0, 'en el event loop'), (max(2, streaming.SEARCH_WORKERS), 'en procesos worker')):
+        # Servidor en otro proceso: los clientes no deben competir por su GIL
+        port = _free_port()
+        server_process = multiprocessing.get_context('fork').Process(
+            target=_serve, args=(port, workers))
+        server_process.start()
+        _wait_port(port)
+        print(f"{n_sessions} sesiones, búsquedas {label}:")
+        asyncio.run(_run(port, pairs))
+        server_process.terminate()
+        server_process.join()
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 4,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 100)
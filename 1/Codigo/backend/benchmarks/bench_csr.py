@@ -0,0 +1,48 @@
+"""
+Benchmark: búsqueda sobre networkx vs. sobre la representación CSR
+
+Uso (desde backend/):
+    python -m benchmarks.bench_csr [n_queries]
+
+Se mide con decimate=1 (un evento por arista relajada) y decimate=1000 (casi sin
+eventos, aísla el costo del bucle de búsqueda). Verifica además que ambas implementaciones emiten exactamente los mismos eventos.
+"""
+import sys
+import time
+
+from app.csr import get_csr
+from app.main import astar_stream, dijkstra_stream
+from app.nx_search import astar_stream_nx, dijkstra_stream_nx
+from benchmarks.common import load_bench_graph, random_pairs
+
+
+def _strip_time(events):
+    return [{k: v for k, v in e.items() if k != 'time_s'} for e in events]
+
+
+def main(n_queries: int = 20):
+    G = load_bench_graph()
+    t0 = time.perf_counter()
+    get_csr(G)
+    print(f"Construcción CSR: {time.perf_counter() - t0:.3f}s "
+          f"({len(G.nodes)} nodos, {len(G.edges)} aristas)")
+
+    pairs = random_pairs(G, n_queries)
+    for decimate in (1, 1000):
+        for name, fast, ref in (('dijkstra', dijkstra_stream, dijkstra_stream_nx),
+                                ('astar', astar_stream, astar_stream_nx)):
+            t_ref = t_fast = 0.0
+            for orig, dest in pairs:
+                t0 = time.perf_counter()
+                ev_ref = list(ref(G, orig, dest, decimate=decimate))
+                t_ref += time.perf_counter() - t0
+                t0 = time.perf_counter()
+                ev_fast = list(fast(G, orig, dest, decimate=decimate))
+                t_fast += time.perf_counter() - t0
+                assert _strip_time(ev_ref) == _strip_time(ev_fast), f"{name}: eventos distintos para {orig}->{dest}"
+            print(f"{name:9s} decimate={decimate:<5d} networkx {t_ref / n_queries * 1000:8.1f} ms/consulta | "
+                  f"CSR {t_fast / n_queries * 1000:8.1f} ms/consulta | x{t_ref / t_fast:.2f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
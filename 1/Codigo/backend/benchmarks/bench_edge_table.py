@@ -0,0 +1,79 @@
+"""
+Benchmark: eventos y muestra de aristas con la tabla de aristas precalculada
+
+Uso (desde backend/):
+    python -m benchmarks.bench_edge_table [lado_grilla]
+
+1. Arma un evento 'visited' por cada arista del grafo como antes (id con
+   f-string y coordenadas buscadas por nodo) y por índice sobre csr.EdgeTable.
+2. Mide /api/edges-sample: primera consulta (muestra + json) y consultas
+   siguientes (respuesta cacheada por decimate).
+"""
+import sys
+import time
+
+from fastapi.testclient import TestClient
+
+from app import main as server
+from app.csr import get_csr
+from benchmarks.common import make_grid_graph
+
+
+def _events_formatted(csr):
+    ids, keys, lat, lon, nbr, off = csr.ids_l, csr.keys_l, csr.lat_l, csr.lon_l, csr.nbr_l, csr.off_l
+    for u in range(csr.n_nodes):
+        for e in range(off[u], off[u + 1]):
+            v = nbr[e]
+            u_id, v_id = ids[u], ids[v]
+            yield {
+                'type': 'visited', 'edge_id': f"{u_id}|{v_id}|{keys[e]}",
+                'u': u_id, 'v': v_id, 'k': keys[e], 'weight': csr.w_l[e],
+                'coords': [[lat[u], lon[u]], [lat[v], lon[v]]]
+            }
+
+
+def _events_indexed(csr):
+    et = csr.edge_table()
+    edge_ids, us, vs, keys, coords, wts = et.edge_id_l, et.u_l, et.v_l, csr.keys_l, et.coords_l, csr.w_l
+    for e in range(csr.n_edges):
+        yield {
+            'type': 'visited', 'edge_id': edge_ids[e],
+            'u': us[e], 'v': vs[e], 'k': keys[e], 'weight': wts[e], 'coords': coords[e]
+        }
+
+
+def _timed(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(side: int = 200):
+    G = make_grid_graph(side=side)
+    csr = get_csr(G)
+    t0 = time.perf_counter()
+    csr.edge_table()
+    print(f"Grilla {side}x{side}: {csr.n_edges} aristas, tabla construida en {time.perf_counter() - t0:.2f}s")
+
+    t_fmt = _timed(lambda: sum(1 for _ in _events_formatted(csr)))
+    t_idx = _timed(lambda: sum(1 for _ in _events_indexed(csr)))
+    print(f"eventos 'visited' x{csr.n_edges}: formateados {t_fmt:.3f}s | por índice {t_idx:.3f}s "
+          f"({t_fmt / t_idx:.2f}x)")
+
+    server.GRAPH = csr
+    server._EDGE_SAMPLE_CACHE.clear()
+    client = TestClient(server.app)
+    for decimate in (1, 10):
+        t0 = time.perf_counter()
+        client.get('/api/edges-sample', params={'decimate': decimate})
+        t_cold = time.perf_counter() - t0
+        t_warm = _timed(lambda: client.get('/api/edges-sample', params={'decimate': decimate}))
+        print(f"/api/edges-sample decimate={decimate}: primera {t_cold * 1000:.1f} ms | "
+              f"cacheada {t_warm * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
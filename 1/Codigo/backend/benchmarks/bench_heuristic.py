@@ -0,0 +1,120 @@
+"""
+Benchmark: costo de la heurística de A* con y sin la geometría precalculada
+
+Para las expansiones reales de consultas A* al azar (cada nodo asentado con sus
+vecinos) compara cuánto cuesta puntuar todos los vecinos con:
+
+- haversine: haversine_m con las coordenadas en grados (la heurística anterior)
+- escalar: NodeGeometry.heuristic, cuerda entre vectores unitarios precalculados
+- en línea: la misma fórmula escrita en el bucle, como en astar_stream
+- lote por expansión: NodeGeometry.heuristic_batch sobre el slice de vecinos
+- todos los nodos: heuristic_batch de todo el grafo una vez por consulta (O(V)
+  por consulta: rinde en rutas largas, pero en un grafo grande encarece las cortas)
+
+Al final mide astar_stream por consulta (sin eventos) con la heurística actual.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_heuristic [n_queries]
+"""
+import math
+import sys
+import time
+
+import numpy as np
+
+from app.csr import EARTH_RADIUS_M, get_csr
+from app.main import astar_stream, haversine_m
+from benchmarks.common import load_bench_graph, random_pairs
+
+NO_EVENTS = 10 ** 9
+
+
+def _expansions(csr, o: int, t: int):
+    """Nodos asentados por A* de o a t, en orden (se reconstruyen de los eventos 'visited')."""
+    settled = [o]
+    for event in astar_stream(csr, csr.ids_l[o], csr.ids_l[t], progress_every=NO_EVENTS):
+        if event['type'] == 'visited':
+            u = csr.index[event['u']]
+            if settled[-1] != u:
+                settled.append(u)
+    return settled
+
+
+def main(n_queries: int = 20):
+    G = load_bench_graph()
+    csr = get_csr(G)
+    csr.edge_table()
+    t0 = time.perf_counter()
+    geometry = csr.geometry()
+    print(f"{csr.n_nodes} nodos, {csr.n_edges} aristas; geometría por nodo en "
+          f"{(time.perf_counter() - t0) * 1000:.1f} ms\n")
+
+    off, nbr, lat, lon = csr.off_l, csr.nbr_l, csr.lat_l, csr.lon_l
+    max_speed = csr.max_speed
+    queries = [(csr.index[a], csr.index[b]) for a, b in random_pairs(G, n_queries)]
+    expansions = [(t, _expansions(csr, o, t)) for o, t in queries]
+    scored = sum(off[u + 1] - off[u] for _, settled in expansions for u in settled)
+
+    def by_haversine():
+        for t, settled in expansions:
+            t_lat, t_lon = lat[t], lon[t]
+            for u in settled:
+                for e in range(off[u], off[u + 1]):
+                    v = nbr[e]
+                    haversine_m(lat[v], lon[v], t_lat, t_lon) / max_speed
+
+    def by_scalar():
+        for t, settled in expansions:
+            h = geometry.heuristic(t, max_speed)
+            for u in settled:
+                for e in range(off[u], off[u + 1]):
+                    h(nbr[e])
+
+    def by_inline():
+        xs, ys, zs = geometry.x_l, geometry.y_l, geometry.z_l
+        asin, sqrt = math.asin, math.sqrt
+        scale = 2 * EARTH_RADIUS_M / max_speed
+        for t, settled in expansions:
+            tx, ty, tz = xs[t], ys[t], zs[t]
+            for u in settled:
+                for e in range(off[u], off[u + 1]):
+                    v = nbr[e]
+                    dx, dy, dz = xs[v] - tx, ys[v] - ty, zs[v] - tz
+                    asin(min(sqrt(dx * dx + dy * dy + dz * dz) * 0.5, 1.0)) * scale
+
+    def by_batch():
+        neighbors = csr.neighbors
+        for t, settled in expansions:
+            for u in settled:
+                geometry.heuristic_batch(neighbors[off[u]:off[u + 1]], t, max_speed).tolist()
+
+    def by_whole_graph():
+        for t, settled in expansions:
+            h = geometry.heuristic_batch(slice(None), t, max_speed).tolist()
+            for u in settled:
+                for e in range(off[u], off[u + 1]):
+                    h[nbr[e]]
+
+    strategies = [('haversine', by_haversine), ('escalar', by_scalar), ('en línea', by_inline),
+                  ('lote por expansión', by_batch), ('todos los nodos', by_whole_graph)]
+    base = None
+    for name, run in strategies:
+        t0 = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - t0
+        base = base or elapsed
+        print(f"{name:20s} {elapsed / scored * 1e9:8.0f} ns/vecino {elapsed / n_queries * 1000:8.2f} ms/consulta "
+              f"({base / elapsed:.1f}x)")
+
+    times = []
+    for o, t in queries:
+        t0 = time.perf_counter()
+        for _ in astar_stream(G, csr.ids_l[o], csr.ids_l[t], decimate=NO_EVENTS, progress_every=NO_EVENTS):
+            pass
+        times.append((time.perf_counter() - t0) * 1000)
+    print(f"\nastar_stream: p50 {np.percentile(times, 50):.2f} ms, media {np.mean(times):.2f} ms "
+          f"({scored / n_queries:.0f} vecinos puntuados por consulta)")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
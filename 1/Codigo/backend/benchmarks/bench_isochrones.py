@@ -0,0 +1,54 @@
+"""
+Benchmark: isócronas de varios presupuestos en una sola búsqueda vs. una por presupuesto
+
+Para orígenes al azar y presupuestos de 5, 10, 15 y 20 minutos compara el tiempo
+de compute_isochrones con todos los presupuestos juntos contra una llamada por
+presupuesto, y cuánto del total se va en la búsqueda y cuánto en los polígonos.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_isochrones [n_queries]
+"""
+import random
+import sys
+import time
+
+from app.csr import get_csr
+from app.isochrones import bounded_dijkstra, compute_isochrones
+from benchmarks.common import load_bench_graph
+
+BUDGETS_MIN = (5, 10, 15, 20)
+
+
+def main(n_queries: int = 10):
+    G = load_bench_graph()
+    csr = get_csr(G)
+    csr.edge_table()
+    rng = random.Random(42)
+    sources = [rng.randrange(csr.n_nodes) for _ in range(n_queries)]
+    budgets = [m * 60.0 for m in BUDGETS_MIN]
+    print(f"{csr.n_nodes} nodos, {csr.n_edges} aristas, presupuestos {BUDGETS_MIN} min\n")
+
+    t0 = time.perf_counter()
+    explored = sum(len(bounded_dijkstra(csr, s, max(budgets))[0]) for s in sources)
+    t_search = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    results = [compute_isochrones(csr, s, budgets, include_edges=False) for s in sources]
+    t_joint = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for s in sources:
+        for b in budgets:
+            compute_isochrones(csr, s, [b], include_edges=False)
+    t_separate = time.perf_counter() - t0
+
+    rings = sum(len(p) for r in results for f in r['features'] for p in f['geometry']['coordinates'])
+    print(f"{'solo búsqueda acotada':28s} {t_search / n_queries * 1000:8.1f} ms/origen ({explored / n_queries:.0f} nodos)")
+    print(f"{'una búsqueda, todos juntos':28s} {t_joint / n_queries * 1000:8.1f} ms/origen "
+          f"({rings / n_queries:.1f} anillos)")
+    print(f"{'una búsqueda por presupuesto':28s} {t_separate / n_queries * 1000:8.1f} ms/origen "
+          f"({t_separate / t_joint:.1f}x más lento)")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
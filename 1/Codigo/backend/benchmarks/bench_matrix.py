@@ -0,0 +1,31 @@
+"""
+Benchmark: matriz origen-destino N x N en serie vs. con el pool de procesos
+
+Uso (desde backend/):
+    python -m benchmarks.bench_matrix [n_points]
+"""
+import random
+import sys
+import time
+
+from app.csr import get_csr
+from app.matrix import shutdown_pool, travel_time_matrix
+from benchmarks.common import load_bench_graph
+
+
+def main(n_points: int = 50):
+    csr = get_csr(load_bench_graph())
+    rng = random.Random(42)
+    points = [rng.randrange(csr.n_nodes) for _ in range(n_points)]
+
+    for parallel in (False, True):
+        travel_time_matrix(csr, points[:8], points[:8], parallel=parallel)  # calentar el pool
+        t0 = time.perf_counter()
+        travel_time_matrix(csr, points, points, parallel=parallel)
+        elapsed = time.perf_counter() - t0
+        print(f"{'pool' if parallel else 'serie':6s} {n_points}x{n_points}: {elapsed * 1000:8.1f} ms")
+    shutdown_pool()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
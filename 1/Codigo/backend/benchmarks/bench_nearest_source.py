@@ -0,0 +1,57 @@
+"""
+Benchmark: fuente más cercana entre N candidatos, una búsqueda por candidato vs. una sola búsqueda inversa
+
+Para cada destino aleatorio compara:
+
+- una ruta A* (routing.shortest_path) por candidato, como hoy con N consultas a /ws/run
+- facilities.nearest_sources con k=1 (solo el ganador) y k=5
+
+Uso (desde backend/):
+    python -m benchmarks.bench_nearest_source [n_queries] [n_fuentes]
+"""
+import random
+import sys
+import time
+
+import numpy as np
+
+from app.csr import get_csr
+from app.facilities import nearest_sources
+from app.routing import shortest_path
+from benchmarks.common import load_bench_graph
+
+
+def main(n_queries: int = 20, n_sources: int = 40):
+    csr = get_csr(load_bench_graph())
+    csr.geometry()
+    csr.reverse()
+    rng = random.Random(42)
+    queries = [(rng.sample(range(csr.n_nodes), n_sources), rng.randrange(csr.n_nodes)) for _ in range(n_queries)]
+    print(f"{csr.n_nodes} nodos, {n_sources} candidatos por consulta; p50 en ms\n")
+
+    def per_source(sources, t):
+        best = min((shortest_path(csr, s, t, 'astar')[0], s) for s in sources)
+        return best[1]
+
+    runners = {
+        f'A* x {n_sources}': per_source,
+        'inversa k=1': lambda sources, t: (nearest_sources(csr, sources, t, k=1)[0] or [None])[0],
+        'inversa k=5': lambda sources, t: (nearest_sources(csr, sources, t, k=5)[0] or [None])[0],
+    }
+    winners = {}
+    for name, run in runners.items():
+        times, found = [], []
+        for sources, t in queries:
+            t0 = time.perf_counter()
+            found.append(run(sources, t))
+            times.append((time.perf_counter() - t0) * 1000)
+        winners[name] = found
+        print(f"{name:14s} {np.percentile(times, 50):9.2f}")
+    # Los ganadores coinciden (salvo empates exactos de costo)
+    reverse = [r.source if r is not None else None for r in winners['inversa k=1']]
+    same = sum(a == b for a, b in zip(winners[f'A* x {n_sources}'], reverse))
+    print(f"\nMismo ganador en {same}/{n_queries} consultas")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20, int(sys.argv[2]) if len(sys.argv) > 2 else 40)
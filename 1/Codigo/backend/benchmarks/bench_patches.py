@@ -0,0 +1,80 @@
+"""
+Benchmark: parches de pesos en vivo, actualización incremental vs. reconstrucción
+
+Para cada tamaño de parche (aristas al azar con aumentos, disminuciones y cortes)
+mide cuánto tarda cada etapa de apply_patches (grafo, ALT, CH, tráfico) y lo
+compara con volver a construir landmarks y CH desde cero. Cuando el parche es
+demasiado grande apply_patches deja la CH pendiente y el servidor la reconstruye
+en segundo plano; acá se la reconstruye aparte y su tiempo va en la columna
+'2.º plano', fuera del total. Verifica además que la CH resultante dé los mismos
+costos que Dijkstra sobre el grafo parcheado.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_patches [n_checks]
+"""
+import math
+import random
+import sys
+import time
+
+from app.alt import LandmarkTables
+from app.ch import ContractionHierarchy, ch_query
+from app.csr import dijkstra_all, get_csr
+from app.patches import apply_patches
+from benchmarks.bench_traffic import synthetic_profiles
+from benchmarks.common import load_bench_graph
+
+PATCH_SIZES = (1, 10, 100, 1000, 10000)
+
+
+def random_changes(csr, n: int, seed: int = 0):
+    """{arista: peso} con n aristas: un tercio más lentas, un tercio más rápidas, un tercio cortadas."""
+    rng = random.Random(seed)
+    changes = {}
+    for i, e in enumerate(rng.sample(range(csr.n_edges), min(n, csr.n_edges))):
+        kind = i % 3
+        changes[e] = (csr.w_l[e] * rng.uniform(2, 5), csr.w_l[e] * rng.uniform(0.5, 0.9), math.inf)[kind]
+    return changes
+
+
+def main(n_checks: int = 10):
+    G = load_bench_graph()
+    csr = get_csr(G)
+    print(f"{csr.n_nodes} nodos, {csr.n_edges} aristas")
+
+    t0 = time.perf_counter()
+    landmarks = LandmarkTables.build(csr)
+    t_alt = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    ch = ContractionHierarchy.build(csr)
+    t_ch = time.perf_counter() - t0
+    traffic = synthetic_profiles(csr, 0.5)
+    # Tablas derivadas de la topología, que el servidor ya arma al arrancar
+    csr.edge_table()
+    csr.reverse()
+    print(f"Reconstrucción completa: ALT {t_alt * 1000:.0f} ms, CH {t_ch * 1000:.0f} ms\n")
+
+    print(f"{'aristas':>8} {'grafo':>9} {'ALT':>9} {'CH':>9} {'tráfico':>9} {'total':>9}  vs. reconstruir  2.º plano")
+    rng = random.Random(1)
+    for n in PATCH_SIZES:
+        update = apply_patches(csr, random_changes(csr, n), ch=ch, landmarks=landmarks, traffic=traffic)
+        tm = {k: v * 1000 for k, v in update.timings.items()}
+        total = sum(tm.values())
+        line = (f"{n:>8} {tm['graph']:>7.1f}ms {tm['alt']:>7.1f}ms {tm['ch']:>7.1f}ms {tm['traffic']:>7.1f}ms "
+                f"{total:>7.1f}ms  {(t_alt + t_ch) * 1000 / total:14.1f}x")
+        if 'ch' in update.pending:
+            t0 = time.perf_counter()
+            update.ch = ContractionHierarchy.build(update.csr)
+            line += f"  {(time.perf_counter() - t0) * 1000:7.0f}ms"
+        print(line)
+
+        # La CH actualizada debe seguir siendo exacta
+        for _ in range(n_checks):
+            s, t = rng.randrange(csr.n_nodes), rng.randrange(csr.n_nodes)
+            expected = dijkstra_all(update.csr, [s])[t]
+            cost = ch_query(update.ch, s, t, collect=False)[0]
+            assert cost == expected or math.isclose(cost, expected, rel_tol=1e-9), (n, s, t, cost, expected)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
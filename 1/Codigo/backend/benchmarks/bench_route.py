@@ -0,0 +1,61 @@
+"""
+Benchmark: ruta sin streaming (compute_route) vs. los streams de /ws/run
+
+Por rango de distancia (ver common.BUCKETS) mide, para Dijkstra y A*:
+
+- stream + JSON: todos los eventos (decimate=1) serializados como los envía el WebSocket
+- stream silencioso: decimate y progress_every enormes, solo la búsqueda y la ruta
+- compute_route: el kernel sin eventos más la polyline
+
+Uso (desde backend/):
+    python -m benchmarks.bench_route [n_queries]
+"""
+import json
+import sys
+import time
+
+import numpy as np
+
+from app.csr import get_csr
+from app.main import astar_stream, dijkstra_stream
+from app.routing import compute_route
+from benchmarks.common import bucketed_pairs, load_bench_graph
+
+NO_EVENTS = 10 ** 9
+STREAMS = {'dijkstra': dijkstra_stream, 'astar': astar_stream}
+
+
+def _p50_ms(run, pairs) -> float:
+    times = []
+    for o, t in pairs:
+        t0 = time.perf_counter()
+        run(o, t)
+        times.append((time.perf_counter() - t0) * 1000)
+    return float(np.percentile(times, 50))
+
+
+def main(n_queries: int = 20):
+    G = load_bench_graph()
+    csr = get_csr(G)
+    csr.edge_table()
+    csr.geometry()
+    ids = csr.ids_l
+    pairs = bucketed_pairs(csr, n_queries)
+    print(f"{csr.n_nodes} nodos, {csr.n_edges} aristas; p50 en ms\n")
+    print(f"{'alg':9s} {'rango':6s} {'stream+JSON':>12s} {'silencioso':>11s} {'compute_route':>14s} {'vs. stream':>11s}")
+    for alg, stream in STREAMS.items():
+        modes = {
+            'events': lambda o, t: [json.dumps(e) for e in stream(G, ids[o], ids[t])],
+            'silent': lambda o, t: list(stream(G, ids[o], ids[t], decimate=NO_EVENTS, progress_every=NO_EVENTS)),
+            'route': lambda o, t: compute_route(csr, o, t, alg),
+        }
+        for bucket, bucket_pairs in pairs.items():
+            if not bucket_pairs:
+                continue
+            p50 = {mode: _p50_ms(run, bucket_pairs) for mode, run in modes.items()}
+            print(f"{alg:9s} {bucket:6s} {p50['events']:>12.2f} {p50['silent']:>11.2f} {p50['route']:>14.2f} "
+                  f"{p50['events'] / p50['route']:>10.1f}x")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,88 @@
+"""
+Benchmark: curvas de escala de los algoritmos sobre redes sintéticas (sin OSM)
+
+Para cada tamaño genera una red con app.synthetic y mide:
+
+- generación de la red, armado del CSR (to_csr) y, hasta NX_MAX_NODES, el camino
+  de carga del servidor (MultiDiGraph + CSRGraph.from_networkx)
+- preprocesamiento de ALT y, hasta CH_MAX_NODES, de Contraction Hierarchies
+- p50 (ms) y nodos explorados promedio por consulta de Dijkstra, A*, Dijkstra y A*
+  bidireccionales, A* con ALT, CH y compute_route, con los mismos pares aleatorios
+
+Uso (desde backend/):
+    python -m benchmarks.bench_scaling [n_queries] [nodos ...]     # por defecto 10000 100000
+
+Con 1M de nodos el pico es de unos 4 GB de RAM (los arreglos, sus copias en listas y
+las tablas de ALT); para 2M conviene generar la red con `python -m app.synthetic`
+y medir una sola cosa por proceso.
+"""
+import random
+import sys
+import time
+
+import numpy as np
+
+from app.alt import LandmarkTables
+from app.ch import ContractionHierarchy, ch_query
+from app.csr import CSRGraph
+from app.main import astar_stream, bidirectional_stream, dijkstra_stream
+from app.routing import compute_route
+from app.synthetic import generate_road_network
+
+NO_EVENTS = 10 ** 9
+NX_MAX_NODES = 200_000
+CH_MAX_NODES = 20_000
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t0
+
+
+def _done(gen):
+    return [e for e in gen if e['type'] == 'done'][0]['nodes_explored']
+
+
+def main(n_queries: int = 20, sizes=(10_000, 100_000)):
+    print(f"{'nodos':>9s} {'alg':10s} {'p50 ms':>9s} {'explorados':>11s}")
+    for size in sizes:
+        network, t_gen = _timed(lambda: generate_road_network(size))
+        csr, t_csr = _timed(network.to_csr)
+        load = f"generación {t_gen:.2f}s, to_csr {t_csr:.2f}s"
+        if size <= NX_MAX_NODES:
+            _, t_nx = _timed(lambda: CSRGraph.from_networkx(network.to_networkx()))
+            load += f", networkx + from_networkx {t_nx:.2f}s"
+        csr.edge_table()
+        csr.geometry()
+        tables, t_alt = _timed(lambda: LandmarkTables.build(csr))
+        load += f", ALT {t_alt:.2f}s"
+        runners = {
+            'dijkstra': lambda o, t: _done(dijkstra_stream(csr, o, t, decimate=NO_EVENTS)),
+            'astar': lambda o, t: _done(astar_stream(csr, o, t, decimate=NO_EVENTS)),
+            'bidijkstra': lambda o, t: _done(bidirectional_stream(csr, o, t, decimate=NO_EVENTS)),
+            'biastar': lambda o, t: _done(bidirectional_stream(csr, o, t, decimate=NO_EVENTS, heuristic=True)),
+            'alt': lambda o, t: _done(astar_stream(csr, o, t, decimate=NO_EVENTS, landmarks=tables)),
+            'route': lambda o, t: compute_route(csr, o, t, 'astar')['nodes_explored'],
+        }
+        if size <= CH_MAX_NODES:
+            ch, t_ch = _timed(lambda: ContractionHierarchy.build(csr))
+            load += f", CH {t_ch:.2f}s"
+            runners['ch'] = lambda o, t: ch_query(ch, o, t, collect=False)[2]
+        print(f"{csr.n_nodes:>9d} {csr.n_edges} aristas; {load}")
+
+        # Los ids de la red sintética coinciden con los índices del CSR
+        rng = random.Random(42)
+        pairs = [(rng.randrange(csr.n_nodes), rng.randrange(csr.n_nodes)) for _ in range(n_queries)]
+        for name, run in runners.items():
+            times, explored = [], 0
+            for o, t in pairs:
+                count, elapsed = _timed(lambda: run(o, t))
+                times.append(elapsed * 1000)
+                explored += count
+            print(f"{csr.n_nodes:>9d} {name:10s} {np.percentile(times, 50):>9.2f} {explored / n_queries:>11.0f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20,
+         tuple(int(s) for s in sys.argv[2:]) or (10_000, 100_000))
@@ -0,0 +1,106 @@
+"""
+Benchmark: estado por consulta denso (O(V)) vs. buffers con reinicio por generación
+
+Uso (desde backend/):
+    python -m benchmarks.bench_sparse_state [n_queries] [lado_grilla]
+
+Compara, para rutas cortas (< 1 km), medias (1-5 km) y largas (> 5 km), el
+dijkstra_stream actual (buffers reutilizables con reinicio por generación) con
+una copia de la versión anterior, que reservaba listas de tamaño V por consulta.
+Se usa decimate grande para aislar el costo de la búsqueda; se reporta tiempo
+medio y pico de memoria (tracemalloc) por consulta.
+"""
+import heapq
+import math
+import sys
+import time
+import tracemalloc
+
+from app.csr import get_csr
+from app.main import _path_events, dijkstra_stream
+from benchmarks.common import bucketed_pairs, make_grid_graph
+
+
+def dense_dijkstra_stream(G, orig, dest, decimate: int = 1, progress_every: int = 500):
+    """Versión anterior de dijkstra_stream: dist / prev / visited de tamaño V por consulta."""
+    csr = get_csr(G)
+    off, nbr, wts = csr.off_l, csr.nbr_l, csr.w_l
+    ids, keys, lat, lon = csr.ids_l, csr.keys_l, csr.lat_l, csr.lon_l
+    o, t = csr.index[orig], csr.index[dest]
+    dist = [math.inf] * csr.n_nodes
+    prev = [-1] * csr.n_nodes
+    visited = bytearray(csr.n_nodes)
+    dist[o] = 0
+    pq = [(0, o)]
+    nodes_explored = 0
+    yield {'type': 'status', 'msg': 'started', 'algorithm': 'dijkstra', 'orig': orig, 'dest': dest}
+    i = 0
+    while pq:
+        d, node = heapq.heappop(pq)
+        if visited[node]:
+            continue
+        visited[node] = 1
+        nodes_explored += 1
+        if node == t:
+            yield {'type': 'status', 'msg': 'reached_dest', 'node': dest}
+            break
+        d_node = dist[node]
+        for e in range(off[node], off[node + 1]):
+            v = nbr[e]
+            w = wts[e]
+            new_dist = d_node + w
+            if new_dist < dist[v]:
+                dist[v] = new_dist
+                prev[v] = node
+                heapq.heappush(pq, (new_dist, v))
+                if i % decimate == 0:
+                    u_id, v_id = ids[node], ids[v]
+                    yield {
+                        'type': 'visited', 'edge_id': f"{u_id}|{v_id}|{keys[e]}",
+                        'u': u_id, 'v': v_id, 'k': keys[e], 'weight': w,
+                        'coords': [[lat[node], lon[node]], [lat[v], lon[v]]]
+                    }
+                i += 1
+        if nodes_explored % progress_every == 0:
+            yield {'type': 'progress', 'explored': nodes_explored}
+    path_edges, total_km = csr.reconstruct_path(o, t, prev)
+    yield from _path_events(csr, o, path_edges)
+    yield {'type': 'done', 'nodes_explored': nodes_explored, 'distance_km': total_km}
+
+
+def _measure(fn, pairs):
+    t0 = time.perf_counter()
+    for o, t in pairs:
+        fn(o, t)
+    elapsed = (time.perf_counter() - t0) / len(pairs)
+    tracemalloc.start()
+    fn(*pairs[0])
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main(n_queries: int = 20, side: int = 300):
+    G = make_grid_graph(side=side)
+    csr = get_csr(G)
+    print(f"Grilla {side}x{side}: {csr.n_nodes} nodos, {csr.n_edges} aristas")
+    ids = csr.ids_l
+
+    def sparse(o, t):
+        for _ in dijkstra_stream(G, ids[o], ids[t], decimate=10**9, progress_every=10**9):
+            pass
+
+    def dense(o, t):
+        for _ in dense_dijkstra_stream(G, ids[o], ids[t], decimate=10**9, progress_every=10**9):
+            pass
+
+    for name, pairs in bucketed_pairs(csr, n_queries).items():
+        t_dense, m_dense = _measure(dense, pairs)
+        t_sparse, m_sparse = _measure(sparse, pairs)
+        print(f"{name:6s} denso {t_dense * 1000:8.2f} ms {m_dense / 1e6:7.2f} MB | "
+              f"generaciones {t_sparse * 1000:8.2f} ms {m_sparse / 1e6:7.2f} MB")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 300)
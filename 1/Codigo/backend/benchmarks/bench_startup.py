@@ -0,0 +1,72 @@
+"""
+Benchmark: arranque desde la caché pickle vs. desde el formato CSR en disco
+
+Uso (desde backend/):
+    python -m benchmarks.bench_startup [lado_grilla]
+
+Con la caché real (graph_cache_corrientes.pkl) se usa esa; si no, una grilla
+sintética con los mismos atributos de estilo por arista que agrega
+load_or_download_graph (color, alpha, linewidth). Mide el tiempo hasta tener el
+grafo CSR listo, el tamaño en disco y el tiempo de importar osmnx (que el
+arranque desde el formato CSR evita).
+"""
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from app.csr import CSRGraph
+from app.graph_store import load_graph, save_graph
+from app.main import CACHE_FILE, COLOR_UNVISITED
+from benchmarks.common import make_grid_graph
+
+
+def _dir_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.iterdir())
+
+
+def main(side: int = 300):
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        if CACHE_FILE.exists():
+            pkl = CACHE_FILE
+        else:
+            print(f"Sin caché del grafo: usando grilla sintética {side}x{side}")
+            G = make_grid_graph(side=side)
+            for _, _, data in G.edges(data=True):
+                data.update(color=COLOR_UNVISITED, alpha=0.25, linewidth=0.6)
+            pkl = tmp / 'graph.pkl'
+            with open(pkl, 'wb') as f:
+                pickle.dump(G, f)
+            del G
+
+        t0 = time.perf_counter()
+        with open(pkl, 'rb') as f:
+            G = pickle.load(f)
+        t_unpickle = time.perf_counter() - t0
+        csr = CSRGraph.from_networkx(G)
+        t_pickle = time.perf_counter() - t0
+
+        store = tmp / 'graph.graph'
+        save_graph(csr, store)
+        del G, csr
+
+        t0 = time.perf_counter()
+        csr = load_graph(store)
+        t_store = time.perf_counter() - t0
+
+        print(f"{csr.n_nodes} nodos, {csr.n_edges} aristas")
+        print(f"pickle: {os.path.getsize(pkl) / 1e6:7.1f} MB  {t_pickle:6.2f}s "
+              f"(unpickle {t_unpickle:.2f}s + CSR {t_pickle - t_unpickle:.2f}s)")
+        print(f"CSR   : {_dir_size(store) / 1e6:7.1f} MB  {t_store:6.2f}s  x{t_pickle / t_store:.1f}")
+
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'import osmnx'], check=False, capture_output=True)
+    print(f"import osmnx (proceso nuevo): {time.perf_counter() - t0:.2f}s, evitado al arrancar desde el formato CSR")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 300)
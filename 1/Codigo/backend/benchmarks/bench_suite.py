@@ -0,0 +1,177 @@
+"""
+Suite de benchmarks de ruteo con consultas reproducibles y reporte JSON
+
+Genera con una semilla fija pares origen-destino agrupados por distancia (ver
+common.BUCKETS) y mide dijkstra_stream y astar_stream en dos modos:
+
+- events: decimate=1, se consumen todos los eventos como haría el WebSocket
+- silent: decimate y progress_every enormes, solo la búsqueda y la ruta
+
+Por algoritmo, modo y rango registra nodos explorados, latencia p50 / p95 /
+media y pico de memoria por consulta (tracemalloc, en una segunda pasada para no
+afectar los tiempos). Cada consulta se repite --repeat veces y se toma el menor
+tiempo, para que el ruido de la máquina no tape las diferencias entre commits. El reporte JSON incluye el commit y una huella del grafo:
+dos reportes del mismo grafo y la misma semilla usan exactamente las mismas
+consultas y se pueden comparar con --compare.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_suite [--queries 20] [--seed 42] [--repeat 3] [--out bench_report.json] [--compare anterior.json]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import networkx as nx
+import numpy as np
+
+from app.csr import get_csr
+from app.main import CACHE_FILE, astar_stream, dijkstra_stream
+from benchmarks.common import bucketed_pairs, load_bench_graph
+
+REPORT_VERSION = 1
+NO_EVENTS = 10 ** 9
+ALGORITHMS: Dict[str, Callable[..., Iterator[Dict[str, Any]]]] = {
+    'dijkstra': dijkstra_stream,
+    'astar': astar_stream,
+}
+MODES = {
+    'events': {'decimate': 1},
+    'silent': {'decimate': NO_EVENTS, 'progress_every': NO_EVENTS},
+}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def _run_query(run: Callable[[], Iterator[Dict[str, Any]]]) -> Tuple[float, int]:
+    """Consume todos los eventos de una consulta: (segundos, nodos explorados)."""
+    t0 = time.perf_counter()
+    done = None
+    for event in run():
+        if event['type'] == 'done':
+            done = event
+    return time.perf_counter() - t0, done['nodes_explored']
+
+
+def _peak_memory(run: Callable[[], Iterator[Dict[str, Any]]]) -> int:
+    """Pico de memoria (bytes) reservada durante una consulta."""
+    tracemalloc.start()
+    try:
+        for _ in run():
+            pass
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_suite(G: nx.MultiDiGraph, n_queries: int = 20, seed: int = 42, repeat: int = 3) -> Dict[str, Any]:
+    """Mide todos los algoritmos, modos y rangos de distancia; devuelve el reporte."""
+    csr = get_csr(G)
+    ids = csr.ids_l
+    pairs = bucketed_pairs(csr, n_queries, seed=seed)
+    results: Dict[str, Any] = {}
+    for alg, stream in ALGORITHMS.items():
+        for mode, kwargs in MODES.items():
+            # Consulta de calentamiento: buffers de búsqueda, tabla de aristas, velocidad máxima
+            o, t = next(p for bucket in pairs.values() for p in bucket)
+            _run_query(lambda: stream(G, ids[o], ids[t], **kwargs))
+            for bucket, bucket_pairs in pairs.items():
+                if not bucket_pairs:
+                    continue
+                latencies, explored = [], []
+                for o, t in bucket_pairs:
+                    runs = [_run_query(lambda: stream(G, ids[o], ids[t], **kwargs)) for _ in range(repeat)]
+                    elapsed, nodes = min(runs)
+                    latencies.append(elapsed * 1000)
+                    explored.append(nodes)
+                peak = max(_peak_memory(lambda: stream(G, ids[o], ids[t], **kwargs)) for o, t in bucket_pairs)
+                results.setdefault(alg, {}).setdefault(mode, {})[bucket] = {
+                    'queries': len(bucket_pairs),
+                    'nodes_explored_mean': float(np.mean(explored)),
+                    'p50_ms': float(np.percentile(latencies, 50)),
+                    'p95_ms': float(np.percentile(latencies, 95)),
+                    'mean_ms': float(np.mean(latencies)),
+                    'peak_memory_kb': peak / 1024,
+                }
+    return {
+        'version': REPORT_VERSION,
+        'commit': _git_commit(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'graph': {
+            'source': 'cache' if os.path.exists(CACHE_FILE) else 'grid',
+            'nodes': csr.n_nodes,
+            'edges': csr.n_edges,
+            'fingerprint': csr.fingerprint(),
+        },
+        'seed': seed,
+        'queries_per_bucket': n_queries,
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def compare_reports(old: Dict[str, Any], new: Dict[str, Any]) -> List[str]:
+    """Líneas con la variación de p50, p95 y nodos explorados entre dos reportes."""
+    lines = []
+    if old['graph'] != new['graph'] or old['seed'] != new['seed']:
+        lines.append("Aviso: los reportes usan grafos o semillas distintos; las consultas no son las mismas")
+    for alg, modes in new['results'].items():
+        for mode, buckets in modes.items():
+            for bucket, cur in buckets.items():
+                prev = old['results'].get(alg, {}).get(mode, {}).get(bucket)
+                if prev is None:
+                    continue
+                change = ' '.join(f"{key} {(cur[key] / prev[key] - 1) * 100:+6.1f}%" if prev[key] else f"{key} n/a"
+                                  for key in ('p50_ms', 'p95_ms', 'nodes_explored_mean', 'peak_memory_kb'))
+                lines.append(f"{alg:9s} {mode:7s} {bucket:6s} {change}")
+    return lines
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    graph = report['graph']
+    print(f"Grafo ({graph['source']}): {graph['nodes']} nodos, {graph['edges']} aristas; "
+          f"commit {report['commit']}, semilla {report['seed']}")
+    print(f"{'alg':9s} {'modo':7s} {'rango':6s} {'consultas':>9s} {'nodos':>9s} {'p50 ms':>9s} {'p95 ms':>9s} "
+          f"{'memoria KB':>11s}")
+    for alg, modes in report['results'].items():
+        for mode, buckets in modes.items():
+            for bucket, r in buckets.items():
+                print(f"{alg:9s} {mode:7s} {bucket:6s} {r['queries']:>9d} {r['nodes_explored_mean']:>9.0f} "
+                      f"{r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['peak_memory_kb']:>11.1f}")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Suite de benchmarks de ruteo con reporte JSON")
+    parser.add_argument('--queries', type=int, default=20, help="consultas por rango de distancia")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=3, help="repeticiones por consulta (se toma la menor)")
+    parser.add_argument('--out', default='bench_report.json', help="archivo del reporte JSON")
+    parser.add_argument('--compare', help="reporte anterior contra el que comparar")
+    args = parser.parse_args(argv)
+
+    report = run_suite(load_bench_graph(), args.queries, args.seed, args.repeat)
+    print_report(report)
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReporte guardado en {args.out}")
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        print(f"\nComparación con {args.compare} (commit {previous.get('commit')}):")
+        print('\n'.join(compare_reports(previous, report)))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,64 @@
+"""
+Benchmark: red vial completa por /api/edges-sample (JSON) vs. teselas binarias
+
+Uso (desde backend/):
+    python -m benchmarks.bench_tiles [lado_grilla] [z]
+
+Compara los bytes y el tiempo de bajar todas las aristas con
+/api/edges-sample?decimate=1 contra pedir las teselas z/x/y que cubren el grafo
+(primera vez: generación; segunda: desde la caché en memoria; tercera: 304 con
+If-None-Match), y cuántos bytes cuesta un viewport típico de 3x3 teselas.
+"""
+import math
+import sys
+import tempfile
+import time
+
+from fastapi.testclient import TestClient
+
+from app import main as server
+from app.csr import get_csr
+from benchmarks.common import make_grid_graph
+
+
+def _tile_of(lat, lon, z):
+    n = 1 << z
+    return int((lon + 180.0) / 360.0 * n), int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+
+
+def main(side: int = 200, z: int = 14):
+    G = make_grid_graph(side=side)
+    csr = get_csr(G)
+    server.GRAPH = csr
+    server._EDGE_SAMPLE_CACHE.clear()
+    client = TestClient(server.app)
+    print(f"Grilla {side}x{side}: {csr.n_edges} aristas")
+
+    t0 = time.perf_counter()
+    body = client.get('/api/edges-sample', params={'decimate': 1}).content
+    print(f"edges-sample decimate=1: {len(body) / 1e6:6.2f} MB en {time.perf_counter() - t0:.2f}s")
+
+    x0, y0 = _tile_of(float(csr.lat.max()), float(csr.lon.min()), z)
+    x1, y1 = _tile_of(float(csr.lat.min()), float(csr.lon.max()), z)
+    tiles = [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+    with tempfile.TemporaryDirectory() as tmp:
+        server.TILE_CACHE_DIR = tmp
+        server._TILE_INDEXES.clear()
+        etags = {}
+        for label in ('generadas', 'cacheadas', '304'):
+            t0 = time.perf_counter()
+            n_bytes = 0
+            for x, y in tiles:
+                headers = {'If-None-Match': etags[(x, y)]} if label == '304' else {}
+                r = client.get(f'/api/tiles/{z}/{x}/{y}', headers=headers)
+                etags[(x, y)] = r.headers['etag']
+                n_bytes += len(r.content)
+            print(f"{len(tiles)} teselas z={z} {label:9s}: {n_bytes / 1e6:6.2f} MB en {time.perf_counter() - t0:.2f}s")
+        viewport = sum(len(client.get(f'/api/tiles/{z}/{x}/{y}').content)
+                       for x in range(x0, x0 + 3) for y in range(y0, y0 + 3))
+        print(f"viewport de 3x3 teselas: {viewport / 1e3:.1f} kB")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 14)
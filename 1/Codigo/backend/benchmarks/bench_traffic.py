@@ -0,0 +1,76 @@
+"""
+Benchmark: costo extra por relajación de los pesos dependientes del horario
+
+Uso (desde backend/):
+    python -m benchmarks.bench_traffic [n_queries] [fraccion_con_perfil]
+
+1. Micro: costo de cada arista como csr.w_l[e] vs. TrafficProfiles.travel_time(e, t),
+   con perfiles sintéticos (velocidad aleatoria por franja) en la fracción de
+   aristas indicada (por defecto todas).
+2. Consultas: Dijkstra y A* con pesos estáticos vs. con hora de salida (08:00),
+   mismo conjunto de pares (semilla 42); se informa el tiempo por arista relajada.
+"""
+import random
+import sys
+import time
+
+import numpy as np
+
+from app.csr import get_csr
+from app.main import astar_stream, dijkstra_stream
+from app.traffic import DAY_S, N_BUCKETS, TrafficProfiles
+from benchmarks.common import load_bench_graph, random_pairs
+
+
+def synthetic_profiles(csr, fraction: float = 1.0, seed: int = 0) -> TrafficProfiles:
+    """Perfiles con velocidades entre 30% y 100% de la de flujo libre en una fracción de las aristas."""
+    rng = np.random.default_rng(seed)
+    observed = np.flatnonzero(rng.random(csr.n_edges) < fraction)
+    edge_profile = np.full(csr.n_edges, -1, dtype=np.int32)
+    edge_profile[observed] = np.arange(len(observed), dtype=np.int32)
+    free_flow = csr.lengths[observed] / csr.weights[observed] * 3.6
+    speeds = free_flow[:, None] * rng.uniform(0.3, 1.0, size=(len(observed), N_BUCKETS))
+    return TrafficProfiles(csr, speeds.astype(np.float16), edge_profile, csr.fingerprint())
+
+
+def main(n_queries: int = 30, fraction: float = 1.0):
+    G = load_bench_graph()
+    csr = get_csr(G)
+    profiles = synthetic_profiles(csr, fraction)
+    print(f"{csr.n_edges} aristas, {profiles.n_profiles} con perfil "
+          f"({profiles.speeds.nbytes / 1e6:.1f} MB en float16)")
+
+    rng = random.Random(0)
+    sample = [(rng.randrange(csr.n_edges), rng.uniform(0, DAY_S)) for _ in range(200_000)]
+    w, tt = csr.w_l, profiles.travel_time
+    t0 = time.perf_counter()
+    for e, _ in sample:
+        w[e]
+    t_static = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for e, t in sample:
+        tt(e, t)
+    t_td = time.perf_counter() - t0
+    print(f"costo por arista: estático {t_static / len(sample) * 1e9:.0f} ns | "
+          f"dependiente del horario {t_td / len(sample) * 1e9:.0f} ns")
+
+    departure = 8 * 3600.0
+    list(dijkstra_stream(csr, csr.ids_l[0], csr.ids_l[0]))  # Calentamiento (buffers de búsqueda)
+    degree = csr.n_edges / csr.n_nodes
+    for name, stream in (('dijkstra', dijkstra_stream), ('astar', astar_stream)):
+        totals = {'estático': [0.0, 0], 'horario': [0.0, 0]}
+        for orig, dest in random_pairs(G, n_queries):
+            for label, kwargs in (('estático', {}), ('horario', {'departure': departure, 'traffic': profiles})):
+                t0 = time.perf_counter()
+                done = list(stream(csr, orig, dest, decimate=10 ** 9, **kwargs))[-1]
+                totals[label][0] += time.perf_counter() - t0
+                totals[label][1] += done['nodes_explored']
+        line = []
+        for label, (elapsed, explored) in totals.items():
+            line.append(f"{label} {elapsed:.2f}s, {elapsed / max(explored * degree, 1) * 1e9:.0f} ns/relajación")
+        print(f"{name:8s} x{n_queries}: " + " | ".join(line))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 30,
+         float(sys.argv[2]) if len(sys.argv) > 2 else 1.0)
@@ -0,0 +1,67 @@
+"""
+Benchmark: modos del WebSocket /ws/run (por evento vs. lotes columnar / binario)
+
+Uso (desde backend/):
+    python -m benchmarks.bench_ws_protocol [n_queries] [lado_grilla]
+
+Ejecuta rutas largas con decimate=1 a través del endpoint real (TestClient, sin
+red) y mide tiempo hasta 'done', cantidad de frames y bytes enviados en cada
+modo. speed alto para que el throttling no domine la medición.
+"""
+import sys
+import time
+
+from fastapi.testclient import TestClient
+
+from app import main as server
+from app.route_cache import RouteCache
+from benchmarks.common import make_grid_graph
+
+
+def _session(client, msg):
+    frames = n_bytes = 0
+    with client.websocket_connect('/ws/run') as ws:
+        ws.send_json(msg)
+        while True:
+            frame = ws.receive()
+            frames += 1
+            if frame.get('bytes') is not None:
+                n_bytes += len(frame['bytes'])
+                continue
+            text = frame.get('text')
+            if text is None:
+                break
+            n_bytes += len(text.encode())
+            if '"type": "done"' in text or '"type": "error"' in text:
+                break
+    return frames, n_bytes
+
+
+def main(n_queries: int = 3, side: int = 100):
+    G = make_grid_graph(side=side)
+    server.GRAPH = G
+    server.ROUTE_CACHE = RouteCache(maxsize=0)
+    client = TestClient(server.app)
+    nodes = sorted(G.nodes)
+    pairs = [(nodes[i], nodes[-1 - i]) for i in range(n_queries)]
+
+    base = None
+    for protocol in ('events', 'columnar', 'binary'):
+        t0 = time.perf_counter()
+        frames = n_bytes = 0
+        for orig, dest in pairs:
+            msg = {'alg': 'dijkstra', 'orig': orig, 'dest': dest,
+                   'params': {'decimate': 1, 'speed': 1000, 'protocol': protocol}}
+            f, b = _session(client, msg)
+            frames += f
+            n_bytes += b
+        elapsed = (time.perf_counter() - t0) / n_queries
+        base = base or elapsed
+        print(f"{protocol:8s} {elapsed * 1000:9.1f} ms/ruta  {frames / n_queries:9.0f} frames  "
+              f"{n_bytes / n_queries / 1e6:7.2f} MB  x{base / elapsed:.1f}")
+    server.GRAPH = None
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3,
+               int(sys.argv[2]) if len(sys.argv) > 2 else 100)
@@ -0,0 +1,76 @@
+"""
+Utilidades compartidas por los benchmarks
+
+Carga el grafo de Corrientes desde la caché si existe; si no, construye un grafo
+sintético en grilla con los mismos atributos (x, y, weight, length, speed_kph)
+para poder medir sin acceso a la red.
+"""
+import math
+import os
+import random
+from typing import Dict, List, Tuple
+
+import networkx as nx
+
+from app.csr import CSRGraph
+from app.main import CACHE_FILE, DEFAULT_SPEED_KMH, haversine_m, load_or_download_graph
+
+# Rangos de distancia en línea recta entre origen y destino (metros)
+BUCKETS = (('corta', 0, 1000), ('media', 1000, 5000), ('larga', 5000, math.inf))
+
+
+def make_grid_graph(side: int = 100, spacing_m: float = 100.0, seed: int = 0) -> nx.MultiDiGraph:
+    """Grilla side x side de calles doble mano alrededor de Corrientes, con velocidades variadas."""
+    rng = random.Random(seed)
+    G = nx.MultiDiGraph()
+    lat0, lon0 = -27.47, -58.83
+    dlat = spacing_m / 111_320.0
+    dlon = spacing_m / (111_320.0 * 0.887)  # cos(-27.47°)
+    for r in range(side):
+        for c in range(side):
+            G.add_node(r * side + c, y=lat0 + r * dlat, x=lon0 + c * dlon)
+    for r in range(side):
+        for c in range(side):
+            u = r * side + c
+            for v in ((u + 1) if c + 1 < side else None, (u + side) if r + 1 < side else None):
+                if v is None:
+                    continue
+                speed = rng.choice((DEFAULT_SPEED_KMH, DEFAULT_SPEED_KMH, 60, 30))
+                length = spacing_m * rng.uniform(0.9, 1.1)
+                for a, b in ((u, v), (v, u)):
+                    G.add_edge(a, b, length=length, speed_kph=speed, weight=length / (speed / 3.6))
+    return G
+
+
+def load_bench_graph() -> nx.MultiDiGraph:
+    """Grafo real desde la caché, o grilla sintética si no hay caché."""
+    if os.path.exists(CACHE_FILE):
+        return load_or_download_graph()
+    print("Sin caché del grafo: usando grilla sintética 100x100")
+    return make_grid_graph()
+
+
+def random_pairs(G: nx.MultiDiGraph, n: int, seed: int = 42) -> List[Tuple[int, int]]:
+    """Pares origen-destino aleatorios y reproducibles."""
+    rng = random.Random(seed)
+    nodes = sorted(G.nodes)
+    return [(rng.choice(nodes), rng.choice(nodes)) for _ in range(n)]
+
+
+def bucketed_pairs(csr: CSRGraph, n: int, seed: int = 42) -> Dict[str, List[Tuple[int, int]]]:
+    """
+    Hasta n pares (ids densos) por rango de distancia de BUCKETS, reproducibles
+    con la misma semilla y el mismo grafo. Si el grafo es chico para algún rango
+    se corta tras n * 1000 intentos y ese rango queda incompleto (o vacío).
+    """
+    rng = random.Random(seed)
+    buckets: Dict[str, List[Tuple[int, int]]] = {name: [] for name, _, _ in BUCKETS}
+    for _ in range(n * 1000):
+        if all(len(p) >= n for p in buckets.values()):
+            break
+        o, t = rng.randrange(csr.n_nodes), rng.randrange(csr.n_nodes)
+        d = haversine_m(csr.lat_l[o], csr.lon_l[o], csr.lat_l[t], csr.lon_l[t])
+        for name, lo, hi in BUCKETS:
+            if lo <= d < hi and len(buckets[name]) < n:
+                buckets[name].append((o, t))
+    return buckets
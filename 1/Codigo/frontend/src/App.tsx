@@ -5,7 +5,7 @@ import { useState, useEffect, useMemo } from "react";
 import MapViewer from "./components/MapViewer";
 import ControlPanel from "./components/ControlPanel";
 import { useWebSocket } from "./hooks/useWebSocket";
-import { useEdgesSample } from "./hooks/useApi";
+import { useGraphMeta } from "./hooks/useApi";
 import { findNearestNode } from "./hooks/useApi";
 import { WSRequest, AlgorithmStats, AlgorithmComparison } from "./types";
 
@@ -21,7 +21,8 @@ function App() {
     error: wsError,
     clearMessages,
   } = useWebSocket();
-  const { edges: edgeCoords, loading: edgesLoading } = useEdgesSample(2);
+  // La red vial se carga por teselas del viewport (ver MapViewer / tiles.ts)
+  const { loading: edgesLoading } = useGraphMeta();
   const [selectedOrigin, setSelectedOrigin] = useState<{
     lat: number;
     lon: number;
@@ -52,14 +53,18 @@ function App() {
     );
 
     if (!doneMessage || !startMessage || !currentRequest) return null;
+    // El historial y la comparación solo cubren Dijkstra y A*
+    const algorithm = currentRequest.alg;
+    const orig = currentRequest.orig;
+    if ((algorithm !== "dijkstra" && algorithm !== "astar") || orig === undefined) return null;
 
-    const key = `${currentRequest.orig}-${currentRequest.dest}`;
+    const key = `${orig}-${currentRequest.dest}`;
     const stats: AlgorithmStats = {
-      algorithm: currentRequest.alg,
+      algorithm,
       nodes_explored: doneMessage.nodes_explored || 0,
       time_s: doneMessage.time_s || 0,
       distance_km: doneMessage.distance_km || 0,
-      orig: currentRequest.orig,
+      orig,
       dest: currentRequest.dest,
     };
 
@@ -189,7 +194,6 @@ function App() {
         </div>
       ) : (
         <MapViewer
-          edgeCoords={edgeCoords || {}}
           messages={messages}
           center={DEFAULT_CENTER}
           zoom={DEFAULT_ZOOM}
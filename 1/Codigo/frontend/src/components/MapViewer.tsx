@@ -1,17 +1,19 @@
 /**
  * Componente del mapa con visualización de rutas en tiempo real
  */
-import { useMemo, useState, useEffect } from "react";
+import { useMemo, useState, useEffect, useRef } from "react";
 import {
   MapContainer,
   TileLayer,
   Polyline,
+  useMap,
   useMapEvents,
   Marker,
   Popup,
 } from "react-leaflet";
 import L from "leaflet";
 import { WSMessage, EdgeCoords } from "../types";
+import { fetchRoadTile, tilesForBounds } from "../tiles";
 
 // Fix para los iconos de Leaflet en producción
 delete (L.Icon.Default.prototype as any)._getIconUrl;
@@ -25,7 +27,6 @@ L.Icon.Default.mergeOptions({
 });
 
 interface MapViewerProps {
-  edgeCoords: EdgeCoords | null;
   messages: WSMessage[];
   center: [number, number];
   zoom: number;
@@ -49,8 +50,54 @@ function MapClickHandler({
   return null;
 }
 
+/**
+ * Red vial de fondo: pide las teselas binarias que cubren el viewport (con todas
+ * las aristas) y dibuja cada tesela como una sola multi-polilínea
+ */
+function RoadTilesLayer() {
+  const map = useMap();
+  const [tiles, setTiles] = useState<Record<string, [number, number][][]>>({});
+  const requestedRef = useRef(new Set<string>());
+
+  useEffect(() => {
+    const load = () => {
+      for (const [x, y] of tilesForBounds(map.getBounds())) {
+        const key = `${x}/${y}`;
+        if (requestedRef.current.has(key)) continue;
+        requestedRef.current.add(key);
+        fetchRoadTile(x, y)
+          .then((tile) => setTiles((prev) => ({ ...prev, [key]: tile.coords })))
+          .catch((err) => {
+            requestedRef.current.delete(key);
+            console.error("Error cargando tesela:", err);
+          });
+      }
+    };
+    load();
+    map.on("moveend", load);
+    return () => {
+      map.off("moveend", load);
+    };
+  }, [map]);
+
+  return (
+    <>
+      {Object.entries(tiles).map(([key, lines]) => (
+        <Polyline
+          key={`tile-${key}`}
+          positions={lines}
+          pathOptions={{
+            color: "#444444",
+            weight: 0.8,
+            opacity: 0.25,
+          }}
+        />
+      ))}
+    </>
+  );
+}
+
 export default function MapViewer({
-  edgeCoords,
   messages,
   center,
   zoom,
@@ -58,15 +105,8 @@ export default function MapViewer({
   selectedOrigin,
   selectedDest,
 }: MapViewerProps) {
-  const [allEdgeCoords, setAllEdgeCoords] = useState<EdgeCoords>(
-    edgeCoords || {}
-  );
-
-  useEffect(() => {
-    if (edgeCoords) {
-      setAllEdgeCoords((prev) => ({ ...prev, ...edgeCoords }));
-    }
-  }, [edgeCoords]);
+  // Coordenadas de las aristas que llegan con los eventos de la búsqueda
+  const [allEdgeCoords, setAllEdgeCoords] = useState<EdgeCoords>({});
 
   useEffect(() => {
     const newCoords: EdgeCoords = { ...allEdgeCoords };
@@ -90,16 +130,21 @@ export default function MapViewer({
     }
   }, [messages, allEdgeCoords]);
 
-  const { visitedEdges, pathEdges, algorithm } = useMemo(() => {
+  const { visitedEdges, backwardEdges, pathEdges, algorithm } = useMemo(() => {
     const visited: string[] = [];
+    const backward = new Set<string>();
     const path: string[] = [];
-    let algo: "dijkstra" | "astar" = "astar";
+    let algo: NonNullable<WSMessage["algorithm"]> = "astar";
 
     for (const msg of messages) {
       if (msg.type === "visited" && msg.edge_id) {
         if (!visited.includes(msg.edge_id)) {
           visited.push(msg.edge_id);
         }
+        // Búsquedas bidireccionales: la frontera desde el destino se dibuja aparte
+        if (msg.direction === "backward") {
+          backward.add(msg.edge_id);
+        }
       } else if (msg.type === "path" && msg.edge_id) {
         path.push(msg.edge_id);
       } else if (msg.type === "status" && msg.algorithm) {
@@ -109,6 +154,7 @@ export default function MapViewer({
 
     return {
       visitedEdges: visited,
+      backwardEdges: backward,
       pathEdges: path,
       algorithm: algo,
     };
@@ -130,17 +176,7 @@ export default function MapViewer({
 
       <MapClickHandler onMapClick={onMapClick || undefined} />
 
-      {Object.entries(allEdgeCoords).map(([edgeId, coords]) => (
-        <Polyline
-          key={`base-${edgeId}`}
-          positions={coords}
-          pathOptions={{
-            color: "#444444",
-            weight: 0.8,
-            opacity: 0.25,
-          }}
-        />
-      ))}
+      <RoadTilesLayer />
 
       {visitedEdges.map((edgeId) => {
         const coords = allEdgeCoords[edgeId];
@@ -152,7 +188,7 @@ export default function MapViewer({
             key={`visited-${edgeId}`}
             positions={coords}
             pathOptions={{
-              color: "#ff6b35",
+              color: backwardEdges.has(edgeId) ? "#b36bff" : "#ff6b35",
               weight: 2.5,
               opacity: isInPath ? 0.3 : 0.9,
             }}
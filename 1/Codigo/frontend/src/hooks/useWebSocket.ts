@@ -1,8 +1,13 @@
 /**
  * Hook personalizado para manejar la conexión WebSocket con reconexión automática
+ *
+ * La conexión es una sesión persistente: cada consulta lleva un id y, al enviar
+ * una nueva, la anterior se cancela en el servidor ({"type": "cancel", "id"}).
+ * Solo se muestran los mensajes de la consulta actual.
  */
 import { useEffect, useRef, useState, useCallback } from "react";
 import { WSMessage, WSRequest } from "../types";
+import { decodeBinaryFrame, expandColumnar, VisitedBatch } from "../protocol";
 
 const API_URL = import.meta.env.VITE_API_URL || "http://localhost:8000";
 const WS_URL = API_URL.replace("http", "ws") + "/ws/run";
@@ -24,6 +29,9 @@ export function useWebSocket(): UseWebSocketReturn {
   const reconnectTimeoutRef = useRef<NodeJS.Timeout | null>(null);
   const shouldReconnectRef = useRef(true);
   const reconnectAttemptsRef = useRef(0);
+  const nextIdRef = useRef(0);
+  const currentIdRef = useRef<number | null>(null);
+  const inFlightRef = useRef(false);
 
   const clearMessages = useCallback(() => {
     setMessages([]);
@@ -41,6 +49,7 @@ export function useWebSocket(): UseWebSocketReturn {
 
     try {
       const ws = new WebSocket(WS_URL);
+      ws.binaryType = "arraybuffer"; // Frames del protocolo "binary"
 
       ws.onopen = () => {
         console.log("WebSocket conectado");
@@ -51,8 +60,26 @@ export function useWebSocket(): UseWebSocketReturn {
 
       ws.onmessage = (event) => {
         try {
-          const message: WSMessage = JSON.parse(event.data);
-          setMessages((prev) => [...prev, message]);
+          // Los modos por lotes se expanden a los mismos mensajes que el modo "events"
+          if (event.data instanceof ArrayBuffer) {
+            const batch = decodeBinaryFrame(event.data);
+            if (batch.length > 0 && batch[0].id === currentIdRef.current) {
+              setMessages((prev) => [...prev, ...batch]);
+            }
+            return;
+          }
+          const message = JSON.parse(event.data);
+          // Restos de una consulta ya reemplazada (o su confirmación de cancelación)
+          if (message.id !== undefined && message.id !== currentIdRef.current) return;
+          if (message.type === "done" || message.type === "error") {
+            inFlightRef.current = false;
+          }
+          if (message.type === "visited_batch") {
+            const batch = expandColumnar(message as VisitedBatch);
+            setMessages((prev) => [...prev, ...batch]);
+          } else if (message.type !== "protocol" && message.type !== "cancelled") {
+            setMessages((prev) => [...prev, message as WSMessage]);
+          }
         } catch (err) {
           console.error("Error parseando mensaje WebSocket:", err);
         }
@@ -67,9 +94,9 @@ export function useWebSocket(): UseWebSocketReturn {
       ws.onclose = (event) => {
         console.log("WebSocket desconectado", event.code, event.reason);
         setConnected(false);
+        inFlightRef.current = false;
 
         // Solo reconectar si no fue una desconexión intencional
-        // El servidor cierra la conexión después de enviar 'done', eso es normal
         if (shouldReconnectRef.current && !event.wasClean) {
           reconnectAttemptsRef.current += 1;
           const delay = Math.min(
@@ -84,7 +111,7 @@ export function useWebSocket(): UseWebSocketReturn {
             connect();
           }, delay);
         } else {
-          // Si fue una desconexión limpia (como después de 'done'), reconectar después de un breve delay
+          // Si fue una desconexión limpia, reconectar después de un breve delay
           reconnectTimeoutRef.current = setTimeout(() => {
             if (shouldReconnectRef.current) {
               console.log("Reconectando después de desconexión limpia...");
@@ -109,7 +136,20 @@ export function useWebSocket(): UseWebSocketReturn {
   }, []);
 
   const send = useCallback(
-    (request: WSRequest) => {
+    (baseRequest: WSRequest) => {
+      nextIdRef.current += 1;
+      const request: WSRequest = { ...baseRequest, id: nextIdRef.current };
+      // La búsqueda anterior (si sigue en curso) ya no se mira: se cancela
+      if (
+        inFlightRef.current &&
+        currentIdRef.current !== null &&
+        wsRef.current?.readyState === WebSocket.OPEN
+      ) {
+        wsRef.current.send(JSON.stringify({ type: "cancel", id: currentIdRef.current }));
+      }
+      currentIdRef.current = request.id ?? null;
+      inFlightRef.current = true;
+
       // Si el WebSocket está cerrado, crear una nueva conexión
       if (!wsRef.current || wsRef.current.readyState === WebSocket.CLOSED) {
         console.log("WebSocket cerrado, creando nueva conexión...");
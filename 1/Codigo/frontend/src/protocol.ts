@@ -0,0 +1,109 @@
+/**
+ * Decodificación de los modos por lotes del WebSocket /ws/run
+ *
+ * El cliente elige el modo en params.protocol ("events" | "columnar" | "binary").
+ * En los modos por lotes los eventos 'visited' llegan agrupados:
+ *
+ * - columnar: mensaje JSON {type: "visited_batch", n, u[], v[], k[], weight[],
+ *   coords[] (lat_u, lon_u, lat_v, lon_v por arista), direction[]?}
+ * - binary: frame binario little-endian (ws.binaryType = "arraybuffer"):
+ *     header de 8 bytes: uint8 versión, uint8 tipo (1 = visited), uint8 flags
+ *     (bit 0: hay direction; bit 1: hay id de consulta), uint8 reservado, uint32 N
+ *     luego, si flags & 2, int64 id de la consulta, int64[N] u, int64[N] v, int32[N] k, float32[N] weight,
+ *     float32[4N] coords y, si flags & 1, uint8[N] direction (1 = backward)
+ *
+ * Ambas funciones devuelven los mismos WSMessage que el modo "events".
+ */
+import { WSMessage } from "./types";
+
+export const BINARY_VERSION = 1;
+const KIND_VISITED = 1;
+const FLAG_DIRECTION = 1;
+const FLAG_REQUEST_ID = 2;
+
+export interface VisitedBatch {
+  type: "visited_batch";
+  n: number;
+  u: number[];
+  v: number[];
+  k: number[];
+  weight: number[];
+  coords: number[];
+  direction?: ("forward" | "backward")[];
+  id?: number;
+}
+
+export function expandColumnar(batch: VisitedBatch): WSMessage[] {
+  const out: WSMessage[] = [];
+  for (let i = 0; i < batch.n; i++) {
+    const c = 4 * i;
+    out.push({
+      type: "visited",
+      edge_id: `${batch.u[i]}|${batch.v[i]}|${batch.k[i]}`,
+      u: batch.u[i],
+      v: batch.v[i],
+      k: batch.k[i],
+      weight: batch.weight[i],
+      coords: [
+        [batch.coords[c], batch.coords[c + 1]],
+        [batch.coords[c + 2], batch.coords[c + 3]],
+      ],
+      direction: batch.direction?.[i],
+      id: batch.id,
+    });
+  }
+  return out;
+}
+
+export function decodeBinaryFrame(buffer: ArrayBuffer): WSMessage[] {
+  const view = new DataView(buffer);
+  const version = view.getUint8(0);
+  const kind = view.getUint8(1);
+  const flags = view.getUint8(2);
+  const n = view.getUint32(4, true);
+  if (version !== BINARY_VERSION || kind !== KIND_VISITED) {
+    throw new Error(`Frame binario no soportado (versión ${version}, tipo ${kind})`);
+  }
+
+  // Los arreglos están alineados a su tamaño: se leen sin copiar
+  let offset = 8;
+  let id: number | undefined;
+  if (flags & FLAG_REQUEST_ID) {
+    id = Number(view.getBigInt64(offset, true));
+    offset += 8;
+  }
+  const u = new BigInt64Array(buffer, offset, n);
+  offset += 8 * n;
+  const v = new BigInt64Array(buffer, offset, n);
+  offset += 8 * n;
+  const k = new Int32Array(buffer, offset, n);
+  offset += 4 * n;
+  const weight = new Float32Array(buffer, offset, n);
+  offset += 4 * n;
+  const coords = new Float32Array(buffer, offset, 4 * n);
+  offset += 16 * n;
+  const direction = flags & FLAG_DIRECTION ? new Uint8Array(buffer, offset, n) : null;
+
+  const out: WSMessage[] = [];
+  for (let i = 0; i < n; i++) {
+    const c = 4 * i;
+    // Los ids OSM entran en un Number (< 2^53)
+    const uId = Number(u[i]);
+    const vId = Number(v[i]);
+    out.push({
+      type: "visited",
+      edge_id: `${uId}|${vId}|${k[i]}`,
+      u: uId,
+      v: vId,
+      k: k[i],
+      weight: weight[i],
+      coords: [
+        [coords[c], coords[c + 1]],
+        [coords[c + 2], coords[c + 3]],
+      ],
+      direction: direction ? (direction[i] ? "backward" : "forward") : undefined,
+      id,
+    });
+  }
+  return out;
+}
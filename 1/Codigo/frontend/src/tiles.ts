@@ -0,0 +1,109 @@
+/**
+ * Teselas binarias de la red vial (GET /api/tiles/{z}/{x}/{y}, ver backend/app/tiles.py)
+ *
+ * Formato little-endian: header de 16 bytes (uint8 versión, uint8 z, uint16 extent,
+ * uint32 x, uint32 y, uint32 N) y luego N registros de 5 varints: delta del índice
+ * de arista, zigzag(dx_u), zigzag(dy_u) respecto del extremo v del registro anterior
+ * y zigzag(dx_v), zigzag(dy_v) respecto de u. Coordenadas en unidades de tesela por
+ * extent (grilla Web Mercator).
+ *
+ * El servidor responde con ETag y Cache-Control: no-cache, así que el navegador
+ * revalida cada tesela y recibe 304 si no cambió el grafo.
+ */
+import type { LatLngBounds } from "leaflet";
+
+const API_URL = import.meta.env.VITE_API_URL || "http://localhost:8000";
+
+export const TILE_VERSION = 1;
+export const TILE_ZOOM = 14; // Las teselas de datos se piden siempre a este nivel
+export const MAX_VISIBLE_TILES = 64; // Con zoom muy alejado no se carga la red completa
+const HEADER_SIZE = 16;
+
+export interface RoadTile {
+  edges: number[];
+  coords: [number, number][][]; // [[lat_u, lon_u], [lat_v, lon_v]] por arista
+}
+
+export function tilesForBounds(bounds: LatLngBounds, z: number = TILE_ZOOM): [number, number][] {
+  const n = 2 ** z;
+  const tileX = (lon: number) => Math.floor(((lon + 180) / 360) * n);
+  const tileY = (lat: number) => {
+    const r = (lat * Math.PI) / 180;
+    return Math.floor(((1 - Math.asinh(Math.tan(r)) / Math.PI) / 2) * n);
+  };
+  const x0 = Math.max(0, tileX(bounds.getWest()));
+  const x1 = Math.min(n - 1, tileX(bounds.getEast()));
+  const y0 = Math.max(0, tileY(bounds.getNorth()));
+  const y1 = Math.min(n - 1, tileY(bounds.getSouth()));
+  if ((x1 - x0 + 1) * (y1 - y0 + 1) > MAX_VISIBLE_TILES) return [];
+
+  const out: [number, number][] = [];
+  for (let x = x0; x <= x1; x++) {
+    for (let y = y0; y <= y1; y++) out.push([x, y]);
+  }
+  return out;
+}
+
+export function decodeTile(buffer: ArrayBuffer): RoadTile {
+  const view = new DataView(buffer);
+  const version = view.getUint8(0);
+  const z = view.getUint8(1);
+  const extent = view.getUint16(2, true);
+  const x = view.getUint32(4, true);
+  const y = view.getUint32(8, true);
+  const n = view.getUint32(12, true);
+  if (version !== TILE_VERSION) {
+    throw new Error(`Versión de tesela no soportada: ${version}`);
+  }
+
+  const bytes = new Uint8Array(buffer, HEADER_SIZE);
+  let pos = 0;
+  const readVarint = () => {
+    let value = 0;
+    let mult = 1;
+    for (;;) {
+      const byte = bytes[pos++];
+      value += (byte & 0x7f) * mult;
+      if (!(byte & 0x80)) return value;
+      mult *= 128;
+    }
+  };
+  const readZigzag = () => {
+    const v = readVarint();
+    return v % 2 === 0 ? v / 2 : -(v + 1) / 2;
+  };
+
+  const scale = extent * 2 ** z;
+  const unproject = (qx: number, qy: number): [number, number] => {
+    const mx = (x * extent + qx) / scale;
+    const my = (y * extent + qy) / scale;
+    const lat = (Math.atan(Math.sinh(Math.PI * (1 - 2 * my))) * 180) / Math.PI;
+    return [lat, mx * 360 - 180];
+  };
+
+  const edges: number[] = [];
+  const coords: [number, number][][] = [];
+  let e = 0;
+  let px = 0;
+  let py = 0;
+  for (let i = 0; i < n; i++) {
+    e += readVarint();
+    const xu = px + readZigzag();
+    const yu = py + readZigzag();
+    const xv = xu + readZigzag();
+    const yv = yu + readZigzag();
+    edges.push(e);
+    coords.push([unproject(xu, yu), unproject(xv, yv)]);
+    px = xv;
+    py = yv;
+  }
+  return { edges, coords };
+}
+
+export async function fetchRoadTile(x: number, y: number, z: number = TILE_ZOOM): Promise<RoadTile> {
+  const response = await fetch(`${API_URL}/api/tiles/${z}/${x}/${y}`, { cache: "no-cache" });
+  if (!response.ok) {
+    throw new Error(`HTTP error! status: ${response.status}`);
+  }
+  return decodeTile(await response.arrayBuffer());
+}
@@ -3,6 +3,7 @@
  */
 
 export interface GraphMeta {
+  region: string
   place: string
   radius_m: number
   nodes_total: number
@@ -32,10 +33,11 @@ export interface PathEdge {
 }
 
 export interface WSMessage {
-  type: 'status' | 'visited' | 'path' | 'progress' | 'done' | 'error'
+  type: 'status' | 'visited' | 'path' | 'progress' | 'done' | 'error' | 'cancelled'
+  id?: number // Consulta a la que pertenece (sesión persistente)
   msg?: string
-  algorithm?: 'dijkstra' | 'astar'
-  orig?: number
+  algorithm?: 'dijkstra' | 'astar' | 'alt' | 'bidijkstra' | 'biastar' | 'ch' | 'alternatives' | 'nearest'
+  orig?: number | null // null con 'nearest'
   dest?: number
   node?: number
   edge_id?: string
@@ -48,16 +50,39 @@ export interface WSMessage {
   nodes_explored?: number
   time_s?: number
   distance_km?: number
+  departure_s?: number // Solo con hora de salida
+  arrival_s?: number
   coords?: [number, number][] // Coordenadas [[lat, lon], [lat, lon]]
+  direction?: 'forward' | 'backward' // Solo en búsquedas bidireccionales y alternativas
+  route_index?: number // Solo en alternativas: 0 = ruta óptima
+  routes?: { route_index: number; cost_s: number; distance_km: number }[] // Resumen en 'done' (alternativas)
+  source?: number // En 'done' con 'nearest': candidato ganador
+  sources?: number[] | { source: number; cost_s: number; distance_km: number }[] // Candidatos ('started') y k mejores ('done') con 'nearest'
+  events_emitted?: number // En 'done': eventos enviados por la búsqueda
+  profile?: { // En 'done' con params.profile
+    mode: 'cprofile'
+    total_s: number
+    functions: { function: string; calls: number; tottime_s: number; cumtime_s: number }[]
+  }
 }
 
 export interface WSRequest {
-  alg: 'dijkstra' | 'astar'
-  orig: number
+  id?: number // Lo asigna useWebSocket: la conexión queda abierta para más consultas
+  alg: 'dijkstra' | 'astar' | 'alt' | 'bidijkstra' | 'biastar' | 'ch' | 'alternatives' | 'nearest'
+  orig?: number // No se usa con alg 'nearest'
   dest: number
+  sources?: (number | [number, number])[] // Candidatos (ids de nodo o [lat, lon]) con alg 'nearest'
+  region?: string // Región del grafo ('corrientes' por defecto, ver /api/regions)
   params: {
     decimate: number
     speed: number
+    protocol?: 'events' | 'columnar' | 'binary' // Ver protocol.ts
+    batch_size?: number
+    batch_ms?: number
+    departure?: string | number // "HH:MM" o segundos desde medianoche (perfiles de tráfico)
+    routes?: number // Cantidad máxima de rutas con alg 'alternatives' (1 a 5)
+    k?: number // Cantidad de mejores candidatos con alg 'nearest'
+    profile?: boolean // Perfil cProfile de la búsqueda en 'done'
   }
 }
 